@@ -0,0 +1,96 @@
+/**
+ * Integration Tests for the account balance ledger
+ * Checks that concurrent writes to one account add up, that deletes revert
+ * exactly once, and that compaction preserves the balance
+ */
+
+const db = require('../../src/config/database');
+const Account = require('../../src/models/Account');
+const TransactionService = require('../../src/services/TransactionService');
+
+describe('Account balance ledger - Integration Tests', () => {
+  let userId;
+  let checking;
+  let savings;
+
+  beforeAll(async () => {
+    [{ user_id: userId }] = await db('users')
+      .insert({ email: `account-ledger-${Date.now()}@example.com`, password_hash: 'x' })
+      .returning('user_id');
+
+    checking = await Account.create(userId, { name: 'Checking', account_type: 'bank', current_balance: 100 });
+    savings = await Account.create(userId, { name: 'Savings', account_type: 'bank', current_balance: 0 });
+  });
+
+  afterAll(async () => {
+    if (userId) {
+      await db('transactions').where({ user_id: userId }).del();
+      await db('users').where({ user_id: userId }).del();
+    }
+  });
+
+  const balanceOf = async (accountId) => Number((await Account.findById(accountId)).current_balance);
+
+  it('applies concurrent writes to one account without losing any', async () => {
+    await Promise.all(Array.from({ length: 20 }, () => TransactionService.createTransaction(userId, {
+      accountId: checking.account_id,
+      amount: 5,
+      type: 'income'
+    })));
+
+    expect(await balanceOf(checking.account_id)).toBe(200);
+
+    const stored = await db('accounts').where({ account_id: checking.account_id }).first();
+    expect(Number(stored.current_balance)).toBe(100);
+  });
+
+  it('moves transfers between accounts through the ledger', async () => {
+    await TransactionService.createTransaction(userId, {
+      accountId: checking.account_id,
+      toAccountId: savings.account_id,
+      amount: 50,
+      type: 'transfer'
+    });
+
+    expect(await balanceOf(checking.account_id)).toBe(150);
+    expect(await balanceOf(savings.account_id)).toBe(50);
+  });
+
+  it('reverts a deleted transaction exactly once', async () => {
+    const expense = await TransactionService.createTransaction(userId, {
+      accountId: checking.account_id,
+      amount: 30,
+      type: 'expense'
+    });
+    expect(await balanceOf(checking.account_id)).toBe(120);
+
+    const results = await Promise.allSettled([
+      TransactionService.deleteTransaction(userId, expense.transaction_id),
+      TransactionService.deleteTransaction(userId, expense.transaction_id)
+    ]);
+
+    expect(results.filter(result => result.status === 'fulfilled')).toHaveLength(1);
+    expect(await balanceOf(checking.account_id)).toBe(150);
+  });
+
+  it('folds pending deltas into current_balance on compaction', async () => {
+    const compacted = await Account.compactBalances([checking.account_id, savings.account_id]);
+
+    expect(compacted).toBe(2);
+    expect(await db('account_balance_deltas').where({ user_id: userId })).toHaveLength(0);
+    expect(await balanceOf(checking.account_id)).toBe(150);
+    expect(await balanceOf(savings.account_id)).toBe(50);
+  });
+
+  it('replaces pending deltas when the balance is set explicitly', async () => {
+    await TransactionService.createTransaction(userId, {
+      accountId: savings.account_id,
+      amount: 10,
+      type: 'income'
+    });
+
+    await Account.update(savings.account_id, userId, { current_balance: 500 });
+
+    expect(await balanceOf(savings.account_id)).toBe(500);
+  });
+});
@@ -0,0 +1,76 @@
+/**
+ * Integration Tests for filtered expense lists
+ * Checks tag and merchant filters, and that totals come back with the page
+ * (exact or capped) and agree with the filters
+ */
+
+const db = require('../../src/config/database');
+const Account = require('../../src/models/Account');
+const Expense = require('../../src/models/Expense');
+
+describe('Expense list filters - Integration Tests', () => {
+  let userId;
+  let account;
+
+  beforeAll(async () => {
+    [{ user_id: userId }] = await db('users')
+      .insert({ email: `expense-filters-${Date.now()}@example.com`, password_hash: 'x' })
+      .returning('user_id');
+
+    account = await Account.create(userId, { name: 'Card', account_type: 'credit_card', current_balance: 0 });
+
+    const fixtures = [
+      { merchant: 'Starbucks Koramangala', tags: ['coffee', 'work'] },
+      { merchant: 'Blue Tokai', tags: ['coffee'] },
+      { merchant: '100%_Pure Juice', tags: ['snacks'] },
+      { merchant: 'Amazon', tags: [] }
+    ];
+    for (const [index, fixture] of fixtures.entries()) {
+      await Expense.create(userId, {
+        account_id: account.account_id,
+        amount: 10 + index,
+        description: `Expense ${index}`,
+        expense_date: new Date(2026, 0, index + 1),
+        ...fixture
+      });
+    }
+  });
+
+  afterAll(async () => {
+    if (userId) {
+      await db('expenses').where({ user_id: userId }).del();
+      await db('users').where({ user_id: userId }).del();
+    }
+  });
+
+  it('matches any of the requested tags and counts the same rows', async () => {
+    const result = await Expense.list(userId, { tags: ['work', 'snacks'], limit: 1 });
+
+    expect(result.expenses).toHaveLength(1);
+    expect(result.total).toBe(2);
+    expect(result.total_capped).toBe(false);
+  });
+
+  it('matches merchant substrings case-insensitively with literal wildcards', async () => {
+    const coffee = await Expense.list(userId, { merchant: 'STARBUCKS' });
+    expect(coffee.expenses.map(e => e.merchant)).toEqual(['Starbucks Koramangala']);
+
+    const literal = await Expense.list(userId, { merchant: '%_' });
+    expect(literal.expenses.map(e => e.merchant)).toEqual(['100%_Pure Juice']);
+  });
+
+  it('still reports the total when paging past the end', async () => {
+    const result = await Expense.list(userId, { limit: 10, offset: 50 });
+
+    expect(result.expenses).toHaveLength(0);
+    expect(result.total).toBe(4);
+  });
+
+  it('returns a capped count on request', async () => {
+    const result = await Expense.list(userId, { count: 'capped', limit: 2 });
+
+    expect(result.expenses).toHaveLength(2);
+    expect(result.total).toBe(4);
+    expect(result.total_capped).toBe(false);
+  });
+});
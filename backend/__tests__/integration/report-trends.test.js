@@ -0,0 +1,114 @@
+/**
+ * Integration Tests for set-based monthly reports
+ * Checks Report.getTrends / getIncomeVsExpense against the month-by-month
+ * implementation they replaced, and that they run in constant round trips
+ */
+
+const db = require('../../src/config/database');
+const Report = require('../../src/models/Report');
+const FxRate = require('../../src/models/FxRate');
+
+// The previous implementation: two SUM queries per month
+const legacyMonthlyTotals = async (userId, months) => {
+  const now = new Date();
+  const baseCurrency = await FxRate.getBaseCurrency(userId);
+  const totals = [];
+
+  for (let i = months - 1; i >= 0; i--) {
+    const monthStart = new Date(now.getFullYear(), now.getMonth() - i, 1);
+    const monthEnd = new Date(now.getFullYear(), now.getMonth() - i + 1, 0);
+
+    totals.push({
+      income: await Report._sumConverted('income', userId, baseCurrency, monthStart, monthEnd),
+      expenses: await Report._sumConverted('expenses', userId, baseCurrency, monthStart, monthEnd)
+    });
+  }
+
+  return totals;
+};
+
+const dayInMonth = (monthsAgo, day) => {
+  const now = new Date();
+  const date = new Date(now.getFullYear(), now.getMonth() - monthsAgo, day);
+  return [
+    date.getFullYear(),
+    String(date.getMonth() + 1).padStart(2, '0'),
+    String(date.getDate()).padStart(2, '0')
+  ].join('-');
+};
+
+describe('Report monthly aggregation - Integration Tests', () => {
+  let userId;
+  let hasReportTables = false;
+
+  beforeAll(async () => {
+    hasReportTables = await db.schema.hasTable('expenses') && await db.schema.hasTable('income');
+    if (!hasReportTables) {
+      return;
+    }
+
+    [{ user_id: userId }] = await db('users')
+      .insert({ email: `report-trends-${Date.now()}@example.com`, password_hash: 'x' })
+      .returning('user_id');
+
+    await db('expenses').insert([
+      { user_id: userId, amount: 120.25, expense_date: dayInMonth(0, 1), is_deleted: false },
+      { user_id: userId, amount: 79.75, expense_date: dayInMonth(0, 28), is_deleted: false },
+      { user_id: userId, amount: 50, expense_date: dayInMonth(1, 15), is_deleted: false },
+      { user_id: userId, amount: 999, expense_date: dayInMonth(1, 16), is_deleted: true },
+      { user_id: userId, amount: 10.1, expense_date: dayInMonth(4, 1), is_deleted: false },
+      { user_id: userId, amount: 33.33, expense_date: dayInMonth(11, 28), is_deleted: false }
+    ]);
+
+    await db('income').insert([
+      { user_id: userId, amount: 3000, income_date: dayInMonth(0, 1), is_deleted: false },
+      { user_id: userId, amount: 2500.5, income_date: dayInMonth(4, 28), is_deleted: false },
+      { user_id: userId, amount: 100, income_date: dayInMonth(13, 10), is_deleted: false }
+    ]);
+  });
+
+  afterAll(async () => {
+    if (userId) {
+      await db('users').where({ user_id: userId }).del();
+    }
+  });
+
+  it('should match the month-by-month totals, including empty months', async () => {
+    if (!hasReportTables) {
+      return;
+    }
+
+    const legacy = await legacyMonthlyTotals(userId, 12);
+    const { trends } = await Report.getTrends(userId, 12);
+    const { data } = await Report.getIncomeVsExpense(userId, 12);
+
+    expect(trends).toHaveLength(12);
+    expect(data).toHaveLength(12);
+    trends.forEach((month, index) => {
+      expect(month.income).toBeCloseTo(legacy[index].income, 2);
+      expect(month.expenses).toBeCloseTo(legacy[index].expenses, 2);
+      expect(month.net).toBeCloseTo(legacy[index].income - legacy[index].expenses, 2);
+      expect(data[index]).toEqual({ period: month.month, income: month.income, expenses: month.expenses });
+    });
+    expect(trends[11].month).toBe(dayInMonth(0, 1).substring(0, 7));
+    expect(trends[9]).toMatchObject({ income: 0, expenses: 0, net: 0 });
+  });
+
+  it('should use a constant number of queries regardless of months', async () => {
+    if (!hasReportTables) {
+      return;
+    }
+
+    let queries = 0;
+    const countQuery = () => { queries++; };
+    db.on('query', countQuery);
+    try {
+      await Report.getTrends(userId, 60);
+    } finally {
+      db.removeListener('query', countQuery);
+    }
+
+    // Base currency lookup + one aggregate
+    expect(queries).toBe(2);
+  });
+});
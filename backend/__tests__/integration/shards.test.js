@@ -0,0 +1,88 @@
+/**
+ * Integration Tests for hash-sharded routing
+ * Runs against several Postgres databases (docker-compose.shards.yml) listed
+ * in SHARD_TEST_DATABASE_URLS as primary=url,shard1=url,...; skipped otherwise
+ */
+
+const path = require('path');
+const knex = require('knex');
+const { ShardRouter, parseShardUrls, PRIMARY_SHARD } = require('../../src/config/shards');
+
+const urls = parseShardUrls(process.env.SHARD_TEST_DATABASE_URLS);
+const describeShards = urls[PRIMARY_SHARD] && Object.keys(urls).length > 1 ? describe : describe.skip;
+
+describeShards('Shard routing - Integration Tests', () => {
+  const pools = {};
+  const userIds = [];
+  let router;
+
+  beforeAll(async () => {
+    Object.entries(urls).forEach(([name, url]) => {
+      pools[name] = knex({
+        client: 'pg',
+        connection: url,
+        pool: { min: 0, max: 2 },
+        migrations: { directory: path.join(__dirname, '../../migrations') }
+      });
+    });
+    await Promise.all(Object.values(pools).map(pool => pool.migrate.latest()));
+    await pools[PRIMARY_SHARD]('db_shards')
+      .insert(Object.keys(pools).map(name => ({ name, weight: 100 })))
+      .onConflict('name')
+      .ignore();
+
+    const { [PRIMARY_SHARD]: primary, ...shards } = pools;
+    router = new ShardRouter({ primary, shards });
+
+    for (let i = 0; i < 20; i++) {
+      const [{ user_id: userId }] = await primary('users')
+        .insert({ email: `shards-${Date.now()}-${i}@example.com`, password_hash: 'x' })
+        .returning('user_id');
+      userIds.push(userId);
+    }
+  });
+
+  afterAll(async () => {
+    if (router) {
+      for (const pool of Object.values(pools)) {
+        await pool('users').whereIn('user_id', userIds).del();
+      }
+      await pools[PRIMARY_SHARD]('user_shards').whereIn('user_id', userIds).del();
+    }
+    await Promise.all(Object.values(pools).map(pool => pool.destroy()));
+  });
+
+  it('places new users across shards and replicates their users row', async () => {
+    const placed = {};
+    for (const userId of userIds) {
+      const shard = await router.assign(userId);
+      placed[shard] = (placed[shard] || 0) + 1;
+
+      const replica = await pools[shard]('users').where({ user_id: userId }).first();
+      expect(replica).toBeDefined();
+    }
+
+    expect(Object.keys(placed).length).toBeGreaterThan(1);
+  });
+
+  it('binds queries to the user\'s shard', async () => {
+    for (const userId of userIds) {
+      const { shard } = await pools[PRIMARY_SHARD]('user_shards').where({ user_id: userId }).first();
+      const { rows: [{ name }] } = await router.runForUser(userId, () => router.current().raw('SELECT current_database() || inet_server_port() AS name'));
+      const { rows: [expected] } = await pools[shard].raw('SELECT current_database() || inet_server_port() AS name');
+
+      expect(name).toBe(expected.name);
+    }
+  });
+
+  it('refuses users that are being moved', async () => {
+    const [userId] = userIds;
+    await pools[PRIMARY_SHARD]('user_shards').where({ user_id: userId }).update({ state: 'moving' });
+    router.forget(userId);
+
+    await expect(router.forUser(userId)).rejects.toMatchObject({ statusCode: 503 });
+
+    await pools[PRIMARY_SHARD]('user_shards').where({ user_id: userId }).update({ state: 'active' });
+    router.forget(userId);
+  });
+});
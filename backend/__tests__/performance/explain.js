@@ -0,0 +1,109 @@
+/**
+ * Capture the SQL a model call issues and re-run it under
+ * EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON), summarised for assertions.
+ */
+
+const ANALYZED = /^\s*(select|with)\b/i;
+const SESSION_SETTING = /^\s*select set_config\(/i;
+
+/** Run `fn` and return every query knex sent while it ran. */
+const captureQueries = async (db, fn) => {
+  const queries = [];
+  const onQuery = query => queries.push({ sql: query.sql, bindings: query.bindings || [] });
+
+  db.on('query', onQuery);
+  try {
+    await fn();
+  } finally {
+    db.removeListener('query', onQuery);
+  }
+  return queries;
+};
+
+/**
+ * EXPLAIN ANALYZE each read query on one connection inside a transaction
+ * that is rolled back. Transaction-local set_config calls (search) are
+ * replayed so the plans see the same settings the model used.
+ */
+const explainQueries = async (db, queries) => {
+  const connection = await db.client.acquireConnection();
+  const plans = [];
+  try {
+    await connection.query('BEGIN');
+    for (const { sql, bindings } of queries) {
+      if (SESSION_SETTING.test(sql)) {
+        await connection.query(sql, bindings);
+      } else if (ANALYZED.test(sql)) {
+        const { rows } = await connection.query(`EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ${sql}`, bindings);
+        plans.push({ sql, plan: rows[0]['QUERY PLAN'][0] });
+      }
+    }
+  } finally {
+    await connection.query('ROLLBACK').catch(() => {});
+    await db.client.releaseConnection(connection);
+  }
+  return plans;
+};
+
+const walk = (node, visit) => {
+  visit(node);
+  (node.Plans || []).forEach(child => walk(child, visit));
+};
+
+/** Rows a scan node read, including ones its filter then discarded. */
+const rowsTouched = node => (
+  ((node['Actual Rows'] || 0) + (node['Rows Removed by Filter'] || 0) + (node['Rows Removed by Index Recheck'] || 0))
+  * (node['Actual Loops'] || 1)
+);
+
+/**
+ * Totals over all of a shape's queries: execution time, shared buffers hit
+ * or read, rows read by scans, and the relations / indexes scanned.
+ */
+const summarizePlans = (plans) => {
+  const summary = { queries: plans.length, executionMs: 0, buffers: 0, rows: 0, seqScans: [], indexes: [] };
+
+  plans.forEach(({ plan }) => {
+    summary.executionMs += plan['Execution Time'];
+    summary.buffers += (plan.Plan['Shared Hit Blocks'] || 0) + (plan.Plan['Shared Read Blocks'] || 0);
+    walk(plan.Plan, node => {
+      if (node['Relation Name']) {
+        summary.rows += rowsTouched(node);
+      }
+      if (node['Node Type'] === 'Seq Scan') {
+        summary.seqScans.push(node['Relation Name']);
+      }
+      if (node['Index Name']) {
+        summary.indexes.push(node['Index Name']);
+      }
+    });
+  });
+
+  summary.seqScans = [...new Set(summary.seqScans)];
+  summary.indexes = [...new Set(summary.indexes)];
+  return summary;
+};
+
+/** Indented text rendering of a JSON plan, for failure messages. */
+const formatPlan = ({ sql, plan }) => {
+  const lines = [sql];
+  const render = (node, depth) => {
+    const target = [node['Relation Name'], node['Index Name'] && `using ${node['Index Name']}`].filter(Boolean).join(' ');
+    lines.push(
+      `${'  '.repeat(depth)}-> ${node['Node Type']}${target ? ` on ${target}` : ''} ` +
+      `(rows=${node['Actual Rows']} loops=${node['Actual Loops']} ` +
+      `buffers=${(node['Shared Hit Blocks'] || 0) + (node['Shared Read Blocks'] || 0)})`
+    );
+    (node.Plans || []).forEach(child => render(child, depth + 1));
+  };
+  render(plan.Plan, 0);
+  lines.push(`Execution Time: ${plan['Execution Time'].toFixed(3)} ms`);
+  return lines.join('\n');
+};
+
+module.exports = {
+  captureQueries,
+  explainQueries,
+  summarizePlans,
+  formatPlan
+};
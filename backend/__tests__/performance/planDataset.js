@@ -0,0 +1,227 @@
+/**
+ * Deterministic dataset for the query-plan suite.
+ *
+ * 200 users share the tables, so plans are chosen under realistic
+ * selectivity. User 0 is the heavy account the suite queries, with 100x a
+ * normal user's rows. Every value is derived from the row's ordinal, so two
+ * seeds at the same scale produce the same rows. Dates are laid out relative
+ * to the current month, because reports ask for "the last N months".
+ *
+ * PLAN_DATASET_SCALE multiplies the row counts (default 1: about 600k
+ * transactions, 300k expenses and 60k income rows). A dataset already seeded
+ * at the same scale is reused. Set PLAN_DATASET_RESEED=true to rebuild it.
+ */
+
+const USERS = 200;
+const ACCOUNTS_PER_USER = 4;
+const CATEGORIES_PER_USER = 8;
+const HEAVY_FACTOR = 100;
+
+const ROWS_PER_USER = {
+  transactions: 2000,
+  expenses: 1000,
+  income: 200
+};
+
+const MERCHANTS = [
+  'Blue Tokai Coffee', 'Starbucks Koramangala', 'Amazon', 'Flipkart', 'Swiggy', 'Zomato', 'BigBasket',
+  'Uber', 'Ola Cabs', 'Indian Oil', 'HP Petrol', 'Airtel', 'Jio', 'BESCOM', 'Apollo Pharmacy',
+  'Decathlon', 'IKEA', 'PVR Cinemas', 'BookMyShow', 'Nykaa', 'Myntra', 'Croma', 'Reliance Digital',
+  'DMart', 'More Supermarket', 'Cafe Coffee Day', 'Third Wave Coffee', 'Chai Point', 'IndiGo', 'IRCTC'
+];
+const TAGS = ['food', 'travel', 'work', 'family', 'health', 'bills', 'fun', 'gifts', 'coffee', 'fuel', 'rent'];
+const CATEGORY_NAMES = ['Food', 'Transport', 'Shopping', 'Bills', 'Health', 'Entertainment', 'Travel', 'Salary'];
+
+// On one row in RARE_EVERY, so filters on them are selective enough that the
+// tag / trigram / full-text indexes must win
+const RARE_EVERY = 1000;
+const RARE_MERCHANT = 'Rare Bookshop Jayanagar';
+const RARE_TAG = 'reimbursable';
+
+const USER_EMAIL = n => `plan-dataset-${n}@example.com`;
+const EMAIL_PATTERN = 'plan-dataset-%@example.com';
+
+const scaleOf = () => Math.max(1, Number(process.env.PLAN_DATASET_SCALE) || 1);
+
+const expectedRows = (table, scale, heavy) => ROWS_PER_USER[table] * scale * (heavy ? HEAVY_FACTOR : 1);
+
+const columnsOf = async (db, table) => {
+  const { rows } = await db.raw(`
+    SELECT column_name, data_type FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = ?
+  `, [table]);
+  return new Map(rows.map(row => [row.column_name, row.data_type]));
+};
+
+const sqlArray = values => `ARRAY[${values.map(value => `'${value.replace(/'/g, "''")}'`).join(', ')}]`;
+
+// Expression for a pseudo-random value in [0, modulo) from the row ordinal
+const mix = (modulo, salt) => `((g * 7919 + u.n * 104729 + ${salt}) % ${modulo})`;
+
+const tagsExpression = (dataType) => {
+  const first = `(${sqlArray(TAGS)})[${mix(TAGS.length, 11)} + 1]`;
+  const second = `CASE WHEN g % ${RARE_EVERY} = 1 THEN '${RARE_TAG}' ELSE (${sqlArray(TAGS)})[${mix(TAGS.length, 23)} + 1] END`;
+  if (dataType === 'jsonb') {
+    return `jsonb_build_array(${first}, ${second})`;
+  }
+  return `ARRAY[${first}, ${second}]`;
+};
+
+/**
+ * INSERT ... SELECT of `table` rows for every dataset user. `columns` maps
+ * column name to SQL expression; columns missing from this schema are skipped.
+ */
+const insertRows = async (db, table, scale, columns) => {
+  const existing = await columnsOf(db, table);
+  const present = Object.entries(columns).filter(([name]) => existing.has(name));
+
+  await db.raw(`
+    WITH dataset_users AS (
+      SELECT user_id, substring(email from 'plan-dataset-(\\d+)@')::int AS n
+      FROM users WHERE email LIKE ?
+    ),
+    dataset_accounts AS (
+      SELECT user_id, account_id, row_number() OVER (PARTITION BY user_id ORDER BY name) - 1 AS n
+      FROM accounts WHERE user_id IN (SELECT user_id FROM dataset_users)
+    ),
+    dataset_categories AS (
+      SELECT user_id, category_id, row_number() OVER (PARTITION BY user_id ORDER BY name) - 1 AS n
+      FROM categories WHERE user_id IN (SELECT user_id FROM dataset_users)
+    )
+    INSERT INTO ${table} (${present.map(([name]) => name).join(', ')})
+    SELECT ${present.map(([, expression]) => expression).join(', ')}
+    FROM dataset_users u
+    CROSS JOIN LATERAL generate_series(1, CASE WHEN u.n = 0 THEN ? ELSE ? END) AS g
+    JOIN dataset_accounts a ON a.user_id = u.user_id AND a.n = g % ${ACCOUNTS_PER_USER}
+    JOIN dataset_categories c ON c.user_id = u.user_id AND c.n = g % ${CATEGORIES_PER_USER}
+  `, [EMAIL_PATTERN, expectedRows(table, scale, true), expectedRows(table, scale, false)]);
+};
+
+const dateExpression = `(date_trunc('month', current_date)::date + 27 - ${mix(5 * 365, 3)})`;
+const amountExpression = `((${mix(2000000, 5)} + 100) / 100.0)`;
+const currencyExpression = `CASE WHEN g % 20 = 0 THEN 'USD' ELSE 'INR' END`;
+const merchantExpression = `CASE WHEN g % ${RARE_EVERY} = 7 THEN '${RARE_MERCHANT}' ELSE (${sqlArray(MERCHANTS)})[${mix(MERCHANTS.length, 7)} + 1] END`;
+
+const clear = async (db) => {
+  await db('users').where('email', 'like', EMAIL_PATTERN).del();
+  await db('fx_rates').where({ source: 'plan-dataset' }).del();
+};
+
+const seed = async (db, scale) => {
+  await db.raw(`
+    INSERT INTO users (email, password_hash, name, currency_preference)
+    SELECT 'plan-dataset-' || n || '@example.com', 'x', 'Plan dataset ' || n, 'INR'
+    FROM generate_series(0, ?) AS n
+  `, [USERS - 1]);
+
+  await db.raw(`
+    INSERT INTO accounts (user_id, name, account_type, currency)
+    SELECT user_id, 'Account ' || a, 'bank', 'INR'
+    FROM users CROSS JOIN generate_series(0, ?) AS a
+    WHERE email LIKE ?
+  `, [ACCOUNTS_PER_USER - 1, EMAIL_PATTERN]);
+
+  await db.raw(`
+    INSERT INTO categories (user_id, name, category_type)
+    SELECT user_id, (${sqlArray(CATEGORY_NAMES)})[c + 1], CASE WHEN c = 7 THEN 'income' ELSE 'expense' END
+    FROM users CROSS JOIN generate_series(0, ?) AS c
+    WHERE email LIKE ?
+  `, [CATEGORIES_PER_USER - 1, EMAIL_PATTERN]);
+
+  // USD rows need a rate on or before their date for the report conversions
+  await db.raw(`
+    INSERT INTO fx_rates (currency, rate_date, rate, source)
+    SELECT currency, day::date, rate, 'plan-dataset'
+    FROM generate_series(current_date - interval '6 years', current_date + interval '1 month', interval '1 day') AS day
+    CROSS JOIN (VALUES ('USD', 1.0), ('INR', 83.0)) AS rates (currency, rate)
+    ON CONFLICT DO NOTHING
+  `);
+
+  const transactionColumns = await columnsOf(db, 'transactions');
+  await insertRows(db, 'transactions', scale, {
+    user_id: 'u.user_id',
+    account_id: 'a.account_id',
+    category_id: 'c.category_id',
+    amount: amountExpression,
+    currency: currencyExpression,
+    transaction_type: `CASE WHEN g % 10 < 8 THEN 'expense' ELSE 'income' END`,
+    description: `'Invoice ' || ${mix(5000, 13)}`,
+    merchant: merchantExpression,
+    notes: `CASE WHEN g % 9 = 0 THEN 'split with ' || (${sqlArray(TAGS)})[${mix(TAGS.length, 17)} + 1] END`,
+    tags: tagsExpression(transactionColumns.get('tags')),
+    transaction_date: dateExpression,
+    is_deleted: 'g % 50 = 0'
+  });
+
+  if (await db.schema.hasTable('expenses')) {
+    await insertRows(db, 'expenses', scale, {
+      user_id: 'u.user_id',
+      account_id: 'a.account_id',
+      category_id: 'c.category_id',
+      amount: amountExpression,
+      currency: currencyExpression,
+      description: `'Expense ' || ${mix(5000, 13)}`,
+      merchant: merchantExpression,
+      tags: tagsExpression((await columnsOf(db, 'expenses')).get('tags')),
+      expense_date: dateExpression,
+      is_deleted: 'g % 50 = 0'
+    });
+  }
+
+  if (await db.schema.hasTable('income')) {
+    await insertRows(db, 'income', scale, {
+      user_id: 'u.user_id',
+      account_id: 'a.account_id',
+      category_id: 'c.category_id',
+      amount: amountExpression,
+      currency: currencyExpression,
+      source: `'Employer ' || ${mix(20, 13)}`,
+      description: `'Income ' || ${mix(5000, 13)}`,
+      income_date: dateExpression,
+      is_deleted: 'g % 50 = 0'
+    });
+  }
+};
+
+/**
+ * Seed the dataset unless it is already there at this scale, then refresh
+ * statistics. Returns the ids the suite queries with.
+ */
+const ensurePlanDataset = async (db) => {
+  const scale = scaleOf();
+  const heavy = await db('users').where({ email: USER_EMAIL(0) }).first('user_id');
+  const current = heavy && await db('transactions').where({ user_id: heavy.user_id }).count('* as count').first();
+  const fresh = !current || Number(current.count) !== expectedRows('transactions', scale, true);
+
+  if (fresh || process.env.PLAN_DATASET_RESEED === 'true') {
+    await clear(db);
+    await seed(db, scale);
+  }
+
+  const tables = ['users', 'accounts', 'categories', 'transactions', 'fx_rates'];
+  for (const table of ['expenses', 'income']) {
+    if (await db.schema.hasTable(table)) {
+      tables.push(table);
+    }
+  }
+  await db.raw(`VACUUM (ANALYZE) ${tables.join(', ')}`);
+
+  const heavyUser = await db('users').where({ email: USER_EMAIL(0) }).first('user_id');
+  const lightUser = await db('users').where({ email: USER_EMAIL(1) }).first('user_id');
+  const account = await db('accounts').where({ user_id: heavyUser.user_id }).orderBy('name').first('account_id');
+  const category = await db('categories').where({ user_id: heavyUser.user_id }).orderBy('name').first('category_id');
+
+  return {
+    scale,
+    heavyUserId: heavyUser.user_id,
+    lightUserId: lightUser.user_id,
+    accountId: account.account_id,
+    categoryId: category.category_id
+  };
+};
+
+module.exports = {
+  ensurePlanDataset,
+  expectedRows,
+  RARE_EVERY
+};
@@ -0,0 +1,238 @@
+/**
+ * Query-plan regression tests
+ * Runs each model query shape against a large generated dataset under
+ * EXPLAIN (ANALYZE, BUFFERS), asserts on the plan (indexes used, no
+ * sequential scans on the big tables, row and buffer budgets) and compares
+ * execution time and buffers with stored baselines
+ *
+ * RUN_QUERY_PLAN_TESTS=true enables the suite (npm run test:plans).
+ * UPDATE_PLAN_BASELINES=true rewrites query-plan-baselines.json from this
+ * run. Record baselines on the machine that will run the comparison.
+ */
+
+const fs = require('fs');
+const path = require('path');
+const db = require('../../src/config/database');
+const Transaction = require('../../src/models/Transaction');
+const Expense = require('../../src/models/Expense');
+const Income = require('../../src/models/Income');
+const Report = require('../../src/models/Report');
+const Account = require('../../src/models/Account');
+const { ensurePlanDataset, expectedRows, RARE_EVERY } = require('./planDataset');
+const { captureQueries, explainQueries, summarizePlans, formatPlan } = require('./explain');
+
+const describePlans = process.env.RUN_QUERY_PLAN_TESTS === 'true' ? describe : describe.skip;
+
+const BASELINE_FILE = path.join(__dirname, 'query-plan-baselines.json');
+const UPDATE_BASELINES = process.env.UPDATE_PLAN_BASELINES === 'true';
+const RUNS = Number(process.env.PLAN_RUNS) || 5;
+const TIME_TOLERANCE = Number(process.env.PLAN_TIME_TOLERANCE) || 1.5;
+const TIME_SLACK_MS = 2;
+const BUFFER_TOLERANCE = 1.25;
+const BUFFER_SLACK = 16;
+
+// Tables large enough that a sequential scan is always a regression
+const LARGE_TABLES = ['transactions', 'expenses', 'income'];
+
+const isoDate = date => date.toISOString().slice(0, 10);
+const monthsAgo = months => {
+  const now = new Date();
+  return new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth() - months, 1));
+};
+
+const drain = async (rows, limit) => {
+  let count = 0;
+  for await (const row of rows) { // eslint-disable-line no-unused-vars
+    if (++count >= limit) break;
+  }
+};
+
+/**
+ * Query shapes. `run` calls the model; `indexes` lists patterns of which
+ * at least one must be used per entry; `rows` / `buffers` cap what the shape
+ * may read, as functions of the dataset scale.
+ */
+const SHAPES = [
+  {
+    name: 'Transaction.list',
+    run: ids => Transaction.list(ids.heavyUserId, {}),
+    indexes: [/^idx_transactions_(date|user_export)$/],
+    rows: () => 5000,
+    buffers: () => 1000
+  },
+  {
+    name: 'Transaction.list by account',
+    run: ids => Transaction.list(ids.heavyUserId, { accountId: ids.accountId }),
+    indexes: [/^idx_transactions_/],
+    rows: () => 5000,
+    buffers: () => 2000
+  },
+  {
+    name: 'Transaction.list last 3 months',
+    run: ids => Transaction.list(ids.heavyUserId, { startDate: isoDate(monthsAgo(2)), endDate: isoDate(new Date()) }),
+    indexes: [/^idx_transactions_(date|user_export)$/],
+    rows: () => 5000,
+    buffers: () => 2000
+  },
+  {
+    name: 'Transaction.search',
+    run: ids => Transaction.search(ids.heavyUserId, 'bookshop'),
+    indexes: [/^idx_transactions_search_/],
+    rows: scale => expectedRows('transactions', scale, true) / RARE_EVERY * 4 + 5000,
+    buffers: scale => 1000 * scale
+  },
+  {
+    name: 'Transaction.exportRows first page',
+    run: ids => drain(Transaction.exportRows(ids.heavyUserId), 1),
+    indexes: [/^idx_transactions_user_export$/],
+    rows: () => 12000,
+    buffers: () => 8000
+  },
+  {
+    name: 'Expense.list',
+    table: 'expenses',
+    run: ids => Expense.list(ids.heavyUserId, {}),
+    indexes: [/^idx_expenses_/],
+    // The exact total counts every live expense of the user
+    rows: scale => expectedRows('expenses', scale, true) * 1.1,
+    buffers: scale => 1500 * scale
+  },
+  {
+    name: 'Expense.list capped count',
+    table: 'expenses',
+    run: ids => Expense.list(ids.heavyUserId, { count: 'capped' }),
+    indexes: [/^idx_expenses_/],
+    rows: () => 3000,
+    buffers: () => 1000
+  },
+  {
+    name: 'Expense.list by tag',
+    table: 'expenses',
+    run: ids => Expense.list(ids.heavyUserId, { tags: ['reimbursable'], count: 'capped' }),
+    indexes: [/^idx_expenses_(user_)?tags$/],
+    rows: scale => expectedRows('expenses', scale, true) / RARE_EVERY * 4 + 5000,
+    buffers: scale => 1000 * scale
+  },
+  {
+    name: 'Expense.list by merchant',
+    table: 'expenses',
+    run: ids => Expense.list(ids.heavyUserId, { merchant: 'bookshop', count: 'capped' }),
+    indexes: [/^idx_expenses_user_merchant_trgm$/],
+    rows: scale => expectedRows('expenses', scale, true) / RARE_EVERY * 4 + 5000,
+    buffers: scale => 1000 * scale
+  },
+  {
+    name: 'Income.list',
+    table: 'income',
+    run: ids => Income.list(ids.heavyUserId, {}),
+    indexes: [/^idx_income_/],
+    rows: scale => expectedRows('income', scale, true) * 1.1,
+    buffers: scale => 500 * scale
+  },
+  {
+    name: 'Report.getCategorySpending last year',
+    table: 'expenses',
+    run: ids => Report.getCategorySpending(ids.heavyUserId, isoDate(monthsAgo(11)), isoDate(new Date())),
+    indexes: [/^idx_expenses_/],
+    rows: scale => expectedRows('expenses', scale, true) / 2,
+    buffers: scale => 8000 * scale
+  },
+  {
+    name: 'Report.getTrends 12 months',
+    table: 'income',
+    run: ids => Report.getTrends(ids.heavyUserId, 12),
+    indexes: [/^idx_expenses_/, /^idx_income_/],
+    rows: scale => (expectedRows('expenses', scale, true) + expectedRows('income', scale, true)) / 2,
+    buffers: scale => 12000 * scale
+  },
+  {
+    name: 'Report.getDashboard monthly',
+    table: 'income',
+    run: ids => Report.getDashboard(ids.heavyUserId, 'monthly'),
+    indexes: [/^idx_expenses_/, /^idx_income_/],
+    rows: scale => (expectedRows('expenses', scale, true) + expectedRows('income', scale, true)) / 10,
+    buffers: scale => 2000 * scale
+  },
+  {
+    name: 'Account.listByUser',
+    run: ids => Account.listByUser(ids.heavyUserId),
+    rows: () => 2000,
+    buffers: () => 200
+  }
+];
+
+const median = values => [...values].sort((a, b) => a - b)[Math.floor(values.length / 2)];
+
+const readBaselines = () => (fs.existsSync(BASELINE_FILE) ? JSON.parse(fs.readFileSync(BASELINE_FILE, 'utf8')) : {});
+
+describePlans('Query plans - Performance Tests', () => {
+  const baselines = readBaselines();
+  const measured = {};
+  let ids;
+
+  beforeAll(async () => {
+    ids = await ensurePlanDataset(db);
+  }, 30 * 60 * 1000);
+
+  afterAll(() => {
+    if (UPDATE_BASELINES && Object.keys(measured).length) {
+      fs.writeFileSync(BASELINE_FILE, `${JSON.stringify({ ...baselines, ...measured }, null, 2)}\n`);
+    }
+  });
+
+  SHAPES.forEach(shape => {
+    it(`${shape.name} keeps its plan`, async () => {
+      if (shape.table && !(await db.schema.hasTable(shape.table))) {
+        return;
+      }
+
+      const queries = await captureQueries(db, () => shape.run(ids));
+      let plans;
+      const times = [];
+      for (let i = 0; i < RUNS; i++) {
+        plans = await explainQueries(db, queries);
+        times.push(summarizePlans(plans).executionMs);
+      }
+      const summary = { ...summarizePlans(plans), executionMs: median(times) };
+      const violations = [];
+
+      const seqScans = summary.seqScans.filter(relation => LARGE_TABLES.includes(relation));
+      if (seqScans.length) {
+        violations.push(`sequential scan on ${seqScans.join(', ')}`);
+      }
+      (shape.indexes || []).forEach(pattern => {
+        if (!summary.indexes.some(index => pattern.test(index))) {
+          violations.push(`no index matching ${pattern} (used: ${summary.indexes.join(', ') || 'none'})`);
+        }
+      });
+      if (summary.rows > shape.rows(ids.scale)) {
+        violations.push(`read ${summary.rows} rows, budget ${shape.rows(ids.scale)}`);
+      }
+      if (summary.buffers > shape.buffers(ids.scale)) {
+        violations.push(`touched ${summary.buffers} buffers, budget ${shape.buffers(ids.scale)}`);
+      }
+
+      const baseline = baselines[shape.name];
+      if (baseline && !UPDATE_BASELINES) {
+        const timeLimit = baseline.executionMs * TIME_TOLERANCE + TIME_SLACK_MS;
+        if (summary.executionMs > timeLimit) {
+          violations.push(`median ${summary.executionMs.toFixed(2)} ms, baseline ${baseline.executionMs.toFixed(2)} ms (limit ${timeLimit.toFixed(2)} ms)`);
+        }
+        const bufferLimit = Math.ceil(baseline.buffers * BUFFER_TOLERANCE + BUFFER_SLACK);
+        if (summary.buffers > bufferLimit) {
+          violations.push(`${summary.buffers} buffers, baseline ${baseline.buffers} (limit ${bufferLimit})`);
+        }
+      }
+      measured[shape.name] = {
+        executionMs: Number(summary.executionMs.toFixed(3)),
+        buffers: summary.buffers,
+        rows: summary.rows,
+        indexes: summary.indexes
+      };
+
+      if (violations.length) {
+        throw new Error(`${shape.name}:\n  ${violations.join('\n  ')}\n\n${plans.map(formatPlan).join('\n\n')}`);
+      }
+    }, 5 * 60 * 1000);
+  });
+});
@@ -0,0 +1,157 @@
+/**
+ * Unit Tests for the shard router
+ * Tests consistent-hash placement, user_shards lookups and caching, binding
+ * a user's shard to the async context and answering 503 while a user moves
+ */
+
+const { HashRing, ShardRouter, parseShardUrls, PRIMARY_SHARD } = require('../../../src/config/shards');
+
+const userIds = count => Array.from({ length: count }, (_, i) => `00000000-0000-4000-8000-${String(i).padStart(12, '0')}`);
+
+// Minimal knex stand-in: pool(table) returns a chainable query whose
+// terminal calls resolve from `results[table]`
+const createPool = (name, results = {}) => {
+  const queries = [];
+  const pool = jest.fn((table) => {
+    const query = { table };
+    ['where', 'onConflict', 'ignore', 'merge', 'select'].forEach(method => {
+      query[method] = jest.fn(() => query);
+    });
+    query.first = jest.fn(async () => results[table]);
+    query.insert = jest.fn(() => query);
+    query.then = (resolve, reject) => Promise.resolve(results[table] || []).then(resolve, reject);
+    queries.push(query);
+    return query;
+  });
+  pool.shardName = name;
+  pool.queries = queries;
+  pool.destroy = jest.fn().mockResolvedValue();
+  return pool;
+};
+
+describe('HashRing', () => {
+  it('should place keys deterministically', () => {
+    const ring = new HashRing([{ name: 'a', weight: 100 }, { name: 'b', weight: 100 }]);
+    const again = new HashRing([{ name: 'b', weight: 100 }, { name: 'a', weight: 100 }]);
+
+    userIds(50).forEach(id => expect(ring.nodeFor(id)).toBe(again.nodeFor(id)));
+  });
+
+  it('should spread keys roughly by weight', () => {
+    const ring = new HashRing([{ name: 'a', weight: 100 }, { name: 'b', weight: 100 }, { name: 'c', weight: 200 }]);
+    const counts = { a: 0, b: 0, c: 0 };
+    userIds(8000).forEach(id => { counts[ring.nodeFor(id)] += 1; });
+
+    expect(counts.a / 8000).toBeGreaterThan(0.18);
+    expect(counts.a / 8000).toBeLessThan(0.32);
+    expect(counts.c / 8000).toBeGreaterThan(0.4);
+    expect(counts.c / 8000).toBeLessThan(0.6);
+  });
+
+  it('should only move keys onto a newly added shard', () => {
+    const before = new HashRing([{ name: 'a', weight: 100 }, { name: 'b', weight: 100 }]);
+    const after = new HashRing([{ name: 'a', weight: 100 }, { name: 'b', weight: 100 }, { name: 'c', weight: 100 }]);
+    const ids = userIds(3000);
+    const moved = ids.filter(id => before.nodeFor(id) !== after.nodeFor(id));
+
+    moved.forEach(id => expect(after.nodeFor(id)).toBe('c'));
+    expect(moved.length / ids.length).toBeLessThan(0.45);
+  });
+
+  it('should skip shards with weight 0', () => {
+    const ring = new HashRing([{ name: 'a', weight: 100 }, { name: 'b', weight: 0 }]);
+    userIds(200).forEach(id => expect(ring.nodeFor(id)).toBe('a'));
+  });
+});
+
+describe('parseShardUrls', () => {
+  it('should parse name=url pairs', () => {
+    expect(parseShardUrls('shard1=postgres://h1/db?x=1, shard2=postgres://h2/db')).toEqual({
+      shard1: 'postgres://h1/db?x=1',
+      shard2: 'postgres://h2/db'
+    });
+    expect(parseShardUrls('')).toEqual({});
+  });
+
+  it('should reject entries without a name', () => {
+    expect(() => parseShardUrls('postgres://h1/db')).toThrow('Invalid SHARD_DATABASE_URLS entry');
+  });
+});
+
+describe('ShardRouter', () => {
+  const userId = userIds(1)[0];
+  let primary;
+  let shard1;
+  let router;
+
+  beforeEach(() => {
+    primary = createPool(PRIMARY_SHARD, {
+      db_shards: [{ name: 'shard1', weight: 100 }],
+      users: { user_id: userId, email: 'a@example.com' }
+    });
+    shard1 = createPool('shard1');
+    router = new ShardRouter({ primary, shards: { shard1 } });
+  });
+
+  it('should be disabled with only the primary', () => {
+    const single = new ShardRouter({ primary });
+    expect(single.enabled).toBe(false);
+    return expect(single.forUser(userId)).resolves.toBe(primary);
+  });
+
+  it('should route unpinned users to the primary', async () => {
+    await expect(router.forUser(userId)).resolves.toBe(primary);
+  });
+
+  it('should cache placements from user_shards', async () => {
+    const results = { user_shards: { shard: 'shard1', state: 'active' } };
+    router.primary = createPool(PRIMARY_SHARD, results);
+
+    await expect(router.forUser(userId)).resolves.toBe(shard1);
+    await expect(router.forUser(userId)).resolves.toBe(shard1);
+    expect(router.primary).toHaveBeenCalledTimes(1);
+  });
+
+  it('should refuse users that are being moved', async () => {
+    router.primary = createPool(PRIMARY_SHARD, { user_shards: { shard: PRIMARY_SHARD, state: 'moving' } });
+
+    await expect(router.forUser(userId)).rejects.toMatchObject({ statusCode: 503 });
+  });
+
+  it('should place new users by the ring and replicate their users row', async () => {
+    await expect(router.assign(userId)).resolves.toBe('shard1');
+
+    const replica = shard1.queries.find(query => query.table === 'users');
+    expect(replica.insert).toHaveBeenCalledWith({ user_id: userId, email: 'a@example.com' });
+    const pin = primary.queries.find(query => query.table === 'user_shards');
+    expect(pin.insert).toHaveBeenCalledWith(expect.objectContaining({ user_id: userId, shard: 'shard1', state: 'active' }));
+  });
+
+  it('should bind the shard for the rest of the request', async () => {
+    router.placements.set(userId, { shard: 'shard1', state: 'active' });
+    let seen;
+
+    await router.bindRequest({ user: { userId } }, {}, () => { seen = router.current(); });
+
+    expect(seen).toBe(shard1);
+    expect(router.current()).toBe(primary);
+  });
+
+  it('should answer 503 with Retry-After while a user moves', async () => {
+    router.placements.set(userId, { shard: 'shard1', state: 'moving' });
+    const res = { set: jest.fn(), status: jest.fn(() => res), json: jest.fn() };
+    const next = jest.fn();
+
+    await router.bindRequest({ user: { userId } }, res, next);
+
+    expect(res.status).toHaveBeenCalledWith(503);
+    expect(res.set).toHaveBeenCalledWith('Retry-After', '5');
+    expect(next).not.toHaveBeenCalled();
+  });
+
+  it('should run a callback once per shard', async () => {
+    const seen = await router.eachShard(name => router.current().shardName + ':' + name);
+
+    expect(seen).toEqual({ primary: 'primary:primary', shard1: 'shard1:shard1' });
+  });
+});
@@ -0,0 +1,154 @@
+/**
+ * Unit Tests for the conditional GET middleware
+ * Tests ETag issuance, 304 short-circuiting, write invalidation, metrics and
+ * the Redis path
+ */
+
+const EventEmitter = require('events');
+const createConditionalRequests = require('../../../src/middleware/conditionalGet');
+
+const createStore = () => {
+  const store = new Map();
+  return {
+    async get(key) {
+      return store.has(key) ? store.get(key) : null;
+    },
+    async set(key, value) {
+      store.set(key, value);
+      return 'OK';
+    },
+    async incr(key) {
+      const next = (Number(store.get(key)) || 0) + 1;
+      store.set(key, String(next));
+      return next;
+    }
+  };
+};
+
+const createReq = (method, path, headers = {}) => ({
+  method,
+  path,
+  baseUrl: '/api/v1/accounts',
+  originalUrl: `/api/v1/accounts${path === '/' ? '' : path}`,
+  headers,
+  user: { userId: 'user-1' }
+});
+
+const createRes = () => {
+  const res = new EventEmitter();
+  res.headers = {};
+  res.statusCode = 200;
+  res.set = jest.fn((name, value) => { res.headers[name.toLowerCase()] = value; return res; });
+  res.get = jest.fn(name => res.headers[name.toLowerCase()]);
+  res.status = jest.fn(code => { res.statusCode = code; return res; });
+  res.end = jest.fn(() => res);
+  return res;
+};
+
+describe('conditionalGet middleware', () => {
+  let conditional;
+
+  beforeEach(() => {
+    conditional = createConditionalRequests(createStore());
+  });
+
+  it('should set an ETag and continue on the first read', async () => {
+    const res = createRes();
+    const next = jest.fn();
+
+    await conditional.track('accounts')(createReq('GET', '/'), res, next);
+
+    expect(next).toHaveBeenCalled();
+    expect(res.headers.etag).toMatch(/^"accounts-/);
+  });
+
+  it('should answer a matching If-None-Match with 304 without calling the route', async () => {
+    const first = createRes();
+    await conditional.track('accounts')(createReq('GET', '/'), first, jest.fn());
+
+    const res = createRes();
+    const next = jest.fn();
+    await conditional.track('accounts')(createReq('GET', '/', { 'if-none-match': first.headers.etag }), res, next);
+
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(304);
+    expect(conditional.getMetrics()['/api/v1/accounts']).toMatchObject({ hits: 1, misses: 1, hitRate: 0.5 });
+  });
+
+  it('should issue a new ETag after a write', async () => {
+    const first = createRes();
+    await conditional.track('accounts')(createReq('GET', '/'), first, jest.fn());
+
+    await conditional.track('accounts')(createReq('POST', '/'), createRes(), jest.fn());
+
+    const res = createRes();
+    const next = jest.fn();
+    await conditional.track('accounts')(createReq('GET', '/', { 'if-none-match': first.headers.etag }), res, next);
+
+    expect(next).toHaveBeenCalled();
+    expect(res.headers.etag).not.toBe(first.headers.etag);
+  });
+
+  it('should let other mounts invalidate a resource', async () => {
+    const first = createRes();
+    await conditional.track('accounts')(createReq('GET', '/'), first, jest.fn());
+
+    await conditional.invalidates('accounts')(createReq('POST', '/'), createRes(), jest.fn());
+
+    const next = jest.fn();
+    await conditional.track('accounts')(createReq('GET', '/', { 'if-none-match': first.headers.etag }), createRes(), next);
+
+    expect(next).toHaveBeenCalled();
+  });
+
+  it('should ignore paths that are not tracked', async () => {
+    const res = createRes();
+    const next = jest.fn();
+
+    await conditional.track('accounts')(createReq('GET', '/abc/statistics'), res, next);
+
+    expect(next).toHaveBeenCalled();
+    expect(res.headers.etag).toBeUndefined();
+  });
+
+  describe('with Redis', () => {
+    let redis;
+
+    beforeEach(() => {
+      redis = Object.assign(createStore(), { expire: jest.fn().mockResolvedValue(1) });
+      jest.spyOn(redis, 'set');
+      conditional = createConditionalRequests(createStore(), { getClient: () => redis, ttlSeconds: 60 });
+    });
+
+    it('should keep counters in Redis with an expiry and a shared ETag scope', async () => {
+      const res = createRes();
+      await conditional.track('accounts')(createReq('GET', '/'), res, jest.fn());
+
+      expect(redis.set).toHaveBeenCalledWith('resource_version:accounts:user-1', expect.any(String), { EX: 60, NX: true });
+      expect(res.headers.etag).toMatch(/^"accounts-v-/);
+
+      const other = createConditionalRequests(createStore(), { getClient: () => redis });
+      const next = jest.fn();
+      await other.track('accounts')(createReq('GET', '/', { 'if-none-match': res.headers.etag }), createRes(), next);
+      expect(next).not.toHaveBeenCalled();
+    });
+
+    it('should refresh the expiry when a write bumps the counter', async () => {
+      await conditional.track('accounts')(createReq('GET', '/'), createRes(), jest.fn());
+      await conditional.invalidates('accounts')(createReq('POST', '/'), createRes(), jest.fn());
+
+      expect(redis.expire).toHaveBeenCalledWith('resource_version:accounts:user-1', 60);
+    });
+
+    it('should fall back to the memory store when Redis fails', async () => {
+      redis.get = jest.fn().mockRejectedValue(new Error('connection lost'));
+      const res = createRes();
+      const next = jest.fn();
+
+      await conditional.track('accounts')(createReq('GET', '/'), res, next);
+
+      expect(next).toHaveBeenCalled();
+      expect(res.headers.etag).not.toMatch(/^"accounts-v-/);
+    });
+  });
+});
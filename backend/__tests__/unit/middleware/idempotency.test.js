@@ -0,0 +1,149 @@
+/**
+ * Unit Tests for the idempotency middleware
+ * Tests replaying stored responses, the in-progress lock, key reuse with a
+ * different body, releasing on server errors and the Redis path
+ */
+
+const createIdempotency = require('../../../src/middleware/idempotency');
+
+const createStore = () => {
+  const store = new Map();
+  return {
+    store,
+    async get(key) {
+      return store.has(key) ? store.get(key) : null;
+    },
+    async set(key, value) {
+      store.set(key, value);
+      return 'OK';
+    }
+  };
+};
+
+const createReq = ({ key = 'key-1', body = { amount: 10 }, userId = 'user-1' } = {}) => ({
+  method: 'POST',
+  originalUrl: '/api/v1/transactions',
+  body,
+  user: { userId },
+  get: jest.fn(name => (name === 'Idempotency-Key' ? key : undefined))
+});
+
+const createRes = () => {
+  const listeners = {};
+  const res = { headers: {}, statusCode: 200 };
+  res.set = jest.fn((name, value) => { res.headers[name] = value; return res; });
+  res.status = jest.fn(code => { res.statusCode = code; return res; });
+  res.json = jest.fn(() => res);
+  res.on = jest.fn((event, listener) => { listeners[event] = listener; return res; });
+  res.emit = event => listeners[event] && listeners[event]();
+  return res;
+};
+
+const send = async (middleware, req = createReq()) => {
+  const res = createRes();
+  const next = jest.fn();
+  await middleware(req, res, next);
+  return { res, next };
+};
+
+const flush = () => new Promise(resolve => setImmediate(resolve));
+
+describe('idempotency middleware', () => {
+  let fallbackClient;
+  let middleware;
+
+  beforeEach(() => {
+    fallbackClient = createStore();
+    middleware = createIdempotency({ fallbackClient, getClient: () => null });
+  });
+
+  it('should pass through requests without a key', async () => {
+    const { next } = await send(middleware, createReq({ key: undefined }));
+    expect(next).toHaveBeenCalled();
+    expect(fallbackClient.store.size).toBe(0);
+  });
+
+  it('should replay the stored response for a retry', async () => {
+    const first = await send(middleware);
+    expect(first.next).toHaveBeenCalled();
+    first.res.status(201).json({ transaction_id: 'txn-1' });
+    first.res.emit('close');
+    await flush();
+
+    const { res, next } = await send(middleware);
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(201);
+    expect(res.json).toHaveBeenCalledWith({ transaction_id: 'txn-1' });
+    expect(res.headers['Idempotent-Replayed']).toBe('true');
+  });
+
+  it('should reject a concurrent duplicate while the first is running', async () => {
+    const first = await send(middleware);
+    expect(first.next).toHaveBeenCalled();
+
+    const { res, next } = await send(middleware);
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(409);
+    expect(res.headers['Retry-After']).toBe('1');
+  });
+
+  it('should reject reusing a key for a different request', async () => {
+    const first = await send(middleware);
+    first.res.status(201).json({ transaction_id: 'txn-1' });
+    await flush();
+
+    const { res, next } = await send(middleware, createReq({ body: { amount: 99 } }));
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(422);
+  });
+
+  it('should let a retry run again after a server error', async () => {
+    const first = await send(middleware);
+    first.res.status(500).json({ error: 'Internal server error' });
+    first.res.emit('close');
+    await flush();
+
+    const { next } = await send(middleware);
+    expect(next).toHaveBeenCalled();
+  });
+
+  it('should send the response only after the record is stored', async () => {
+    let stored;
+    fallbackClient.set = jest.fn(() => new Promise(resolve => { stored = resolve; }));
+    const res = createRes();
+    const { json } = res;
+    await middleware(createReq(), res, jest.fn());
+
+    res.status(201).json({ transaction_id: 'txn-1' });
+    await flush();
+    expect(json).not.toHaveBeenCalled();
+
+    stored('OK');
+    await flush();
+    expect(json).toHaveBeenCalledWith({ transaction_id: 'txn-1' });
+  });
+
+  it('should keep keys separate per user', async () => {
+    await send(middleware, createReq({ userId: 'a' }));
+    const { next } = await send(middleware, createReq({ userId: 'b' }));
+    expect(next).toHaveBeenCalled();
+  });
+
+  it('should take the lock with one script call on Redis', async () => {
+    const redis = {
+      evalSha: jest.fn().mockResolvedValue(null),
+      set: jest.fn().mockResolvedValue('OK')
+    };
+    middleware = createIdempotency({ fallbackClient, getClient: () => redis, ttlSeconds: 60 });
+
+    const { res, next } = await send(middleware);
+    expect(next).toHaveBeenCalled();
+    expect(redis.evalSha).toHaveBeenCalledTimes(1);
+    expect(redis.evalSha.mock.calls[0][1].keys).toEqual(['idempotency:user-1:key-1']);
+
+    res.status(201).json({ transaction_id: 'txn-1' });
+    await flush();
+    expect(redis.set).toHaveBeenCalledWith('idempotency:user-1:key-1', expect.any(String), { EX: 60 });
+    expect(JSON.parse(redis.set.mock.calls[0][1])).toMatchObject({ state: 'done', status: 201 });
+  });
+});
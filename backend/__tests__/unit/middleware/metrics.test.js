@@ -0,0 +1,154 @@
+/**
+ * Unit Tests for the Prometheus metrics middleware
+ * Tests route-pattern labels, in-flight tracking, query fingerprints,
+ * pool gauges and the /metrics handler
+ */
+
+const EventEmitter = require('events');
+const createMetrics = require('../../../src/middleware/metrics');
+const { Registry } = require('../../../src/utils/prometheus');
+
+const createPool = (used = 3) => ({
+  max: 10,
+  numUsed: () => used,
+  numFree: () => 7,
+  numPendingAcquires: () => 1,
+  numPendingCreates: () => 0
+});
+
+const createReq = (overrides = {}) => ({
+  method: 'GET',
+  baseUrl: '/api/v1/accounts',
+  route: { path: '/:id' },
+  get: jest.fn(() => undefined),
+  ...overrides
+});
+
+const createRes = () => {
+  const res = new EventEmitter();
+  res.statusCode = 200;
+  res.set = jest.fn(() => res);
+  res.send = jest.fn(body => { res.body = body; return res; });
+  res.status = jest.fn(code => { res.statusCode = code; return res; });
+  res.json = jest.fn(body => { res.body = body; return res; });
+  return res;
+};
+
+const scrape = async (metrics) => {
+  const res = createRes();
+  await metrics.handler(createReq(), res);
+  return res.body;
+};
+
+describe('metrics middleware', () => {
+  let metrics;
+
+  beforeEach(() => {
+    metrics = createMetrics({ db: { client: { pool: createPool() } }, getPools: () => null, token: null });
+  });
+
+  afterEach(() => {
+    metrics.stop();
+  });
+
+  it('labels request latency with the route pattern, not the raw path', async () => {
+    const req = createReq();
+    const res = createRes();
+    metrics.middleware(req, res, () => {});
+    res.emit('finish');
+
+    const body = await scrape(metrics);
+    expect(body).toContain('http_request_duration_seconds_count{method="GET",route="/api/v1/accounts/:id",status_code="200"} 1');
+    expect(body).toContain('http_requests_in_flight 0');
+  });
+
+  it('counts a request once even when both finish and close fire', async () => {
+    const res = createRes();
+    metrics.middleware(createReq({ route: undefined }), res, () => {});
+    expect(await scrape(metrics)).toContain('http_requests_in_flight 1');
+
+    res.emit('finish');
+    res.emit('close');
+
+    const body = await scrape(metrics);
+    expect(body).toContain('route="unmatched",status_code="200"} 1');
+    expect(body).toContain('http_requests_in_flight 0');
+  });
+
+  it('groups queries that differ only in literals under one fingerprint', async () => {
+    metrics.recordQuery({ sql: 'select * from "accounts" where "user_id" = $1 and "balance" > 100', durationMs: 4 });
+    metrics.recordQuery({ sql: 'select * from  "accounts" where "user_id" = $2 and "balance" > 250', durationMs: 6 });
+
+    const body = await scrape(metrics);
+    const counts = body.split('\n').filter(line => line.startsWith('db_query_duration_seconds_count'));
+    expect(counts).toHaveLength(1);
+    expect(counts[0]).toMatch(/ 2$/);
+    expect(body).toContain('statement="select * from \\"accounts\\" where \\"user_id\\" = ? and \\"balance\\" > ?"');
+  });
+
+  it('collapses IN lists and string literals when normalizing SQL', () => {
+    expect(createMetrics.normalizeSql("select 1 from t where id in ($1, $2, $3) and name = 'O''Brien'"))
+      .toBe('select ? from t where id in (?) and name = ?');
+  });
+
+  it('reports knex pool utilisation on scrape', async () => {
+    const body = await scrape(metrics);
+    expect(body).toContain('db_pool_connections{shard="primary",state="used"} 3');
+    expect(body).toContain('db_pool_connections{shard="primary",state="pending_acquire"} 1');
+    expect(body).toContain('db_pool_max_connections{shard="primary"} 10');
+  });
+
+  it('reports every shard pool when sharding is enabled', async () => {
+    metrics.stop();
+    const pools = new Map([
+      ['primary', { client: { pool: createPool(3) } }],
+      ['shard1', { client: { pool: createPool(9) } }]
+    ]);
+    metrics = createMetrics({ db: { client: { pool: createPool() } }, getPools: () => pools, token: null });
+
+    const body = await scrape(metrics);
+    expect(body).toContain('db_pool_connections{shard="primary",state="used"} 3');
+    expect(body).toContain('db_pool_connections{shard="shard1",state="used"} 9');
+    expect(body).toContain('db_pool_max_connections{shard="shard1"} 10');
+  });
+
+  it('reports process memory on scrape', async () => {
+    const body = await scrape(metrics);
+    expect(body).toMatch(/nodejs_memory_bytes\{kind="rss"\} \d+/);
+    expect(body).toMatch(/nodejs_memory_bytes\{kind="heap_used"\} \d+/);
+  });
+
+  it('serves the Prometheus text format', async () => {
+    const res = createRes();
+    await metrics.handler(createReq(), res);
+    expect(res.set).toHaveBeenCalledWith('Content-Type', Registry.CONTENT_TYPE);
+    expect(res.body).toContain('# TYPE http_request_duration_seconds histogram');
+  });
+
+  it('requires the bearer token when one is configured', async () => {
+    metrics.stop();
+    metrics = createMetrics({ db: null, token: 'secret' });
+
+    const denied = createRes();
+    await metrics.handler(createReq(), denied);
+    expect(denied.statusCode).toBe(401);
+
+    const wrong = createRes();
+    await metrics.handler(createReq({ get: jest.fn(() => 'Bearer secreT') }), wrong);
+    expect(wrong.statusCode).toBe(401);
+
+    const allowed = createRes();
+    await metrics.handler(createReq({ get: jest.fn(() => 'Bearer secret') }), allowed);
+    expect(allowed.statusCode).toBe(200);
+  });
+
+  it('fails closed when a token is required but not configured', async () => {
+    metrics.stop();
+    metrics = createMetrics({ db: null, token: undefined, requireToken: true });
+
+    const res = createRes();
+    await metrics.handler(createReq({ get: jest.fn(() => 'Bearer ') }), res);
+    expect(res.statusCode).toBe(503);
+    expect(res.set).not.toHaveBeenCalled();
+  });
+});
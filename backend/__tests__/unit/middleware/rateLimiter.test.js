@@ -0,0 +1,101 @@
+/**
+ * Unit Tests for the rate limiter middleware
+ * Tests GCRA budgets on the in-memory fallback, the local deny cache,
+ * per-user keys and falling back when Redis fails
+ */
+
+const createRateLimiter = require('../../../src/middleware/rateLimiter');
+
+const createStore = () => {
+  const store = new Map();
+  return {
+    get: jest.fn(async key => (store.has(key) ? store.get(key) : null)),
+    async set(key, value) {
+      store.set(key, value);
+      return 'OK';
+    }
+  };
+};
+
+const createRes = () => {
+  const res = { headers: {}, statusCode: 200 };
+  res.set = jest.fn((name, value) => { res.headers[name] = value; return res; });
+  res.status = jest.fn(code => { res.statusCode = code; return res; });
+  res.send = jest.fn(() => res);
+  res.on = jest.fn();
+  return res;
+};
+
+const hit = async (limiter, req = { ip: '10.0.0.1' }) => {
+  const res = createRes();
+  const next = jest.fn();
+  await limiter(req, res, next);
+  return { res, next };
+};
+
+describe('rateLimiter middleware', () => {
+  let store;
+
+  beforeEach(() => {
+    store = createStore();
+  });
+
+  it('should allow a burst up to the limit and then reject with Retry-After', async () => {
+    const limiter = createRateLimiter({ name: 'test', limit: 3, windowMs: 60000, fallbackClient: store, getClient: () => null });
+
+    for (let i = 0; i < 3; i++) {
+      expect((await hit(limiter)).next).toHaveBeenCalled();
+    }
+
+    const { res, next } = await hit(limiter);
+    expect(next).not.toHaveBeenCalled();
+    expect(res.status).toHaveBeenCalledWith(429);
+    expect(Number(res.headers['Retry-After'])).toBeGreaterThan(0);
+  });
+
+  it('should answer repeat offenders from the deny cache', async () => {
+    const limiter = createRateLimiter({ name: 'test', limit: 1, windowMs: 60000, fallbackClient: store, getClient: () => null });
+
+    await hit(limiter);
+    await hit(limiter);
+    const lookups = store.get.mock.calls.length;
+
+    const { res } = await hit(limiter);
+    expect(res.status).toHaveBeenCalledWith(429);
+    expect(store.get.mock.calls.length).toBe(lookups);
+  });
+
+  it('should keep separate budgets per key and skip requests without one', async () => {
+    const limiter = createRateLimiter({
+      name: 'user',
+      limit: 1,
+      windowMs: 60000,
+      keyGenerator: req => req.user && req.user.userId,
+      fallbackClient: store,
+      getClient: () => null
+    });
+
+    expect((await hit(limiter, { user: { userId: 'a' } })).next).toHaveBeenCalled();
+    expect((await hit(limiter, { user: { userId: 'b' } })).next).toHaveBeenCalled();
+    expect((await hit(limiter, { user: { userId: 'a' } })).next).not.toHaveBeenCalled();
+    expect((await hit(limiter, {})).next).toHaveBeenCalled();
+  });
+
+  it('should fall back to memory when the Redis script fails', async () => {
+    const redis = { evalSha: jest.fn().mockRejectedValue(new Error('connection lost')) };
+    const limiter = createRateLimiter({ name: 'test', limit: 1, windowMs: 60000, fallbackClient: store, getClient: () => redis });
+
+    expect((await hit(limiter)).next).toHaveBeenCalled();
+    expect((await hit(limiter)).next).not.toHaveBeenCalled();
+    expect(redis.evalSha).toHaveBeenCalled();
+  });
+
+  it('should use the Redis script result when available', async () => {
+    const redis = { evalSha: jest.fn().mockResolvedValue([0, 4000]) };
+    const limiter = createRateLimiter({ name: 'test', limit: 1, windowMs: 60000, fallbackClient: store, getClient: () => redis });
+
+    const { res } = await hit(limiter);
+    expect(res.status).toHaveBeenCalledWith(429);
+    expect(res.headers['Retry-After']).toBe('4');
+  });
+});
@@ -0,0 +1,207 @@
+/**
+ * Unit Tests for AccountPurgeService
+ * Tests adaptive batch sizing, table order and resuming, lock-timeout
+ * backoff, lease renewal around VACUUM and failure handling
+ */
+
+const AccountPurgeService = require('../../../src/services/AccountPurgeService');
+const { directory } = require('../../../src/config/shards');
+
+jest.mock('../../../src/config/database', () => {
+  const db = jest.fn();
+  db.schema = { hasTable: jest.fn(), hasColumn: jest.fn() };
+  return db;
+});
+
+jest.mock('../../../src/config/shards', () => {
+  const handle = jest.fn();
+  handle.raw = jest.fn();
+  return {
+    directory: () => handle,
+    getShardRouter: () => null,
+    runForUser: (userId, fn) => fn()
+  };
+});
+
+const userId = '00000000-0000-4000-8000-000000000001';
+
+const lockTimeout = () => Object.assign(new Error('canceling statement due to lock timeout'), { code: '55P03' });
+
+describe('AccountPurgeService', () => {
+  let service;
+  let updates;
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+    updates = [];
+    directory().mockImplementation(() => {
+      const query = {};
+      query.where = jest.fn(() => query);
+      query.update = jest.fn(async (values) => { updates.push(values); return 1; });
+      return query;
+    });
+
+    service = new AccountPurgeService({ batchSize: 100, batchDelayMs: 0, vacuumThreshold: 1000 });
+    jest.spyOn(service, 'recordProgress').mockResolvedValue();
+    jest.spyOn(service, 'vacuum').mockResolvedValue();
+    jest.spyOn(service, 'anonymizeUser').mockResolvedValue();
+  });
+
+  describe('nextBatchSize', () => {
+    const limits = { targetMs: 50, min: 50, max: 5000 };
+
+    it('should halve the batch after a slow batch', () => {
+      expect(AccountPurgeService.nextBatchSize(400, 120, limits)).toBe(200);
+      expect(AccountPurgeService.nextBatchSize(60, 120, limits)).toBe(50);
+    });
+
+    it('should double the batch after a fast batch', () => {
+      expect(AccountPurgeService.nextBatchSize(400, 10, limits)).toBe(800);
+      expect(AccountPurgeService.nextBatchSize(4000, 10, limits)).toBe(5000);
+    });
+
+    it('should keep the batch when it is near the target', () => {
+      expect(AccountPurgeService.nextBatchSize(400, 40, limits)).toBe(400);
+    });
+  });
+
+  describe('purgeTable', () => {
+    const handle = { schema: { hasTable: jest.fn(), hasColumn: jest.fn() } };
+
+    beforeEach(() => {
+      handle.schema.hasTable.mockResolvedValue(true);
+      handle.schema.hasColumn.mockResolvedValue(true);
+    });
+
+    it('should delete in batches until nothing is left, recording each batch', async () => {
+      jest.spyOn(service, 'deleteBatch')
+        .mockResolvedValueOnce(100)
+        .mockResolvedValueOnce(100)
+        .mockResolvedValueOnce(30)
+        .mockResolvedValueOnce(0);
+      const purge = { user_id: userId, deleted_rows: '5' };
+
+      await expect(service.purgeTable(handle, 'expenses', userId, purge)).resolves.toBe(230);
+
+      expect(service.deleteBatch).toHaveBeenCalledTimes(4);
+      expect(service.recordProgress).toHaveBeenCalledWith(userId, 'expenses', 100);
+      expect(purge.deleted_rows).toBe(235);
+    });
+
+    it('should skip tables this schema does not have', async () => {
+      handle.schema.hasTable.mockResolvedValue(false);
+      jest.spyOn(service, 'deleteBatch');
+
+      await expect(service.purgeTable(handle, 'goals', userId, { deleted_rows: 0 })).resolves.toBe(0);
+      expect(service.deleteBatch).not.toHaveBeenCalled();
+    });
+
+    it('should retry a lock timeout with a smaller batch', async () => {
+      jest.spyOn(service, 'deleteBatch')
+        .mockRejectedValueOnce(lockTimeout())
+        .mockResolvedValueOnce(0);
+
+      await service.purgeTable(handle, 'transactions', userId, { deleted_rows: 0 });
+
+      expect(service.deleteBatch).toHaveBeenNthCalledWith(2, handle, 'transactions', userId, 50);
+    });
+
+    it('should rethrow errors that are not lock timeouts', async () => {
+      jest.spyOn(service, 'deleteBatch').mockRejectedValueOnce(new Error('violates foreign key constraint'));
+
+      await expect(service.purgeTable(handle, 'accounts', userId, { deleted_rows: 0 }))
+        .rejects.toThrow('violates foreign key constraint');
+    });
+  });
+
+  describe('purgeUser', () => {
+    it('should resume at the recorded table and finish with the devices', async () => {
+      const seen = [];
+      jest.spyOn(service, 'purgeTable').mockImplementation(async (handle, table) => {
+        seen.push(table);
+        return table === 'sync_tombstones' ? 5000 : 0;
+      });
+
+      await service.purgeUser({ user_id: userId, current_table: 'accounts', deleted_rows: 0 });
+
+      expect(seen).toEqual(['accounts', 'categories', 'user_settings', 'security_settings', 'sync_tombstones', 'devices']);
+      expect(service.vacuum).toHaveBeenCalledWith(expect.anything(), expect.objectContaining({ sync_tombstones: 5000 }), userId);
+      expect(service.anonymizeUser).toHaveBeenCalledWith(userId);
+      expect(updates[updates.length - 1]).toMatchObject({ status: 'done', current_table: null });
+    });
+
+    it('should vacuum tables emptied before the purge was interrupted', async () => {
+      jest.spyOn(service, 'purgeTable').mockImplementation(async (handle, table) => (table === 'expenses' ? 600 : 0));
+
+      await service.purgeUser({
+        user_id: userId,
+        current_table: 'expenses',
+        deleted_rows: 0,
+        deleted_by_table: { transactions: 20000, expenses: '700' }
+      });
+
+      expect(service.vacuum).toHaveBeenCalledWith(
+        expect.anything(),
+        expect.objectContaining({ transactions: 20000, expenses: 1300 }),
+        userId
+      );
+    });
+
+    it('should delete children before the accounts they reference', () => {
+      const order = AccountPurgeService.PURGE_TABLES.map(({ table }) => table);
+
+      ['transactions', 'account_balance_deltas', 'account_balance_snapshots', 'recurring_transactions', 'bank_transactions']
+        .forEach(table => expect(order.indexOf(table)).toBeLessThan(order.indexOf('accounts')));
+      expect(order.indexOf('bank_transactions')).toBeLessThan(order.indexOf('bank_accounts'));
+      expect(order.indexOf('sync_tombstones')).toBeGreaterThan(order.indexOf('accounts'));
+    });
+
+    it('should hand the purge back when stopped part way', async () => {
+      jest.spyOn(service, 'purgeTable').mockImplementation(async () => {
+        service.stop();
+        return 0;
+      });
+
+      await service.purgeUser({ user_id: userId, current_table: null, deleted_rows: 0 });
+
+      expect(service.purgeTable).toHaveBeenCalledTimes(1);
+      expect(service.anonymizeUser).not.toHaveBeenCalled();
+      expect(updates[updates.length - 1]).toMatchObject({ status: 'pending', locked_until: null });
+    });
+  });
+
+  describe('vacuum', () => {
+    it('should extend the lease before each VACUUM', async () => {
+      service.vacuum.mockRestore();
+      const handle = { raw: jest.fn().mockResolvedValue() };
+      const order = [];
+      jest.spyOn(service, 'renewLease').mockImplementation(async () => order.push('lease'));
+      handle.raw.mockImplementation(async () => order.push('vacuum'));
+
+      await service.vacuum(handle, { transactions: 5000, budgets: 10, expenses: 2000 }, userId);
+
+      expect(order).toEqual(['lease', 'vacuum', 'lease', 'vacuum']);
+      expect(service.renewLease).toHaveBeenCalledWith(userId, service.vacuumLeaseSecs);
+    });
+  });
+
+  describe('processNext', () => {
+    it('should return false when no purge is due', async () => {
+      directory().raw.mockResolvedValue({ rows: [] });
+
+      await expect(service.processNext()).resolves.toBe(false);
+    });
+
+    it('should requeue a failed purge until it runs out of attempts', async () => {
+      jest.spyOn(service, 'purgeUser').mockRejectedValue(new Error('boom'));
+
+      directory().raw.mockResolvedValue({ rows: [{ user_id: userId, attempts: 1 }] });
+      await expect(service.processNext()).resolves.toBe(true);
+      expect(updates[updates.length - 1]).toMatchObject({ status: 'pending', last_error: 'boom' });
+
+      directory().raw.mockResolvedValue({ rows: [{ user_id: userId, attempts: 5 }] });
+      await service.processNext();
+      expect(updates[updates.length - 1]).toMatchObject({ status: 'failed' });
+    });
+  });
+});
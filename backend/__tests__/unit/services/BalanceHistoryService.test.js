@@ -0,0 +1,141 @@
+/**
+ * Unit Tests for BalanceHistoryService
+ * Tests range handling, on-read repair of back-dated writes and the end-of-day batch
+ */
+
+const BalanceHistoryService = require('../../../src/services/BalanceHistoryService');
+const Account = require('../../../src/models/Account');
+const AccountBalanceSnapshot = require('../../../src/models/AccountBalanceSnapshot');
+const FxRate = require('../../../src/models/FxRate');
+
+jest.mock('../../../src/config/database', () => ({
+  transaction: jest.fn(async fn => fn({ trx: true }))
+}));
+jest.mock('../../../src/models/Account');
+jest.mock('../../../src/models/AccountBalanceSnapshot', () => ({
+  toDateString: jest.requireActual('../../../src/models/AccountBalanceSnapshot').toDateString,
+  rebuild: jest.fn(),
+  accountIdsAfter: jest.fn(),
+  listUnsnapshotted: jest.fn(),
+  invalidatedAccounts: jest.fn(),
+  lockInvalidations: jest.fn(),
+  deleteInvalidations: jest.fn(),
+  hasInvalidations: jest.fn(),
+  snapshotRange: jest.fn(),
+  history: jest.fn(),
+  netWorth: jest.fn()
+}));
+jest.mock('../../../src/models/FxRate');
+
+describe('BalanceHistoryService', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+    AccountBalanceSnapshot.hasInvalidations.mockResolvedValue(false);
+    AccountBalanceSnapshot.invalidatedAccounts.mockResolvedValue([]);
+  });
+
+  describe('resolveRange', () => {
+    it('should default to the last 365 days', () => {
+      const { fromDate, toDate } = BalanceHistoryService.resolveRange(undefined, '2026-10-19');
+      expect(toDate).toBe('2026-10-19');
+      expect(fromDate).toBe('2025-10-19');
+    });
+
+    it('should reject inverted and oversized ranges', () => {
+      expect(() => BalanceHistoryService.resolveRange('2026-02-01', '2026-01-01'))
+        .toThrow('from must be on or before to');
+      expect(() => BalanceHistoryService.resolveRange('2015-01-01', '2026-01-01'))
+        .toThrow('Range cannot exceed');
+    });
+  });
+
+  describe('getBalanceHistory', () => {
+    it('should return null for accounts the user does not own', async () => {
+      Account.findById.mockResolvedValue({ account_id: 'acc-1', user_id: 'someone-else' });
+
+      const result = await BalanceHistoryService.getBalanceHistory('user-1', 'acc-1');
+
+      expect(result).toBeNull();
+      expect(AccountBalanceSnapshot.history).not.toHaveBeenCalled();
+    });
+
+    it('should rebuild invalidated days before reading', async () => {
+      Account.findById.mockResolvedValue({ account_id: 'acc-1', user_id: 'user-1', currency: 'INR' });
+      AccountBalanceSnapshot.hasInvalidations.mockResolvedValue(true);
+      AccountBalanceSnapshot.invalidatedAccounts.mockResolvedValue(['acc-1']);
+      AccountBalanceSnapshot.lockInvalidations.mockResolvedValue({ ids: [7], fromDate: '2026-03-05' });
+      AccountBalanceSnapshot.snapshotRange.mockResolvedValue({ firstDate: '2026-01-01', lastDate: '2026-10-18' });
+      AccountBalanceSnapshot.history.mockResolvedValue([{ date: '2026-10-18', balance: '1250.50' }]);
+
+      const result = await BalanceHistoryService.getBalanceHistory('user-1', 'acc-1', {
+        from: '2026-10-01', to: '2026-10-18'
+      });
+
+      expect(AccountBalanceSnapshot.invalidatedAccounts).toHaveBeenCalledWith({ accountIds: ['acc-1'] });
+      expect(AccountBalanceSnapshot.rebuild).toHaveBeenCalledWith(['acc-1'], '2026-03-05', '2026-10-18', { trx: true });
+      expect(AccountBalanceSnapshot.deleteInvalidations).toHaveBeenCalledWith({ trx: true }, [7]);
+      expect(result.history).toEqual([{ date: '2026-10-18', balance: 1250.5 }]);
+    });
+
+    it('should not extend history before the first snapshot when repairing', async () => {
+      AccountBalanceSnapshot.invalidatedAccounts.mockResolvedValue(['acc-1']);
+      AccountBalanceSnapshot.lockInvalidations.mockResolvedValue({ ids: [7], fromDate: '2020-01-01' });
+      AccountBalanceSnapshot.snapshotRange.mockResolvedValue({ firstDate: '2026-01-01', lastDate: '2026-10-18' });
+
+      await BalanceHistoryService.repairInvalidations();
+
+      expect(AccountBalanceSnapshot.rebuild).toHaveBeenCalledWith(['acc-1'], '2026-01-01', '2026-10-18', { trx: true });
+    });
+
+    it('should keep the invalidations when the rebuild fails', async () => {
+      AccountBalanceSnapshot.invalidatedAccounts.mockResolvedValue(['acc-1']);
+      AccountBalanceSnapshot.lockInvalidations.mockResolvedValue({ ids: [7], fromDate: '2026-03-05' });
+      AccountBalanceSnapshot.snapshotRange.mockResolvedValue({ firstDate: '2026-01-01', lastDate: '2026-10-18' });
+      AccountBalanceSnapshot.rebuild.mockRejectedValueOnce(new Error('statement timeout'));
+
+      await expect(BalanceHistoryService.repairInvalidations()).rejects.toThrow('statement timeout');
+
+      expect(AccountBalanceSnapshot.deleteInvalidations).not.toHaveBeenCalled();
+    });
+
+    it('should skip an account whose invalidations another request already repaired', async () => {
+      AccountBalanceSnapshot.invalidatedAccounts.mockResolvedValue(['acc-1']);
+      AccountBalanceSnapshot.lockInvalidations.mockResolvedValue(null);
+
+      await expect(BalanceHistoryService.repairInvalidations()).resolves.toBe(0);
+      expect(AccountBalanceSnapshot.rebuild).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('getNetWorthTimeline', () => {
+    it('should convert into the user base currency', async () => {
+      FxRate.getBaseCurrency.mockResolvedValue('USD');
+      AccountBalanceSnapshot.netWorth.mockResolvedValue([{ date: '2026-10-18', net_worth: '100.25', accounts: '2' }]);
+
+      const result = await BalanceHistoryService.getNetWorthTimeline('user-1', { from: '2026-10-18', to: '2026-10-18' });
+
+      expect(AccountBalanceSnapshot.netWorth).toHaveBeenCalledWith('user-1', 'USD', '2026-10-18', '2026-10-18');
+      expect(result).toEqual({
+        currency: 'USD',
+        from: '2026-10-18',
+        to: '2026-10-18',
+        timeline: [{ date: '2026-10-18', netWorth: 100.25, accounts: 2 }]
+      });
+    });
+  });
+
+  describe('runEndOfDay', () => {
+    it('should backfill new accounts and snapshot every account in batches', async () => {
+      AccountBalanceSnapshot.listUnsnapshotted.mockResolvedValue([{ account_id: 'acc-new', first_date: '2026-09-01' }]);
+      AccountBalanceSnapshot.accountIdsAfter.mockResolvedValue(['acc-1', 'acc-new']);
+      AccountBalanceSnapshot.rebuild.mockResolvedValueOnce(48).mockResolvedValueOnce(2);
+
+      const stats = await BalanceHistoryService.runEndOfDay('2026-10-18');
+
+      expect(AccountBalanceSnapshot.rebuild).toHaveBeenCalledWith(['acc-new'], '2026-09-01', '2026-10-18');
+      expect(AccountBalanceSnapshot.rebuild).toHaveBeenCalledWith(['acc-1', 'acc-new'], '2026-10-18', '2026-10-18');
+      expect(AccountBalanceSnapshot.accountIdsAfter).toHaveBeenCalledWith(null, 1000);
+      expect(stats).toEqual({ day: '2026-10-18', repaired: 0, backfilled: 48, snapshots: 2 });
+    });
+  });
+});
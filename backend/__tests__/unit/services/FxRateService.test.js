@@ -0,0 +1,47 @@
+/**
+ * Unit Tests for FxRateService
+ * Tests rates file parsing and loading
+ */
+
+jest.mock('../../../src/models/FxRate', () => ({
+  PIVOT_CURRENCY: 'USD',
+  upsertMany: jest.fn()
+}));
+
+const FxRateService = require('../../../src/services/FxRateService');
+const FxRate = require('../../../src/models/FxRate');
+
+describe('FxRateService', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  describe('parseRatesCsv', () => {
+    it('should parse rates and add the pivot currency for each date', () => {
+      const rates = FxRateService.parseRatesCsv('date,currency,rate\n2026-10-16,inr,83.12\n\n# weekend\n2026-10-16,EUR,0.92\n');
+
+      expect(rates).toEqual([
+        { rate_date: '2026-10-16', currency: 'INR', rate: 83.12 },
+        { rate_date: '2026-10-16', currency: 'EUR', rate: 0.92 },
+        { rate_date: '2026-10-16', currency: 'USD', rate: 1 }
+      ]);
+    });
+
+    it('should reject malformed lines', () => {
+      expect(() => FxRateService.parseRatesCsv('2026-10-16,INR,-1')).toThrow('Invalid FX rate on line 1');
+      expect(() => FxRateService.parseRatesCsv('16/10/2026,INR,83')).toThrow('Invalid FX rate on line 1');
+    });
+  });
+
+  describe('loadRates', () => {
+    it('should upsert the parsed rates with their source', async () => {
+      FxRate.upsertMany.mockResolvedValue(2);
+
+      await expect(FxRateService.loadRates('2026-10-16,INR,83.12\n', 'ecb')).resolves.toBe(2);
+      expect(FxRate.upsertMany).toHaveBeenCalledWith([
+        { rate_date: '2026-10-16', currency: 'INR', rate: 83.12 },
+        { rate_date: '2026-10-16', currency: 'USD', rate: 1 }
+      ], 'ecb');
+    });
+  });
+});
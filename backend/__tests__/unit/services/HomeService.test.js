@@ -0,0 +1,74 @@
+/**
+ * Unit Tests for HomeService
+ * Tests that the home payload is assembled from concurrent reads
+ */
+
+const HomeService = require('../../../src/services/HomeService');
+const Account = require('../../../src/models/Account');
+const Category = require('../../../src/models/Category');
+const FxRate = require('../../../src/models/FxRate');
+const { Notification } = require('../../../src/models/Notification');
+const AnalyticsService = require('../../../src/services/AnalyticsService');
+
+jest.mock('../../../src/models/Account');
+jest.mock('../../../src/models/Category');
+jest.mock('../../../src/models/FxRate');
+jest.mock('../../../src/models/Notification', () => ({
+  Notification: { getUnreadCount: jest.fn() },
+  NotificationPreference: {}
+}));
+jest.mock('../../../src/services/AnalyticsService');
+
+describe('HomeService.getHome', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+    Account.listByUser.mockResolvedValue([{ account_id: 'acc-1', name: 'Wallet', current_balance: '120.00' }]);
+    Category.listForUser.mockResolvedValue([
+      { category_id: 'cat-1', name: 'Food', category_type: 'expense', icon: 'fork', color: '#f00', description: 'x' },
+      { category_id: 'cat-2', name: 'Old', category_type: 'expense', is_deleted: true }
+    ]);
+    FxRate.getBaseCurrency.mockResolvedValue('INR');
+    AnalyticsService.getHomeActivity.mockResolvedValue({
+      dashboard: { period: 'week', income: 100, expenses: 40 },
+      recentTransactions: [{ transaction_id: 'txn-1' }]
+    });
+    AnalyticsService.getBudgetSummary.mockResolvedValue({ active: 3, overBudget: 1 });
+    Notification.getUnreadCount.mockResolvedValue('4');
+  });
+
+  it('should combine accounts, activity, categories, budgets and notifications', async () => {
+    const home = await HomeService.getHome('user-1', { period: 'week', recentLimit: 5 });
+
+    expect(AnalyticsService.getHomeActivity).toHaveBeenCalledWith('user-1', 'INR', 'week', 5);
+    expect(home).toMatchObject({
+      accounts: [{ account_id: 'acc-1' }],
+      recentTransactions: [{ transaction_id: 'txn-1' }],
+      dashboard: { period: 'week', income: 100, expenses: 40 },
+      budgets: { active: 3, overBudget: 1 },
+      notifications: { unread: 4 }
+    });
+  });
+
+  it('should return compact, live categories only', async () => {
+    const home = await HomeService.getHome('user-1');
+
+    expect(home.categories).toEqual([
+      { category_id: 'cat-1', name: 'Food', category_type: 'expense', icon: 'fork', color: '#f00' }
+    ]);
+  });
+
+  it('should start every read before waiting on any of them', async () => {
+    let releaseAccounts;
+    Account.listByUser.mockImplementation(() => new Promise(resolve => { releaseAccounts = resolve; }));
+
+    const pending = HomeService.getHome('user-1');
+    await Promise.resolve();
+
+    expect(Category.listForUser).toHaveBeenCalled();
+    expect(AnalyticsService.getBudgetSummary).toHaveBeenCalled();
+    expect(Notification.getUnreadCount).toHaveBeenCalled();
+
+    releaseAccounts([]);
+    await pending;
+  });
+});
@@ -0,0 +1,134 @@
+/**
+ * Unit Tests for PhoneOtpService
+ * Tests the Redis HMAC store, mapping of verify results to errors and
+ * falling back to the phone_otps table
+ */
+
+jest.mock('../../../src/config/redis');
+jest.mock('../../../src/config/database', () => jest.fn());
+jest.mock('bcryptjs', () => ({
+  hash: jest.fn().mockResolvedValue('bcrypt-hash'),
+  compare: jest.fn()
+}));
+
+const { getRedisClient } = require('../../../src/config/redis');
+const db = require('../../../src/config/database');
+const bcrypt = require('bcryptjs');
+const PhoneOtpService = require('../../../src/services/PhoneOtpService');
+
+const createRedis = () => {
+  const multi = {
+    hSet: jest.fn(() => multi),
+    pExpire: jest.fn(() => multi),
+    exec: jest.fn().mockResolvedValue([1, 1])
+  };
+  return {
+    multi: jest.fn(() => multi),
+    evalSha: jest.fn(),
+    eval: jest.fn(),
+    tx: multi
+  };
+};
+
+const createQuery = (record) => {
+  const query = {
+    where: jest.fn(() => query),
+    andWhere: jest.fn(() => query),
+    orderBy: jest.fn(() => query),
+    first: jest.fn().mockResolvedValue(record),
+    del: jest.fn().mockResolvedValue(1),
+    insert: jest.fn().mockResolvedValue([1]),
+    update: jest.fn().mockResolvedValue(1)
+  };
+  return query;
+};
+
+describe('PhoneOtpService', () => {
+  const phone = '919876543210';
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+    process.env.OTP_HMAC_SECRET = 'test-secret';
+  });
+
+  describe('issue', () => {
+    it('should store an HMAC of the code with a TTL in Redis', async () => {
+      const redis = createRedis();
+      getRedisClient.mockReturnValue(redis);
+
+      const otp = await PhoneOtpService.issue(phone, 'signin');
+
+      expect(otp).toMatch(/^\d{6}$/);
+      expect(redis.tx.hSet).toHaveBeenCalledWith(`otp:{${phone}}:signin`, {
+        code: PhoneOtpService.digest(phone, 'signin', otp),
+        attempts: 0
+      });
+      expect(redis.tx.pExpire).toHaveBeenCalledWith(`otp:{${phone}}:signin`, 10 * 60 * 1000);
+      expect(bcrypt.hash).not.toHaveBeenCalled();
+      expect(db).not.toHaveBeenCalled();
+    });
+
+    it('should fall back to the table when Redis fails', async () => {
+      const redis = createRedis();
+      redis.tx.exec.mockRejectedValue(new Error('connection lost'));
+      getRedisClient.mockReturnValue(redis);
+      const query = createQuery();
+      db.mockReturnValue(query);
+
+      await PhoneOtpService.issue(phone, 'signup');
+
+      expect(bcrypt.hash).toHaveBeenCalled();
+      expect(query.insert).toHaveBeenCalledWith(expect.objectContaining({
+        phone_number: phone,
+        code_hash: 'bcrypt-hash',
+        purpose: 'signup'
+      }));
+    });
+  });
+
+  describe('verify', () => {
+    it('should consume the code in one script call', async () => {
+      const redis = createRedis();
+      redis.evalSha.mockResolvedValue('ok');
+      getRedisClient.mockReturnValue(redis);
+
+      await expect(PhoneOtpService.verify(phone, '123456', 'signin')).resolves.toBe(true);
+
+      const [, options] = redis.evalSha.mock.calls[0];
+      expect(options.keys).toEqual([`otp:{${phone}}:signin`, `otp:{${phone}}:attempts`]);
+      expect(options.arguments[0]).toBe(PhoneOtpService.digest(phone, 'signin', '123456'));
+      expect(db).not.toHaveBeenCalled();
+    });
+
+    it('should reject wrong and locked codes without touching the table', async () => {
+      const redis = createRedis();
+      getRedisClient.mockReturnValue(redis);
+
+      redis.evalSha.mockResolvedValueOnce('invalid');
+      await expect(PhoneOtpService.verify(phone, '000000', 'signin')).rejects.toThrow('Invalid OTP');
+
+      redis.evalSha.mockResolvedValueOnce('locked');
+      await expect(PhoneOtpService.verify(phone, '000000', 'signin')).rejects.toThrow('Too many attempts');
+
+      expect(db).not.toHaveBeenCalled();
+    });
+
+    it('should check the table for codes Redis does not have', async () => {
+      const redis = createRedis();
+      redis.evalSha.mockResolvedValue('missing');
+      getRedisClient.mockReturnValue(redis);
+      db.mockReturnValue(createQuery({ otp_id: 1, attempt_count: 0, code_hash: 'bcrypt-hash' }));
+      bcrypt.compare.mockResolvedValue(true);
+
+      await expect(PhoneOtpService.verify(phone, '123456', 'signin')).resolves.toBe(true);
+      expect(bcrypt.compare).toHaveBeenCalledWith('123456', 'bcrypt-hash');
+    });
+
+    it('should use the table when Redis is not configured', async () => {
+      getRedisClient.mockReturnValue(null);
+      db.mockReturnValue(createQuery(undefined));
+
+      await expect(PhoneOtpService.verify(phone, '123456', 'signin')).rejects.toThrow('OTP expired or not found');
+    });
+  });
+});
@@ -0,0 +1,116 @@
+/**
+ * Unit Tests for PriceService
+ * Tests price file parsing, the LRU price cache and batched valuation
+ */
+
+const PriceService = require('../../../src/services/PriceService');
+const SecurityPrice = require('../../../src/models/SecurityPrice');
+const Investment = require('../../../src/models/Investment');
+const LruCache = require('../../../src/utils/lruCache');
+
+jest.mock('../../../src/models/SecurityPrice');
+jest.mock('../../../src/models/Investment');
+
+describe('PriceService', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+    PriceService.clearCache();
+    PriceService.setFeed(null);
+  });
+
+  describe('parsePricesCsv', () => {
+    it('should parse prices, skipping the header and comments', () => {
+      const prices = PriceService.parsePricesCsv([
+        'date,symbol,price',
+        '# closing prices',
+        '2026-10-16,infy,1862.40',
+        '',
+        '2026-10-16,NIFTYBEES,271.15'
+      ].join('\n'));
+
+      expect(prices).toEqual([
+        { price_date: '2026-10-16', symbol: 'INFY', price: 1862.4 },
+        { price_date: '2026-10-16', symbol: 'NIFTYBEES', price: 271.15 }
+      ]);
+    });
+
+    it('should reject malformed lines', () => {
+      expect(() => PriceService.parsePricesCsv('2026-10-16,INFY,-1')).toThrow('Invalid price on line 1');
+    });
+  });
+
+  describe('getLatestPrices', () => {
+    it('should fetch only cache misses, in one query', async () => {
+      SecurityPrice.latestForSymbols.mockResolvedValue([
+        { symbol: 'INFY', price: '1862.40', price_date: '2026-10-16' }
+      ]);
+
+      const first = await PriceService.getLatestPrices(['INFY', 'UNKNOWN']);
+      const second = await PriceService.getLatestPrices(['INFY', 'UNKNOWN']);
+
+      expect(SecurityPrice.latestForSymbols).toHaveBeenCalledTimes(1);
+      expect(SecurityPrice.latestForSymbols).toHaveBeenCalledWith(['INFY', 'UNKNOWN']);
+      expect(first.get('INFY')).toEqual({ price: 1862.4, price_date: '2026-10-16' });
+      expect(second.has('UNKNOWN')).toBe(false);
+      expect(second.get('INFY')).toEqual({ price: 1862.4, price_date: '2026-10-16' });
+    });
+
+    it('should drop cached symbols when new prices are stored', async () => {
+      SecurityPrice.latestForSymbols.mockResolvedValue([]);
+      SecurityPrice.upsertMany.mockResolvedValue(1);
+
+      await PriceService.getLatestPrices(['INFY']);
+      await PriceService.loadPrices('2026-10-17,INFY,1870');
+      await PriceService.getLatestPrices(['INFY']);
+
+      expect(SecurityPrice.latestForSymbols).toHaveBeenCalledTimes(2);
+    });
+  });
+
+  describe('refreshFromFeed', () => {
+    it('should store feed prices under the feed name', async () => {
+      SecurityPrice.upsertMany.mockResolvedValue(1);
+      PriceService.setFeed({
+        name: 'test-feed',
+        fetchPrices: jest.fn().mockResolvedValue([{ symbol: 'infy', price_date: '2026-10-17', price: '1870.5' }])
+      });
+
+      await PriceService.refreshFromFeed(['INFY']);
+
+      expect(SecurityPrice.upsertMany).toHaveBeenCalledWith(
+        [{ symbol: 'INFY', price_date: '2026-10-17', price: 1870.5 }],
+        'test-feed'
+      );
+    });
+
+    it('should fail without a feed', async () => {
+      await expect(PriceService.refreshFromFeed(['INFY'])).rejects.toThrow('No price feed configured');
+    });
+  });
+
+  describe('valueAllHoldings', () => {
+    it('should mark holdings to market in id-range batches', async () => {
+      Investment.maxId.mockResolvedValue(250);
+      Investment.markToMarket.mockResolvedValue(40);
+
+      const result = await PriceService.valueAllHoldings({ batchSize: 100 });
+
+      expect(Investment.markToMarket).toHaveBeenCalledTimes(3);
+      expect(Investment.markToMarket).toHaveBeenCalledWith({ fromId: 201, toId: 250 });
+      expect(result).toEqual({ updated: 120, maxId: 250 });
+    });
+  });
+});
+
+describe('LruCache', () => {
+  it('should evict the least recently used entry', () => {
+    const cache = new LruCache({ maxSize: 2 });
+    cache.set('a', 1).set('b', 2);
+    cache.get('a');
+    cache.set('c', 3);
+
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.get('a')).toBe(1);
+    expect(cache.get('c')).toBe(3);
+  });
+});
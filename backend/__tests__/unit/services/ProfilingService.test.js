@@ -0,0 +1,117 @@
+/**
+ * Unit Tests for ProfilingService
+ * Tests CPU/heap captures, the single-capture lock, cooldown, retention and
+ * stack folding
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const ProfilingService = require('../../../src/services/ProfilingService');
+
+describe('ProfilingService', () => {
+  let directory;
+  let service;
+
+  beforeEach(() => {
+    directory = fs.mkdtempSync(path.join(os.tmpdir(), 'profiles-'));
+    service = new ProfilingService({ directory, cooldownMs: 0 });
+  });
+
+  afterEach(() => {
+    service.stopSampling();
+    fs.rmSync(directory, { recursive: true, force: true });
+  });
+
+  it('writes a CPU profile and lists it', async () => {
+    const capture = await service.captureCpuProfile({ durationMs: 100 });
+
+    expect(capture.name).toMatch(/^cpu-.*\.cpuprofile$/);
+    const profile = JSON.parse(fs.readFileSync(path.join(directory, capture.name), 'utf8'));
+    expect(Array.isArray(profile.nodes)).toBe(true);
+
+    const captures = await service.listCaptures();
+    expect(captures.map(entry => entry.name)).toEqual([capture.name]);
+  });
+
+  it('streams a heap snapshot to disk', async () => {
+    const capture = await service.captureHeapSnapshot();
+
+    expect(capture.name).toMatch(/^heap-.*\.heapsnapshot$/);
+    expect(capture.bytes).toBeGreaterThan(0);
+    const snapshot = JSON.parse(fs.readFileSync(path.join(directory, capture.name), 'utf8'));
+    expect(snapshot.snapshot).toBeDefined();
+  });
+
+  it('allows only one capture at a time', async () => {
+    const running = service.captureCpuProfile({ durationMs: 200 });
+
+    await expect(service.captureHeapSnapshot()).rejects.toMatchObject({ statusCode: 409 });
+    await running;
+  });
+
+  it('enforces the cooldown between captures', async () => {
+    service = new ProfilingService({ directory, cooldownMs: 60000 });
+    await service.captureCpuProfile({ durationMs: 100 });
+
+    await expect(service.captureCpuProfile({ durationMs: 100 })).rejects.toMatchObject({ statusCode: 429 });
+  });
+
+  it('keeps only the newest captures within the age limit', async () => {
+    const write = (name, ageMs) => {
+      const filePath = path.join(directory, name);
+      fs.writeFileSync(filePath, '{}');
+      const mtime = new Date(Date.now() - ageMs);
+      fs.utimesSync(filePath, mtime, mtime);
+    };
+    write('cpu-a.cpuprofile', 3000);
+    write('cpu-b.cpuprofile', 2000);
+    write('cpu-c.cpuprofile', 1000);
+    write('heap-old.heapsnapshot', 10 * 24 * 60 * 60 * 1000);
+    write('notes.txt', 10 * 24 * 60 * 60 * 1000);
+    service = new ProfilingService({ directory, cooldownMs: 0, maxCaptures: 2, maxAgeMs: 24 * 60 * 60 * 1000 });
+
+    const removed = await service.pruneCaptures();
+
+    expect(removed.sort()).toEqual(['cpu-a.cpuprofile', 'heap-old.heapsnapshot']);
+    expect(fs.readdirSync(directory).sort()).toEqual(['cpu-b.cpuprofile', 'cpu-c.cpuprofile', 'notes.txt']);
+  });
+
+  it('only resolves capture names it could have written', () => {
+    expect(service.resolveCapture('../../etc/passwd')).toBeNull();
+    expect(service.resolveCapture('cpu-missing.cpuprofile')).toBeNull();
+  });
+
+  it('folds profile samples into collapsed stacks', () => {
+    const frame = (id, functionName, children = []) => ({
+      id,
+      callFrame: { functionName, url: `/app/${functionName}.js`, lineNumber: 0 },
+      children
+    });
+    const profile = {
+      nodes: [
+        { id: 1, callFrame: { functionName: '(root)', url: '', lineNumber: -1 }, children: [2] },
+        frame(2, 'handler', [3, 4]),
+        frame(3, 'query'),
+        frame(4, 'serialize')
+      ],
+      samples: [3, 3, 4, 2]
+    };
+
+    const stacks = ProfilingService.foldProfile(profile);
+
+    expect(stacks.get('handler (handler.js:1);query (query.js:1)')).toBe(2);
+    expect(stacks.get('handler (handler.js:1);serialize (serialize.js:1)')).toBe(1);
+    expect(stacks.get('handler (handler.js:1)')).toBe(1);
+  });
+
+  it('reports continuous sampling status', () => {
+    expect(service.getFlameGraph()).toBeNull();
+
+    const status = service.startSampling({ windowMinutes: 5 });
+    expect(status).toMatchObject({ enabled: true, windowMinutes: 5 });
+    expect(service.getFlameGraph()).toBe('');
+
+    expect(service.stopSampling()).toEqual({ enabled: false });
+  });
+});
@@ -0,0 +1,94 @@
+/**
+ * Unit Tests for ReportJobQueue
+ * Tests job deduplication, cached results and worker processing
+ */
+
+const ReportJobQueue = require('../../../src/services/ReportJobQueue');
+
+const createRedis = () => {
+  const store = new Map();
+  const lists = new Map();
+  return {
+    store,
+    lists,
+    async get(key) {
+      return store.has(key) ? store.get(key) : null;
+    },
+    async set(key, value, options = {}) {
+      if ((options.NX && store.has(key)) || (options.XX && !store.has(key))) {
+        return null;
+      }
+      store.set(key, value);
+      return 'OK';
+    },
+    lPush: jest.fn(async (key, value) => {
+      const list = lists.get(key) || [];
+      list.unshift(value);
+      lists.set(key, list);
+      return list.length;
+    }),
+    async brPop(key) {
+      const list = lists.get(key) || [];
+      return list.length ? { key, element: list.pop() } : null;
+    },
+    async lLen(key) {
+      return (lists.get(key) || []).length;
+    }
+  };
+};
+
+describe('ReportJobQueue', () => {
+  let redis;
+  let queue;
+
+  beforeEach(() => {
+    redis = createRedis();
+    queue = new ReportJobQueue(redis);
+  });
+
+  it('should give identical requests the same job and queue it once', async () => {
+    const first = await queue.enqueue('user-1', 'annual', { year: '2026' });
+    const second = await queue.enqueue('user-1', 'annual', { year: 2026 });
+
+    expect(second.jobId).toBe(first.jobId);
+    expect(redis.lPush).toHaveBeenCalledTimes(1);
+    expect(await queue.getQueueLength()).toBe(1);
+  });
+
+  it('should keep jobs for different users or params apart', () => {
+    const base = ReportJobQueue.jobId('user-1', 'annual', { year: '2026' });
+
+    expect(ReportJobQueue.jobId('user-2', 'annual', { year: '2026' })).not.toBe(base);
+    expect(ReportJobQueue.jobId('user-1', 'annual', { year: '2025' })).not.toBe(base);
+  });
+
+  it('should run queued jobs and serve the stored result', async () => {
+    const handler = jest.fn().mockResolvedValue({ total_income: 100 });
+    const job = await queue.enqueue('user-1', 'annual', { year: '2026' });
+
+    expect(await queue.processNext({ annual: handler })).toBe(true);
+    expect(handler).toHaveBeenCalledWith('user-1', { year: '2026' });
+
+    const cached = await queue.enqueue('user-1', 'annual', { year: '2026' });
+    expect(cached).toMatchObject({ jobId: job.jobId, status: 'completed', result: { total_income: 100 } });
+    expect(redis.lPush).toHaveBeenCalledTimes(1);
+  });
+
+  it('should record failures and allow the job to be retried', async () => {
+    await queue.enqueue('user-1', 'annual', { year: '2026' });
+    await queue.processNext({ annual: jest.fn().mockRejectedValue(new Error('boom')) });
+
+    const failed = await queue.getJobForUser(ReportJobQueue.jobId('user-1', 'annual', { year: '2026' }), 'user-1');
+    expect(failed).toMatchObject({ status: 'failed', error: 'boom' });
+
+    const retried = await queue.enqueue('user-1', 'annual', { year: '2026' });
+    expect(retried.status).toBe('queued');
+    expect(redis.lPush).toHaveBeenCalledTimes(2);
+  });
+
+  it('should hide jobs from other users', async () => {
+    const job = await queue.enqueue('user-1', 'trends', { months: '60' });
+
+    expect(await queue.getJobForUser(job.jobId, 'user-2')).toBeNull();
+  });
+});
@@ -0,0 +1,64 @@
+/**
+ * Unit Tests for ReportService argument checks
+ * Tests the checks the heavy reports run before computing or queueing
+ */
+
+const ReportService = require('../../../src/services/ReportService');
+const Report = require('../../../src/models/Report');
+
+jest.mock('../../../src/models/Report');
+
+describe('ReportService', () => {
+  describe('parseMonths', () => {
+    it('should default to 12 months', () => {
+      expect(ReportService.parseMonths(undefined)).toBe(12);
+      expect(ReportService.parseMonths('24')).toBe(24);
+    });
+
+    it('should refuse more than 60 months with a 400', () => {
+      let error;
+      try {
+        ReportService.parseMonths('500');
+      } catch (caught) {
+        error = caught;
+      }
+
+      expect(error.message).toBe('Months must be between 1 and 60');
+      expect(error.statusCode).toBe(400);
+    });
+  });
+
+  describe('getIncomeVsExpense', () => {
+    it('should use the shared months check', async () => {
+      await expect(ReportService.getIncomeVsExpense('user-1', '500')).rejects.toMatchObject({ statusCode: 400 });
+
+      await ReportService.getIncomeVsExpense('user-1', undefined);
+      expect(Report.getIncomeVsExpense).toHaveBeenCalledWith('user-1', 12);
+    });
+  });
+
+  describe('parseYear', () => {
+    it('should accept years from 2000 to next year', () => {
+      expect(ReportService.parseYear('2024')).toBe(2024);
+      expect(() => ReportService.parseYear('1999')).toThrow('Year must be between 2000 and next year');
+      expect(() => ReportService.parseYear('abc')).toThrow('Year must be a number');
+    });
+  });
+
+  describe('parseComparisonDates', () => {
+    it('should return the four dates', () => {
+      const dates = ReportService.parseComparisonDates('2026-01-01', '2026-01-31', '2026-02-01', '2026-02-28');
+      expect(dates.map(date => date.toISOString().slice(0, 10)))
+        .toEqual(['2026-01-01', '2026-01-31', '2026-02-01', '2026-02-28']);
+    });
+
+    it('should refuse missing, malformed or reversed dates', () => {
+      expect(() => ReportService.parseComparisonDates('2026-01-01', '2026-01-31'))
+        .toThrow('All four date parameters are required');
+      expect(() => ReportService.parseComparisonDates('nope', '2026-01-31', '2026-02-01', '2026-02-28'))
+        .toThrow('Invalid date format');
+      expect(() => ReportService.parseComparisonDates('2026-02-01', '2026-01-31', '2026-02-01', '2026-02-28'))
+        .toThrow('Start date must be before end date');
+    });
+  });
+});
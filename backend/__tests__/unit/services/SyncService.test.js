@@ -0,0 +1,47 @@
+/**
+ * Unit Tests for SyncService
+ * Tests watermark parsing and delegation to the Sync model
+ */
+
+const SyncService = require('../../../src/services/SyncService');
+const Sync = require('../../../src/models/Sync');
+
+jest.mock('../../../src/models/Sync');
+
+describe('SyncService', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  describe('parseWatermark', () => {
+    it('should treat a missing watermark as a full sync', () => {
+      expect(SyncService.parseWatermark(undefined)).toBeNull();
+      expect(SyncService.parseWatermark('')).toBeNull();
+    });
+
+    it('should keep large watermarks as strings', () => {
+      expect(SyncService.parseWatermark('9007199254740993')).toBe('9007199254740993');
+    });
+
+    it('should reject non-numeric watermarks', () => {
+      expect(() => SyncService.parseWatermark('abc')).toThrow('Invalid sync watermark');
+      expect(() => SyncService.parseWatermark('-1')).toThrow('Invalid sync watermark');
+    });
+  });
+
+  describe('getChanges', () => {
+    it('should require a user ID', async () => {
+      await expect(SyncService.getChanges(null, '10')).rejects.toThrow('User ID is required');
+    });
+
+    it('should pass the parsed watermark to the model', async () => {
+      const changes = { watermark: '42', full: false };
+      Sync.getChanges.mockResolvedValue(changes);
+
+      const result = await SyncService.getChanges('user-1', '41');
+
+      expect(result).toBe(changes);
+      expect(Sync.getChanges).toHaveBeenCalledWith('user-1', '41');
+    });
+  });
+});
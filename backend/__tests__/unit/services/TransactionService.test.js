@@ -0,0 +1,29 @@
+/**
+ * Unit Tests for TransactionService search
+ * Tests query normalization and delegation to the Transaction model
+ */
+
+const TransactionService = require('../../../src/services/TransactionService');
+const Transaction = require('../../../src/models/Transaction');
+
+jest.mock('../../../src/models/Transaction');
+
+describe('TransactionService.searchTransactions', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  it('should reject queries shorter than 2 characters', async () => {
+    await expect(TransactionService.searchTransactions('user-1', ' a ')).rejects.toThrow('at least 2 characters');
+    await expect(TransactionService.searchTransactions('user-1', undefined)).rejects.toThrow('at least 2 characters');
+    expect(Transaction.search).not.toHaveBeenCalled();
+  });
+
+  it('should collapse whitespace before searching', async () => {
+    Transaction.search.mockResolvedValue([]);
+
+    await TransactionService.searchTransactions('user-1', '  coffee   shop ', { limit: 10 });
+
+    expect(Transaction.search).toHaveBeenCalledWith('user-1', 'coffee shop', { limit: 10 });
+  });
+});
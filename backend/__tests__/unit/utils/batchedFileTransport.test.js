@@ -0,0 +1,102 @@
+/**
+ * Unit Tests for BatchedFileTransport
+ * Tests ring buffer overflow, level sampling, batched flushing and the exit
+ * drain
+ */
+
+const fs = require('fs');
+const BatchedFileTransport = require('../../../src/utils/batchedFileTransport');
+
+const MESSAGE = Symbol.for('message');
+
+const entry = (level, message) => ({ level, message, [MESSAGE]: JSON.stringify({ level, message }) });
+
+describe('BatchedFileTransport', () => {
+  let transport;
+  let posted;
+
+  const createTransport = (options = {}) => {
+    const created = new BatchedFileTransport({
+      files: { combined: 'combined.log', error: 'error.log' },
+      flushIntervalMs: 60000,
+      ...options
+    });
+    posted = [];
+    created.startWorker = () => ({ postMessage: batch => posted.push(batch) });
+    return created;
+  };
+
+  afterEach(() => {
+    clearInterval(transport.timer);
+  });
+
+  it('should flush buffered lines as one batch, copying errors to the error file', () => {
+    transport = createTransport();
+    transport.log(entry('info', 'a'), () => {});
+    transport.log(entry('error', 'b'), () => {});
+
+    transport.flush();
+
+    expect(posted).toHaveLength(1);
+    expect(posted[0].combined.split('\n').filter(Boolean)).toHaveLength(2);
+    expect(posted[0].error).toContain('"message":"b"');
+    expect(transport.getMetrics()).toMatchObject({ buffered: 0, flushed: 2, flushes: 1 });
+  });
+
+  it('should overwrite the oldest line and count drops when full', () => {
+    transport = createTransport({ capacity: 2, batchSize: 100 });
+    ['1', '2', '3'].forEach(message => transport.log(entry('info', message), () => {}));
+
+    transport.flush();
+
+    expect(posted[0].combined).not.toContain('"message":"1"');
+    expect(posted[0].combined).toContain('"message":"3"');
+    expect(transport.getMetrics().dropped).toBe(1);
+  });
+
+  it('should sample configured levels but always keep errors', () => {
+    transport = createTransport({ sampleRates: { info: 0 } });
+    transport.log(entry('info', 'noise'), () => {});
+    transport.log(entry('error', 'boom'), () => {});
+
+    expect(transport.getMetrics()).toMatchObject({ buffered: 1, sampledOut: 1 });
+  });
+
+  describe('flushSync', () => {
+    let appended;
+
+    beforeEach(() => {
+      appended = [];
+      jest.spyOn(fs, 'appendFileSync').mockImplementation((file, data) => appended.push({ file, data }));
+    });
+
+    afterEach(() => {
+      fs.appendFileSync.mockRestore();
+    });
+
+    it('should write batches the worker has not acknowledged along with the buffer', () => {
+      transport = createTransport();
+      transport.log(entry('error', 'posted'), () => {});
+      transport.flush();
+      transport.log(entry('info', 'buffered'), () => {});
+
+      transport.flushSync();
+
+      expect(appended[0].file).toBe('combined.log');
+      expect(appended[0].data).toContain('"message":"posted"');
+      expect(appended[0].data).toContain('"message":"buffered"');
+      expect(appended[1]).toMatchObject({ file: 'error.log' });
+    });
+
+    it('should skip batches the worker already wrote', () => {
+      transport = createTransport();
+      transport.log(entry('info', 'posted'), () => {});
+      transport.flush();
+      Atomics.store(transport.written, 0, 1);
+
+      transport.flushSync();
+
+      expect(appended).toHaveLength(0);
+    });
+  });
+});
@@ -0,0 +1,117 @@
+/**
+ * Unit Tests for exportStream
+ * Tests keyset paging, CSV/NDJSON serialisation and gzip output
+ */
+
+const zlib = require('zlib');
+const { Writable } = require('stream');
+const { keysetRows, sendExport } = require('../../../src/utils/exportStream');
+
+// Minimal knex-like builder over an in-memory table sorted newest first
+const fakeQuery = (rows, calls) => () => {
+  const state = { limit: Infinity, after: null };
+  const builder = {
+    orderBy: () => builder,
+    limit: n => { state.limit = n; return builder; },
+    whereRaw: (sql, bindings) => { state.after = bindings.slice(2); return builder; },
+    then: (resolve, reject) => {
+      calls.push(state.after);
+      const start = state.after
+        ? rows.findIndex(row => row.date < state.after[0] || (row.date === state.after[0] && row.id < state.after[1]))
+        : 0;
+      return Promise.resolve(start === -1 ? [] : rows.slice(start, start + state.limit)).then(resolve, reject);
+    }
+  };
+  return builder;
+};
+
+const fakeResponse = () => {
+  const chunks = [];
+  const res = new Writable({
+    write(chunk, encoding, callback) {
+      chunks.push(Buffer.from(chunk));
+      res.headersSent = true;
+      callback();
+    }
+  });
+  res.headers = {};
+  res.headersSent = false;
+  res.setHeader = (name, value) => { res.headers[name] = value; };
+  res.body = () => Buffer.concat(chunks);
+  return res;
+};
+
+async function* fromArray(rows) {
+  yield* rows;
+}
+
+describe('exportStream', () => {
+  describe('keysetRows', () => {
+    it('should page through every row using the last seen key', async () => {
+      const table = [
+        { date: '2026-03-02', id: 5 },
+        { date: '2026-03-02', id: 4 },
+        { date: '2026-03-01', id: 9 },
+        { date: '2026-02-28', id: 1 },
+        { date: '2026-02-27', id: 2 }
+      ];
+      const calls = [];
+
+      const seen = [];
+      for await (const row of keysetRows(fakeQuery(table, calls), { dateColumn: 't.date', idColumn: 't.id', batchSize: 2 })) {
+        seen.push(row.id);
+      }
+
+      expect(seen).toEqual([5, 4, 9, 1, 2]);
+      expect(calls).toEqual([null, ['2026-03-02', 4], ['2026-02-28', 1]]);
+    });
+  });
+
+  describe('sendExport', () => {
+    const fields = ['id', 'description', 'amount'];
+
+    it('should write quoted CSV with a header', async () => {
+      const res = fakeResponse();
+
+      await sendExport(res, fromArray([
+        { id: 1, description: 'Coffee, "large"', amount: '4.50' },
+        { id: 2, description: null, amount: 12 }
+      ]), { fields, filename: 'expenses' });
+
+      expect(res.headers['Content-Type']).toBe('text/csv; charset=utf-8');
+      expect(res.headers['Content-Disposition']).toBe('attachment; filename="expenses.csv"');
+      expect(res.body().toString()).toBe(
+        '"id","description","amount"\n1,"Coffee, ""large""","4.50"\n2,,12'
+      );
+    });
+
+    it('should write only the header when nothing matches', async () => {
+      const res = fakeResponse();
+
+      await sendExport(res, fromArray([]), { fields, filename: 'expenses' });
+
+      expect(res.body().toString()).toBe('"id","description","amount"');
+    });
+
+    it('should write gzipped NDJSON', async () => {
+      const res = fakeResponse();
+
+      await sendExport(res, fromArray([{ id: 1, description: 'Rent', amount: '900.00', extra: true }]), {
+        fields, filename: 'income', format: 'ndjson', gzip: true
+      });
+
+      expect(res.headers['Content-Type']).toBe('application/gzip');
+      expect(res.headers['Content-Disposition']).toBe('attachment; filename="income.ndjson.gz"');
+      expect(zlib.gunzipSync(res.body()).toString()).toBe('{"id":1,"description":"Rent","amount":"900.00"}\n');
+    });
+
+    it('should pass errors before the first byte to the error handler', async () => {
+      const res = fakeResponse();
+      async function* failing() {
+        throw new Error('connection refused');
+      }
+
+      await expect(sendExport(res, failing(), { fields, filename: 'expenses' })).rejects.toThrow('connection refused');
+    });
+  });
+});
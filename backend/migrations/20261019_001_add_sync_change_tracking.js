@@ -0,0 +1,112 @@
+// Change tracking for GET /api/v1/sync.
+//
+// Every synced row carries a change_seq stamped by trigger with the id of the
+// transaction that last wrote it. Transaction ids are a monotonic 64-bit
+// sequence, and the xmin of a snapshot tells us which ones are still in flight,
+// so a watermark taken from the snapshot never skips a late-committing write.
+// Hard deletes of accounts leave a row in sync_tombstones.
+
+const SYNCED_TABLES = ['accounts', 'transactions', 'categories', 'budgets', 'user_settings'];
+
+exports.up = async function(knex) {
+  await knex.raw(`
+    CREATE OR REPLACE FUNCTION assign_sync_change_seq()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      NEW.change_seq := pg_current_xact_id()::text::bigint;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+  `);
+
+  for (const tableName of SYNCED_TABLES) {
+    const hasTable = await knex.schema.hasTable(tableName);
+    if (!hasTable) {
+      continue;
+    }
+
+    const hasChangeSeq = await knex.schema.hasColumn(tableName, 'change_seq');
+    if (!hasChangeSeq) {
+      await knex.schema.alterTable(tableName, table => {
+        table.bigInteger('change_seq').notNullable().defaultTo(0);
+      });
+    }
+
+    const hasUpdatedAt = await knex.schema.hasColumn(tableName, 'updated_at');
+    if (!hasUpdatedAt) {
+      await knex.schema.alterTable(tableName, table => {
+        table.timestamp('updated_at', { useTz: true }).defaultTo(knex.fn.now());
+      });
+    }
+
+    await knex.raw(`DROP TRIGGER IF EXISTS ${tableName}_sync_change_seq ON ${tableName}`);
+    await knex.raw(`
+      CREATE TRIGGER ${tableName}_sync_change_seq
+      BEFORE INSERT OR UPDATE ON ${tableName}
+      FOR EACH ROW EXECUTE FUNCTION assign_sync_change_seq()
+    `);
+
+    await knex.raw(`CREATE INDEX IF NOT EXISTS idx_${tableName}_user_change_seq ON ${tableName}(user_id, change_seq)`);
+    await knex.raw(`CREATE INDEX IF NOT EXISTS idx_${tableName}_user_updated_at ON ${tableName}(user_id, updated_at)`);
+  }
+
+  // System categories have no user_id, so they need their own change index
+  await knex.raw('CREATE INDEX IF NOT EXISTS idx_categories_system_change_seq ON categories(change_seq) WHERE is_system = true');
+
+  const hasTombstones = await knex.schema.hasTable('sync_tombstones');
+  if (!hasTombstones) {
+    await knex.schema.createTable('sync_tombstones', table => {
+      table.bigIncrements('tombstone_id').primary();
+      table.uuid('user_id').notNullable().references('user_id').inTable('users').onDelete('CASCADE');
+      table.string('entity_type', 30).notNullable();
+      table.string('entity_id', 100).notNullable();
+      table.bigInteger('change_seq').notNullable();
+      table.timestamp('deleted_at', { useTz: true }).defaultTo(knex.fn.now());
+    });
+  }
+  await knex.raw('CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_change_seq ON sync_tombstones(user_id, change_seq)');
+
+  await knex.raw(`
+    CREATE OR REPLACE FUNCTION record_account_tombstone()
+    RETURNS TRIGGER AS $$
+    BEGIN
+      INSERT INTO sync_tombstones (user_id, entity_type, entity_id, change_seq)
+      VALUES (OLD.user_id, 'account', OLD.account_id::text, pg_current_xact_id()::text::bigint);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+  `);
+  await knex.raw('DROP TRIGGER IF EXISTS accounts_sync_tombstone ON accounts');
+  await knex.raw(`
+    CREATE TRIGGER accounts_sync_tombstone
+    AFTER DELETE ON accounts
+    FOR EACH ROW EXECUTE FUNCTION record_account_tombstone()
+  `);
+};
+
+exports.down = async function(knex) {
+  await knex.raw('DROP TRIGGER IF EXISTS accounts_sync_tombstone ON accounts');
+  await knex.raw('DROP FUNCTION IF EXISTS record_account_tombstone()');
+  await knex.schema.dropTableIfExists('sync_tombstones');
+  await knex.raw('DROP INDEX IF EXISTS idx_categories_system_change_seq');
+
+  for (const tableName of SYNCED_TABLES) {
+    const hasTable = await knex.schema.hasTable(tableName);
+    if (!hasTable) {
+      continue;
+    }
+
+    await knex.raw(`DROP TRIGGER IF EXISTS ${tableName}_sync_change_seq ON ${tableName}`);
+    await knex.raw(`DROP INDEX IF EXISTS idx_${tableName}_user_change_seq`);
+    await knex.raw(`DROP INDEX IF EXISTS idx_${tableName}_user_updated_at`);
+
+    const hasChangeSeq = await knex.schema.hasColumn(tableName, 'change_seq');
+    if (hasChangeSeq) {
+      await knex.schema.alterTable(tableName, table => {
+        table.dropColumn('change_seq');
+      });
+    }
+  }
+
+  await knex.raw('DROP FUNCTION IF EXISTS assign_sync_change_seq()');
+};
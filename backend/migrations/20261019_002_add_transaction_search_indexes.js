@@ -0,0 +1,53 @@
+// Indexes for GET /api/v1/transactions/search.
+//
+// Full-text matching uses a weighted tsvector over description, merchant,
+// notes and tags; fuzzy matching uses trigrams over the same text. Both are
+// expression indexes over IMMUTABLE helpers rather than stored columns so the
+// search document never leaks into `transactions.*` payloads. user_id leads
+// each GIN index (via btree_gin) so a lookup only visits one user's postings.
+
+exports.up = async function(knex) {
+  const hasTransactionsTable = await knex.schema.hasTable('transactions');
+  if (!hasTransactionsTable) {
+    return;
+  }
+
+  await knex.raw('CREATE EXTENSION IF NOT EXISTS pg_trgm');
+  await knex.raw('CREATE EXTENSION IF NOT EXISTS btree_gin');
+
+  await knex.raw(`
+    CREATE OR REPLACE FUNCTION transaction_search_text(description text, merchant text, notes text, tags text[])
+    RETURNS text AS $$
+      SELECT concat_ws(' ', description, merchant, notes, array_to_string(tags, ' '))
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+  `);
+
+  await knex.raw(`
+    CREATE OR REPLACE FUNCTION transaction_search_document(description text, merchant text, notes text, tags text[])
+    RETURNS tsvector AS $$
+      SELECT setweight(to_tsvector('simple', coalesce(description, '')), 'A')
+          || setweight(to_tsvector('simple', coalesce(merchant, '')), 'A')
+          || setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+          || setweight(to_tsvector('simple', coalesce(array_to_string(tags, ' '), '')), 'C')
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+  `);
+
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS idx_transactions_search_document
+    ON transactions USING GIN (user_id, transaction_search_document(description, merchant, notes, tags))
+    WHERE is_deleted = false
+  `);
+
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS idx_transactions_search_trgm
+    ON transactions USING GIN (user_id, transaction_search_text(description, merchant, notes, tags) gin_trgm_ops)
+    WHERE is_deleted = false
+  `);
+};
+
+exports.down = async function(knex) {
+  await knex.raw('DROP INDEX IF EXISTS idx_transactions_search_trgm');
+  await knex.raw('DROP INDEX IF EXISTS idx_transactions_search_document');
+  await knex.raw('DROP FUNCTION IF EXISTS transaction_search_document(text, text, text, text[])');
+  await knex.raw('DROP FUNCTION IF EXISTS transaction_search_text(text, text, text, text[])');
+};
@@ -0,0 +1,37 @@
+// Daily FX rates for converting mixed-currency totals into a user's base
+// currency. Every rate is quoted against one pivot currency (USD): `rate` is
+// how many units of `currency` one USD buys on `rate_date`. Any pair converts
+// as amount * rate(to) / rate(from), using the latest rates on or before the
+// date of the amount being converted.
+
+exports.up = async function(knex) {
+  const hasFxRatesTable = await knex.schema.hasTable('fx_rates');
+  if (!hasFxRatesTable) {
+    await knex.schema.createTable('fx_rates', table => {
+      table.string('currency', 3).notNullable();
+      table.date('rate_date').notNullable();
+      table.decimal('rate', 20, 10).notNullable();
+      table.string('source', 50);
+      table.timestamp('created_at', { useTz: true }).defaultTo(knex.fn.now());
+      table.primary(['currency', 'rate_date']);
+    });
+  }
+
+  await knex.raw(`
+    DO $$
+    BEGIN
+      IF NOT EXISTS (
+        SELECT 1
+        FROM pg_constraint
+        WHERE conname = 'fx_rates_rate_positive_check'
+      ) THEN
+        ALTER TABLE fx_rates
+        ADD CONSTRAINT fx_rates_rate_positive_check CHECK (rate > 0);
+      END IF;
+    END $$;
+  `);
+};
+
+exports.down = async function(knex) {
+  await knex.schema.dropTableIfExists('fx_rates');
+};
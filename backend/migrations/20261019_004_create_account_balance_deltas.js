@@ -0,0 +1,57 @@
+// Append-only balance ledger.
+//
+// Transactions no longer UPDATE accounts.current_balance; they insert a
+// signed delta here instead, so concurrent writes to one account never queue
+// on its row lock. An account's balance is current_balance plus its pending
+// deltas. Compaction folds deltas into current_balance in the background.
+// Deltas carry the sync change_seq so balance changes reach /api/v1/sync
+// before they are compacted.
+
+exports.up = async function(knex) {
+  const hasAccountsTable = await knex.schema.hasTable('accounts');
+  if (!hasAccountsTable) {
+    return;
+  }
+
+  const hasDeltasTable = await knex.schema.hasTable('account_balance_deltas');
+  if (!hasDeltasTable) {
+    await knex.schema.createTable('account_balance_deltas', table => {
+      table.bigIncrements('delta_id').primary();
+      table.uuid('account_id').notNullable().references('account_id').inTable('accounts').onDelete('CASCADE');
+      table.uuid('user_id').notNullable();
+      table.uuid('transaction_id');
+      table.decimal('amount', 15, 2).notNullable();
+      table.bigInteger('change_seq').notNullable().defaultTo(0);
+      table.timestamp('created_at', { useTz: true }).defaultTo(knex.fn.now());
+    });
+  }
+
+  // Covering index: the balance read path is an index-only SUM per account
+  await knex.raw('CREATE INDEX IF NOT EXISTS idx_account_balance_deltas_account ON account_balance_deltas(account_id) INCLUDE (amount)');
+  await knex.raw('CREATE INDEX IF NOT EXISTS idx_account_balance_deltas_user_change_seq ON account_balance_deltas(user_id, change_seq)');
+
+  await knex.raw('DROP TRIGGER IF EXISTS account_balance_deltas_sync_change_seq ON account_balance_deltas');
+  await knex.raw(`
+    CREATE TRIGGER account_balance_deltas_sync_change_seq
+    BEFORE INSERT ON account_balance_deltas
+    FOR EACH ROW EXECUTE FUNCTION assign_sync_change_seq()
+  `);
+};
+
+exports.down = async function(knex) {
+  const hasDeltasTable = await knex.schema.hasTable('account_balance_deltas');
+  if (hasDeltasTable) {
+    // Fold anything still pending back into the accounts before dropping it
+    await knex.raw(`
+      UPDATE accounts
+      SET current_balance = accounts.current_balance + pending.amount
+      FROM (
+        SELECT account_id, SUM(amount) AS amount
+        FROM account_balance_deltas
+        GROUP BY account_id
+      ) pending
+      WHERE accounts.account_id = pending.account_id
+    `);
+  }
+  await knex.schema.dropTableIfExists('account_balance_deltas');
+};
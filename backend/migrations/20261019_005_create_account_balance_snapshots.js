@@ -0,0 +1,52 @@
+// End-of-day account balances for balance-history and net-worth charts.
+//
+// One row per account per day: the balance after every transaction dated on
+// or before snapshot_date. Rows are written by the end-of-day job
+// (scripts/snapshot-balances.js). A back-dated create or delete does not touch
+// snapshots on the write path. It appends an invalidation instead, and the
+// affected range is rebuilt by the next job run or by the first read of that
+// account's history.
+
+exports.up = async function(knex) {
+  const hasAccountsTable = await knex.schema.hasTable('accounts');
+  if (!hasAccountsTable) {
+    return;
+  }
+
+  const hasSnapshotsTable = await knex.schema.hasTable('account_balance_snapshots');
+  if (!hasSnapshotsTable) {
+    await knex.schema.createTable('account_balance_snapshots', table => {
+      table.uuid('account_id').notNullable().references('account_id').inTable('accounts').onDelete('CASCADE');
+      table.uuid('user_id').notNullable();
+      table.date('snapshot_date').notNullable();
+      table.string('currency', 3).notNullable();
+      table.decimal('balance', 15, 2).notNullable();
+      table.timestamp('updated_at', { useTz: true }).defaultTo(knex.fn.now());
+      table.primary(['account_id', 'snapshot_date']);
+    });
+  }
+
+  // Net-worth timeline: one range scan over a user's snapshots
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS idx_account_balance_snapshots_user_date
+    ON account_balance_snapshots(user_id, snapshot_date) INCLUDE (balance, currency)
+  `);
+
+  const hasInvalidationsTable = await knex.schema.hasTable('account_snapshot_invalidations');
+  if (!hasInvalidationsTable) {
+    await knex.schema.createTable('account_snapshot_invalidations', table => {
+      table.bigIncrements('invalidation_id').primary();
+      table.uuid('account_id').notNullable().references('account_id').inTable('accounts').onDelete('CASCADE');
+      table.uuid('user_id').notNullable();
+      table.date('from_date').notNullable();
+      table.timestamp('created_at', { useTz: true }).defaultTo(knex.fn.now());
+    });
+  }
+  await knex.raw('CREATE INDEX IF NOT EXISTS idx_account_snapshot_invalidations_account ON account_snapshot_invalidations(account_id)');
+  await knex.raw('CREATE INDEX IF NOT EXISTS idx_account_snapshot_invalidations_user ON account_snapshot_invalidations(user_id)');
+};
+
+exports.down = async function(knex) {
+  await knex.schema.dropTableIfExists('account_snapshot_invalidations');
+  await knex.schema.dropTableIfExists('account_balance_snapshots');
+};
@@ -0,0 +1,55 @@
+// Daily closing prices for investment symbols, loaded from a price file or a
+// price feed (scripts/load-security-prices.js). Holdings are marked to market
+// against the latest price on or before today. The nightly valuation job
+// (scripts/value-portfolios.js) writes it into investments.current_price, and
+// portfolio summaries read it through the in-process price cache.
+
+exports.up = async function(knex) {
+  const hasPricesTable = await knex.schema.hasTable('security_prices');
+  if (!hasPricesTable) {
+    await knex.schema.createTable('security_prices', table => {
+      table.string('symbol', 20).notNullable();
+      table.date('price_date').notNullable();
+      table.decimal('price', 15, 2).notNullable();
+      table.string('source', 50);
+      table.timestamp('created_at', { useTz: true }).defaultTo(knex.fn.now());
+      table.primary(['symbol', 'price_date']);
+    });
+  }
+
+  await knex.raw(`
+    DO $$
+    BEGIN
+      IF NOT EXISTS (
+        SELECT 1
+        FROM pg_constraint
+        WHERE conname = 'security_prices_price_positive_check'
+      ) THEN
+        ALTER TABLE security_prices
+        ADD CONSTRAINT security_prices_price_positive_check CHECK (price > 0);
+      END IF;
+    END $$;
+  `);
+
+  const hasInvestmentsTable = await knex.schema.hasTable('investments');
+  if (hasInvestmentsTable) {
+    // Portfolio summary: one index range scan per user over live holdings
+    await knex.raw(`
+      CREATE INDEX IF NOT EXISTS idx_investments_user_live
+      ON investments(user_id, created_at DESC)
+      WHERE is_deleted = false
+    `);
+    // Nightly valuation joins holdings to prices by normalised symbol
+    await knex.raw(`
+      CREATE INDEX IF NOT EXISTS idx_investments_symbol_live
+      ON investments(UPPER(symbol))
+      WHERE is_deleted = false AND symbol IS NOT NULL
+    `);
+  }
+};
+
+exports.down = async function(knex) {
+  await knex.raw('DROP INDEX IF EXISTS idx_investments_symbol_live');
+  await knex.raw('DROP INDEX IF EXISTS idx_investments_user_live');
+  await knex.schema.dropTableIfExists('security_prices');
+};
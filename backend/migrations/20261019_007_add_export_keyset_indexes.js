@@ -0,0 +1,30 @@
+// Exports page through a user's rows newest first with keyset predicates
+// `(date, id) < (last date, last id)`. These indexes match that order, so
+// each page is one index range scan however deep into the export it is.
+
+const EXPORT_INDEXES = [
+  ['expenses', 'idx_expenses_user_export', 'expense_date', 'expense_id'],
+  ['income', 'idx_income_user_export', 'income_date', 'income_id'],
+  ['transactions', 'idx_transactions_user_export', 'transaction_date', 'transaction_id']
+];
+
+exports.up = async function(knex) {
+  for (const [tableName, indexName, dateColumn, idColumn] of EXPORT_INDEXES) {
+    const hasTable = await knex.schema.hasTable(tableName);
+    if (!hasTable) {
+      continue;
+    }
+
+    await knex.raw(`
+      CREATE INDEX IF NOT EXISTS ${indexName}
+      ON ${tableName}(user_id, ${dateColumn} DESC, ${idColumn} DESC)
+      WHERE is_deleted = false
+    `);
+  }
+};
+
+exports.down = async function(knex) {
+  for (const [, indexName] of EXPORT_INDEXES) {
+    await knex.raw(`DROP INDEX IF EXISTS ${indexName}`);
+  }
+};
@@ -0,0 +1,39 @@
+// Indexes for filtered expense lists (GET /expenses, /expenses/filter).
+//
+// Tag filters use `tags ?| array[...]` and merchant filters use
+// `merchant ILIKE '%x%'`. Both are answered by GIN indexes that lead with
+// user_id (via btree_gin), so a lookup only visits one user's postings even
+// for users with 100k+ expenses.
+
+exports.up = async function(knex) {
+  const hasExpensesTable = await knex.schema.hasTable('expenses');
+  if (!hasExpensesTable) {
+    return;
+  }
+
+  await knex.raw('CREATE EXTENSION IF NOT EXISTS pg_trgm');
+  await knex.raw('CREATE EXTENSION IF NOT EXISTS btree_gin');
+
+  const { rows } = await knex.raw(`
+    SELECT data_type FROM information_schema.columns
+    WHERE table_name = 'expenses' AND column_name = 'tags'
+  `);
+  if (rows.length && rows[0].data_type === 'jsonb') {
+    await knex.raw(`
+      CREATE INDEX IF NOT EXISTS idx_expenses_user_tags
+      ON expenses USING GIN (user_id, tags)
+      WHERE is_deleted = false
+    `);
+  }
+
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS idx_expenses_user_merchant_trgm
+    ON expenses USING GIN (user_id, merchant gin_trgm_ops)
+    WHERE is_deleted = false
+  `);
+};
+
+exports.down = async function(knex) {
+  await knex.raw('DROP INDEX IF EXISTS idx_expenses_user_merchant_trgm');
+  await knex.raw('DROP INDEX IF EXISTS idx_expenses_user_tags');
+};
@@ -0,0 +1,43 @@
+// Shard map for hash-sharded routing by user_id (src/config/shards.js).
+//
+// db_shards lists the shards on the consistent-hash ring. weight sets each
+// shard's share of new users, and 0 takes a shard out of placement without
+// moving anyone. user_shards pins each user to a shard. Users without a row
+// live on the primary. state = 'moving' makes requests for that user return
+// 503 while scripts/move-user-shard.js copies their rows.
+//
+// Only the primary (directory) database reads these tables. Running the
+// migration on every shard keeps the schemas identical.
+
+exports.up = async function(knex) {
+  const hasShards = await knex.schema.hasTable('db_shards');
+  if (!hasShards) {
+    await knex.schema.createTable('db_shards', (table) => {
+      table.string('name', 64).primary();
+      table.integer('weight').notNullable().defaultTo(100);
+      table.timestamp('created_at').notNullable().defaultTo(knex.fn.now());
+    });
+    await knex('db_shards').insert({ name: 'primary', weight: 100 });
+  }
+
+  const hasUserShards = await knex.schema.hasTable('user_shards');
+  if (!hasUserShards) {
+    await knex.schema.createTable('user_shards', (table) => {
+      table.uuid('user_id').primary();
+      table.string('shard', 64).notNullable();
+      table.string('state', 16).notNullable().defaultTo('active');
+      table.string('target_shard', 64);
+      table.timestamp('updated_at').notNullable().defaultTo(knex.fn.now());
+    });
+    await knex.raw(`
+      ALTER TABLE user_shards
+      ADD CONSTRAINT user_shards_state_check CHECK (state IN ('active', 'moving'))
+    `);
+    await knex.raw('CREATE INDEX IF NOT EXISTS idx_user_shards_shard ON user_shards (shard)');
+  }
+};
+
+exports.down = async function(knex) {
+  await knex.schema.dropTableIfExists('user_shards');
+  await knex.schema.dropTableIfExists('db_shards');
+};
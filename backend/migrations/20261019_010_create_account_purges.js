@@ -0,0 +1,45 @@
+// Background purge queue for deleted accounts.
+//
+// UserService.deleteAccount only marks the user deleted and inserts a row
+// here. src/workers/purgeWorker.js claims rows (FOR UPDATE SKIP LOCKED with a
+// lease) and deletes the user's rows table by table in short batches.
+// current_table and deleted_rows record progress after every batch, so a
+// purge interrupted by a deploy or crash resumes where it stopped. A failed
+// purge is retried after run_after until max attempts, then left as 'failed'.
+//
+// Lives on the primary (directory) database next to users.
+
+exports.up = async function(knex) {
+  const hasPurges = await knex.schema.hasTable('account_purges');
+  if (!hasPurges) {
+    await knex.schema.createTable('account_purges', (table) => {
+      table.uuid('user_id').primary();
+      table.string('status', 16).notNullable().defaultTo('pending');
+      table.string('current_table', 64);
+      table.bigInteger('deleted_rows').notNullable().defaultTo(0);
+      table.integer('attempts').notNullable().defaultTo(0);
+      table.text('last_error');
+      table.timestamp('run_after', { useTz: true }).notNullable().defaultTo(knex.fn.now());
+      table.timestamp('locked_until', { useTz: true });
+      table.timestamp('requested_at', { useTz: true }).notNullable().defaultTo(knex.fn.now());
+      table.timestamp('started_at', { useTz: true });
+      table.timestamp('completed_at', { useTz: true });
+      table.timestamp('updated_at', { useTz: true }).notNullable().defaultTo(knex.fn.now());
+    });
+    await knex.raw(`
+      ALTER TABLE account_purges
+      ADD CONSTRAINT account_purges_status_check CHECK (status IN ('pending', 'running', 'done', 'failed'))
+    `);
+  }
+
+  // The claim query only looks at unfinished purges
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS idx_account_purges_pending
+    ON account_purges (run_after, requested_at)
+    WHERE status IN ('pending', 'running')
+  `);
+};
+
+exports.down = async function(knex) {
+  await knex.schema.dropTableIfExists('account_purges');
+};
@@ -0,0 +1,28 @@
+// Per-table deleted row counts for account purges.
+//
+// A purge resumed after a restart only re-runs the tables from current_table
+// on, so the counts of tables emptied before the interruption are kept here.
+// AccountPurgeService vacuums from these totals once the purge finishes.
+
+exports.up = async function(knex) {
+  const hasPurges = await knex.schema.hasTable('account_purges');
+  if (!hasPurges) {
+    return;
+  }
+
+  const hasCounts = await knex.schema.hasColumn('account_purges', 'deleted_by_table');
+  if (!hasCounts) {
+    await knex.schema.alterTable('account_purges', (table) => {
+      table.jsonb('deleted_by_table').notNullable().defaultTo('{}');
+    });
+  }
+};
+
+exports.down = async function(knex) {
+  const hasCounts = await knex.schema.hasColumn('account_purges', 'deleted_by_table');
+  if (hasCounts) {
+    await knex.schema.alterTable('account_purges', (table) => {
+      table.dropColumn('deleted_by_table');
+    });
+  }
+};
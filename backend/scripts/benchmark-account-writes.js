@@ -0,0 +1,94 @@
+#!/usr/bin/env node
+
+// Write throughput on a single hot account: the previous in-place
+// `UPDATE accounts SET current_balance = current_balance + ?` against the
+// append-only balance ledger. Both run N concurrent writers against one
+// scratch account, then check the final balance.
+//
+// Usage: node scripts/benchmark-account-writes.js <userId> [writers] [writesPerWriter]
+
+const db = require('../src/config/database');
+const Account = require('../src/models/Account');
+const TransactionService = require('../src/services/TransactionService');
+
+const legacyWrite = (userId, accountId, amount) => db.transaction(async trx => {
+  await trx('transactions').insert({
+    transaction_id: trx.raw('gen_random_uuid()'),
+    user_id: userId,
+    account_id: accountId,
+    amount,
+    currency: 'INR',
+    transaction_type: 'income',
+    transaction_date: new Date(),
+    created_at: new Date(),
+    updated_at: new Date(),
+    is_deleted: false
+  });
+  await trx('accounts')
+    .where({ account_id: accountId })
+    .update({ current_balance: trx.raw('current_balance + ?', [amount]), updated_at: new Date() });
+});
+
+const ledgerWrite = (userId, accountId, amount) => TransactionService.createTransaction(userId, {
+  accountId,
+  amount,
+  type: 'income'
+});
+
+const percentile = (sorted, p) => sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+
+const run = async (label, userId, writers, writesPerWriter, write) => {
+  const account = await Account.create(userId, { name: `bench ${label}`, account_type: 'cash' });
+  const latencies = [];
+
+  const start = process.hrtime.bigint();
+  await Promise.all(Array.from({ length: writers }, async () => {
+    for (let i = 0; i < writesPerWriter; i++) {
+      const writeStart = process.hrtime.bigint();
+      await write(userId, account.account_id, 1);
+      latencies.push(Number(process.hrtime.bigint() - writeStart) / 1e6);
+    }
+  }));
+  const elapsedSecs = Number(process.hrtime.bigint() - start) / 1e9;
+
+  const { current_balance: balance } = await Account.findById(account.account_id);
+  latencies.sort((a, b) => a - b);
+  console.log(
+    `${label.padEnd(8)} ${(latencies.length / elapsedSecs).toFixed(0).padStart(6)} writes/s  ` +
+    `p50 ${percentile(latencies, 0.5).toFixed(2)} ms  p99 ${percentile(latencies, 0.99).toFixed(2)} ms  ` +
+    `balance ${Number(balance)} (expected ${latencies.length})`
+  );
+
+  const compactStart = process.hrtime.bigint();
+  await Account.compactBalances([account.account_id]);
+  const compacted = await Account.findById(account.account_id);
+  console.log(
+    `${''.padEnd(8)} compaction ${(Number(process.hrtime.bigint() - compactStart) / 1e6).toFixed(2)} ms, ` +
+    `balance after ${Number(compacted.current_balance)}`
+  );
+
+  await db('transactions').where({ account_id: account.account_id }).del();
+  await db('accounts').where({ account_id: account.account_id }).del();
+};
+
+async function main() {
+  const [userId, writersArg, writesArg] = process.argv.slice(2);
+  if (!userId) {
+    console.error('Usage: node scripts/benchmark-account-writes.js <userId> [writers] [writesPerWriter]');
+    process.exit(1);
+  }
+
+  const writers = parseInt(writersArg) || 10;
+  const writesPerWriter = parseInt(writesArg) || 200;
+
+  console.log(`📊 ${writers} writers x ${writesPerWriter} writes on one account`);
+  await run('hot row', userId, writers, writesPerWriter, legacyWrite);
+  await run('ledger', userId, writers, writesPerWriter, ledgerWrite);
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Benchmark failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -0,0 +1,115 @@
+#!/usr/bin/env node
+
+// Show that exports run in flat memory: stream N rows through the export
+// pipeline into a slow sink and sample RSS as it goes.
+//
+// Usage: node scripts/benchmark-export.js [rows] [--gzip] [--ndjson]
+//        node scripts/benchmark-export.js --user <userId> [--gzip]   (real expenses from DATABASE_URL)
+//
+// Without --user, rows are generated in keyset-sized pages with a short
+// delay per page standing in for the query round trip.
+
+const { Writable } = require('stream');
+const { keysetRows, sendExport } = require('../src/utils/exportStream');
+
+const PAGE_DELAY_MS = 2;
+const SAMPLE_INTERVAL_MS = 250;
+
+const syntheticQuery = total => () => {
+  let limit = 0;
+  let afterId = null;
+  const builder = {
+    orderBy: () => builder,
+    limit: n => { limit = n; return builder; },
+    whereRaw: (sql, bindings) => { afterId = bindings[3]; return builder; },
+    then: (resolve, reject) => {
+      const start = afterId === null ? total : afterId - 1;
+      const rows = [];
+      for (let id = start; id > Math.max(0, start - limit); id--) {
+        rows.push({
+          expense_id: id,
+          expense_date: new Date(Date.UTC(2020, 0, 1) + id * 60000),
+          description: `Synthetic expense ${id}`,
+          amount: (id % 10000 / 100).toFixed(2),
+          currency: 'INR',
+          category_name: 'Food & Dining',
+          merchant: 'Benchmark Mart',
+          notes: id % 7 === 0 ? 'note, with "quotes"' : ''
+        });
+      }
+      return new Promise(done => setTimeout(done, PAGE_DELAY_MS, rows)).then(resolve, reject);
+    }
+  };
+  return builder;
+};
+
+// Drains at roughly network speed so backpressure actually engages
+const slowSink = () => {
+  const sink = new Writable({
+    highWaterMark: 64 * 1024,
+    write(chunk, encoding, callback) {
+      sink.bytes += chunk.length;
+      setImmediate(callback);
+    }
+  });
+  sink.bytes = 0;
+  sink.headersSent = false;
+  sink.setHeader = () => {};
+  return sink;
+};
+
+async function main() {
+  const args = process.argv.slice(2);
+  const gzip = args.includes('--gzip');
+  const format = args.includes('--ndjson') ? 'ndjson' : 'csv';
+  const userIndex = args.indexOf('--user');
+  const total = parseInt(args.find(arg => /^\d+$/.test(arg))) || 1000000;
+
+  let rows;
+  let fields = ['expense_id', 'expense_date', 'description', 'amount', 'currency', 'category_name', 'merchant', 'notes'];
+  let db = null;
+  if (userIndex !== -1) {
+    db = require('../src/config/database');
+    const ExpenseService = require('../src/services/ExpenseService');
+    rows = ExpenseService.exportExpenses(args[userIndex + 1], {});
+    fields = ExpenseService.exportFields;
+  } else {
+    rows = keysetRows(syntheticQuery(total), { dateColumn: 'expenses.expense_date', idColumn: 'expenses.expense_id' });
+  }
+
+  let count = 0;
+  const counted = (async function* () {
+    for await (const row of rows) {
+      count++;
+      yield row;
+    }
+  })();
+
+  const samples = [];
+  const sample = () => samples.push(process.memoryUsage().rss);
+  const timer = setInterval(sample, SAMPLE_INTERVAL_MS);
+  const sink = slowSink();
+  const start = process.hrtime.bigint();
+
+  try {
+    sample();
+    await sendExport(sink, counted, { fields, filename: 'expenses', format, gzip });
+    sample();
+  } finally {
+    clearInterval(timer);
+    if (db) await db.destroy();
+  }
+
+  const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+  const mb = bytes => (bytes / 1024 / 1024).toFixed(1);
+  const quarter = Math.max(1, Math.floor(samples.length / 4));
+  console.log(`Exported ${count.toLocaleString()} rows (${format}${gzip ? ', gzip' : ''}) in ${seconds.toFixed(1)}s, ${mb(sink.bytes)} MB written`);
+  console.log(`RSS MB  start ${mb(samples[0])}  ` +
+    `25% ${mb(samples[quarter])}  50% ${mb(samples[quarter * 2] || samples[samples.length - 1])}  ` +
+    `end ${mb(samples[samples.length - 1])}  peak ${mb(Math.max(...samples))}`);
+}
+
+main().catch(error => {
+  console.error(`❌ Export benchmark failed: ${error.message}`);
+  process.exitCode = 1;
+});
@@ -0,0 +1,73 @@
+#!/usr/bin/env node
+
+// Compare the set-based monthly report query with the month-by-month loop it
+// replaced: round trips and wall time per call.
+//
+// Usage: node scripts/benchmark-report-trends.js <userId> [months] [iterations]
+
+const db = require('../src/config/database');
+const Report = require('../src/models/Report');
+const FxRate = require('../src/models/FxRate');
+
+const legacyTrends = async (userId, months) => {
+  const now = new Date();
+  const baseCurrency = await FxRate.getBaseCurrency(userId);
+  const trends = [];
+
+  for (let i = months - 1; i >= 0; i--) {
+    const monthStart = new Date(now.getFullYear(), now.getMonth() - i, 1);
+    const monthEnd = new Date(now.getFullYear(), now.getMonth() - i + 1, 0);
+    const expenses = await Report._sumConverted('expenses', userId, baseCurrency, monthStart, monthEnd);
+    const income = await Report._sumConverted('income', userId, baseCurrency, monthStart, monthEnd);
+    trends.push({ month: monthStart, income, expenses, net: income - expenses });
+  }
+
+  return trends;
+};
+
+const measure = async (label, iterations, fn) => {
+  let queries = 0;
+  const countQuery = () => { queries++; };
+  db.on('query', countQuery);
+
+  const timings = [];
+  try {
+    for (let i = 0; i < iterations; i++) {
+      const start = process.hrtime.bigint();
+      await fn();
+      timings.push(Number(process.hrtime.bigint() - start) / 1e6);
+    }
+  } finally {
+    db.removeListener('query', countQuery);
+  }
+
+  timings.sort((a, b) => a - b);
+  const mean = timings.reduce((sum, ms) => sum + ms, 0) / timings.length;
+  console.log(
+    `${label.padEnd(12)} round trips/call: ${String(queries / iterations).padStart(4)}  ` +
+    `mean ${mean.toFixed(2)} ms  p50 ${timings[Math.floor(timings.length / 2)].toFixed(2)} ms  ` +
+    `max ${timings[timings.length - 1].toFixed(2)} ms`
+  );
+};
+
+async function main() {
+  const [userId, monthsArg, iterationsArg] = process.argv.slice(2);
+  if (!userId) {
+    console.error('Usage: node scripts/benchmark-report-trends.js <userId> [months] [iterations]');
+    process.exit(1);
+  }
+
+  const months = parseInt(monthsArg) || 60;
+  const iterations = parseInt(iterationsArg) || 20;
+
+  console.log(`📊 getTrends(${months} months) x ${iterations}`);
+  await measure('month loop', iterations, () => legacyTrends(userId, months));
+  await measure('set-based', iterations, () => Report.getTrends(userId, months));
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Benchmark failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -0,0 +1,41 @@
+#!/usr/bin/env node
+
+// Load daily FX rates from a local file into fx_rates.
+//
+// Usage: npm run fx:load -- path/to/rates.csv [source]
+//
+// The file has one `date,currency,rate` line per rate, where rate is units of
+// currency per 1 USD, e.g.
+//   date,currency,rate
+//   2026-10-16,INR,83.12
+//   2026-10-16,EUR,0.9184
+
+const fs = require('fs');
+const path = require('path');
+const db = require('../src/config/database');
+const { getShardRouter } = require('../src/config/shards');
+const FxRateService = require('../src/services/FxRateService');
+
+async function main() {
+  const [filePath, source] = process.argv.slice(2);
+  if (!filePath) {
+    console.error('Usage: npm run fx:load -- <rates.csv> [source]');
+    process.exit(1);
+  }
+
+  const content = fs.readFileSync(path.resolve(filePath), 'utf8');
+  // Reference data: every shard joins against its own copy
+  const counts = await getShardRouter().eachShard(
+    () => FxRateService.loadRates(content, source || path.basename(filePath))
+  );
+  Object.entries(counts).forEach(([shard, count]) => {
+    console.log(`✅ Loaded ${count} FX rates from ${filePath} into ${shard}`);
+  });
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ FX rate load failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -0,0 +1,40 @@
+#!/usr/bin/env node
+
+// Load daily security prices from a local file into security_prices.
+//
+// Usage: npm run prices:load -- path/to/prices.csv [source]
+//
+// The file has one `date,symbol,price` line per closing price, e.g.
+//   date,symbol,price
+//   2026-10-16,INFY,1862.40
+//   2026-10-16,NIFTYBEES,271.15
+
+const fs = require('fs');
+const path = require('path');
+const db = require('../src/config/database');
+const { getShardRouter } = require('../src/config/shards');
+const PriceService = require('../src/services/PriceService');
+
+async function main() {
+  const [filePath, source] = process.argv.slice(2);
+  if (!filePath) {
+    console.error('Usage: npm run prices:load -- <prices.csv> [source]');
+    process.exit(1);
+  }
+
+  const content = fs.readFileSync(path.resolve(filePath), 'utf8');
+  // Reference data: every shard joins against its own copy
+  const counts = await getShardRouter().eachShard(
+    () => PriceService.loadPrices(content, source || path.basename(filePath))
+  );
+  Object.entries(counts).forEach(([shard, count]) => {
+    console.log(`✅ Loaded ${count} security prices from ${filePath} into ${shard}`);
+  });
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Price load failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
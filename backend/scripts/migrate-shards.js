@@ -0,0 +1,91 @@
+#!/usr/bin/env node
+
+// Run migrations on the primary and on every shard in SHARD_DATABASE_URLS,
+// then register each shard in db_shards so the ring starts placing new users
+// on it.
+//
+// Usage: npm run shards:migrate -- [--weight N]
+//
+// New shards join with weight N (default 100). An existing shard keeps its
+// weight. Set weight = 0 in db_shards to stop placing users on a shard.
+//
+// Serial ids (categories, bank_accounts, ...) are allocated per database. So
+// that a user's rows can move between shards without colliding, shard i's
+// sequences start at i * 10^12. The primary keeps its own range. System
+// categories are copied from the primary to every shard on each run.
+
+const db = require('../src/config/database');
+const { getShardRouter, PRIMARY_SHARD } = require('../src/config/shards');
+
+const SEQUENCE_STRIDE = 1e12;
+
+const offsetSequences = async (pool, floor) => {
+  const { rows } = await pool.raw(`
+    SELECT sequence_schema, sequence_name FROM information_schema.sequences
+    WHERE sequence_schema = current_schema()
+  `);
+  for (const { sequence_name: name } of rows) {
+    const { rows: [{ last_value: lastValue }] } = await pool.raw('SELECT last_value FROM ??', [name]);
+    if (Number(lastValue) < floor) {
+      await pool.raw('SELECT setval(?, ?)', [name, floor]);
+    }
+  }
+  return rows.length;
+};
+
+// System categories are shared by every user, and transactions reference them
+// by id, so each shard needs the primary's rows under the same ids
+const copySystemCategories = async (primary, pool) => {
+  const categories = await primary('categories').where({ is_system: true });
+  if (categories.length === 0) {
+    return 0;
+  }
+  await pool('categories').insert(categories).onConflict('category_id').merge();
+  return categories.length;
+};
+
+async function main() {
+  const args = process.argv.slice(2);
+  const weightIndex = args.indexOf('--weight');
+  const weight = weightIndex >= 0 ? parseInt(args[weightIndex + 1]) : 100;
+  if (Number.isNaN(weight) || weight < 0) {
+    console.error('Usage: npm run shards:migrate -- [--weight N]');
+    process.exit(1);
+  }
+
+  const router = getShardRouter();
+  const names = router.shardNames();
+
+  for (const [index, name] of names.entries()) {
+    const pool = router.pool(name);
+    const [batch, applied] = await pool.migrate.latest();
+    console.log(`✅ ${name}: batch ${batch}, ${applied.length} migration(s) applied`);
+
+    if (name !== PRIMARY_SHARD) {
+      const sequences = await offsetSequences(pool, index * SEQUENCE_STRIDE);
+      console.log(`   ${sequences} sequence(s) start at ${index * SEQUENCE_STRIDE}`);
+      const categories = await copySystemCategories(router.primary, pool);
+      console.log(`   ${categories} system categor${categories === 1 ? 'y' : 'ies'} copied from the primary`);
+    }
+  }
+
+  const inserted = await router.primary('db_shards')
+    .insert(names.map(name => ({ name, weight })))
+    .onConflict('name')
+    .ignore()
+    .returning('name');
+  const rows = await router.primary('db_shards').orderBy('name').select('name', 'weight');
+
+  console.log(`📊 Ring (${inserted.length} new):`);
+  rows.forEach(row => {
+    const status = names.includes(row.name) ? '' : '  ⚠️  not in SHARD_DATABASE_URLS';
+    console.log(`   ${row.name.padEnd(16)} weight ${row.weight}${status}`);
+  });
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Shard migration failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
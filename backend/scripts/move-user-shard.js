@@ -0,0 +1,302 @@
+#!/usr/bin/env node
+
+// Move users' rows between shards.
+//
+// Usage: npm run shards:move -- <user_id> <target_shard>
+//        npm run shards:move -- --rebalance [--limit N] [--batch N] [--dry-run]
+//
+// --rebalance moves every user whose shard differs from the one the ring
+// picks now, e.g. after a shard joins or a weight changes, at most --limit
+// users per run (default 1000).
+//
+// A move is resumable. The user's user_shards row is set to 'moving', so the
+// API answers 503 for them. After the placement cache TTL has passed, each
+// per-user table is copied in keyset batches (ON CONFLICT DO NOTHING) and
+// the source rows are deleted. Only then is the row flipped to the target.
+// If the run dies part-way, re-running it picks up the same target and
+// finishes the move. Clients should do a full sync afterwards, because
+// change_seq watermarks are per database. Pending balance deltas are folded
+// into the accounts under their row locks before anything is copied, so a
+// compaction on either side cannot lose or double-count them.
+
+const db = require('../src/config/database');
+const { getShardRouter, PRIMARY_SHARD } = require('../src/config/shards');
+
+// Copy order respects foreign keys; deletes run in reverse
+const USER_TABLES = [
+  'sync_tombstones',
+  'user_settings',
+  'security_settings',
+  'notification_preferences',
+  'categories',
+  'accounts',
+  'account_balance_deltas',
+  'account_balance_snapshots',
+  'account_snapshot_invalidations',
+  'bank_accounts',
+  'bank_transactions',
+  'transactions',
+  'recurring_transactions',
+  'expenses',
+  'income',
+  'budgets',
+  'goals',
+  'investments',
+  'notifications',
+  'data_exports'
+];
+
+const COPY_BATCH_SIZE = 1000;
+const DELETE_BATCH_SIZE = 5000;
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+const primaryKeyOf = async (pool, table) => {
+  const { rows } = await pool.raw(`
+    SELECT a.attname AS column_name
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = ?::regclass AND i.indisprimary
+    ORDER BY array_position(i.indkey, a.attnum)
+  `, [table]);
+  return rows.map(row => row.column_name);
+};
+
+const hasUserColumn = async (pool, table) => (
+  await pool.schema.hasTable(table) && pool.schema.hasColumn(table, 'user_id')
+);
+
+// Copy one table's rows for the user in primary-key order. Rows already on
+// the target (an earlier, interrupted run) are skipped; a key held by another
+// user there means the id ranges overlap and the move stops.
+const copyTable = async (source, target, table, userId) => {
+  const key = await primaryKeyOf(source, table);
+  if (key.length === 0) {
+    throw new Error(`${table} has no primary key to page by`);
+  }
+
+  let last = null;
+  let copied = 0;
+  for (;;) {
+    const query = source(table).where({ user_id: userId }).orderBy(key).limit(COPY_BATCH_SIZE);
+    if (last) {
+      query.whereRaw(`(${key.map(() => '??').join(', ')}) > (${key.map(() => '?').join(', ')})`, [...key, ...last]);
+    }
+    const rows = await query;
+    if (rows.length === 0) {
+      return copied;
+    }
+
+    const inserted = await target(table).insert(rows).onConflict(key).ignore().returning(key);
+    if (inserted.length < rows.length) {
+      const clashes = await target(table)
+        .whereIn(key, rows.map(row => key.map(column => row[column])))
+        .whereNot({ user_id: userId })
+        .count('* as count')
+        .first();
+      if (Number(clashes.count) > 0) {
+        throw new Error(`${table}: ${clashes.count} key(s) already belong to other users on the target`);
+      }
+    }
+
+    copied += inserted.length;
+    last = key.map(column => rows[rows.length - 1][column]);
+  }
+};
+
+// Same fold as Account.compactBalances, restricted to the user's accounts.
+// API writes are refused while the user is moving, so no new deltas appear
+// for them afterwards and the source ledger stays empty during the copy.
+const foldBalances = async (pool, userId) => pool.transaction(async (trx) => {
+  const accounts = await trx('accounts')
+    .where({ user_id: userId })
+    .orderBy('account_id')
+    .forNoKeyUpdate()
+    .select('account_id');
+  if (accounts.length === 0) {
+    return 0;
+  }
+
+  const result = await trx.raw(`
+    WITH moved AS (
+      DELETE FROM account_balance_deltas
+      WHERE account_id = ANY(?::uuid[])
+      RETURNING account_id, amount
+    ), totals AS (
+      SELECT account_id, SUM(amount) AS amount
+      FROM moved
+      GROUP BY account_id
+    )
+    UPDATE accounts
+    SET current_balance = accounts.current_balance + totals.amount,
+        updated_at = NOW()
+    FROM totals
+    WHERE accounts.account_id = totals.account_id
+  `, [accounts.map(row => row.account_id)]);
+  return result.rowCount;
+});
+
+const deleteTable = async (pool, table, userId) => {
+  let deleted = 0;
+  for (;;) {
+    const count = await pool(table)
+      .whereIn('ctid', pool(table).select('ctid').where({ user_id: userId }).limit(DELETE_BATCH_SIZE))
+      .del();
+    deleted += count;
+    if (count < DELETE_BATCH_SIZE) {
+      return deleted;
+    }
+  }
+};
+
+const placementOf = async (router, userId) => (
+  await router.primary('user_shards').where({ user_id: userId }).first()
+) || { user_id: userId, shard: PRIMARY_SHARD, state: 'active', target_shard: null };
+
+const markMoving = async (router, userId, target) => {
+  const placement = await placementOf(router, userId);
+  if (placement.state === 'moving') {
+    if (placement.target_shard !== target) {
+      throw new Error(`${userId} is already moving to ${placement.target_shard}`);
+    }
+    return false;
+  }
+
+  await router.primary('user_shards')
+    .insert({ user_id: userId, shard: placement.shard, state: 'moving', target_shard: target, updated_at: new Date() })
+    .onConflict('user_id')
+    .merge(['state', 'target_shard', 'updated_at']);
+  return true;
+};
+
+// The user must already be marked moving and every API process must have
+// dropped its cached placement.
+const copyUser = async (router, userId) => {
+  const placement = await placementOf(router, userId);
+  const source = router.pool(placement.shard);
+  const target = router.pool(placement.target_shard);
+  const stats = {};
+
+  if (placement.target_shard !== PRIMARY_SHARD) {
+    await router.replicateUser(userId, placement.target_shard);
+  }
+
+  if (await source.schema.hasTable('account_balance_deltas')) {
+    await foldBalances(source, userId);
+  }
+  for (const table of USER_TABLES) {
+    if (await hasUserColumn(source, table)) {
+      stats[table] = await copyTable(source, target, table, userId);
+    }
+  }
+  for (const table of [...USER_TABLES].reverse()) {
+    if (await hasUserColumn(source, table)) {
+      await deleteTable(source, table, userId);
+    }
+  }
+  if (placement.shard !== PRIMARY_SHARD) {
+    await source('users').where({ user_id: userId }).del();
+  }
+
+  await router.primary('user_shards')
+    .where({ user_id: userId })
+    .update({ shard: placement.target_shard, state: 'active', target_shard: null, updated_at: new Date() });
+  router.forget(userId);
+
+  const rows = Object.values(stats).reduce((sum, count) => sum + count, 0);
+  console.log(`✅ ${userId}: ${placement.shard} → ${placement.target_shard}, ${rows} rows`);
+  return rows;
+};
+
+const moveUsers = async (router, moves) => {
+  let waitNeeded = false;
+  for (const { userId, target } of moves) {
+    waitNeeded = (await markMoving(router, userId, target)) || waitNeeded;
+  }
+  if (waitNeeded) {
+    const waitMs = router.placements.ttlMs + 1000;
+    console.log(`📊 ${moves.length} user(s) marked moving, waiting ${waitMs} ms for cached placements to expire`);
+    await sleep(waitMs);
+  }
+  for (const { userId } of moves) {
+    await copyUser(router, userId);
+  }
+};
+
+// Users (pinned or not) whose current shard differs from the ring's choice
+const findMisplaced = async (router, limit) => {
+  const ring = await router.getRing();
+  const misplaced = [];
+  let after = null;
+
+  while (misplaced.length < limit) {
+    const query = router.primary('users as u')
+      .leftJoin('user_shards as s', 's.user_id', 'u.user_id')
+      .select('u.user_id', 's.shard', 's.state', 's.target_shard')
+      .orderBy('u.user_id')
+      .limit(COPY_BATCH_SIZE);
+    if (after) {
+      query.where('u.user_id', '>', after);
+    }
+    const rows = await query;
+    if (rows.length === 0) {
+      break;
+    }
+
+    rows.forEach(row => {
+      const target = row.state === 'moving' ? row.target_shard : ring.nodeFor(row.user_id);
+      if (row.state === 'moving' || target !== (row.shard || PRIMARY_SHARD)) {
+        misplaced.push({ userId: row.user_id, from: row.shard || PRIMARY_SHARD, target });
+      }
+    });
+    after = rows[rows.length - 1].user_id;
+  }
+  return misplaced.slice(0, limit);
+};
+
+const option = (args, name, fallback) => {
+  const index = args.indexOf(name);
+  return index >= 0 ? parseInt(args[index + 1]) : fallback;
+};
+
+async function main() {
+  const args = process.argv.slice(2);
+  const router = getShardRouter();
+
+  if (args.includes('--rebalance')) {
+    const limit = option(args, '--limit', 1000);
+    const batchSize = option(args, '--batch', 50);
+    const moves = await findMisplaced(router, limit);
+
+    console.log(`📊 ${moves.length} user(s) to move`);
+    if (args.includes('--dry-run')) {
+      moves.forEach(move => console.log(`   ${move.userId}: ${move.from} → ${move.target}`));
+      return;
+    }
+    for (let i = 0; i < moves.length; i += batchSize) {
+      await moveUsers(router, moves.slice(i, i + batchSize));
+    }
+    return;
+  }
+
+  const [userId, target] = args;
+  if (!userId || !target) {
+    console.error('Usage: npm run shards:move -- <user_id> <target_shard> | --rebalance [--limit N] [--batch N] [--dry-run]');
+    process.exit(1);
+  }
+  router.pool(target);
+
+  const placement = await placementOf(router, userId);
+  if (placement.state === 'active' && placement.shard === target) {
+    console.log(`✅ ${userId} is already on ${target}`);
+    return;
+  }
+  await moveUsers(router, [{ userId, target }]);
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Shard move failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -0,0 +1,117 @@
+#!/usr/bin/env node
+
+// Account purge queue status and storage follow-up.
+//
+// Usage: npm run purge:status
+//        npm run purge:status -- --retry-failed
+//        npm run purge:status -- --reindex [table ...]
+//
+// Prints the account_purges queue, then the size and dead-row count of
+// every purged table on each shard, so you can see space being reclaimed.
+// The purge worker vacuums tables it emptied a lot of; that makes the space
+// reusable but does not return it to the filesystem. --reindex rebuilds the
+// indexes of the given tables (default: all purged tables) with REINDEX
+// CONCURRENTLY, which shrinks them without blocking reads or writes.
+// --retry-failed puts failed purges back in the queue.
+
+const db = require('../src/config/database');
+const { directory, getShardRouter } = require('../src/config/shards');
+const AccountPurgeService = require('../src/services/AccountPurgeService');
+
+const PURGED_TABLES = AccountPurgeService.PURGE_TABLES.map(({ table }) => table);
+
+const formatBytes = bytes => `${(Number(bytes) / 1024 / 1024).toFixed(1)} MB`;
+
+const printQueue = async () => {
+  const counts = await directory()('account_purges')
+    .select('status')
+    .count('* as count')
+    .sum('deleted_rows as deleted')
+    .groupBy('status');
+  console.log('📊 Purge queue');
+  if (counts.length === 0) {
+    console.log('   (empty)');
+  }
+  counts.forEach(row => console.log(`   ${row.status}: ${row.count} accounts, ${row.deleted || 0} rows deleted`));
+
+  const active = await directory()('account_purges')
+    .whereIn('status', ['running', 'failed'])
+    .orderBy('requested_at')
+    .limit(20);
+  active.forEach(purge => console.log(
+    `   ${purge.user_id} ${purge.status} at ${purge.current_table || '-'} ` +
+    `(${purge.deleted_rows} rows, attempt ${purge.attempts})${purge.last_error ? `: ${purge.last_error}` : ''}`
+  ));
+};
+
+const printTables = async (shard) => {
+  const { rows } = await db.raw(`
+    SELECT relname AS table_name,
+           pg_table_size(relid) AS table_bytes,
+           pg_indexes_size(relid) AS index_bytes,
+           n_live_tup, n_dead_tup, last_vacuum, last_autovacuum
+    FROM pg_stat_user_tables
+    WHERE relname = ANY(?)
+    ORDER BY pg_total_relation_size(relid) DESC
+  `, [PURGED_TABLES]);
+
+  console.log(`📊 ${shard}`);
+  rows.forEach(row => console.log(
+    `   ${row.table_name}: table ${formatBytes(row.table_bytes)}, indexes ${formatBytes(row.index_bytes)}, ` +
+    `${row.n_live_tup} live / ${row.n_dead_tup} dead rows, ` +
+    `vacuumed ${row.last_vacuum || row.last_autovacuum || 'never'}`
+  ));
+};
+
+const reindex = async (shard, tables) => {
+  for (const table of tables) {
+    if (!(await db.schema.hasTable(table))) {
+      continue;
+    }
+    const before = await db.raw('SELECT pg_indexes_size(?::regclass) AS bytes', [table]);
+    await db.raw('REINDEX TABLE CONCURRENTLY ??', [table]);
+    const after = await db.raw('SELECT pg_indexes_size(?::regclass) AS bytes', [table]);
+    console.log(
+      `✅ ${shard} ${table}: indexes ${formatBytes(before.rows[0].bytes)} → ${formatBytes(after.rows[0].bytes)}`
+    );
+  }
+};
+
+async function main() {
+  const args = process.argv.slice(2);
+  const router = getShardRouter();
+
+  if (args[0] === '--retry-failed') {
+    const retried = await directory()('account_purges')
+      .where({ status: 'failed' })
+      .update({ status: 'pending', attempts: 0, run_after: new Date(), updated_at: new Date() });
+    console.log(`✅ ${retried} failed purge(s) queued again`);
+    return;
+  }
+
+  if (args[0] === '--reindex') {
+    const tables = args.length > 1 ? args.slice(1) : PURGED_TABLES;
+    const unknown = tables.filter(table => !PURGED_TABLES.includes(table));
+    if (unknown.length) {
+      console.error(`Not a purged table: ${unknown.join(', ')}`);
+      process.exit(1);
+    }
+    await router.eachShard(shard => reindex(shard, tables));
+    return;
+  }
+
+  if (args.length) {
+    console.error('Usage: npm run purge:status -- [--retry-failed | --reindex [table ...]]');
+    process.exit(1);
+  }
+
+  await printQueue();
+  await router.eachShard(printTables);
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Purge status failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
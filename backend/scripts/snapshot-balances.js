@@ -0,0 +1,37 @@
+#!/usr/bin/env node
+
+// End-of-day account balance snapshots.
+//
+// Usage: npm run snapshots:eod -- [YYYY-MM-DD]
+//
+// Snapshots every account for the given day (default yesterday). Run it from
+// cron shortly after midnight. It also rebuilds ranges made stale by
+// back-dated transactions and backfills history for accounts that have none.
+// With SHARD_DATABASE_URLS set, it runs on the primary and every shard.
+
+const db = require('../src/config/database');
+const { getShardRouter } = require('../src/config/shards');
+const BalanceHistoryService = require('../src/services/BalanceHistoryService');
+
+async function main() {
+  const [day] = process.argv.slice(2);
+  if (day && !/^\d{4}-\d{2}-\d{2}$/.test(day)) {
+    console.error('Usage: npm run snapshots:eod -- [YYYY-MM-DD]');
+    process.exit(1);
+  }
+
+  await getShardRouter().eachShard(async (shard) => {
+    const stats = await BalanceHistoryService.runEndOfDay(day || undefined);
+    console.log(
+      `✅ ${shard} snapshots for ${stats.day}: ${stats.snapshots} written, ` +
+      `${stats.repaired} repaired, ${stats.backfilled} backfilled`
+    );
+  });
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Balance snapshot run failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -0,0 +1,44 @@
+#!/usr/bin/env node
+
+// Nightly portfolio valuation: mark every holding to market.
+//
+// Usage: npm run portfolios:value
+//
+// When PRICE_FEED_MODULE points at a module exporting
+// `{ name, fetchPrices(symbols) }`, prices for every held symbol are pulled
+// from it first. Otherwise the latest loaded prices are used as they are.
+// With SHARD_DATABASE_URLS set, each shard's holdings are priced and valued
+// on that shard.
+
+const path = require('path');
+const db = require('../src/config/database');
+const { getShardRouter } = require('../src/config/shards');
+const Investment = require('../src/models/Investment');
+const PriceService = require('../src/services/PriceService');
+
+async function main() {
+  if (process.env.PRICE_FEED_MODULE) {
+    PriceService.setFeed(require(path.resolve(process.env.PRICE_FEED_MODULE)));
+  }
+
+  await getShardRouter().eachShard(async (shard) => {
+    const started = Date.now();
+
+    if (process.env.PRICE_FEED_MODULE) {
+      const symbols = await Investment.listHeldSymbols();
+      const count = await PriceService.refreshFromFeed(symbols);
+      console.log(`✅ ${shard}: pulled ${count} prices for ${symbols.length} symbols from the feed`);
+    }
+
+    const { updated, maxId } = await PriceService.valueAllHoldings();
+    const seconds = ((Date.now() - started) / 1000).toFixed(1);
+    console.log(`✅ ${shard}: valued holdings up to id ${maxId}: ${updated} repriced in ${seconds}s`);
+  });
+}
+
+main()
+  .catch(error => {
+    console.error(`❌ Portfolio valuation failed: ${error.message}`);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -1,5 +1,4 @@
 const express = require('express');
-const rateLimit = require('express-rate-limit');
 const authRoutes = require('./routes/authRoutes');
 const transactionRoutes = require('./routes/transactionRoutes');
 const analyticsRoutes = require('./routes/analyticsRoutes');
@@ -12,18 +11,30 @@ const budgetRoutes = require('./routes/budgetRoutes');
 const reportRoutes = require('./routes/reportRoutes');
 const bankRoutes = require('./routes/bankRoutes');
 const investmentRoutes = require('./routes/investmentRoutes');
+const homeRoutes = require('./routes/homeRoutes');
 const notificationRoutes = require('./routes/notificationRoutes');
 const settingsRoutes = require('./routes/settingsRoutes');
+const syncRoutes = require('./routes/syncRoutes');
 const authMiddleware = require('./middleware/authMiddleware');
 const securityHeaders = require('./middleware/securityHeaders');
 const errorHandler = require('./middleware/errorHandler');
 const logger = require('./utils/logger');
 const AuthService = require('./services/AuthService');
+const AccountService = require('./services/AccountService');
 const FeatureFlagsService = require('./services/FeatureFlagsService');
 const DeploymentMetricsService = require('./services/DeploymentMetricsService');
 const featureFlagsMiddleware = require('./middleware/featureFlags');
+const createConditionalRequests = require('./middleware/conditionalGet');
+const createRateLimiter = require('./middleware/rateLimiter');
+const createIdempotency = require('./middleware/idempotency');
+const createMetrics = require('./middleware/metrics');
+const { requestContext, instrumentKnex, timed } = require('./middleware/requestContext');
 const deploymentMetricsRoutes = require('./routes/deploymentMetrics');
+const profilingRoutes = require('./routes/profiling');
+const ProfilingService = require('./services/ProfilingService');
+const requireAdmin = require('./middleware/requireAdmin');
 const db = require('./config/database');
+const { getShardRouter, shardContext, directory } = require('./config/shards');
 require('dotenv').config();
 
 const app = express();
@@ -34,6 +45,7 @@ let deploymentMetricsService = null;
 
 const createInMemoryCacheClient = () => {
   const store = new Map();
+  const expiryTimers = new Map();
 
   return {
     async get(key) {
@@ -41,14 +53,29 @@ const createInMemoryCacheClient = () => {
     },
     async set(key, value, mode, ttlSeconds) {
       store.set(key, value);
+      // A rewrite replaces the previous expiry instead of inheriting it
+      clearTimeout(expiryTimers.get(key));
+      expiryTimers.delete(key);
       if (mode === 'EX' && Number.isFinite(ttlSeconds) && ttlSeconds > 0) {
-        setTimeout(() => store.delete(key), ttlSeconds * 1000).unref?.();
+        const timer = setTimeout(() => {
+          store.delete(key);
+          expiryTimers.delete(key);
+        }, ttlSeconds * 1000);
+        timer.unref?.();
+        expiryTimers.set(key, timer);
       }
       return 'OK';
     },
+    async incr(key) {
+      const next = (Number(store.get(key)) || 0) + 1;
+      store.set(key, String(next));
+      return next;
+    },
     async del(...keys) {
       let deleted = 0;
       keys.flat().forEach((key) => {
+        clearTimeout(expiryTimers.get(key));
+        expiryTimers.delete(key);
         if (store.delete(key)) {
           deleted += 1;
         }
@@ -91,7 +118,7 @@ const initializeDeploymentServices = async (db, redis) => {
 (() => {
   try {
     const cacheClient = createInMemoryCacheClient();
-    featureFlagsService = new FeatureFlagsService(db, cacheClient);
+    featureFlagsService = new FeatureFlagsService(directory(), cacheClient);
     deploymentMetricsService = new DeploymentMetricsService(cacheClient, featureFlagsService);
     logger.info('Feature Flags and Deployment Metrics services initialized (in-memory cache)');
   } catch (error) {
@@ -103,78 +130,111 @@ const initializeDeploymentServices = async (db, redis) => {
 
 app.set('deploymentServices', { featureFlagsService, deploymentMetricsService });
 
+// Per-user resource versions backing ETag / If-None-Match on list and settings
+// endpoints (Redis, in-memory fallback)
+const conditionalRequests = createConditionalRequests(createInMemoryCacheClient());
+
+// Idempotency-Key replay for record-creating POSTs (Redis, in-memory fallback)
+const idempotency = createIdempotency({ fallbackClient: createInMemoryCacheClient() });
+
+// Prometheus metrics (GET /metrics); METRICS_TOKEN is a bearer token, required in production
+const metrics = createMetrics({ db });
+
+// Request Logging: one line per request with auth / DB / serialization timings
+// One listener per pool: with SHARD_DATABASE_URLS set, db routes to several
+getShardRouter().pools.forEach(pool => instrumentKnex(pool, { onQuery: metrics.recordQuery }));
+app.use(requestContext);
+app.use(metrics.middleware);
+
 // Security Middleware
 app.disable('x-powered-by');
 app.set('trust proxy', 1);
 app.use(securityHeaders);
 
-// Rate Limiting (skip in tests)
+// Rate Limiting (skip in tests). Budgets live in Redis when it is available so
+// they hold across replicas; otherwise each process keeps its own.
+const rateLimitFallbackClient = createInMemoryCacheClient();
+
 const limiter = process.env.NODE_ENV === 'test'
   ? (req, res, next) => next()
-  : rateLimit({
+  : createRateLimiter({
+      name: 'ip',
       windowMs: 15 * 60 * 1000, // 15 minutes
-      max: 100, // limit each IP to 100 requests per windowMs
-      skip: (req) => req.path === '/health' || req.path === '/healthz',
-      message: 'Too many requests from this IP, please try again later.'
+      limit: Number(process.env.RATE_LIMIT_IP_MAX) || 100, // requests per IP per windowMs
+      skip: (req) => req.path === '/health' || req.path === '/healthz' || req.path === '/metrics',
+      message: 'Too many requests from this IP, please try again later.',
+      fallbackClient: rateLimitFallbackClient
     });
 
 const authLimiter = process.env.NODE_ENV === 'test'
   ? (req, res, next) => next()
-  : rateLimit({
+  : createRateLimiter({
+      name: 'auth',
       windowMs: 15 * 60 * 1000,
-      max: 5, // 5 login attempts per 15 minutes
+      limit: 5, // 5 login attempts per 15 minutes
       skipSuccessfulRequests: true,
-      message: 'Too many login attempts, please try again later.'
+      message: 'Too many login attempts, please try again later.',
+      fallbackClient: rateLimitFallbackClient
     });
 
+// Per-user budget, applied after authentication so users behind a shared IP
+// (carrier NAT, offices) are limited individually as well
+const userLimiter = process.env.NODE_ENV === 'test'
+  ? (req, res, next) => next()
+  : createRateLimiter({
+      name: 'user',
+      windowMs: 15 * 60 * 1000,
+      limit: Number(process.env.RATE_LIMIT_USER_MAX) || 100,
+      keyGenerator: (req) => req.user && req.user.userId,
+      message: 'Too many requests, please try again later.',
+      fallbackClient: rateLimitFallbackClient
+    });
+
+// shardContext binds the user's shard (SHARD_DATABASE_URLS) for the rest of the request
+const authenticated = [timed('authMs', authMiddleware), userLimiter, shardContext];
+
 app.use(limiter);
 
 // Body Parser Middleware
 app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ limit: '10mb', extended: true }));
 
-// Request Logging Middleware
-app.use((req, res, next) => {
-  logger.info({
-    method: req.method,
-    path: req.path,
-    timestamp: new Date().toISOString()
-  });
-  next();
-});
-
 // Routes
 app.use('/api/v1/auth', authLimiter, authRoutes);
-app.use('/api/v1/transactions', authMiddleware, transactionRoutes);
-app.use('/api/v1/analytics', authMiddleware, analyticsRoutes);
-app.use('/api/v1/accounts', authMiddleware, accountRoutes);
-app.use('/api/v1/categories', authMiddleware, categoryRoutes);
-app.use('/api/v1/users', authMiddleware, userRoutes);
-app.use('/api/v1/expenses', authMiddleware, expenseRoutes);
-app.use('/api/v1/income', authMiddleware, incomeRoutes);
-app.use('/api/v1/budgets', authMiddleware, budgetRoutes);
-app.use('/api/v1/reports', authMiddleware, reportRoutes);
-app.use('/api/v1/banks', authMiddleware, bankRoutes);
-app.use('/api/v1/investments', authMiddleware, investmentRoutes);
-app.use('/api/v1/notifications', authMiddleware, notificationRoutes);
-app.use('/api/v1/settings', authMiddleware, settingsRoutes);
+app.use('/api/v1/transactions', authenticated, idempotency, conditionalRequests.invalidates('accounts'), transactionRoutes);
+app.use('/api/v1/analytics', authenticated, analyticsRoutes);
+app.use('/api/v1/accounts', authenticated, conditionalRequests.track('accounts'), accountRoutes);
+app.use('/api/v1/categories', authenticated, conditionalRequests.track('categories'), categoryRoutes);
+app.use('/api/v1/users', authenticated, userRoutes);
+app.use('/api/v1/expenses', authenticated, idempotency, conditionalRequests.invalidates('accounts'), expenseRoutes);
+app.use('/api/v1/income', authenticated, idempotency, conditionalRequests.invalidates('accounts'), incomeRoutes);
+app.use('/api/v1/budgets', authenticated, budgetRoutes);
+app.use('/api/v1/reports', authenticated, reportRoutes);
+app.use('/api/v1/banks', authenticated, conditionalRequests.invalidates('accounts'), bankRoutes);
+app.use('/api/v1/investments', authenticated, investmentRoutes);
+app.use('/api/v1/notifications', authenticated, conditionalRequests.track('notification-preferences', { paths: ['/preferences'] }), notificationRoutes);
+app.use('/api/v1/settings', authenticated, conditionalRequests.track('settings', { paths: ['/', '/security'] }), settingsRoutes);
+app.use('/api/v1/sync', authenticated, syncRoutes);
+app.use('/api/v1/home', authenticated, homeRoutes);
 
 // Backward-compatible /api routes
 app.use('/api/auth', authLimiter, authRoutes);
-app.use('/api/transactions', authMiddleware, transactionRoutes);
-app.use('/api/analytics', authMiddleware, analyticsRoutes);
-app.use('/api/accounts', authMiddleware, accountRoutes);
-app.use('/api/categories', authMiddleware, categoryRoutes);
-app.use('/api/users', authMiddleware, userRoutes);
-app.use('/api/user', authMiddleware, userRoutes);
-app.use('/api/expenses', authMiddleware, expenseRoutes);
-app.use('/api/income', authMiddleware, incomeRoutes);
-app.use('/api/budgets', authMiddleware, budgetRoutes);
-app.use('/api/reports', authMiddleware, reportRoutes);
-app.use('/api/banks', authMiddleware, bankRoutes);
-app.use('/api/investments', authMiddleware, investmentRoutes);
-app.use('/api/notifications', authMiddleware, notificationRoutes);
-app.use('/api/settings', authMiddleware, settingsRoutes);
+app.use('/api/transactions', authenticated, idempotency, conditionalRequests.invalidates('accounts'), transactionRoutes);
+app.use('/api/analytics', authenticated, analyticsRoutes);
+app.use('/api/accounts', authenticated, conditionalRequests.track('accounts'), accountRoutes);
+app.use('/api/categories', authenticated, conditionalRequests.track('categories'), categoryRoutes);
+app.use('/api/users', authenticated, userRoutes);
+app.use('/api/user', authenticated, userRoutes);
+app.use('/api/expenses', authenticated, idempotency, conditionalRequests.invalidates('accounts'), expenseRoutes);
+app.use('/api/income', authenticated, idempotency, conditionalRequests.invalidates('accounts'), incomeRoutes);
+app.use('/api/budgets', authenticated, budgetRoutes);
+app.use('/api/reports', authenticated, reportRoutes);
+app.use('/api/banks', authenticated, conditionalRequests.invalidates('accounts'), bankRoutes);
+app.use('/api/investments', authenticated, investmentRoutes);
+app.use('/api/notifications', authenticated, conditionalRequests.track('notification-preferences', { paths: ['/preferences'] }), notificationRoutes);
+app.use('/api/settings', authenticated, conditionalRequests.track('settings', { paths: ['/', '/security'] }), settingsRoutes);
+app.use('/api/sync', authenticated, syncRoutes);
+app.use('/api/home', authenticated, homeRoutes);
 
 // Feature Flags and Metrics Middleware (if services initialized)
 if (featureFlagsService && deploymentMetricsService) {
@@ -184,6 +244,15 @@ if (featureFlagsService && deploymentMetricsService) {
   app.use('/api/admin/deployment', authMiddleware, deploymentMetricsRoutes(featureFlagsService, deploymentMetricsService));
 }
 
+// Admin CPU profiles / heap snapshots (users listed in ADMIN_USER_IDS)
+const profilingService = new ProfilingService();
+if (process.env.PROFILE_CONTINUOUS_SAMPLING === 'true') {
+  profilingService.startSampling({ windowMinutes: parseInt(process.env.PROFILE_SAMPLING_WINDOW_MINUTES) || undefined });
+}
+app.use('/api/admin/profiling', authenticated, requireAdmin, profilingRoutes(profilingService));
+
+app.get('/metrics', metrics.handler);
+
 app.get('/healthz', (req, res) => {
   res.json({ status: 'OK' });
 });
@@ -210,6 +279,9 @@ app.get('/health', async (req, res) => {
       health.featureFlags = featureFlagsService.getMetrics();
     }
 
+    health.conditionalRequests = conditionalRequests.getMetrics();
+    health.logging = logger.getMetrics();
+
     res.json(health);
   } catch (error) {
     logger.error('Health check error:', error);
@@ -323,5 +395,33 @@ if (shouldRunCleanup) {
   setInterval(runRevokedTokenCleanup, revokedTokenCleanupIntervalMs);
 }
 
+// Fold account balance ledger deltas into accounts.current_balance
+const balanceCompactionIntervalMs = parseInt(process.env.BALANCE_COMPACTION_INTERVAL_MS) || 60 * 1000;
+
+let balanceCompactionRunning = false;
+
+const runBalanceCompaction = async () => {
+  if (balanceCompactionRunning) {
+    return;
+  }
+  balanceCompactionRunning = true;
+  try {
+    // Every shard keeps its own ledger
+    const perShard = await getShardRouter().eachShard(() => AccountService.compactBalances());
+    const compacted = Object.values(perShard).reduce((sum, count) => sum + count, 0);
+    if (compacted > 0) {
+      logger.debug(`Compacted balance ledger for ${compacted} accounts`);
+    }
+  } catch (error) {
+    logger.error('Balance ledger compaction failed:', error.message);
+  } finally {
+    balanceCompactionRunning = false;
+  }
+};
+
+if (process.env.NODE_ENV !== 'test' && process.env.DISABLE_BALANCE_COMPACTION !== 'true') {
+  setInterval(runBalanceCompaction, balanceCompactionIntervalMs).unref();
+}
+
 module.exports = app;
 module.exports.initializeDeploymentServices = initializeDeploymentServices;
@@ -1,4 +1,5 @@
 const knex = require('knex');
+const shards = require('./shards');
 require('dotenv').config();
 
 function inferSslFromDatabaseUrl(databaseUrl) {
@@ -75,4 +76,5 @@ const config = {
   seeds: { directory: './seeds' }
 };
 
-module.exports = knex(config);
+// With SHARD_DATABASE_URLS set this is a handle routed per user (see shards.js)
+module.exports = shards.configure(knex(config), config);
@@ -0,0 +1,51 @@
+const { createClient } = require('redis');
+const logger = require('../utils/logger');
+require('dotenv').config();
+
+let sharedClient = null;
+
+function isRedisConfigured() {
+  return Boolean(process.env.REDIS_URL) && process.env.NODE_ENV !== 'test';
+}
+
+function createRedisClient() {
+  const client = createClient({
+    url: process.env.REDIS_URL,
+    socket: {
+      connectTimeout: 5000,
+      reconnectStrategy: retries => Math.min(retries * 200, 5000)
+    }
+  });
+
+  client.on('error', error => {
+    logger.error('Redis client error:', error.message);
+  });
+
+  return client;
+}
+
+/**
+ * Shared Redis connection for request handlers. Connects on first use and
+ * returns null until it is ready (or when REDIS_URL is not set), so callers
+ * never block a request on Redis and can fall back to in-process behaviour.
+ */
+function getRedisClient() {
+  if (!isRedisConfigured()) {
+    return null;
+  }
+
+  if (!sharedClient) {
+    sharedClient = createRedisClient();
+    sharedClient.connect().catch(error => {
+      logger.error('Redis connection failed:', error.message);
+    });
+  }
+
+  return sharedClient.isReady ? sharedClient : null;
+}
+
+module.exports = {
+  isRedisConfigured,
+  createRedisClient,
+  getRedisClient
+};
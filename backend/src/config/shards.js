@@ -0,0 +1,345 @@
+/**
+ * Hash-sharded Postgres routing by user_id.
+ *
+ * The primary database (DATABASE_URL) is also the directory. It holds users,
+ * auth and feature-flag tables, plus the shard map:
+ *   - db_shards:   the shards in the consistent-hash ring and their weights
+ *   - user_shards: where each user's data lives (and whether it is moving)
+ * Per-user tables (accounts, transactions, budgets, ...) live on the user's
+ * shard. Every shard carries the full schema, a replica of the users rows it
+ * needs for foreign keys, and the reference tables (fx_rates, security_prices).
+ *
+ * The ring only places new users and picks rebalance targets. After that,
+ * user_shards is authoritative, so adding a shard never silently relocates
+ * anyone. Users with no row (created before sharding) are on the primary.
+ * scripts/move-user-shard.js moves users between shards.
+ *
+ * Models keep calling `db(...)`. With SHARD_DATABASE_URLS set, the exported
+ * knex handle resolves to the shard bound to the current async context. The
+ * shardContext middleware binds the signed-in user's shard for a request,
+ * and runForUser / eachShard do the same for jobs and scripts. Outside a
+ * context it is the primary. Directory tables must use directory() so they
+ * never follow a request onto a shard.
+ *
+ * Without SHARD_DATABASE_URLS nothing is proxied and every call resolves to
+ * the primary.
+ */
+
+const crypto = require('crypto');
+const { AsyncLocalStorage } = require('async_hooks');
+const knex = require('knex');
+const LruCache = require('../utils/lruCache');
+const logger = require('../utils/logger');
+
+const PRIMARY_SHARD = 'primary';
+const VNODES_PER_WEIGHT = 4;
+const RING_REFRESH_MS = 60 * 1000;
+const PLACEMENT_CACHE_SIZE = 100000;
+const PLACEMENT_CACHE_TTL_MS = Number(process.env.SHARD_PLACEMENT_CACHE_TTL_MS) || 30 * 1000;
+
+const hash32 = key => crypto.createHash('md5').update(key).digest().readUInt32BE(0);
+
+class HashRing {
+  /**
+   * `shards` is [{ name, weight }]; each shard gets weight * VNODES_PER_WEIGHT
+   * points on the ring, so a shard with weight 0 receives no new users.
+   */
+  constructor(shards, vnodesPerWeight = VNODES_PER_WEIGHT) {
+    this.points = [];
+    shards.forEach(({ name, weight }) => {
+      for (let i = 0; i < weight * vnodesPerWeight; i++) {
+        this.points.push({ hash: hash32(`${name}#${i}`), name });
+      }
+    });
+    this.points.sort((a, b) => a.hash - b.hash || (a.name < b.name ? -1 : 1));
+  }
+
+  nodeFor(key) {
+    if (this.points.length === 0) {
+      return PRIMARY_SHARD;
+    }
+
+    const hash = hash32(key);
+    let low = 0;
+    let high = this.points.length;
+    while (low < high) {
+      const mid = (low + high) >>> 1;
+      if (this.points[mid].hash < hash) {
+        low = mid + 1;
+      } else {
+        high = mid;
+      }
+    }
+    return this.points[low % this.points.length].name;
+  }
+}
+
+const movingError = userId => {
+  const error = new Error(`User ${userId} is being moved between shards`);
+  error.statusCode = 503;
+  return error;
+};
+
+class ShardRouter {
+  constructor({ primary, shards = {}, placementCacheTtlMs = PLACEMENT_CACHE_TTL_MS }) {
+    this.primary = primary;
+    this.pools = new Map([[PRIMARY_SHARD, primary], ...Object.entries(shards)]);
+    this.storage = new AsyncLocalStorage();
+    this.placements = new LruCache({ maxSize: PLACEMENT_CACHE_SIZE, ttlMs: placementCacheTtlMs });
+    this.ring = null;
+    this.ringLoadedAt = 0;
+  }
+
+  get enabled() {
+    return this.pools.size > 1;
+  }
+
+  shardNames() {
+    return [...this.pools.keys()];
+  }
+
+  pool(name) {
+    const pool = this.pools.get(name);
+    if (!pool) {
+      throw new Error(`Unknown shard: ${name}`);
+    }
+    return pool;
+  }
+
+  /** The knex instance bound to the current context, else the primary. */
+  current() {
+    return this.storage.getStore() || this.primary;
+  }
+
+  async getRing() {
+    if (!this.ring || Date.now() - this.ringLoadedAt > RING_REFRESH_MS) {
+      const rows = await this.primary('db_shards').select('name', 'weight');
+      const known = rows.filter(row => this.pools.has(row.name));
+      rows.filter(row => !this.pools.has(row.name)).forEach(row => {
+        logger.warn(`Shard ${row.name} is in db_shards but has no connection configured`);
+      });
+      this.ring = new HashRing(known.length > 0 ? known : [{ name: PRIMARY_SHARD, weight: 1 }]);
+      this.ringLoadedAt = Date.now();
+    }
+    return this.ring;
+  }
+
+  async placementFor(userId) {
+    const cached = this.placements.get(userId);
+    if (cached) {
+      return cached;
+    }
+
+    const row = await this.primary('user_shards').where({ user_id: userId }).first('shard', 'state');
+    const placement = row || { shard: PRIMARY_SHARD, state: 'active' };
+    this.placements.set(userId, placement);
+    return placement;
+  }
+
+  /** Shard name holding `userId`'s data; throws 503 while the user is moving. */
+  async shardFor(userId) {
+    if (!this.enabled) {
+      return PRIMARY_SHARD;
+    }
+    const placement = await this.placementFor(userId);
+    if (placement.state === 'moving') {
+      throw movingError(userId);
+    }
+    return placement.shard;
+  }
+
+  async forUser(userId) {
+    return this.pool(await this.shardFor(userId));
+  }
+
+  /**
+   * Place a new user on the ring's shard for them: replicate the users row
+   * there (per-user tables reference it) and record the placement.
+   */
+  async assign(userId) {
+    if (!this.enabled) {
+      return PRIMARY_SHARD;
+    }
+
+    const shard = (await this.getRing()).nodeFor(userId);
+    if (shard !== PRIMARY_SHARD) {
+      await this.replicateUser(userId, shard);
+    }
+    await this.primary('user_shards')
+      .insert({ user_id: userId, shard, state: 'active', updated_at: new Date() })
+      .onConflict('user_id')
+      .ignore();
+    this.placements.delete(userId);
+    return shard;
+  }
+
+  async replicateUser(userId, shard) {
+    const user = await this.primary('users').where({ user_id: userId }).first();
+    if (user) {
+      await this.pool(shard)('users').insert(user).onConflict('user_id').merge();
+    }
+  }
+
+  forget(userId) {
+    this.placements.delete(userId);
+  }
+
+  run(pool, fn) {
+    return this.storage.run(pool, fn);
+  }
+
+  async runForUser(userId, fn) {
+    if (!this.enabled) {
+      return fn();
+    }
+    const pool = await this.forUser(userId);
+    return this.run(pool, fn);
+  }
+
+  /** Run `fn(name)` once per shard, each inside that shard's context. */
+  async eachShard(fn) {
+    const results = {};
+    for (const [name, pool] of this.pools) {
+      results[name] = await this.run(pool, () => fn(name));
+    }
+    return results;
+  }
+
+  /** Express handler: bind the signed-in user's shard for the request. */
+  async bindRequest(req, res, next) {
+    if (!this.enabled || !req.user || !req.user.userId) {
+      return next();
+    }
+
+    let pool;
+    try {
+      pool = await this.forUser(req.user.userId);
+    } catch (error) {
+      if (error.statusCode === 503) {
+        res.set('Retry-After', '5');
+        return res.status(503).json({ error: 'Account maintenance in progress, please retry shortly' });
+      }
+      return next(error);
+    }
+    return this.run(pool, next);
+  }
+
+  async destroy() {
+    await Promise.all([...this.pools.values()].map(pool => pool.destroy()));
+  }
+}
+
+/**
+ * SHARD_DATABASE_URLS="shard1=postgres://...,shard2=postgres://..." adds
+ * shards next to the primary; each gets a pool with the primary's settings.
+ */
+const parseShardUrls = (value) => {
+  if (!value) {
+    return {};
+  }
+  return Object.fromEntries(value.split(',').map(entry => entry.trim()).filter(Boolean).map(entry => {
+    const separator = entry.indexOf('=');
+    if (separator <= 0) {
+      throw new Error(`Invalid SHARD_DATABASE_URLS entry: ${entry}`);
+    }
+    return [entry.slice(0, separator).trim(), entry.slice(separator + 1).trim()];
+  }));
+};
+
+let router = null;
+
+/**
+ * Build the router around the primary knex instance and return the handle
+ * models should use: the primary itself when sharding is off, otherwise a
+ * proxy resolving to the shard of the current context.
+ */
+const configure = (primary, config) => {
+  const shards = {};
+  Object.entries(parseShardUrls(process.env.SHARD_DATABASE_URLS)).forEach(([name, url]) => {
+    shards[name] = knex({
+      ...config,
+      connection: { ...(typeof config.connection === 'object' ? config.connection : {}), connectionString: url }
+    });
+  });
+  router = new ShardRouter({ primary, shards });
+
+  if (!router.enabled) {
+    return primary;
+  }
+
+  return new Proxy(primary, {
+    apply: (target, thisArg, args) => router.current()(...args),
+    get: (target, prop) => {
+      if (prop === 'destroy') {
+        return () => router.destroy();
+      }
+      const instance = router.current();
+      const value = instance[prop];
+      return typeof value === 'function' ? value.bind(instance) : value;
+    }
+  });
+};
+
+const getShardRouter = () => {
+  if (!router) {
+    require('./database');
+  }
+  return router;
+};
+
+/** Place a newly created user on a shard; a no-op without sharding. */
+const assignShard = async (userId) => {
+  const current = getShardRouter();
+  return current ? current.assign(userId) : PRIMARY_SHARD;
+};
+
+/** Run `fn` with `userId`'s shard bound, for work outside a request. */
+const runForUser = async (userId, fn) => {
+  const current = getShardRouter();
+  return current ? current.runForUser(userId, fn) : fn();
+};
+
+/**
+ * Copy `userId`'s users row from the primary to their shard after it
+ * changed, so shard-side SQL joining users (base currency) sees the change.
+ * A no-op without sharding or for users on the primary.
+ */
+const refreshUserReplica = async (userId) => {
+  const current = getShardRouter();
+  if (!current || !current.enabled) {
+    return;
+  }
+  const shard = await current.shardFor(userId);
+  if (shard !== PRIMARY_SHARD) {
+    await current.replicateUser(userId, shard);
+  }
+};
+
+/** Express middleware binding the signed-in user's shard for the request. */
+const shardContext = (req, res, next) => {
+  const current = getShardRouter();
+  return current ? current.bindRequest(req, res, next) : next();
+};
+
+/**
+ * Knex handle for directory tables (users, auth, feature flags), never
+ * routed to a shard.
+ */
+const directory = () => {
+  const db = require('./database');
+  return router ? router.primary : db;
+};
+
+module.exports = {
+  PRIMARY_SHARD,
+  HashRing,
+  ShardRouter,
+  parseShardUrls,
+  configure,
+  getShardRouter,
+  assignShard,
+  runForUser,
+  refreshUserReplica,
+  shardContext,
+  directory
+};
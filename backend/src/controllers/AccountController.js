@@ -1,4 +1,5 @@
 const AccountService = require('../services/AccountService');
+const BalanceHistoryService = require('../services/BalanceHistoryService');
 const { asyncHandler, logger } = require('../utils/validators');
 
 const listAccounts = asyncHandler(async (req, res) => {
@@ -21,9 +22,37 @@ const deleteAccount = asyncHandler(async (req, res) => {
   res.json({ success: true });
 });
 
+const sendRangeError = (res, error) => {
+  if (error.statusCode !== 400) throw error;
+  res.status(400).json({ success: false, error: error.message });
+};
+
+const getBalanceHistory = asyncHandler(async (req, res) => {
+  let history;
+  try {
+    history = await BalanceHistoryService.getBalanceHistory(req.user.userId, req.params.accountId, req.query);
+  } catch (error) {
+    return sendRangeError(res, error);
+  }
+  if (!history) {
+    return res.status(404).json({ success: false, error: 'Account not found' });
+  }
+  res.json(history);
+});
+
+const getNetWorth = asyncHandler(async (req, res) => {
+  try {
+    res.json(await BalanceHistoryService.getNetWorthTimeline(req.user.userId, req.query));
+  } catch (error) {
+    sendRangeError(res, error);
+  }
+});
+
 module.exports = {
   listAccounts,
   createAccount,
   updateAccount,
-  deleteAccount
+  deleteAccount,
+  getBalanceHistory,
+  getNetWorth
 };
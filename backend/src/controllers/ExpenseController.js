@@ -1,5 +1,6 @@
 const ExpenseService = require('../services/ExpenseService');
 const asyncHandler = require('../middleware/asyncHandler');
+const { sendExport } = require('../utils/exportStream');
 
 const ExpenseController = {
   // POST /api/v1/expenses - Create expense
@@ -36,6 +37,7 @@ const ExpenseController = {
       minAmount,
       maxAmount,
       tags,
+      count,
       limit = 20,
       offset = 0
     } = req.query;
@@ -49,6 +51,7 @@ const ExpenseController = {
       minAmount: minAmount ? parseFloat(minAmount) : undefined,
       maxAmount: maxAmount ? parseFloat(maxAmount) : undefined,
       tags: tags ? (Array.isArray(tags) ? tags : [tags]) : undefined,
+      count,
       limit: parseInt(limit),
       offset: parseInt(offset)
     };
@@ -129,20 +132,22 @@ const ExpenseController = {
 
   // GET /api/v1/expenses/export - Export expenses
   exportExpenses: asyncHandler(async (req, res) => {
-    const { format = 'csv', startDate, endDate, categoryId, merchantId } = req.query;
+    const { format = 'csv', gzip, startDate, endDate, accountId, categoryId, merchant } = req.query;
 
     const filters = {
       startDate: startDate ? new Date(startDate) : null,
       endDate: endDate ? new Date(endDate) : null,
+      accountId,
       categoryId,
-      merchantId
+      merchant
     };
 
-    const csvData = await ExpenseService.exportExpenses(req.user.user_id, format, filters);
-
-    res.setHeader('Content-Type', 'text/csv');
-    res.setHeader('Content-Disposition', 'attachment; filename="expenses.csv"');
-    res.send(csvData);
+    await sendExport(res, ExpenseService.exportExpenses(req.user.user_id, filters), {
+      fields: ExpenseService.exportFields,
+      filename: 'expenses',
+      format,
+      gzip: gzip === 'true'
+    });
   }),
 
   // GET /api/v1/expenses/filter - Filter expenses
@@ -156,6 +161,7 @@ const ExpenseController = {
       minAmount,
       maxAmount,
       tags,
+      count,
       limit = 20,
       offset = 0
     } = req.query;
@@ -169,6 +175,7 @@ const ExpenseController = {
       minAmount: minAmount ? parseFloat(minAmount) : undefined,
       maxAmount: maxAmount ? parseFloat(maxAmount) : undefined,
       tags: tags ? (Array.isArray(tags) ? tags : [tags]) : undefined,
+      count,
       limit: parseInt(limit),
       offset: parseInt(offset)
     };
@@ -0,0 +1,14 @@
+const HomeService = require('../services/HomeService');
+const { asyncHandler } = require('../utils/validators');
+
+const getHome = asyncHandler(async (req, res) => {
+  const home = await HomeService.getHome(req.user.userId, {
+    period: req.query.period,
+    recentLimit: req.query.recentLimit
+  });
+  res.json(home);
+});
+
+module.exports = {
+  getHome
+};
@@ -1,5 +1,6 @@
 const IncomeService = require('../services/IncomeService');
 const asyncHandler = require('../middleware/asyncHandler');
+const { sendExport } = require('../utils/exportStream');
 
 const IncomeController = {
   createIncome: asyncHandler(async (req, res) => {
@@ -108,6 +109,26 @@ const IncomeController = {
       success: true,
       data: statistics
     });
+  }),
+
+  // GET /api/v1/income/export - Export income
+  exportIncome: asyncHandler(async (req, res) => {
+    const { format = 'csv', gzip, startDate, endDate, accountId, categoryId, source } = req.query;
+
+    const filters = {
+      startDate: startDate ? new Date(startDate) : null,
+      endDate: endDate ? new Date(endDate) : null,
+      accountId,
+      categoryId,
+      source
+    };
+
+    await sendExport(res, IncomeService.exportIncome(req.user.user_id, filters), {
+      fields: IncomeService.exportFields,
+      filename: 'income',
+      format,
+      gzip: gzip === 'true'
+    });
   })
 };
 
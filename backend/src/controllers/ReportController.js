@@ -1,6 +1,52 @@
 const ReportService = require('../services/ReportService');
+const ReportJobQueue = require('../services/ReportJobQueue');
 const asyncHandler = require('../utils/asyncHandler');
 
+// Heavy reports: clients sending `Prefer: respond-async` get the cached
+// result, or a 202 with a job id to poll instead of waiting on the
+// aggregation. Everyone else (and every client when Redis is down) gets the
+// report computed inline as before. `normalize` runs the service's argument
+// checks first, so invalid parameters get a 400 on both paths instead of a
+// queued job that can only fail. It returns the parsed parameters, which key
+// the job, so spellings of the same report (months omitted, 12 or 012) share
+// one job.
+const sendHeavyReport = async (req, res, report, normalize, compute, message) => {
+  let params;
+  try {
+    params = normalize();
+  } catch (error) {
+    if (error.statusCode !== 400) {
+      throw error;
+    }
+    return res.status(400).json({ success: false, error: error.message });
+  }
+
+  const queue = ReportJobQueue.fromSharedClient();
+  if (!queue || !/\brespond-async\b/i.test(req.get('Prefer') || '')) {
+    const data = await compute();
+    return res.status(200).json({ success: true, message, data });
+  }
+
+  const job = await queue.enqueue(req.user.id, report, params);
+  res.set('Preference-Applied', 'respond-async');
+
+  if (job.status === 'completed') {
+    return res.status(200).json({ success: true, message, data: job.result });
+  }
+
+  const statusUrl = `${req.baseUrl}/jobs/${job.jobId}`;
+  res.set('Location', statusUrl);
+  return res.status(202).json({
+    success: true,
+    message: 'Report is being generated',
+    data: {
+      jobId: job.jobId,
+      status: job.status,
+      statusUrl
+    }
+  });
+};
+
 const getDashboard = asyncHandler(async (req, res) => {
   const { period } = req.query;
   const data = await ReportService.getDashboard(req.user.id, period);
@@ -14,13 +60,12 @@ const getDashboard = asyncHandler(async (req, res) => {
 
 const getTrends = asyncHandler(async (req, res) => {
   const { months } = req.query;
-  const data = await ReportService.getTrends(req.user.id, months);
-
-  res.status(200).json({
-    success: true,
-    message: 'Trends data retrieved successfully',
-    data
-  });
+  await sendHeavyReport(
+    req, res, 'trends',
+    () => ({ months: ReportService.parseMonths(months) }),
+    () => ReportService.getTrends(req.user.id, months),
+    'Trends data retrieved successfully'
+  );
 });
 
 const getCategorySpending = asyncHandler(async (req, res) => {
@@ -47,13 +92,12 @@ const getMonthlyReport = asyncHandler(async (req, res) => {
 
 const getAnnualReport = asyncHandler(async (req, res) => {
   const { year } = req.query;
-  const data = await ReportService.getAnnualReport(req.user.id, year);
-
-  res.status(200).json({
-    success: true,
-    message: 'Annual report retrieved successfully',
-    data
-  });
+  await sendHeavyReport(
+    req, res, 'annual',
+    () => ({ year: ReportService.parseYear(year) }),
+    () => ReportService.getAnnualReport(req.user.id, year),
+    'Annual report retrieved successfully'
+  );
 });
 
 const getGoalsProgress = asyncHandler(async (req, res) => {
@@ -79,11 +123,46 @@ const getIncomeVsExpense = asyncHandler(async (req, res) => {
 
 const getComparison = asyncHandler(async (req, res) => {
   const { startDate1, endDate1, startDate2, endDate2 } = req.query;
-  const data = await ReportService.getComparison(req.user.id, startDate1, endDate1, startDate2, endDate2);
+  await sendHeavyReport(
+    req, res, 'comparison',
+    () => {
+      const dates = ReportService.parseComparisonDates(startDate1, endDate1, startDate2, endDate2)
+        .map(date => date.toISOString());
+      return { startDate1: dates[0], endDate1: dates[1], startDate2: dates[2], endDate2: dates[3] };
+    },
+    () => ReportService.getComparison(req.user.id, startDate1, endDate1, startDate2, endDate2),
+    'Period comparison retrieved successfully'
+  );
+});
 
-  res.status(200).json({
+const getReportJob = asyncHandler(async (req, res) => {
+  const queue = ReportJobQueue.fromSharedClient();
+  const job = queue ? await queue.getJobForUser(req.params.jobId, req.user.id) : null;
+
+  if (!job) {
+    return res.status(404).json({
+      success: false,
+      error: 'Report job not found'
+    });
+  }
+
+  const data = {
+    jobId: job.jobId,
+    report: job.report,
+    status: job.status,
+    createdAt: job.createdAt,
+    completedAt: job.completedAt || null
+  };
+
+  if (job.status === 'completed') {
+    data.result = job.result;
+  } else if (job.status === 'failed') {
+    data.error = job.error;
+  }
+
+  res.status(job.status === 'queued' || job.status === 'processing' ? 202 : 200).json({
     success: true,
-    message: 'Period comparison retrieved successfully',
+    message: `Report job ${job.status}`,
     data
   });
 });
@@ -96,5 +175,6 @@ module.exports = {
   getAnnualReport,
   getGoalsProgress,
   getIncomeVsExpense,
-  getComparison
+  getComparison,
+  getReportJob
 };
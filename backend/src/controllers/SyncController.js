@@ -0,0 +1,17 @@
+const SyncService = require('../services/SyncService');
+const asyncHandler = require('../utils/asyncHandler');
+
+const getChanges = asyncHandler(async (req, res) => {
+  const { since } = req.query;
+  const data = await SyncService.getChanges(req.user.id, since);
+
+  res.status(200).json({
+    success: true,
+    message: 'Sync changes retrieved successfully',
+    data
+  });
+});
+
+module.exports = {
+  getChanges
+};
@@ -1,5 +1,6 @@
 const TransactionService = require('../services/TransactionService');
 const { asyncHandler, logger } = require('../utils/validators');
+const { sendExport } = require('../utils/exportStream');
 
 const getTransactions = asyncHandler(async (req, res) => {
   const transactions = await TransactionService.getTransactions(req.user.userId, {
@@ -15,6 +16,36 @@ const getTransactions = asyncHandler(async (req, res) => {
   res.json(transactions);
 });
 
+const searchTransactions = asyncHandler(async (req, res) => {
+  const transactions = await TransactionService.searchTransactions(req.user.userId, req.query.q, {
+    accountId: req.query.accountId,
+    type: req.query.type,
+    startDate: req.query.startDate,
+    endDate: req.query.endDate,
+    limit: req.query.limit,
+    offset: req.query.offset
+  });
+
+  res.json(transactions);
+});
+
+const exportTransactions = asyncHandler(async (req, res) => {
+  const rows = TransactionService.exportTransactions(req.user.userId, {
+    accountId: req.query.accountId,
+    categoryId: req.query.categoryId,
+    type: req.query.type,
+    startDate: req.query.startDate,
+    endDate: req.query.endDate
+  });
+
+  await sendExport(res, rows, {
+    fields: TransactionService.exportFields,
+    filename: 'transactions',
+    format: req.query.format || 'csv',
+    gzip: req.query.gzip === true
+  });
+});
+
 const createTransaction = asyncHandler(async (req, res) => {
   const transaction = await TransactionService.createTransaction(req.user.userId, {
     accountId: req.body.accountId,
@@ -39,6 +70,8 @@ const deleteTransaction = asyncHandler(async (req, res) => {
 
 module.exports = {
   getTransactions,
+  searchTransactions,
+  exportTransactions,
   createTransaction,
   deleteTransaction
 };
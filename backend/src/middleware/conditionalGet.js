@@ -0,0 +1,197 @@
+/**
+ * Conditional GET support for rarely-changing, per-user resources.
+ *
+ * Each (user, resource) pair has a version counter, in Redis when it is
+ * connected so every replica issues and accepts the same ETags, otherwise in
+ * the in-process fallback client. Counters expire after `ttlSeconds` without
+ * a write. Reads get a strong ETag built from that counter, so If-None-Match
+ * can be answered with 304 before the route touches the database. Writes
+ * under the same mount bump the counter.
+ */
+
+const crypto = require('crypto');
+const { getRedisClient } = require('../config/redis');
+const logger = require('../utils/logger');
+
+const DEFAULT_TTL_SECONDS = 24 * 60 * 60;
+
+const parseIfNoneMatch = (header) => {
+  if (!header) {
+    return [];
+  }
+  return header.split(',').map(tag => tag.trim()).filter(Boolean);
+};
+
+const createConditionalRequests = (fallbackClient, options = {}) => {
+  // Counters in a per-process store are meaningless to other instances, so
+  // their ETags are scoped to this process unless the store is shared. Redis
+  // counters are always shared.
+  const localScope = options.shared ? 'v' : crypto.randomBytes(4).toString('hex');
+  const keyPrefix = options.keyPrefix || 'resource_version:';
+  const ttlSeconds = options.ttlSeconds || DEFAULT_TTL_SECONDS;
+  const getClient = options.getClient || getRedisClient;
+  const metrics = {};
+
+  const versionKey = (userId, resource) => `${keyPrefix}${resource}:${userId}`;
+
+  const routeMetrics = (routeKey) => {
+    if (!metrics[routeKey]) {
+      metrics[routeKey] = {
+        hits: 0,
+        misses: 0,
+        bytesServed: 0,
+        estimatedBytesSaved: 0
+      };
+    }
+    return metrics[routeKey];
+  };
+
+  // Seed from the clock so a lost or expired counter never reissues an old ETag
+  const readVersion = async (client, key, redis) => {
+    const version = await client.get(key);
+    if (version !== null && version !== undefined) {
+      return String(version);
+    }
+
+    const seeded = String(Date.now());
+    if (!redis) {
+      await client.set(key, seeded, 'EX', ttlSeconds);
+      return seeded;
+    }
+    // Another replica may seed the same counter; keep whichever landed first
+    await client.set(key, seeded, { EX: ttlSeconds, NX: true });
+    return String((await client.get(key)) || seeded);
+  };
+
+  const incrementVersion = async (client, key, redis) => {
+    const version = await client.incr(key);
+    if (Number(version) === 1) {
+      await (redis
+        ? client.set(key, String(Date.now()), { EX: ttlSeconds })
+        : client.set(key, String(Date.now()), 'EX', ttlSeconds));
+    } else if (redis) {
+      await client.expire(key, ttlSeconds);
+    }
+  };
+
+  /** Resolves to { version, scope }. */
+  const getVersion = async (userId, resource) => {
+    const key = versionKey(userId, resource);
+    const client = getClient();
+    if (client) {
+      try {
+        return { version: await readVersion(client, key, true), scope: 'v' };
+      } catch (error) {
+        logger.error('Resource versions falling back to memory:', error.message);
+      }
+    }
+    return { version: await readVersion(fallbackClient, key, false), scope: localScope };
+  };
+
+  // Bumps the fallback counter too, so ETags issued while Redis was down are
+  // invalidated as well
+  const bumpVersion = async (userId, resource) => {
+    const key = versionKey(userId, resource);
+    const client = getClient();
+    if (client) {
+      try {
+        await incrementVersion(client, key, true);
+      } catch (error) {
+        logger.error('Resource version bump failed:', error.message);
+      }
+    }
+    await incrementVersion(fallbackClient, key, false);
+  };
+
+  // Bump before the write runs and again once it has finished. The first bump
+  // keeps a read racing the write from being tagged with the old version, the
+  // second covers reads that landed while the write was in flight.
+  const invalidateAroundWrite = async (req, res, resources) => {
+    const bumpAll = () => Promise.all(resources.map(resource => bumpVersion(req.user.userId, resource)));
+
+    res.on('finish', () => {
+      if (res.statusCode < 400) {
+        bumpAll().catch(() => {});
+      }
+    });
+
+    try {
+      await bumpAll();
+    } catch (error) {
+      // A missed bump only costs a stale 304 window; never fail the write
+    }
+  };
+
+  /**
+   * Serve conditional GETs for `paths` (relative to the mount point) and
+   * invalidate the resource on any successful write under the mount.
+   */
+  const track = (resource, { paths = ['/'] } = {}) => async (req, res, next) => {
+    if (!req.user || !req.user.userId) {
+      return next();
+    }
+
+    if (req.method !== 'GET' && req.method !== 'HEAD') {
+      await invalidateAroundWrite(req, res, [resource]);
+      return next();
+    }
+
+    if (!paths.includes(req.path)) {
+      return next();
+    }
+
+    let version;
+    let scope;
+    try {
+      ({ version, scope } = await getVersion(req.user.userId, resource));
+    } catch (error) {
+      return next();
+    }
+
+    const routeKey = `${req.baseUrl}${req.path === '/' ? '' : req.path}`;
+    const stats = routeMetrics(routeKey);
+    const etag = `"${resource}-${scope}-${version}-${crypto.createHash('sha1').update(req.originalUrl).digest('hex').slice(0, 8)}"`;
+
+    if (parseIfNoneMatch(req.headers['if-none-match']).includes(etag)) {
+      stats.hits++;
+      stats.estimatedBytesSaved += stats.misses > 0 ? Math.round(stats.bytesServed / stats.misses) : 0;
+      res.set('ETag', etag);
+      return res.status(304).end();
+    }
+
+    stats.misses++;
+    res.set('ETag', etag);
+    res.set('Cache-Control', 'private, no-cache');
+    res.on('finish', () => {
+      stats.bytesServed += Number(res.get('Content-Length')) || 0;
+    });
+    return next();
+  };
+
+  /**
+   * Invalidate resources whose content changes as a side effect of writes
+   * under another mount (e.g. transactions moving account balances).
+   */
+  const invalidates = (...resources) => async (req, res, next) => {
+    if (req.user && req.user.userId && req.method !== 'GET' && req.method !== 'HEAD') {
+      await invalidateAroundWrite(req, res, resources);
+    }
+    next();
+  };
+
+  const getMetrics = () => {
+    const routes = {};
+    Object.entries(metrics).forEach(([routeKey, stats]) => {
+      const total = stats.hits + stats.misses;
+      routes[routeKey] = {
+        ...stats,
+        hitRate: total > 0 ? Number((stats.hits / total).toFixed(4)) : 0
+      };
+    });
+    return routes;
+  };
+
+  return { track, invalidates, getVersion, bumpVersion, getMetrics };
+};
+
+module.exports = createConditionalRequests;
@@ -0,0 +1,185 @@
+/**
+ * Idempotency-Key support for POST endpoints that create records.
+ *
+ * The first request with a key takes a short lock and runs; its response
+ * (status and JSON body) is stored against the key for `ttlSeconds`. A retry
+ * with the same key and the same request gets the stored response replayed
+ * without running the handler again. A duplicate that arrives while the first
+ * is still running gets 409 and retries, so concurrent duplicates never both
+ * execute. Reusing a key for a different request is a 422.
+ *
+ * Keys live in Redis so every replica sees them; the take-or-read is a single
+ * Lua script. Without Redis the same flow runs against the in-process cache
+ * client with an in-process lock. 5xx responses are not stored, so a request
+ * that failed on the server can be retried with the same key.
+ */
+
+const crypto = require('crypto');
+const { getRedisClient } = require('../config/redis');
+const logger = require('../utils/logger');
+
+// ARGV: pending record, lock TTL (ms). Returns the existing record, or nil
+// after taking the lock.
+const TAKE_SCRIPT = `
+local existing = redis.call('GET', KEYS[1])
+if existing then
+  return existing
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return false
+`;
+
+// ARGV: pending record. Drops the lock only if this request still holds it.
+const RELEASE_SCRIPT = `
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+`;
+
+const sha1 = value => crypto.createHash('sha1').update(value).digest('hex');
+const TAKE_SHA = sha1(TAKE_SCRIPT);
+const RELEASE_SHA = sha1(RELEASE_SCRIPT);
+
+const MAX_KEY_LENGTH = 255;
+const DEFAULT_TTL_SECONDS = 24 * 60 * 60;
+const DEFAULT_LOCK_MS = 60 * 1000;
+
+const runScript = async (client, script, sha, key, args) => {
+  const options = { keys: [key], arguments: args.map(String) };
+  try {
+    return await client.evalSha(sha, options);
+  } catch (error) {
+    if (!String(error.message).includes('NOSCRIPT')) {
+      throw error;
+    }
+    return client.eval(script, options);
+  }
+};
+
+const fingerprint = req => crypto.createHash('sha256')
+  .update(`${req.method} ${req.originalUrl}\n${JSON.stringify(req.body || {})}`)
+  .digest('hex');
+
+const createIdempotency = ({
+  fallbackClient,
+  getClient = getRedisClient,
+  ttlSeconds = Number(process.env.IDEMPOTENCY_TTL_SECONDS) || DEFAULT_TTL_SECONDS,
+  lockMs = DEFAULT_LOCK_MS
+}) => {
+  const localLocks = new Map();
+
+  // Returns the stored record for `key`, or null once this request holds the lock
+  const take = async (key, pending) => {
+    const client = getClient();
+    if (client) {
+      try {
+        const existing = await runScript(client, TAKE_SCRIPT, TAKE_SHA, key, [pending, lockMs]);
+        return existing ? JSON.parse(existing) : null;
+      } catch (error) {
+        logger.error('Idempotency store falling back to memory:', error.message);
+      }
+    }
+
+    const stored = await fallbackClient.get(key);
+    if (stored) {
+      return JSON.parse(stored);
+    }
+    if (localLocks.has(key)) {
+      return JSON.parse(localLocks.get(key));
+    }
+    localLocks.set(key, pending);
+    return null;
+  };
+
+  const complete = async (key, record) => {
+    localLocks.delete(key);
+    const value = JSON.stringify(record);
+    const client = getClient();
+    if (client) {
+      try {
+        await client.set(key, value, { EX: ttlSeconds });
+        return;
+      } catch (error) {
+        logger.error('Idempotency store write failed:', error.message);
+      }
+    }
+    await fallbackClient.set(key, value, 'EX', ttlSeconds);
+  };
+
+  const release = async (key, pending) => {
+    localLocks.delete(key);
+    const client = getClient();
+    if (client) {
+      await runScript(client, RELEASE_SCRIPT, RELEASE_SHA, key, [pending]);
+    }
+  };
+
+  return async (req, res, next) => {
+    const idempotencyKey = req.get('Idempotency-Key');
+    if (req.method !== 'POST' || idempotencyKey === undefined || !req.user || !req.user.userId) {
+      return next();
+    }
+
+    if (idempotencyKey.length === 0 || idempotencyKey.length > MAX_KEY_LENGTH) {
+      return res.status(400).json({ error: `Idempotency-Key must be 1-${MAX_KEY_LENGTH} characters` });
+    }
+
+    const key = `idempotency:${req.user.userId}:${idempotencyKey}`;
+    const requestHash = fingerprint(req);
+    const pending = JSON.stringify({
+      state: 'pending',
+      fingerprint: requestHash,
+      token: crypto.randomBytes(8).toString('hex')
+    });
+
+    let existing;
+    try {
+      existing = await take(key, pending);
+    } catch (error) {
+      // Never block writes because the idempotency store failed
+      logger.error('Idempotency check error:', error.message);
+      return next();
+    }
+
+    if (existing) {
+      if (existing.fingerprint !== requestHash) {
+        return res.status(422).json({ error: 'Idempotency-Key was already used for a different request' });
+      }
+      if (existing.state === 'pending') {
+        res.set('Retry-After', '1');
+        return res.status(409).json({ error: 'A request with this Idempotency-Key is still in progress' });
+      }
+      res.set('Idempotent-Replayed', 'true');
+      return res.status(existing.status).json(existing.body);
+    }
+
+    // Hold the response until the record is stored, so a client that retries
+    // as soon as it has the response never finds the key still pending. The
+    // response still goes out if the store write fails.
+    let settled = false;
+    const json = res.json.bind(res);
+    res.json = (body) => {
+      if (settled || res.statusCode >= 500) {
+        return json(body);
+      }
+      settled = true;
+      complete(key, { state: 'done', fingerprint: requestHash, status: res.statusCode, body })
+        .catch(error => logger.error('Idempotency store write failed:', error.message))
+        .then(() => json(body));
+      return res;
+    };
+
+    res.on('close', () => {
+      if (!settled) {
+        settled = true;
+        release(key, pending)
+          .catch(error => logger.error('Idempotency lock release failed:', error.message));
+      }
+    });
+
+    return next();
+  };
+};
+
+module.exports = createIdempotency;
@@ -0,0 +1,252 @@
+/**
+ * Prometheus metrics for GET /metrics.
+ *
+ * - HTTP: latency histogram per matched route pattern, in-flight gauge, and
+ *   per-request DB time / query count by route (from the request context)
+ * - DB: latency histogram per query fingerprint (literals and placeholders
+ *   stripped) fed by the knex hooks in requestContext, plus pool utilisation
+ *   per shard (`shard="primary"` when sharding is off)
+ * - Runtime: event-loop delay percentiles, GC pause histogram and process
+ *   memory (RSS, V8 heap, external), for spotting drift in soak runs
+ *
+ * Route labels use the Express route pattern (/api/v1/accounts/:id), never
+ * the raw path, so label cardinality stays bounded.
+ *
+ * The endpoint requires `Authorization: Bearer <token>` when a token is set.
+ * With `requireToken` (the default in production) and no token, it fails
+ * closed and serves nothing.
+ */
+
+const crypto = require('crypto');
+const { monitorEventLoopDelay, PerformanceObserver, constants } = require('perf_hooks');
+const { Registry } = require('../utils/prometheus');
+const { getContext } = require('./requestContext');
+const { PRIMARY_SHARD, getShardRouter } = require('../config/shards');
+
+const MAX_FINGERPRINTS = 500;
+const MAX_STATEMENT_LENGTH = 200;
+
+const GC_KINDS = {
+  [constants.NODE_PERFORMANCE_GC_MINOR]: 'minor',
+  [constants.NODE_PERFORMANCE_GC_MAJOR]: 'major',
+  [constants.NODE_PERFORMANCE_GC_INCREMENTAL]: 'incremental',
+  [constants.NODE_PERFORMANCE_GC_WEAKCB]: 'weakcb'
+};
+
+const normalizeSql = sql => String(sql)
+  .replace(/'(?:[^']|'')*'/g, '?')
+  .replace(/\$\d+/g, '?')
+  .replace(/\b\d+(?:\.\d+)?\b/g, '?')
+  .replace(/\(\s*\?(?:\s*,\s*\?)*\s*\)/g, '(?)')
+  .replace(/\s+/g, ' ')
+  .trim();
+
+const routeLabel = (req) => {
+  if (!req.route) {
+    return 'unmatched';
+  }
+  const path = Array.isArray(req.route.path) ? req.route.path.join('|') : req.route.path;
+  return `${req.baseUrl}${path === '/' && req.baseUrl ? '' : path}`;
+};
+
+// Constant-time check of an Authorization header against the bearer token
+const hasBearerToken = (header, token) => {
+  const given = Buffer.from(String(header || ''));
+  const expected = Buffer.from(`Bearer ${token}`);
+  return given.length === expected.length && crypto.timingSafeEqual(given, expected);
+};
+
+// Every shard's knex instance by name, or null without sharding
+const shardPools = () => {
+  const router = getShardRouter();
+  return router && router.enabled ? router.pools : null;
+};
+
+const createMetrics = ({
+  db,
+  getPools = shardPools,
+  token = process.env.METRICS_TOKEN,
+  requireToken = process.env.NODE_ENV === 'production'
+} = {}) => {
+  const registry = new Registry();
+
+  const httpDuration = registry.histogram({
+    name: 'http_request_duration_seconds',
+    help: 'HTTP request latency by route pattern',
+    labelNames: ['method', 'route', 'status_code']
+  });
+  const inFlight = registry.gauge({
+    name: 'http_requests_in_flight',
+    help: 'HTTP requests currently being served'
+  });
+  const requestDbTime = registry.histogram({
+    name: 'http_request_db_seconds',
+    help: 'Total database time spent per request by route pattern',
+    labelNames: ['route']
+  });
+  const requestDbQueries = registry.histogram({
+    name: 'http_request_db_queries',
+    help: 'Database queries issued per request by route pattern',
+    labelNames: ['route'],
+    buckets: [0, 1, 2, 5, 10, 20, 50, 100]
+  });
+  const queryDuration = registry.histogram({
+    name: 'db_query_duration_seconds',
+    help: 'Database query latency by query fingerprint',
+    labelNames: ['fingerprint'],
+    buckets: [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+  });
+  const fingerprintInfo = registry.gauge({
+    name: 'db_query_fingerprint_info',
+    help: 'Normalized statement for each query fingerprint',
+    labelNames: ['fingerprint', 'statement']
+  });
+  const poolConnections = registry.gauge({
+    name: 'db_pool_connections',
+    help: 'Knex pool connections by shard and state',
+    labelNames: ['shard', 'state']
+  });
+  const poolMax = registry.gauge({
+    name: 'db_pool_max_connections',
+    help: 'Configured knex pool maximum by shard',
+    labelNames: ['shard']
+  });
+  const loopLag = registry.gauge({
+    name: 'nodejs_eventloop_lag_seconds',
+    help: 'Event loop delay since the previous scrape',
+    labelNames: ['stat']
+  });
+  const memory = registry.gauge({
+    name: 'nodejs_memory_bytes',
+    help: 'Process memory from process.memoryUsage()',
+    labelNames: ['kind']
+  });
+  const gcDuration = registry.histogram({
+    name: 'nodejs_gc_duration_seconds',
+    help: 'Garbage collection pauses by kind',
+    labelNames: ['kind'],
+    buckets: [0.001, 0.01, 0.1, 1, 2, 5]
+  });
+
+  const fingerprints = new Map();
+  const fingerprintFor = (sql) => {
+    const statement = normalizeSql(sql);
+    if (fingerprints.has(statement)) {
+      return fingerprints.get(statement);
+    }
+    if (fingerprints.size >= MAX_FINGERPRINTS) {
+      return 'other';
+    }
+
+    const fingerprint = crypto.createHash('sha1').update(statement).digest('hex').slice(0, 12);
+    fingerprints.set(statement, fingerprint);
+    fingerprintInfo.set({ fingerprint, statement: statement.slice(0, MAX_STATEMENT_LENGTH) }, 1);
+    return fingerprint;
+  };
+
+  const recordQuery = ({ sql, durationMs }) => {
+    queryDuration.observe({ fingerprint: fingerprintFor(sql) }, durationMs / 1000);
+  };
+
+  const middleware = (req, res, next) => {
+    const start = process.hrtime.bigint();
+    const context = getContext();
+    let done = false;
+
+    inFlight.inc();
+    const finish = () => {
+      if (done) {
+        return;
+      }
+      done = true;
+      inFlight.dec();
+
+      const route = routeLabel(req);
+      const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+      httpDuration.observe({ method: req.method, route, status_code: res.statusCode }, seconds);
+      if (context) {
+        requestDbTime.observe({ route }, context.dbMs / 1000);
+        requestDbQueries.observe({ route }, context.dbQueries);
+      }
+    };
+
+    res.once('finish', finish);
+    res.once('close', finish);
+    next();
+  };
+
+  const loopDelay = monitorEventLoopDelay({ resolution: 20 });
+  loopDelay.enable();
+
+  const gcObserver = new PerformanceObserver((list) => {
+    list.getEntries().forEach((entry) => {
+      const kind = entry.detail ? entry.detail.kind : entry.kind;
+      gcDuration.observe({ kind: GC_KINDS[kind] || 'unknown' }, entry.duration / 1000);
+    });
+  });
+  gcObserver.observe({ entryTypes: ['gc'] });
+
+  registry.addCollector(() => {
+    // Histogram values are nanoseconds; reset so each scrape covers one interval
+    if (loopDelay.count > 0) {
+      loopLag.set({ stat: 'mean' }, loopDelay.mean / 1e9);
+      loopLag.set({ stat: 'p50' }, loopDelay.percentile(50) / 1e9);
+      loopLag.set({ stat: 'p99' }, loopDelay.percentile(99) / 1e9);
+      loopLag.set({ stat: 'max' }, loopDelay.max / 1e9);
+    }
+    loopDelay.reset();
+  });
+
+  registry.addCollector(() => {
+    const usage = process.memoryUsage();
+    memory.set({ kind: 'rss' }, usage.rss);
+    memory.set({ kind: 'heap_used' }, usage.heapUsed);
+    memory.set({ kind: 'heap_total' }, usage.heapTotal);
+    memory.set({ kind: 'external' }, usage.external);
+  });
+
+  // `db` is the shard proxy, which resolves to the primary outside a request,
+  // so each shard's pool is read from the router
+  registry.addCollector(() => {
+    const pools = getPools() || new Map([[PRIMARY_SHARD, db]]);
+    pools.forEach((handle, shard) => {
+      const pool = handle && handle.client && handle.client.pool;
+      if (!pool) {
+        return;
+      }
+      poolConnections.set({ shard, state: 'used' }, pool.numUsed());
+      poolConnections.set({ shard, state: 'free' }, pool.numFree());
+      poolConnections.set({ shard, state: 'pending_acquire' }, pool.numPendingAcquires());
+      poolConnections.set({ shard, state: 'pending_create' }, pool.numPendingCreates());
+      poolMax.set({ shard }, pool.max);
+    });
+  });
+
+  const handler = async (req, res) => {
+    if (!token && requireToken) {
+      return res.status(503).json({ success: false, error: 'Metrics are disabled until METRICS_TOKEN is set' });
+    }
+    if (token && !hasBearerToken(req.get('authorization'), token)) {
+      return res.status(401).json({ success: false, error: 'Unauthorized' });
+    }
+    res.set('Content-Type', Registry.CONTENT_TYPE);
+    return res.send(await registry.render());
+  };
+
+  const stop = () => {
+    loopDelay.disable();
+    gcObserver.disconnect();
+  };
+
+  return {
+    registry,
+    middleware,
+    recordQuery,
+    handler,
+    stop
+  };
+};
+
+createMetrics.normalizeSql = normalizeSql;
+
+module.exports = createMetrics;
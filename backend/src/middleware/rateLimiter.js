@@ -0,0 +1,200 @@
+/**
+ * Cluster-wide rate limiting.
+ *
+ * Uses GCRA (a token bucket expressed as one "theoretical arrival time" per
+ * key): a client may send `limit` requests in a burst and then one every
+ * windowMs / limit. With Redis the check-and-update is a single Lua script,
+ * so every replica shares one budget per key. Denials are remembered locally
+ * until the client may retry, so throttled clients cost no Redis round trip.
+ * Without Redis the same algorithm runs against the in-process cache client.
+ */
+
+const crypto = require('crypto');
+const { getRedisClient } = require('../config/redis');
+const logger = require('../utils/logger');
+
+// ARGV: emission interval (ms), window (ms). Returns {allowed, remaining|retryAfterMs}.
+const GCRA_SCRIPT = `
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+  tat = now
+end
+local newTat = tat + interval
+local ahead = newTat - now
+if ahead > window then
+  return {0, ahead - window}
+end
+redis.call('SET', KEYS[1], newTat, 'PX', math.ceil(ahead))
+return {1, math.floor((window - ahead) / interval)}
+`;
+
+// ARGV: emission interval (ms). Gives back one request's worth of budget.
+const REFUND_SCRIPT = `
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat then
+  return 0
+end
+local newTat = tat - tonumber(ARGV[1])
+if newTat <= now then
+  redis.call('DEL', KEYS[1])
+else
+  redis.call('SET', KEYS[1], newTat, 'PX', math.ceil(newTat - now))
+end
+return 1
+`;
+
+const sha1 = value => crypto.createHash('sha1').update(value).digest('hex');
+const GCRA_SHA = sha1(GCRA_SCRIPT);
+const REFUND_SHA = sha1(REFUND_SCRIPT);
+
+const DENY_CACHE_MAX_ENTRIES = 10000;
+const DENY_CACHE_MAX_TTL_MS = 5000;
+
+const runScript = async (client, script, sha, key, args) => {
+  const options = { keys: [key], arguments: args.map(String) };
+  try {
+    return await client.evalSha(sha, options);
+  } catch (error) {
+    if (!String(error.message).includes('NOSCRIPT')) {
+      throw error;
+    }
+    return client.eval(script, options);
+  }
+};
+
+const createRateLimiter = ({
+  name,
+  limit,
+  windowMs,
+  keyGenerator = req => req.ip,
+  skip = () => false,
+  skipSuccessfulRequests = false,
+  message = 'Too many requests, please try again later.',
+  fallbackClient,
+  getClient = getRedisClient
+}) => {
+  const interval = Math.ceil(windowMs / limit);
+  const keyPrefix = `rate_limit:${name}:`;
+  const denyCache = new Map();
+
+  // Same GCRA against the in-process client. Its get/set resolve without
+  // yielding to other requests, so the update is effectively atomic.
+  const consumeLocally = async (key) => {
+    const now = Date.now();
+    const stored = Number(await fallbackClient.get(key));
+    const tat = Math.max(stored || now, now);
+    const ahead = tat + interval - now;
+    if (ahead > windowMs) {
+      return [0, ahead - windowMs];
+    }
+    await fallbackClient.set(key, String(tat + interval), 'EX', Math.ceil(ahead / 1000));
+    return [1, Math.floor((windowMs - ahead) / interval)];
+  };
+
+  const refundLocally = async (key) => {
+    const stored = Number(await fallbackClient.get(key));
+    if (stored) {
+      const tat = stored - interval;
+      await fallbackClient.set(key, String(tat), 'EX', Math.max(1, Math.ceil((tat - Date.now()) / 1000)));
+    }
+  };
+
+  const consume = async (key) => {
+    const client = getClient();
+    if (client) {
+      try {
+        return (await runScript(client, GCRA_SCRIPT, GCRA_SHA, key, [interval, windowMs])).map(Number);
+      } catch (error) {
+        logger.error(`Rate limiter ${name} falling back to memory:`, error.message);
+      }
+    }
+    return consumeLocally(key);
+  };
+
+  const refund = async (key) => {
+    const client = getClient();
+    if (client) {
+      try {
+        await runScript(client, REFUND_SCRIPT, REFUND_SHA, key, [interval]);
+        return;
+      } catch (error) {
+        logger.error(`Rate limiter ${name} refund failed:`, error.message);
+      }
+    }
+    await refundLocally(key);
+  };
+
+  const rememberDenial = (key, retryAfterMs) => {
+    if (denyCache.size >= DENY_CACHE_MAX_ENTRIES) {
+      denyCache.delete(denyCache.keys().next().value);
+    }
+    const now = Date.now();
+    denyCache.set(key, {
+      expiresAt: now + Math.min(retryAfterMs, DENY_CACHE_MAX_TTL_MS),
+      retryAt: now + retryAfterMs
+    });
+  };
+
+  const reject = (res, retryAfterMs) => {
+    res.set('Retry-After', String(Math.ceil(retryAfterMs / 1000)));
+    res.set('RateLimit-Limit', String(limit));
+    res.set('RateLimit-Remaining', '0');
+    return res.status(429).send(message);
+  };
+
+  return async (req, res, next) => {
+    if (skip(req)) {
+      return next();
+    }
+
+    const identifier = keyGenerator(req);
+    if (!identifier) {
+      return next();
+    }
+
+    const key = `${keyPrefix}${identifier}`;
+    const denial = denyCache.get(key);
+    if (denial) {
+      if (denial.expiresAt > Date.now()) {
+        return reject(res, denial.retryAt - Date.now());
+      }
+      denyCache.delete(key);
+    }
+
+    let allowed;
+    let detail;
+    try {
+      [allowed, detail] = await consume(key);
+    } catch (error) {
+      // Never take the API down because the limiter failed
+      logger.error(`Rate limiter ${name} error:`, error.message);
+      return next();
+    }
+
+    if (!allowed) {
+      rememberDenial(key, detail);
+      return reject(res, detail);
+    }
+
+    res.set('RateLimit-Limit', String(limit));
+    res.set('RateLimit-Remaining', String(detail));
+
+    if (skipSuccessfulRequests) {
+      res.on('finish', () => {
+        if (res.statusCode < 400) {
+          refund(key).catch(() => {});
+        }
+      });
+    }
+
+    return next();
+  };
+};
+
+module.exports = createRateLimiter;
@@ -0,0 +1,121 @@
+/**
+ * Request-scoped timing context.
+ *
+ * Every request gets a context in AsyncLocalStorage. Knex query events,
+ * timed middleware (e.g. auth) and res.json add their durations to it, and
+ * one structured line per request is logged when the response finishes.
+ */
+
+const { AsyncLocalStorage } = require('async_hooks');
+const logger = require('../utils/logger');
+
+const storage = new AsyncLocalStorage();
+
+const elapsedMs = (start) => Number(process.hrtime.bigint() - start) / 1e6;
+const round = (ms) => Math.round(ms * 100) / 100;
+
+const getContext = () => storage.getStore();
+
+/**
+ * Attach query timing to a knex instance. Each query is charged to the
+ * request that issued it; `onQuery({ sql, durationMs, context })` also sees
+ * queries issued outside a request (workers, scheduled jobs).
+ */
+const instrumentKnex = (db, { onQuery } = {}) => {
+  const pending = new Map();
+
+  db.on('query', (query) => {
+    const context = getContext();
+    if (context || onQuery) {
+      pending.set(query.__knexQueryUid, { context, start: process.hrtime.bigint() });
+    }
+  });
+
+  const settle = (query) => {
+    const entry = pending.get(query.__knexQueryUid);
+    if (entry) {
+      pending.delete(query.__knexQueryUid);
+      const durationMs = elapsedMs(entry.start);
+      if (entry.context) {
+        entry.context.dbMs += durationMs;
+        entry.context.dbQueries++;
+      }
+      if (onQuery) {
+        onQuery({ sql: query.sql, durationMs, context: entry.context });
+      }
+    }
+  };
+
+  db.on('query-response', (response, query) => settle(query));
+  db.on('query-error', (error, query) => settle(query));
+};
+
+/**
+ * Wrap a middleware so the time until it calls next() (or responds) is
+ * charged to `phase` on the request context.
+ */
+const timed = (phase, middleware) => (req, res, next) => {
+  const context = getContext();
+  if (!context) {
+    return middleware(req, res, next);
+  }
+
+  const start = process.hrtime.bigint();
+  let settled = false;
+  const settle = () => {
+    if (!settled) {
+      settled = true;
+      context[phase] = (context[phase] || 0) + elapsedMs(start);
+    }
+  };
+
+  res.once('finish', settle);
+  return middleware(req, res, (...args) => {
+    settle();
+    next(...args);
+  });
+};
+
+const requestContext = (req, res, next) => {
+  const context = {
+    start: process.hrtime.bigint(),
+    authMs: 0,
+    dbMs: 0,
+    dbQueries: 0,
+    serializeMs: 0
+  };
+
+  const json = res.json;
+  res.json = function timedJson(body) {
+    const start = process.hrtime.bigint();
+    try {
+      return json.call(this, body);
+    } finally {
+      context.serializeMs += elapsedMs(start);
+    }
+  };
+
+  res.on('finish', () => {
+    logger.info({
+      type: 'request',
+      method: req.method,
+      path: req.originalUrl.split('?')[0],
+      status: res.statusCode,
+      durationMs: round(elapsedMs(context.start)),
+      authMs: round(context.authMs),
+      dbMs: round(context.dbMs),
+      dbQueries: context.dbQueries,
+      serializeMs: round(context.serializeMs),
+      userId: req.user ? req.user.userId : undefined
+    });
+  });
+
+  storage.run(context, next);
+};
+
+module.exports = {
+  requestContext,
+  instrumentKnex,
+  timed,
+  getContext
+};
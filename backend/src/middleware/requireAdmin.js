@@ -0,0 +1,16 @@
+// Restricts a route to the user ids listed in ADMIN_USER_IDS (comma separated).
+// With no list configured nobody is an admin. Must run after authMiddleware.
+const requireAdmin = (req, res, next) => {
+  const adminIds = (process.env.ADMIN_USER_IDS || '')
+    .split(',')
+    .map(id => id.trim())
+    .filter(Boolean);
+
+  if (!req.user || !adminIds.includes(String(req.user.userId))) {
+    return res.status(403).json({ error: 'Admin access required' });
+  }
+
+  next();
+};
+
+module.exports = requireAdmin;
@@ -1,6 +1,16 @@
 const db = require('../config/database');
 const { v4: uuidv4 } = require('uuid');
 
+const COMPACTION_BATCH_SIZE = 500;
+
+// current_balance plus deltas not yet compacted. Listed after accounts.* so it
+// replaces the stored column in the returned row.
+const balanceColumn = (table = 'accounts') => db.raw(
+  `${table}.current_balance + COALESCE((
+    SELECT SUM(d.amount) FROM account_balance_deltas d WHERE d.account_id = ${table}.account_id
+  ), 0) AS current_balance`
+);
+
 class Account {
   static async create(userId, data) {
     const record = {
@@ -22,15 +32,91 @@ class Account {
   }
 
   static async findById(accountId) {
-    return db('accounts').where({ account_id: accountId }).first();
+    return db('accounts')
+      .select('accounts.*', balanceColumn())
+      .where({ account_id: accountId })
+      .first();
   }
 
   static async listByUser(userId) {
     return db('accounts')
+      .select('accounts.*', balanceColumn())
       .where({ user_id: userId })
       .orderBy('created_at', 'desc');
   }
 
+  static balanceColumn(table) {
+    return balanceColumn(table);
+  }
+
+  /**
+   * Append signed balance changes ({ accountId, amount }) for one transaction.
+   * Inserts take no lock on the account rows, so writers never queue.
+   */
+  static async appendBalanceDeltas(trx, userId, transactionId, deltas) {
+    return trx('account_balance_deltas').insert(deltas.map(delta => ({
+      account_id: delta.accountId,
+      user_id: userId,
+      transaction_id: transactionId,
+      amount: delta.amount
+    })));
+  }
+
+  /**
+   * Lock account rows in account_id order. Every path that locks more than
+   * one account goes through here, so two of them can never deadlock.
+   */
+  static async lockInOrder(trx, accountIds) {
+    const ordered = [...new Set(accountIds)].sort();
+    return trx('accounts')
+      .whereIn('account_id', ordered)
+      .orderBy('account_id')
+      .forNoKeyUpdate()
+      .select('account_id');
+  }
+
+  /**
+   * Fold pending deltas into current_balance. The delete and the balance
+   * update are one statement, so a concurrent read sees either the deltas or
+   * the compacted balance, never both. Returns the number of accounts updated.
+   */
+  static async compactBalances(accountIds = null) {
+    return db.transaction(async trx => {
+      const ids = accountIds || (await trx('account_balance_deltas')
+        .distinct('account_id')
+        .limit(COMPACTION_BATCH_SIZE))
+        .map(row => row.account_id);
+
+      if (ids.length === 0) {
+        return 0;
+      }
+
+      const locked = await Account.lockInOrder(trx, ids);
+      if (locked.length === 0) {
+        return 0;
+      }
+
+      const result = await trx.raw(`
+        WITH moved AS (
+          DELETE FROM account_balance_deltas
+          WHERE account_id = ANY(?::uuid[])
+          RETURNING account_id, amount
+        ), totals AS (
+          SELECT account_id, SUM(amount) AS amount
+          FROM moved
+          GROUP BY account_id
+        )
+        UPDATE accounts
+        SET current_balance = accounts.current_balance + totals.amount,
+            updated_at = NOW()
+        FROM totals
+        WHERE accounts.account_id = totals.account_id
+      `, [locked.map(row => row.account_id)]);
+
+      return result.rowCount;
+    });
+  }
+
   static async update(accountId, userId, data) {
     const updates = {
       name: data.name,
@@ -43,12 +129,25 @@ class Account {
       updated_at: new Date()
     };
 
-    const [account] = await db('accounts')
-      .where({ account_id: accountId, user_id: userId })
-      .update(updates)
-      .returning('*');
+    if (data.current_balance === undefined) {
+      const updated = await db('accounts')
+        .where({ account_id: accountId, user_id: userId })
+        .update(updates);
+      return updated ? Account.findById(accountId) : undefined;
+    }
 
-    return account;
+    // An explicit balance replaces whatever is still pending in the ledger
+    return db.transaction(async trx => {
+      await Account.lockInOrder(trx, [accountId]);
+      const [account] = await trx('accounts')
+        .where({ account_id: accountId, user_id: userId })
+        .update(updates)
+        .returning('*');
+      if (account) {
+        await trx('account_balance_deltas').where({ account_id: accountId }).del();
+      }
+      return account;
+    });
   }
 
   static async remove(accountId, userId) {
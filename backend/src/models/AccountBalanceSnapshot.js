@@ -0,0 +1,231 @@
+const db = require('../config/database');
+const FxRate = require('./FxRate');
+
+const toDateString = date => [
+  date.getFullYear(),
+  String(date.getMonth() + 1).padStart(2, '0'),
+  String(date.getDate()).padStart(2, '0')
+].join('-');
+
+// Rebuild snapshots for a set of accounts over [fromDate, toDate] in one
+// statement. Working backwards from today's balance (current_balance plus
+// pending ledger deltas):
+//   balance(day) = balance now - effects dated after `day`
+// so account opening balances never need to be known.
+// Bindings: accountIds, fromDate, accountIds, fromDate, accountIds, toDate, fromDate, toDate
+const REBUILD_SQL = `
+  WITH accts AS (
+    SELECT a.account_id, a.user_id, COALESCE(a.currency, 'INR') AS currency,
+           a.current_balance + COALESCE((
+             SELECT SUM(d.amount) FROM account_balance_deltas d WHERE d.account_id = a.account_id
+           ), 0) AS balance
+    FROM accounts a
+    WHERE a.account_id = ANY(?::uuid[])
+  ), effects AS (
+    SELECT account_id, day, SUM(amount) AS amount
+    FROM (
+      SELECT account_id, transaction_date::date AS day,
+             CASE WHEN transaction_type = 'income' THEN amount ELSE -amount END AS amount
+      FROM transactions
+      WHERE is_deleted = false
+        AND transaction_type IN ('income', 'expense', 'transfer')
+        AND transaction_date >= ?::date
+        AND account_id = ANY(?::uuid[])
+      UNION ALL
+      SELECT to_account_id, transaction_date::date, amount
+      FROM transactions
+      WHERE is_deleted = false
+        AND transaction_type = 'transfer'
+        AND transaction_date >= ?::date
+        AND to_account_id = ANY(?::uuid[])
+    ) signed
+    GROUP BY account_id, day
+  ), later AS (
+    SELECT account_id, SUM(amount) AS amount
+    FROM effects
+    WHERE day > ?::date
+    GROUP BY account_id
+  ), grid AS (
+    SELECT accts.account_id, accts.user_id, accts.currency, accts.balance,
+           days.day::date AS day, COALESCE(effects.amount, 0) AS amount
+    FROM accts
+    CROSS JOIN generate_series(?::date, ?::date, interval '1 day') AS days(day)
+    LEFT JOIN effects ON effects.account_id = accts.account_id AND effects.day = days.day::date
+  )
+  INSERT INTO account_balance_snapshots (account_id, user_id, snapshot_date, currency, balance, updated_at)
+  SELECT grid.account_id, grid.user_id, grid.day, grid.currency,
+         grid.balance - COALESCE(later.amount, 0) - COALESCE(SUM(grid.amount) OVER (
+           PARTITION BY grid.account_id ORDER BY grid.day DESC
+           ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+         ), 0),
+         NOW()
+  FROM grid
+  LEFT JOIN later ON later.account_id = grid.account_id
+  ON CONFLICT (account_id, snapshot_date)
+  DO UPDATE SET balance = EXCLUDED.balance, currency = EXCLUDED.currency, updated_at = EXCLUDED.updated_at
+`;
+
+class AccountBalanceSnapshot {
+  static toDateString(date) {
+    return toDateString(date);
+  }
+
+  /**
+   * Write (or overwrite) one snapshot per account per day in the range.
+   * Returns the number of rows written.
+   */
+  static async rebuild(accountIds, fromDate, toDate, handle = db) {
+    if (accountIds.length === 0 || fromDate > toDate) {
+      return 0;
+    }
+
+    const result = await handle.raw(REBUILD_SQL, [
+      accountIds,
+      fromDate, accountIds,
+      fromDate, accountIds,
+      toDate,
+      fromDate, toDate
+    ]);
+    return result.rowCount;
+  }
+
+  /**
+   * Keyset page of account ids, for walking every account in batches.
+   */
+  static async accountIdsAfter(afterId, limit) {
+    const rows = await db('accounts')
+      .modify(query => {
+        if (afterId) query.where('account_id', '>', afterId);
+      })
+      .orderBy('account_id')
+      .limit(limit)
+      .select('account_id');
+    return rows.map(row => row.account_id);
+  }
+
+  /**
+   * Accounts without any snapshot yet, with the first day their history
+   * needs (earliest transaction or creation, whichever is first).
+   */
+  static async listUnsnapshotted(limit) {
+    return db('accounts')
+      .whereNotExists(db('account_balance_snapshots')
+        .whereRaw('account_balance_snapshots.account_id = accounts.account_id'))
+      .limit(limit)
+      .select(
+        'accounts.account_id',
+        db.raw(`to_char(LEAST(accounts.created_at::date, (
+          SELECT MIN(t.transaction_date)::date FROM transactions t
+          WHERE (t.account_id = accounts.account_id OR t.to_account_id = accounts.account_id)
+            AND t.is_deleted = false
+        )), 'YYYY-MM-DD') as first_date`)
+      );
+  }
+
+  /**
+   * Record that snapshots from `fromDate` on are stale for these accounts.
+   * Append-only, so it adds no row contention to the transaction write path.
+   */
+  static async invalidate(trx, userId, accountIds, fromDate) {
+    return trx('account_snapshot_invalidations').insert(
+      [...new Set(accountIds)].map(accountId => ({
+        account_id: accountId,
+        user_id: userId,
+        from_date: fromDate
+      }))
+    );
+  }
+
+  /**
+   * Accounts with pending invalidations, optionally limited to some accounts
+   * or one user. Nothing is claimed; see lockInvalidations().
+   */
+  static async invalidatedAccounts({ accountIds = null, userId = null } = {}) {
+    const rows = await db('account_snapshot_invalidations')
+      .modify(query => {
+        if (accountIds) query.whereIn('account_id', accountIds);
+        if (userId) query.where({ user_id: userId });
+      })
+      .distinct('account_id');
+    return rows.map(row => row.account_id);
+  }
+
+  /**
+   * Lock an account's pending invalidations in `trx` until it ends. Returns
+   * { ids, fromDate } (earliest date), or null when there are none. A
+   * concurrent caller waits here and then finds the rows already deleted.
+   */
+  static async lockInvalidations(trx, accountId) {
+    const rows = await trx('account_snapshot_invalidations')
+      .where({ account_id: accountId })
+      .forUpdate()
+      .select('invalidation_id', trx.raw("to_char(from_date, 'YYYY-MM-DD') as from_date"));
+    if (rows.length === 0) {
+      return null;
+    }
+    return {
+      ids: rows.map(row => row.invalidation_id),
+      fromDate: rows.reduce((earliest, row) => (row.from_date < earliest ? row.from_date : earliest), rows[0].from_date)
+    };
+  }
+
+  static async deleteInvalidations(trx, invalidationIds) {
+    return trx('account_snapshot_invalidations').whereIn('invalidation_id', invalidationIds).del();
+  }
+
+  static async hasInvalidations({ accountId = null, userId = null }) {
+    const row = await db('account_snapshot_invalidations')
+      .modify(query => {
+        if (accountId) query.where({ account_id: accountId });
+        if (userId) query.where({ user_id: userId });
+      })
+      .first('invalidation_id');
+    return Boolean(row);
+  }
+
+  static async snapshotRange(accountId, handle = db) {
+    const row = await handle('account_balance_snapshots')
+      .where({ account_id: accountId })
+      .first(
+        handle.raw("to_char(MIN(snapshot_date), 'YYYY-MM-DD') as first_date"),
+        handle.raw("to_char(MAX(snapshot_date), 'YYYY-MM-DD') as last_date")
+      );
+    return row && row.last_date ? { firstDate: row.first_date, lastDate: row.last_date } : null;
+  }
+
+  static async history(accountId, fromDate, toDate) {
+    return db('account_balance_snapshots')
+      .where({ account_id: accountId })
+      .whereBetween('snapshot_date', [fromDate, toDate])
+      .orderBy('snapshot_date', 'asc')
+      .select(db.raw("to_char(snapshot_date, 'YYYY-MM-DD') as date"), 'balance');
+  }
+
+  /**
+   * Daily sum of a user's account snapshots converted into `baseCurrency`
+   * at each day's rate.
+   */
+  static async netWorth(userId, baseCurrency, fromDate, toDate) {
+    const amount = db.raw(
+      'CASE WHEN account_balance_snapshots.currency = ? THEN account_balance_snapshots.balance ' +
+      'ELSE COALESCE(account_balance_snapshots.balance * fx_to.rate / fx_from.rate, account_balance_snapshots.balance) END',
+      [baseCurrency]
+    );
+
+    return FxRate.joinRates(
+      db('account_balance_snapshots')
+        .where('account_balance_snapshots.user_id', userId)
+        .whereBetween('account_balance_snapshots.snapshot_date', [fromDate, toDate]),
+      'account_balance_snapshots', 'snapshot_date', baseCurrency
+    )
+      .groupBy('account_balance_snapshots.snapshot_date')
+      .orderBy('account_balance_snapshots.snapshot_date', 'asc')
+      .select(
+        db.raw("to_char(account_balance_snapshots.snapshot_date, 'YYYY-MM-DD') as date"),
+        db.raw('SUM(?) as net_worth', [amount]),
+        db.raw('COUNT(*) as accounts')
+      );
+  }
+}
+
+module.exports = AccountBalanceSnapshot;
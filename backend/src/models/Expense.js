@@ -1,5 +1,8 @@
 const db = require('../config/database');
 const { v4: uuidv4 } = require('uuid');
+const { keysetRows } = require('../utils/exportStream');
+
+const COUNT_CAP = 1000;
 
 class Expense {
   static async create(userId, data) {
@@ -45,68 +48,123 @@ class Expense {
     return expense ? this._formatExpense(expense) : null;
   }
 
-  static async list(userId, filters = {}) {
-    let query = db('expenses')
-      .where({ 'expenses.user_id': userId, 'expenses.is_deleted': false })
-      .leftJoin('categories', 'expenses.category_id', 'categories.category_id')
-      .leftJoin('accounts', 'expenses.account_id', 'accounts.account_id')
-      .select(
-        'expenses.*',
-        'categories.name as category_name',
-        'accounts.name as account_name'
-      );
-
+  /**
+   * Apply list filters to a query on `expenses`. Only expenses columns are
+   * referenced, so the same filters work with or without the joins.
+   */
+  static _applyFilters(query, filters = {}) {
     if (filters.accountId) {
-      query = query.andWhere('expenses.account_id', filters.accountId);
+      query.andWhere('expenses.account_id', filters.accountId);
     }
 
     if (filters.categoryId) {
-      query = query.andWhere('expenses.category_id', filters.categoryId);
+      query.andWhere('expenses.category_id', filters.categoryId);
     }
 
     if (filters.merchant) {
-      query = query.andWhere('expenses.merchant', 'ilike', `%${filters.merchant}%`);
+      // Served by the merchant trigram index; wildcards in the input are literal
+      const pattern = filters.merchant.replace(/[\\%_]/g, char => `\\${char}`);
+      query.andWhere('expenses.merchant', 'ilike', `%${pattern}%`);
     }
 
     if (filters.startDate && filters.endDate) {
-      query = query.whereBetween('expenses.expense_date', [filters.startDate, filters.endDate]);
+      query.whereBetween('expenses.expense_date', [filters.startDate, filters.endDate]);
     }
 
     if (filters.minAmount !== undefined && filters.maxAmount !== undefined) {
-      query = query.whereBetween('expenses.amount', [filters.minAmount, filters.maxAmount]);
+      query.whereBetween('expenses.amount', [filters.minAmount, filters.maxAmount]);
     }
 
-    if (filters.tags && Array.isArray(filters.tags)) {
-      query = query.andWhere(function() {
-        filters.tags.forEach(tag => {
-          this.orWhereRaw(`tags::jsonb @> ?`, [JSON.stringify([tag])]);
-        });
-      });
+    if (filters.tags && Array.isArray(filters.tags) && filters.tags.length) {
+      // Any of the tags; `?|` is answered by the GIN index on tags
+      query.whereRaw('expenses.tags \\?| ?::text[]', [filters.tags.map(String)]);
     }
 
+    return query;
+  }
+
+  static _filteredQuery(userId, filters = {}) {
+    const query = db('expenses')
+      .where({ 'expenses.user_id': userId, 'expenses.is_deleted': false })
+      .leftJoin('categories', 'expenses.category_id', 'categories.category_id')
+      .leftJoin('accounts', 'expenses.account_id', 'accounts.account_id')
+      .select(
+        'expenses.*',
+        'categories.name as category_name',
+        'accounts.name as account_name'
+      );
+
+    return this._applyFilters(query, filters);
+  }
+
+  /**
+   * Matching row count without the joins. With `cap`, stops counting after
+   * cap + 1 rows, so a large result set costs no more than a small one.
+   */
+  static _countQuery(userId, filters = {}, cap = null) {
+    const matching = this._applyFilters(
+      db('expenses').where({ 'expenses.user_id': userId, 'expenses.is_deleted': false }),
+      filters
+    );
+
+    if (cap) {
+      return db.from(matching.select(db.raw('1')).limit(cap + 1).as('capped')).count('* as count');
+    }
+    return matching.count('* as count');
+  }
+
+  /**
+   * Every row matching `filters`, newest first, read in keyset pages.
+   */
+  static exportRows(userId, filters = {}) {
+    return keysetRows(
+      () => this._filteredQuery(userId, filters).clearSelect().select(
+        'expenses.expense_id',
+        'expenses.description',
+        'expenses.amount',
+        'expenses.currency',
+        'expenses.merchant',
+        'expenses.expense_date',
+        'expenses.notes',
+        'categories.name as category_name'
+      ),
+      { dateColumn: 'expenses.expense_date', idColumn: 'expenses.expense_id' }
+    );
+  }
+
+  /**
+   * One page of expenses plus the total, in a single round trip: the count
+   * runs as an uncorrelated subquery that Postgres evaluates once.
+   * `filters.count` is 'exact' (default) or 'capped' (stops at COUNT_CAP and
+   * sets total_capped).
+   */
+  static async list(userId, filters = {}) {
     const limit = filters.limit || 20;
     const offset = filters.offset || 0;
+    const cap = filters.count === 'capped' ? COUNT_CAP : null;
 
-    const results = await query
+    const results = await this._filteredQuery(userId, filters)
+      .select(this._countQuery(userId, filters, cap).as('total_count'))
       .orderBy('expenses.expense_date', 'desc')
+      .orderBy('expenses.expense_id', 'desc')
       .limit(limit)
       .offset(offset);
 
-    const countQuery = db('expenses')
-      .where({ 'expenses.user_id': userId, 'expenses.is_deleted': false });
-
-    if (filters.accountId) countQuery.andWhere('expenses.account_id', filters.accountId);
-    if (filters.categoryId) countQuery.andWhere('expenses.category_id', filters.categoryId);
-    if (filters.merchant) countQuery.andWhere('expenses.merchant', 'ilike', `%${filters.merchant}%`);
-    if (filters.startDate && filters.endDate) {
-      countQuery.whereBetween('expenses.expense_date', [filters.startDate, filters.endDate]);
+    let count;
+    if (results.length) {
+      count = Number(results[0].total_count);
+    } else if (offset > 0) {
+      // Paged past the end: no row carried the count
+      [{ count }] = await this._countQuery(userId, filters, cap);
+      count = Number(count);
+    } else {
+      count = 0;
     }
 
-    const [{ count }] = await countQuery.count('* as count');
-
     return {
-      expenses: results.map(e => this._formatExpense(e)),
-      total: parseInt(count),
+      expenses: results.map(({ total_count, ...e }) => this._formatExpense(e)),
+      total: cap ? Math.min(count, cap) : count,
+      total_capped: Boolean(cap) && count > cap,
       limit,
       offset
     };
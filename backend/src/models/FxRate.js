@@ -0,0 +1,80 @@
+const db = require('../config/database');
+const { directory } = require('../config/shards');
+
+// All rates are quoted against PIVOT_CURRENCY; see the fx_rates migration.
+const PIVOT_CURRENCY = 'USD';
+const DEFAULT_BASE_CURRENCY = 'INR';
+const UPSERT_BATCH_SIZE = 1000;
+
+class FxRate {
+  static get PIVOT_CURRENCY() {
+    return PIVOT_CURRENCY;
+  }
+
+  static async upsertMany(rates, source = null) {
+    const now = new Date();
+    const rows = rates.map(rate => ({
+      currency: rate.currency,
+      rate_date: rate.rate_date,
+      rate: rate.rate,
+      source,
+      created_at: now
+    }));
+
+    for (let i = 0; i < rows.length; i += UPSERT_BATCH_SIZE) {
+      await db('fx_rates')
+        .insert(rows.slice(i, i + UPSERT_BATCH_SIZE))
+        .onConflict(['currency', 'rate_date'])
+        .merge(['rate', 'source']);
+    }
+
+    return rows.length;
+  }
+
+  static async getBaseCurrency(userId) {
+    const user = await directory()('users').where({ user_id: userId }).first('currency_preference');
+    return (user && user.currency_preference) || DEFAULT_BASE_CURRENCY;
+  }
+
+  /**
+   * Join the rates needed to convert `table.amount` into `baseCurrency` as of
+   * each row's `dateColumn`. Rows already in the base currency skip the
+   * lookups. Select the result with convertedAmount() on the same table.
+   */
+  static joinRates(query, table, dateColumn, baseCurrency) {
+    const currencyColumn = `${table}.currency`;
+    const rateDateColumn = `${table}.${dateColumn}`;
+
+    return query
+      .joinRaw(
+        `LEFT JOIN LATERAL (
+          SELECT fx_rates.rate FROM fx_rates
+          WHERE ?? <> ? AND fx_rates.currency = ?? AND fx_rates.rate_date <= ??
+          ORDER BY fx_rates.rate_date DESC LIMIT 1
+        ) AS fx_from ON true`,
+        [currencyColumn, baseCurrency, currencyColumn, rateDateColumn]
+      )
+      .joinRaw(
+        `LEFT JOIN LATERAL (
+          SELECT fx_rates.rate FROM fx_rates
+          WHERE ?? <> ? AND fx_rates.currency = ? AND fx_rates.rate_date <= ??
+          ORDER BY fx_rates.rate_date DESC LIMIT 1
+        ) AS fx_to ON true`,
+        [currencyColumn, baseCurrency, baseCurrency, rateDateColumn]
+      );
+  }
+
+  /**
+   * `table.amount` in the base currency, for use inside an aggregate. Amounts
+   * with no known rate are counted unconverted rather than dropped.
+   */
+  static convertedAmount(table, baseCurrency) {
+    const amountColumn = `${table}.amount`;
+    return db.raw(
+      'CASE WHEN COALESCE(??, ?) = ? THEN ?? ELSE COALESCE(?? * fx_to.rate / fx_from.rate, ??) END',
+      [`${table}.currency`, baseCurrency, baseCurrency, amountColumn, amountColumn, amountColumn]
+    );
+  }
+}
+
+module.exports = FxRate;
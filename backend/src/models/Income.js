@@ -1,5 +1,6 @@
 const db = require('../config/database');
 const { v4: uuidv4 } = require('uuid');
+const { keysetRows } = require('../utils/exportStream');
 
 class Income {
   static async create(userId, data) {
@@ -43,7 +44,7 @@ class Income {
     return income ? this._formatIncome(income) : null;
   }
 
-  static async list(userId, filters = {}) {
+  static _filteredQuery(userId, filters = {}) {
     let query = db('income')
       .where({ 'income.user_id': userId, 'income.is_deleted': false })
       .leftJoin('categories', 'income.category_id', 'categories.category_id')
@@ -82,6 +83,32 @@ class Income {
       });
     }
 
+    return query;
+  }
+
+  /**
+   * Every row matching `filters`, newest first, read in keyset pages.
+   */
+  static exportRows(userId, filters = {}) {
+    return keysetRows(
+      () => this._filteredQuery(userId, filters).clearSelect().select(
+        'income.income_id',
+        'income.description',
+        'income.amount',
+        'income.currency',
+        'income.source',
+        'income.income_date',
+        'income.notes',
+        'categories.name as category_name',
+        'accounts.name as account_name'
+      ),
+      { dateColumn: 'income.income_date', idColumn: 'income.income_id' }
+    );
+  }
+
+  static async list(userId, filters = {}) {
+    const query = this._filteredQuery(userId, filters);
+
     const limit = filters.limit || 20;
     const offset = filters.offset || 0;
 
@@ -52,21 +52,24 @@ class Investment {
       query = query.where({ investment_type });
     }
 
-    const investments = await query
+    // The window count rides along with the page, so no second query
+    const rows = await query.clone()
+      .select('investments.*', db.raw('count(*) OVER() as total_count'))
       .orderBy('created_at', 'desc')
       .limit(limit)
       .offset(offset);
 
-    const totalResult = await db('investments')
-      .where({ user_id: userId, is_deleted: false })
-      .count('* as total')
-      .first();
+    let total = rows.length ? Number(rows[0].total_count) : 0;
+    if (!rows.length && offset > 0) {
+      const totalResult = await query.count('* as total').first();
+      total = Number(totalResult.total);
+    }
 
     return {
-      total: totalResult.total,
+      total,
       limit,
       offset,
-      investments
+      investments: rows.map(({ total_count, ...investment }) => investment)
     };
   }
 
@@ -103,26 +106,40 @@ class Investment {
       });
   }
 
-  static async getPortfolioSummary(userId) {
+  /**
+   * Summary and per-holding P&L from one holdings query. `getPrices` receives
+   * the upper-cased symbols held and resolves to a Map of symbol to
+   * { price, price_date }; holdings without a market price keep their stored
+   * current_price.
+   */
+  static async getPortfolioSummary(userId, getPrices = async () => new Map()) {
     const investments = await db('investments')
       .where({ user_id: userId, is_deleted: false })
+      .orderBy('created_at', 'desc')
       .select('*');
 
+    const symbols = [...new Set(investments
+      .filter(inv => inv.symbol)
+      .map(inv => inv.symbol.toUpperCase()))];
+    const prices = await getPrices(symbols);
+
     let totalInvested = 0;
     let totalCurrentValue = 0;
     const byType = {};
 
-    for (const investment of investments) {
-      const invested = investment.quantity * investment.purchase_price;
-      const currentValue = investment.quantity * investment.current_price;
+    const holdings = investments.map(inv => {
+      const quote = inv.symbol ? prices.get(inv.symbol.toUpperCase()) : undefined;
+      const marketPrice = quote ? Number(quote.price) : Number(inv.current_price);
+      const invested = inv.quantity * inv.purchase_price;
+      const currentValue = inv.quantity * marketPrice;
       const gain = currentValue - invested;
 
       totalInvested += invested;
       totalCurrentValue += currentValue;
 
-      if (!byType[investment.investment_type]) {
-        byType[investment.investment_type] = {
-          type: investment.investment_type,
+      if (!byType[inv.investment_type]) {
+        byType[inv.investment_type] = {
+          type: inv.investment_type,
           count: 0,
           invested: 0,
           current_value: 0,
@@ -130,11 +147,21 @@ class Investment {
         };
       }
 
-      byType[investment.investment_type].count += 1;
-      byType[investment.investment_type].invested += invested;
-      byType[investment.investment_type].current_value += currentValue;
-      byType[investment.investment_type].gain += gain;
-    }
+      byType[inv.investment_type].count += 1;
+      byType[inv.investment_type].invested += invested;
+      byType[inv.investment_type].current_value += currentValue;
+      byType[inv.investment_type].gain += gain;
+
+      return {
+        ...inv,
+        market_price: marketPrice,
+        price_date: quote ? quote.price_date : null,
+        invested_value: invested,
+        current_value: currentValue,
+        gain,
+        gain_percentage: invested > 0 ? Math.round((gain / invested) * 100 * 100) / 100 : 0
+      };
+    });
 
     const totalGain = totalCurrentValue - totalInvested;
     const gainPercentage = totalInvested > 0 ? (totalGain / totalInvested) * 100 : 0;
@@ -146,16 +173,57 @@ class Investment {
       gain_percentage: Math.round(gainPercentage * 100) / 100,
       total_investments: investments.length,
       by_type: Object.values(byType),
-      investments: investments.map(inv => ({
-        ...inv,
-        invested_value: inv.quantity * inv.purchase_price,
-        current_value: inv.quantity * inv.current_price,
-        gain: (inv.quantity * inv.current_price) - (inv.quantity * inv.purchase_price),
-        gain_percentage: Math.round((((inv.quantity * inv.current_price) - (inv.quantity * inv.purchase_price)) / (inv.quantity * inv.purchase_price)) * 100 * 100) / 100
-      }))
+      investments: holdings
     };
   }
 
+  static async listHeldSymbols() {
+    const rows = await db('investments')
+      .where({ is_deleted: false })
+      .whereNotNull('symbol')
+      .distinct(db.raw('UPPER(symbol) as symbol'));
+    return rows.map(row => row.symbol);
+  }
+
+  static async maxId() {
+    const row = await db('investments').max('investment_id as max_id').first();
+    return Number(row && row.max_id) || 0;
+  }
+
+  /**
+   * Mark live holdings to market in one statement: set current_price to the
+   * latest security price on or before today. Scoped to one user, or to an
+   * investment_id range for the all-users batch. Returns rows changed.
+   */
+  static async markToMarket({ userId = null, fromId = null, toId = null } = {}) {
+    const result = await db.raw(`
+      WITH batch AS (
+        SELECT investment_id, UPPER(symbol) AS symbol
+        FROM investments
+        WHERE is_deleted = false
+          AND symbol IS NOT NULL
+          AND (?::uuid IS NULL OR user_id = ?::uuid)
+          AND (?::int IS NULL OR investment_id BETWEEN ?::int AND ?::int)
+      ), latest AS (
+        SELECT s.symbol, p.price
+        FROM (SELECT DISTINCT symbol FROM batch) s
+        CROSS JOIN LATERAL (
+          SELECT price FROM security_prices
+          WHERE security_prices.symbol = s.symbol AND price_date <= CURRENT_DATE
+          ORDER BY price_date DESC
+          LIMIT 1
+        ) p
+      )
+      UPDATE investments
+      SET current_price = latest.price, updated_at = NOW()
+      FROM batch
+      JOIN latest ON latest.symbol = batch.symbol
+      WHERE investments.investment_id = batch.investment_id
+        AND investments.current_price IS DISTINCT FROM latest.price
+    `, [userId, userId, fromId, fromId, toId]);
+    return result.rowCount;
+  }
+
   static async getByType(userId, investmentType) {
     return await db('investments')
       .where({ user_id: userId, investment_type: investmentType, is_deleted: false })
@@ -1,6 +1,98 @@
 const db = require('../config/database');
+const FxRate = require('./FxRate');
+
+const DATE_COLUMNS = {
+  expenses: 'expense_date',
+  income: 'income_date'
+};
+
+const toDateString = date => [
+  date.getFullYear(),
+  String(date.getMonth() + 1).padStart(2, '0'),
+  String(date.getDate()).padStart(2, '0')
+].join('-');
 
 class Report {
+  /**
+   * Non-deleted rows of `table` (expenses or income) for a user in a date
+   * range, with the FX rates joined for convertedAmount().
+   */
+  static _periodQuery(table, userId, baseCurrency, startDate, endDate) {
+    const dateColumn = DATE_COLUMNS[table];
+    return FxRate.joinRates(
+      db(table)
+        .where({ [`${table}.user_id`]: userId, [`${table}.is_deleted`]: false })
+        .whereBetween(`${table}.${dateColumn}`, [startDate, endDate]),
+      table, dateColumn, baseCurrency
+    );
+  }
+
+  static async _sumConverted(table, userId, baseCurrency, startDate, endDate, where = null) {
+    const query = this._periodQuery(table, userId, baseCurrency, startDate, endDate);
+    if (where) {
+      query.where(where);
+    }
+
+    const row = await query.first(db.raw('SUM(?) as total', [FxRate.convertedAmount(table, baseCurrency)]));
+    return parseFloat(row.total) || 0;
+  }
+
+  /**
+   * Income and expense totals for every month from startDate to endDate in
+   * one query. generate_series supplies the months so empty ones come back
+   * as zero instead of being missing.
+   */
+  static async _monthlyTotals(userId, baseCurrency, start, end) {
+    // Calendar dates, so the session time zone cannot shift the month range
+    const startDate = toDateString(start);
+    const endDate = toDateString(end);
+
+    const monthlySums = table => this._periodQuery(table, userId, baseCurrency, startDate, endDate)
+      .select(
+        db.raw("date_trunc('month', ??)::date as month", [`${table}.${DATE_COLUMNS[table]}`]),
+        db.raw('SUM(?) as total', [FxRate.convertedAmount(table, baseCurrency)])
+      )
+      .groupByRaw('1');
+
+    const rows = await db
+      .with('months', db.raw(
+        "SELECT generate_series(date_trunc('month', ?::date), date_trunc('month', ?::date), interval '1 month')::date as month",
+        [startDate, endDate]
+      ))
+      .with('expense_totals', monthlySums('expenses'))
+      .with('income_totals', monthlySums('income'))
+      .from('months')
+      .leftJoin('expense_totals', 'expense_totals.month', 'months.month')
+      .leftJoin('income_totals', 'income_totals.month', 'months.month')
+      .select(
+        db.raw("to_char(months.month, 'YYYY-MM') as month"),
+        db.raw('COALESCE(income_totals.total, 0) as income'),
+        db.raw('COALESCE(expense_totals.total, 0) as expenses')
+      )
+      .orderBy('months.month', 'asc');
+
+    return rows.map(row => ({
+      month: row.month,
+      income: parseFloat(row.income) || 0,
+      expenses: parseFloat(row.expenses) || 0
+    }));
+  }
+
+  static _lastMonths(months) {
+    const now = new Date();
+    return {
+      startDate: new Date(now.getFullYear(), now.getMonth() - (months - 1), 1),
+      endDate: new Date(now.getFullYear(), now.getMonth() + 1, 0)
+    };
+  }
+
+  static _expensesByCategory(userId, baseCurrency, startDate, endDate) {
+    return this._periodQuery('expenses', userId, baseCurrency, startDate, endDate)
+      .leftJoin('categories', 'expenses.category_id', 'categories.category_id')
+      .groupBy('categories.category_id', 'categories.name')
+      .orderBy('total', 'desc');
+  }
+
   static async getDashboard(userId, period = 'monthly') {
     const now = new Date();
     let startDate, endDate;
@@ -16,34 +108,20 @@ class Report {
       endDate = now;
     }
 
-    const expenses = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate, endDate])
-      .sum('amount as total')
-      .first();
-
-    const income = await db('income')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('income_date', [startDate, endDate])
-      .sum('amount as total')
-      .first();
-
-    const expensesByCategory = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate, endDate])
-      .leftJoin('categories', 'expenses.category_id', 'categories.category_id')
-      .groupBy('categories.category_id', 'categories.name')
-      .select('categories.name', db.raw('sum(amount) as total'))
-      .orderBy('total', 'desc')
-      .limit(5);
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+
+    const totalExpenses = await this._sumConverted('expenses', userId, baseCurrency, startDate, endDate);
+    const totalIncome = await this._sumConverted('income', userId, baseCurrency, startDate, endDate);
 
-    const totalExpenses = parseFloat(expenses.total) || 0;
-    const totalIncome = parseFloat(income.total) || 0;
+    const expensesByCategory = await this._expensesByCategory(userId, baseCurrency, startDate, endDate)
+      .select('categories.name', db.raw('sum(?) as total', [FxRate.convertedAmount('expenses', baseCurrency)]))
+      .limit(5);
 
     return {
       period,
       startDate,
       endDate,
+      currency: baseCurrency,
       summary: {
         total_income: totalIncome,
         total_expenses: totalExpenses,
@@ -58,53 +136,37 @@ class Report {
   }
 
   static async getTrends(userId, months = 12) {
-    const now = new Date();
-    const trends = [];
-
-    for (let i = months - 1; i >= 0; i--) {
-      const monthStart = new Date(now.getFullYear(), now.getMonth() - i, 1);
-      const monthEnd = new Date(now.getFullYear(), now.getMonth() - i + 1, 0);
-
-      const expenses = await db('expenses')
-        .where({ user_id: userId, is_deleted: false })
-        .whereBetween('expense_date', [monthStart, monthEnd])
-        .sum('amount as total')
-        .first();
-
-      const income = await db('income')
-        .where({ user_id: userId, is_deleted: false })
-        .whereBetween('income_date', [monthStart, monthEnd])
-        .sum('amount as total')
-        .first();
-
-      trends.push({
-        month: monthStart.toISOString().substring(0, 7),
-        income: parseFloat(income.total) || 0,
-        expenses: parseFloat(expenses.total) || 0,
-        net: (parseFloat(income.total) || 0) - (parseFloat(expenses.total) || 0)
-      });
-    }
+    const { startDate, endDate } = this._lastMonths(months);
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+    const totals = await this._monthlyTotals(userId, baseCurrency, startDate, endDate);
 
     return {
       period: `${months} months`,
-      trends
+      currency: baseCurrency,
+      trends: totals.map(({ month, income, expenses }) => ({
+        month,
+        income,
+        expenses,
+        net: income - expenses
+      }))
     };
   }
 
   static async getCategorySpending(userId, startDate, endDate) {
-    const spending = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate, endDate])
-      .leftJoin('categories', 'expenses.category_id', 'categories.category_id')
-      .groupBy('categories.category_id', 'categories.name')
-      .select('categories.name', db.raw('sum(amount) as total'), db.raw('count(*) as count'))
-      .orderBy('total', 'desc');
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+    const spending = await this._expensesByCategory(userId, baseCurrency, startDate, endDate)
+      .select(
+        'categories.name',
+        db.raw('sum(?) as total', [FxRate.convertedAmount('expenses', baseCurrency)]),
+        db.raw('count(*) as count')
+      );
 
     const total = spending.reduce((sum, item) => sum + parseFloat(item.total), 0);
 
     return {
       startDate,
       endDate,
+      currency: baseCurrency,
       total,
       categories: spending.map(item => ({
         category: item.name,
@@ -118,25 +180,15 @@ class Report {
   static async getMonthlyReport(userId, year, month) {
     const startDate = new Date(year, month - 1, 1);
     const endDate = new Date(year, month, 0);
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
 
-    const expenses = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate, endDate])
-      .sum('amount as total')
-      .first();
-
-    const income = await db('income')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('income_date', [startDate, endDate])
-      .sum('amount as total')
-      .first();
-
-    const expensesByCategory = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate, endDate])
+    const expenses = await this._sumConverted('expenses', userId, baseCurrency, startDate, endDate);
+    const income = await this._sumConverted('income', userId, baseCurrency, startDate, endDate);
+
+    const expensesByCategory = await this._periodQuery('expenses', userId, baseCurrency, startDate, endDate)
       .leftJoin('categories', 'expenses.category_id', 'categories.category_id')
       .groupBy('categories.name')
-      .select('categories.name', db.raw('sum(amount) as total'))
+      .select('categories.name', db.raw('sum(?) as total', [FxRate.convertedAmount('expenses', baseCurrency)]))
       .orderBy('total', 'desc');
 
     return {
@@ -144,9 +196,10 @@ class Report {
       month,
       startDate,
       endDate,
-      income: parseFloat(income.total) || 0,
-      expenses: parseFloat(expenses.total) || 0,
-      net: (parseFloat(income.total) || 0) - (parseFloat(expenses.total) || 0),
+      currency: baseCurrency,
+      income,
+      expenses,
+      net: income - expenses,
       expenses_by_category: expensesByCategory.map(item => ({
         category: item.name,
         amount: parseFloat(item.total)
@@ -157,50 +210,26 @@ class Report {
   static async getAnnualReport(userId, year) {
     const startDate = new Date(year, 0, 1);
     const endDate = new Date(year, 11, 31);
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
 
-    const totalExpenses = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate, endDate])
-      .sum('amount as total')
-      .first();
-
-    const totalIncome = await db('income')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('income_date', [startDate, endDate])
-      .sum('amount as total')
-      .first();
-
-    const monthlyData = [];
-    for (let month = 1; month <= 12; month++) {
-      const monthStart = new Date(year, month - 1, 1);
-      const monthEnd = new Date(year, month, 0);
-
-      const monthExp = await db('expenses')
-        .where({ user_id: userId, is_deleted: false })
-        .whereBetween('expense_date', [monthStart, monthEnd])
-        .sum('amount as total')
-        .first();
-
-      const monthInc = await db('income')
-        .where({ user_id: userId, is_deleted: false })
-        .whereBetween('income_date', [monthStart, monthEnd])
-        .sum('amount as total')
-        .first();
-
-      monthlyData.push({
-        month,
-        income: parseFloat(monthInc.total) || 0,
-        expenses: parseFloat(monthExp.total) || 0
-      });
-    }
+    const totalExpenses = await this._sumConverted('expenses', userId, baseCurrency, startDate, endDate);
+    const totalIncome = await this._sumConverted('income', userId, baseCurrency, startDate, endDate);
+
+    const monthlyData = (await this._monthlyTotals(userId, baseCurrency, startDate, endDate))
+      .map(({ income, expenses }, index) => ({
+        month: index + 1,
+        income,
+        expenses
+      }));
 
     return {
       year,
       startDate,
       endDate,
-      total_income: parseFloat(totalIncome.total) || 0,
-      total_expenses: parseFloat(totalExpenses.total) || 0,
-      net: (parseFloat(totalIncome.total) || 0) - (parseFloat(totalExpenses.total) || 0),
+      currency: baseCurrency,
+      total_income: totalIncome,
+      total_expenses: totalExpenses,
+      net: totalIncome - totalExpenses,
       monthly_breakdown: monthlyData
     };
   }
@@ -210,22 +239,26 @@ class Report {
       .where({ user_id: userId, is_deleted: false, is_active: true })
       .select('*');
 
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
     const progress = [];
 
     for (const budget of budgets) {
-      const spent = await db('expenses')
-        .where({ user_id: userId, category_id: budget.category_id, is_deleted: false })
-        .whereBetween('expense_date', [budget.start_date, budget.end_date || new Date()])
-        .sum('amount as total')
-        .first();
-
-      const spentAmount = parseFloat(spent.total) || 0;
+      // Spending is measured in the budget's own currency
+      const spentAmount = await this._sumConverted(
+        'expenses',
+        userId,
+        budget.currency || baseCurrency,
+        budget.start_date,
+        budget.end_date || new Date(),
+        { 'expenses.category_id': budget.category_id }
+      );
       const budgetAmount = parseFloat(budget.amount);
       const percentageUsed = (spentAmount / budgetAmount) * 100;
 
       progress.push({
         budget_id: budget.budget_id,
         name: budget.name,
+        currency: budget.currency || baseCurrency,
         target_amount: budgetAmount,
         spent_amount: spentAmount,
         remaining_amount: budgetAmount - spentAmount,
@@ -243,69 +276,31 @@ class Report {
   }
 
   static async getIncomeVsExpense(userId, months = 12) {
-    const now = new Date();
-    const data = [];
-
-    for (let i = months - 1; i >= 0; i--) {
-      const monthStart = new Date(now.getFullYear(), now.getMonth() - i, 1);
-      const monthEnd = new Date(now.getFullYear(), now.getMonth() - i + 1, 0);
-
-      const expenses = await db('expenses')
-        .where({ user_id: userId, is_deleted: false })
-        .whereBetween('expense_date', [monthStart, monthEnd])
-        .sum('amount as total')
-        .first();
-
-      const income = await db('income')
-        .where({ user_id: userId, is_deleted: false })
-        .whereBetween('income_date', [monthStart, monthEnd])
-        .sum('amount as total')
-        .first();
-
-      data.push({
-        period: monthStart.toISOString().substring(0, 7),
-        income: parseFloat(income.total) || 0,
-        expenses: parseFloat(expenses.total) || 0
-      });
-    }
+    const { startDate, endDate } = this._lastMonths(months);
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+    const totals = await this._monthlyTotals(userId, baseCurrency, startDate, endDate);
 
     return {
       months,
-      data
+      currency: baseCurrency,
+      data: totals.map(({ month, income, expenses }) => ({
+        period: month,
+        income,
+        expenses
+      }))
     };
   }
 
   static async getComparison(userId, startDate1, endDate1, startDate2, endDate2) {
-    const period1Expenses = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate1, endDate1])
-      .sum('amount as total')
-      .first();
-
-    const period1Income = await db('income')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('income_date', [startDate1, endDate1])
-      .sum('amount as total')
-      .first();
-
-    const period2Expenses = await db('expenses')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('expense_date', [startDate2, endDate2])
-      .sum('amount as total')
-      .first();
-
-    const period2Income = await db('income')
-      .where({ user_id: userId, is_deleted: false })
-      .whereBetween('income_date', [startDate2, endDate2])
-      .sum('amount as total')
-      .first();
-
-    const p1Exp = parseFloat(period1Expenses.total) || 0;
-    const p1Inc = parseFloat(period1Income.total) || 0;
-    const p2Exp = parseFloat(period2Expenses.total) || 0;
-    const p2Inc = parseFloat(period2Income.total) || 0;
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+
+    const p1Exp = await this._sumConverted('expenses', userId, baseCurrency, startDate1, endDate1);
+    const p1Inc = await this._sumConverted('income', userId, baseCurrency, startDate1, endDate1);
+    const p2Exp = await this._sumConverted('expenses', userId, baseCurrency, startDate2, endDate2);
+    const p2Inc = await this._sumConverted('income', userId, baseCurrency, startDate2, endDate2);
 
     return {
+      currency: baseCurrency,
       period1: {
         startDate: startDate1,
         endDate: endDate1,
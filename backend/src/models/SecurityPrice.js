@@ -0,0 +1,49 @@
+const db = require('../config/database');
+
+const UPSERT_BATCH_SIZE = 1000;
+
+class SecurityPrice {
+  static async upsertMany(prices, source = null) {
+    const now = new Date();
+    const rows = prices.map(price => ({
+      symbol: price.symbol,
+      price_date: price.price_date,
+      price: price.price,
+      source,
+      created_at: now
+    }));
+
+    for (let i = 0; i < rows.length; i += UPSERT_BATCH_SIZE) {
+      await db('security_prices')
+        .insert(rows.slice(i, i + UPSERT_BATCH_SIZE))
+        .onConflict(['symbol', 'price_date'])
+        .merge(['price', 'source']);
+    }
+
+    return rows.length;
+  }
+
+  /**
+   * Latest price on or before today for each symbol, one index probe per
+   * symbol on the (symbol, price_date) primary key.
+   */
+  static async latestForSymbols(symbols) {
+    if (symbols.length === 0) {
+      return [];
+    }
+
+    const result = await db.raw(`
+      SELECT s.symbol, p.price, to_char(p.price_date, 'YYYY-MM-DD') AS price_date
+      FROM unnest(?::text[]) AS s(symbol)
+      CROSS JOIN LATERAL (
+        SELECT price, price_date FROM security_prices
+        WHERE security_prices.symbol = s.symbol AND price_date <= CURRENT_DATE
+        ORDER BY price_date DESC
+        LIMIT 1
+      ) p
+    `, [symbols]);
+    return result.rows;
+  }
+}
+
+module.exports = SecurityPrice;
@@ -0,0 +1,109 @@
+const db = require('../config/database');
+const Account = require('./Account');
+
+const partitionChanges = (rows, idColumn, isFullSync) => {
+  const updated = [];
+  const deleted = [];
+
+  rows.forEach(row => {
+    if (row.is_deleted) {
+      if (!isFullSync) {
+        deleted.push(String(row[idColumn]));
+      }
+    } else {
+      updated.push(row);
+    }
+  });
+
+  return { updated, deleted };
+};
+
+class Sync {
+  /**
+   * Collect every synced entity written at or after the given watermark.
+   *
+   * Runs in one REPEATABLE READ snapshot. The returned watermark is the xmin of
+   * that snapshot, so writes still in flight are picked up by the next call.
+   * A null watermark returns a full snapshot without deleted rows.
+   */
+  static async getChanges(userId, since = null) {
+    const isFullSync = since === null;
+
+    return db.transaction(async trx => {
+      const snapshot = await trx.raw('SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS watermark');
+      const watermark = snapshot.rows[0].watermark;
+
+      const changedSince = query => (isFullSync ? query : query.andWhere('change_seq', '>=', since));
+
+      // Ledger deltas change a balance without touching the account row
+      const accounts = await trx('accounts')
+        .select('accounts.*', Account.balanceColumn())
+        .where({ user_id: userId })
+        .modify(query => {
+          if (!isFullSync) {
+            query.andWhere(builder => builder
+              .where('change_seq', '>=', since)
+              .orWhereIn('account_id', trx('account_balance_deltas')
+                .select('account_id')
+                .where({ user_id: userId })
+                .andWhere('change_seq', '>=', since)));
+          }
+        })
+        .orderBy('change_seq', 'asc');
+
+      const transactions = await changedSince(
+        trx('transactions')
+          .where({ user_id: userId })
+          .modify(query => {
+            if (isFullSync) query.andWhere({ is_deleted: false });
+          })
+      ).orderBy('change_seq', 'asc');
+
+      const categories = await changedSince(
+        trx('categories')
+          .where(builder => {
+            builder.where({ user_id: userId }).orWhere({ is_system: true });
+          })
+          .modify(query => {
+            if (isFullSync) query.andWhere({ is_deleted: false });
+          })
+      ).orderBy('change_seq', 'asc');
+
+      const budgets = await changedSince(
+        trx('budgets')
+          .where({ user_id: userId })
+          .modify(query => {
+            if (isFullSync) query.andWhere({ is_deleted: false });
+          })
+      ).orderBy('change_seq', 'asc');
+
+      const settings = await changedSince(
+        trx('user_settings').where({ user_id: userId })
+      ).first();
+
+      const tombstones = isFullSync
+        ? []
+        : await trx('sync_tombstones')
+          .where({ user_id: userId })
+          .andWhere('change_seq', '>=', since)
+          .select('entity_type', 'entity_id');
+
+      const accountChanges = partitionChanges(accounts, 'account_id', isFullSync);
+      tombstones
+        .filter(tombstone => tombstone.entity_type === 'account')
+        .forEach(tombstone => accountChanges.deleted.push(tombstone.entity_id));
+
+      return {
+        watermark,
+        full: isFullSync,
+        accounts: accountChanges,
+        transactions: partitionChanges(transactions, 'transaction_id', isFullSync),
+        categories: partitionChanges(categories, 'category_id', isFullSync),
+        budgets: partitionChanges(budgets, 'budget_id', isFullSync),
+        settings: settings || null
+      };
+    }, { isolationLevel: 'repeatable read' });
+  }
+}
+
+module.exports = Sync;
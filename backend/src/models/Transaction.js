@@ -1,5 +1,10 @@
 const db = require('../config/database');
 const { v4: uuidv4 } = require('uuid');
+const { keysetRows } = require('../utils/exportStream');
+
+const SEARCH_DOCUMENT = 'transaction_search_document(transactions.description, transactions.merchant, transactions.notes, transactions.tags)';
+const SEARCH_TEXT = 'transaction_search_text(transactions.description, transactions.merchant, transactions.notes, transactions.tags)';
+const SEARCH_WORD_SIMILARITY = 0.4;
 
 class Transaction {
   static async create(userId, data) {
@@ -40,7 +45,7 @@ class Transaction {
       .update({ is_deleted: true, updated_at: new Date() });
   }
 
-  static async list(userId, filters = {}) {
+  static _filteredQuery(userId, filters = {}) {
     let query = db('transactions')
       .where({ 'transactions.user_id': userId, 'transactions.is_deleted': false })
       .leftJoin('categories', 'transactions.category_id', 'categories.category_id')
@@ -68,11 +73,85 @@ class Transaction {
       query = query.whereBetween('transactions.transaction_date', [filters.startDate, filters.endDate]);
     }
 
+    return query;
+  }
+
+  /**
+   * Every row matching `filters`, newest first, read in keyset pages.
+   */
+  static exportRows(userId, filters = {}) {
+    return keysetRows(
+      () => this._filteredQuery(userId, filters).clearSelect().select(
+        'transactions.transaction_id',
+        'transactions.transaction_date',
+        'transactions.transaction_type',
+        'transactions.amount',
+        'transactions.currency',
+        'transactions.description',
+        'transactions.merchant',
+        'transactions.notes',
+        'categories.name as category_name',
+        'accounts.name as account_name'
+      ),
+      { dateColumn: 'transactions.transaction_date', idColumn: 'transactions.transaction_id' }
+    );
+  }
+
+  static async list(userId, filters = {}) {
+    const query = this._filteredQuery(userId, filters);
+
     return query
       .orderBy('transactions.transaction_date', 'desc')
       .limit(filters.limit || 100)
       .offset(filters.offset || 0);
   }
+
+  /**
+   * Ranked full-text plus trigram search over description, merchant, notes
+   * and tags. The expressions must match the search indexes exactly.
+   */
+  static async search(userId, searchText, filters = {}) {
+    return db.transaction(async trx => {
+      // Looser than the 0.6 default so single-word typos still match
+      await trx.raw("SELECT set_config('pg_trgm.word_similarity_threshold', ?, true)", [String(SEARCH_WORD_SIMILARITY)]);
+
+      let query = trx('transactions')
+        .where({ 'transactions.user_id': userId, 'transactions.is_deleted': false })
+        .andWhere(builder => builder
+          .whereRaw(`${SEARCH_DOCUMENT} @@ websearch_to_tsquery('simple', ?)`, [searchText])
+          .orWhereRaw(`? <% ${SEARCH_TEXT}`, [searchText]))
+        .leftJoin('categories', 'transactions.category_id', 'categories.category_id')
+        .leftJoin('accounts', 'transactions.account_id', 'accounts.account_id')
+        .select(
+          'transactions.*',
+          'categories.name as category_name',
+          'categories.category_type',
+          'accounts.name as account_name',
+          trx.raw(
+            `ts_rank(${SEARCH_DOCUMENT}, websearch_to_tsquery('simple', ?)) + word_similarity(?, ${SEARCH_TEXT}) as search_rank`,
+            [searchText, searchText]
+          )
+        );
+
+      if (filters.accountId) {
+        query = query.andWhere('transactions.account_id', filters.accountId);
+      }
+
+      if (filters.type) {
+        query = query.andWhere('transactions.transaction_type', filters.type);
+      }
+
+      if (filters.startDate && filters.endDate) {
+        query = query.whereBetween('transactions.transaction_date', [filters.startDate, filters.endDate]);
+      }
+
+      return query
+        .orderBy('search_rank', 'desc')
+        .orderBy('transactions.transaction_date', 'desc')
+        .limit(filters.limit || 50)
+        .offset(filters.offset || 0);
+    });
+  }
 }
 
 module.exports = Transaction;
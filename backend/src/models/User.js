@@ -1,4 +1,4 @@
-const db = require('../config/database');
+const { directory, assignShard } = require('../config/shards');
 const bcrypt = require('bcryptjs');
 const crypto = require('crypto');
 const { v4: uuidv4 } = require('uuid');
@@ -25,20 +25,21 @@ class User {
       updated_at: new Date()
     };
 
-    const result = await db('users').insert(userRecord).returning('*');
+    const result = await directory()('users').insert(userRecord).returning('*');
+    await assignShard(userRecord.user_id);
     return result[0];
   }
 
   static async findByEmail(email) {
-    return await db('users').where({ email }).first();
+    return await directory()('users').where({ email }).first();
   }
 
   static async findByPhone(phoneNumber) {
-    return await db('users').where({ phone_number: phoneNumber }).first();
+    return await directory()('users').where({ phone_number: phoneNumber }).first();
   }
 
   static async findById(userId) {
-    return await db('users').where({ user_id: userId }).first();
+    return await directory()('users').where({ user_id: userId }).first();
   }
 
   static async verifyPassword(plainPassword, hashedPassword) {
@@ -46,7 +47,7 @@ class User {
   }
 
   static async updateLastLogin(userId, deviceId) {
-    return await db('users')
+    return await directory()('users')
       .where({ user_id: userId })
       .update({
         last_login_at: new Date(),
@@ -57,10 +58,10 @@ class User {
   }
 
   static async incrementLoginAttempt(userId) {
-    return await db('users')
+    return await directory()('users')
       .where({ user_id: userId })
       .update({
-        login_attempt_count: db.raw('login_attempt_count + 1'),
+        login_attempt_count: directory().raw('login_attempt_count + 1'),
         login_attempt_last_at: new Date(),
         updated_at: new Date()
       });
@@ -88,7 +89,7 @@ class User {
   }
 
   static async resetLoginAttempts(userId) {
-    return await db('users')
+    return await directory()('users')
       .where({ user_id: userId })
       .update({
         login_attempt_count: 0,
@@ -101,7 +102,7 @@ class User {
       .createCipher('aes-256-gcm', process.env.ENCRYPTION_KEY)
       .update(secret, 'utf8', 'hex');
 
-    return await db('users')
+    return await directory()('users')
       .where({ user_id: userId })
       .update({
         mfa_secret: encrypted,
@@ -122,7 +123,7 @@ class User {
   }
 
   static async setPhoneVerified(userId) {
-    return await db('users')
+    return await directory()('users')
       .where({ user_id: userId })
       .update({ phone_verified: true, updated_at: new Date() });
   }
@@ -1,11 +1,30 @@
 const express = require('express');
-const { body, validationResult, param } = require('express-validator');
+const { body, validationResult, param, query } = require('express-validator');
 const AccountController = require('../controllers/AccountController');
 
 const router = express.Router();
 
 router.get('/', AccountController.listAccounts);
 
+router.get('/net-worth', [
+  query('from').optional().isISO8601(),
+  query('to').optional().isISO8601()
+], (req, res, next) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) return res.status(400).json({ errors: errors.array() });
+  next();
+}, AccountController.getNetWorth);
+
+router.get('/:accountId/balance-history', [
+  param('accountId').isUUID(),
+  query('from').optional().isISO8601(),
+  query('to').optional().isISO8601()
+], (req, res, next) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) return res.status(400).json({ errors: errors.array() });
+  next();
+}, AccountController.getBalanceHistory);
+
 router.post('/', [
   body('name').isString().isLength({ min: 1 }),
   body('account_type').isIn(['cash', 'bank', 'credit_card', 'investment', 'savings']),
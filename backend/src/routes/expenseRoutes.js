@@ -1,6 +1,7 @@
 const express = require('express');
 const { body, query, param, validationResult } = require('express-validator');
 const ExpenseController = require('../controllers/ExpenseController');
+const { EXPORT_FORMATS } = require('../utils/exportStream');
 
 const router = express.Router();
 
@@ -35,6 +36,7 @@ router.get('/', [
   query('minAmount').optional().isFloat({ ge: 0 }),
   query('maxAmount').optional().isFloat({ ge: 0 }),
   query('tags').optional(),
+  query('count').optional().isIn(['exact', 'capped']),
   query('limit').optional().isInt({ min: 1, max: 100 }),
   query('offset').optional().isInt({ min: 0 })
 ], validationErrorHandler, ExpenseController.listExpenses);
@@ -47,7 +49,11 @@ router.get('/statistics', [
 
 // GET /api/v1/expenses/export - Export expenses (must come before /{id})
 router.get('/export', [
-  query('format').optional().isIn(['csv', 'pdf']).withMessage('Format must be csv or pdf'),
+  query('format').optional().isIn(EXPORT_FORMATS).withMessage('Format must be csv or ndjson'),
+  query('gzip').optional().isIn(['true', 'false']),
+  query('accountId').optional().isString(),
+  query('categoryId').optional().isString(),
+  query('merchant').optional().isString(),
   query('startDate').optional().isISO8601(),
   query('endDate').optional().isISO8601()
 ], validationErrorHandler, ExpenseController.exportExpenses);
@@ -62,6 +68,7 @@ router.get('/filter', [
   query('minAmount').optional().isFloat({ ge: 0 }),
   query('maxAmount').optional().isFloat({ ge: 0 }),
   query('tags').optional(),
+  query('count').optional().isIn(['exact', 'capped']),
   query('limit').optional().isInt({ min: 1, max: 100 }),
   query('offset').optional().isInt({ min: 0 })
 ], validationErrorHandler, ExpenseController.filterExpenses);
@@ -0,0 +1,16 @@
+const express = require('express');
+const { query, validationResult } = require('express-validator');
+const HomeController = require('../controllers/HomeController');
+
+const router = express.Router();
+
+router.get('/', [
+  query('period').optional().isIn(['week', 'month', 'year']),
+  query('recentLimit').optional().isInt({ min: 1, max: 50 }).toInt()
+], (req, res, next) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) return res.status(400).json({ errors: errors.array() });
+  next();
+}, HomeController.getHome);
+
+module.exports = router;
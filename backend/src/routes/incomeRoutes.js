@@ -1,6 +1,7 @@
 const express = require('express');
 const { body, query, param, validationResult } = require('express-validator');
 const IncomeController = require('../controllers/IncomeController');
+const { EXPORT_FORMATS } = require('../utils/exportStream');
 
 const router = express.Router();
 
@@ -44,6 +45,17 @@ router.get('/statistics', [
   query('endDate').notEmpty().isISO8601().withMessage('End date is required')
 ], validationErrorHandler, IncomeController.getStatistics);
 
+// GET /api/v1/income/export - Export income (must come before /{id})
+router.get('/export', [
+  query('format').optional().isIn(EXPORT_FORMATS).withMessage('Format must be csv or ndjson'),
+  query('gzip').optional().isIn(['true', 'false']),
+  query('accountId').optional().isString(),
+  query('categoryId').optional().isString(),
+  query('source').optional().isString(),
+  query('startDate').optional().isISO8601(),
+  query('endDate').optional().isISO8601()
+], validationErrorHandler, IncomeController.exportIncome);
+
 // GET /api/v1/income/{id} - Get single income
 router.get('/:id', [
   param('id').isString().withMessage('Income ID must be a string')
@@ -0,0 +1,136 @@
+/**
+ * Profiling API Routes
+ *
+ * Admin endpoints for:
+ *   - Capturing a time-boxed CPU profile or a heap snapshot
+ *   - Listing and downloading stored captures
+ *   - Starting/stopping continuous sampling and reading its flame graph
+ */
+
+const express = require('express');
+
+/**
+ * Initialize routes with the profiling service
+ */
+function initializeRoutes(profilingService) {
+  const router = express.Router();
+
+  const sendError = (res, error) => res.status(error.statusCode || 500).json({
+    success: false,
+    error: error.message
+  });
+
+  /**
+   * POST /api/admin/profiling/cpu-profile
+   * Profile the process for `durationMs` (100 - 60000, default 10000)
+   */
+  router.post('/cpu-profile', async (req, res) => {
+    try {
+      const capture = await profilingService.captureCpuProfile({
+        durationMs: req.body?.durationMs
+      });
+      res.status(201).json({
+        success: true,
+        data: capture,
+        timestamp: new Date().toISOString()
+      });
+    } catch (error) {
+      sendError(res, error);
+    }
+  });
+
+  /**
+   * POST /api/admin/profiling/heap-snapshot
+   * Write a heap snapshot (pauses the process while it is taken)
+   */
+  router.post('/heap-snapshot', async (req, res) => {
+    try {
+      const capture = await profilingService.captureHeapSnapshot();
+      res.status(201).json({
+        success: true,
+        data: capture,
+        timestamp: new Date().toISOString()
+      });
+    } catch (error) {
+      sendError(res, error);
+    }
+  });
+
+  /**
+   * GET /api/admin/profiling/captures
+   * List stored captures, newest first
+   */
+  router.get('/captures', async (req, res) => {
+    try {
+      const captures = await profilingService.listCaptures();
+      res.json({
+        success: true,
+        data: captures,
+        count: captures.length,
+        timestamp: new Date().toISOString()
+      });
+    } catch (error) {
+      sendError(res, error);
+    }
+  });
+
+  /**
+   * GET /api/admin/profiling/captures/:name
+   * Download a capture
+   */
+  router.get('/captures/:name', (req, res) => {
+    const filePath = profilingService.resolveCapture(req.params.name);
+    if (!filePath) {
+      return res.status(404).json({
+        success: false,
+        error: 'Capture not found'
+      });
+    }
+    res.download(filePath);
+  });
+
+  /**
+   * POST /api/admin/profiling/sampling/start
+   * Enable continuous sampling, keeping the last `windowMinutes` (default 10)
+   */
+  router.post('/sampling/start', (req, res) => {
+    const status = profilingService.startSampling({
+      windowMinutes: parseInt(req.body?.windowMinutes) || undefined
+    });
+    res.json({ success: true, data: status });
+  });
+
+  /**
+   * POST /api/admin/profiling/sampling/stop
+   */
+  router.post('/sampling/stop', (req, res) => {
+    res.json({ success: true, data: profilingService.stopSampling() });
+  });
+
+  /**
+   * GET /api/admin/profiling/sampling
+   * Continuous sampling status
+   */
+  router.get('/sampling', (req, res) => {
+    res.json({ success: true, data: profilingService.getSamplingStatus() });
+  });
+
+  /**
+   * GET /api/admin/profiling/sampling/flamegraph
+   * Collapsed stacks for the retained window (flamegraph.pl / speedscope)
+   */
+  router.get('/sampling/flamegraph', (req, res) => {
+    const flameGraph = profilingService.getFlameGraph();
+    if (flameGraph === null) {
+      return res.status(409).json({
+        success: false,
+        error: 'Continuous sampling is not enabled'
+      });
+    }
+    res.type('text/plain').send(flameGraph);
+  });
+
+  return router;
+}
+
+module.exports = initializeRoutes;
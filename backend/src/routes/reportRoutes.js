@@ -1,5 +1,5 @@
 const express = require('express');
-const { query } = require('express-validator');
+const { query, param } = require('express-validator');
 const authMiddleware = require('../middleware/authMiddleware');
 const ReportController = require('../controllers/ReportController');
 
@@ -127,4 +127,16 @@ router.get(
   ReportController.getComparison
 );
 
+// GET /api/v1/reports/jobs/:jobId
+router.get(
+  '/jobs/:jobId',
+  [
+    param('jobId')
+      .isHexadecimal()
+      .isLength({ min: 32, max: 32 })
+      .withMessage('Job ID must be a report job ID')
+  ],
+  ReportController.getReportJob
+);
+
 module.exports = router;
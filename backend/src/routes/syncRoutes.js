@@ -0,0 +1,16 @@
+const express = require('express');
+const { query, validationResult } = require('express-validator');
+const SyncController = require('../controllers/SyncController');
+
+const router = express.Router();
+
+// GET /api/v1/sync?since=<watermark>
+router.get('/', [
+  query('since').optional().matches(/^\d+$/).withMessage('since must be a watermark returned by a previous sync')
+], (req, res, next) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) return res.status(400).json({ errors: errors.array() });
+  next();
+}, SyncController.getChanges);
+
+module.exports = router;
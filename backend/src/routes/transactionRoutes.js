@@ -1,6 +1,7 @@
 const express = require('express');
 const { body, validationResult, query, param } = require('express-validator');
 const TransactionController = require('../controllers/TransactionController');
+const { EXPORT_FORMATS } = require('../utils/exportStream');
 
 const router = express.Router();
 
@@ -18,6 +19,34 @@ router.get('/', [
   next();
 }, TransactionController.getTransactions);
 
+router.get('/search', [
+  query('q').isString().trim().isLength({ min: 2, max: 200 }),
+  query('accountId').optional().isUUID(),
+  query('type').optional().isIn(['income', 'expense', 'transfer']),
+  query('startDate').optional().isISO8601().toDate(),
+  query('endDate').optional().isISO8601().toDate(),
+  query('limit').optional().isInt({ min: 1, max: 100 }).toInt(),
+  query('offset').optional().isInt({ min: 0 }).toInt()
+], (req, res, next) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) return res.status(400).json({ errors: errors.array() });
+  next();
+}, TransactionController.searchTransactions);
+
+router.get('/export', [
+  query('format').optional().isIn(EXPORT_FORMATS),
+  query('gzip').optional().isBoolean().toBoolean(),
+  query('accountId').optional().isUUID(),
+  query('categoryId').optional().isUUID(),
+  query('type').optional().isIn(['income', 'expense', 'transfer']),
+  query('startDate').optional().isISO8601().toDate(),
+  query('endDate').optional().isISO8601().toDate()
+], (req, res, next) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) return res.status(400).json({ errors: errors.array() });
+  next();
+}, TransactionController.exportTransactions);
+
 router.post('/', [
   body('accountId').isUUID(),
   body('amount').isFloat({ gt: 0 }),
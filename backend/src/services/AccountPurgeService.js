@@ -0,0 +1,349 @@
+/**
+ * Account Purge Service
+ *
+ * Deletes a deleted user's data in the background. UserService.deleteAccount
+ * only queues a row in account_purges; src/workers/purgeWorker.js claims it
+ * and removes the user's rows table by table, children before parents.
+ *
+ * Every batch is its own short transaction deleting at most `batchSize` rows
+ * by ctid, with lock_timeout set, so no statement holds row locks for more
+ * than a few milliseconds and concurrent writers never queue behind a purge.
+ * The batch size adapts to keep each batch near `targetBatchMs`, and the
+ * worker sleeps `batchDelayMs` between batches so purges never saturate I/O
+ * or WAL. Progress is written after every batch, so a purge interrupted part
+ * way resumes at the table it was on. Rows deleted per table are kept in
+ * deleted_by_table across those restarts, and tables that lost many rows in
+ * total are vacuumed afterwards, so their space and index pages are reused instead of
+ * growing the files. The lease is extended before each VACUUM, which can run
+ * far longer than a batch. Finally the users row is anonymised; it stays as
+ * the anchor for audit_logs and data_access_requests.
+ *
+ * account_purges rows are never removed: they are the record of deleted
+ * user_ids that scripts/analytics_export.py drops from its Parquet dataset.
+ */
+
+const db = require('../config/database');
+const { directory, getShardRouter, runForUser } = require('../config/shards');
+const logger = require('../utils/logger');
+
+// Delete order respects foreign keys without relying on ON DELETE CASCADE,
+// which would remove a whole account's rows in one statement.
+// sync_tombstones goes last because deleting accounts writes tombstones.
+const PURGE_TABLES = [
+  { table: 'account_balance_deltas' },
+  { table: 'account_snapshot_invalidations' },
+  { table: 'account_balance_snapshots' },
+  { table: 'transactions' },
+  { table: 'bank_transactions' },
+  { table: 'expenses' },
+  { table: 'income' },
+  { table: 'recurring_transactions' },
+  { table: 'budgets' },
+  { table: 'goals' },
+  { table: 'investments' },
+  { table: 'notifications' },
+  { table: 'notification_preferences' },
+  { table: 'data_exports' },
+  { table: 'bank_accounts' },
+  { table: 'accounts' },
+  { table: 'categories' },
+  { table: 'user_settings' },
+  { table: 'security_settings' },
+  { table: 'sync_tombstones' },
+  { table: 'devices', directory: true }
+];
+
+// Postgres lock_not_available / query_canceled (lock or statement timeout)
+const RETRYABLE_CODES = new Set(['55P03', '57014']);
+const MAX_BATCH_RETRIES = 10;
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+class AccountPurgeService {
+  constructor(options = {}) {
+    this.batchSize = options.batchSize || parseInt(process.env.PURGE_BATCH_SIZE) || 500;
+    this.minBatchSize = options.minBatchSize || 50;
+    this.maxBatchSize = options.maxBatchSize || parseInt(process.env.PURGE_MAX_BATCH_SIZE) || 5000;
+    this.targetBatchMs = options.targetBatchMs || parseInt(process.env.PURGE_TARGET_BATCH_MS) || 50;
+    this.batchDelayMs = options.batchDelayMs !== undefined
+      ? options.batchDelayMs
+      : parseInt(process.env.PURGE_BATCH_DELAY_MS) || 100;
+    this.lockTimeoutMs = options.lockTimeoutMs || parseInt(process.env.PURGE_LOCK_TIMEOUT_MS) || 200;
+    this.vacuumThreshold = options.vacuumThreshold || parseInt(process.env.PURGE_VACUUM_THRESHOLD) || 10000;
+    this.leaseSecs = options.leaseSecs || 5 * 60;
+    this.vacuumLeaseSecs = options.vacuumLeaseSecs || parseInt(process.env.PURGE_VACUUM_LEASE_SECS) || 60 * 60;
+    this.maxAttempts = options.maxAttempts || 5;
+    this.stopping = false;
+  }
+
+  /** Queue `userId` for purging; `handle` may be a transaction. */
+  static async enqueue(userId, handle = directory()) {
+    await handle('account_purges')
+      .insert({ user_id: userId })
+      .onConflict('user_id')
+      .ignore();
+  }
+
+  /**
+   * Halve the batch after a slow batch, double it after a fast one, within
+   * [min, max].
+   */
+  static nextBatchSize(size, elapsedMs, { targetMs, min, max }) {
+    if (elapsedMs > targetMs) {
+      return Math.max(min, Math.floor(size / 2));
+    }
+    if (elapsedMs < targetMs / 2) {
+      return Math.min(max, size * 2);
+    }
+    return size;
+  }
+
+  /** Let an in-flight purge stop after its current batch; it resumes later. */
+  stop() {
+    this.stopping = true;
+  }
+
+  /**
+   * Claim the oldest due purge. A running purge whose lease expired (its
+   * worker died) is claimed again and resumes from its current_table.
+   */
+  async claimNext() {
+    const { rows } = await directory().raw(`
+      UPDATE account_purges
+      SET status = 'running',
+          attempts = attempts + 1,
+          started_at = COALESCE(started_at, now()),
+          locked_until = now() + make_interval(secs => ?),
+          updated_at = now()
+      WHERE user_id = (
+        SELECT user_id FROM account_purges
+        WHERE status IN ('pending', 'running')
+          AND run_after <= now()
+          AND (locked_until IS NULL OR locked_until < now())
+        ORDER BY run_after, requested_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+      )
+      RETURNING *
+    `, [this.leaseSecs]);
+    return rows[0] || null;
+  }
+
+  /** Claim and run one purge. Returns false when none is due. */
+  async processNext() {
+    const purge = await this.claimNext();
+    if (!purge) {
+      return false;
+    }
+
+    try {
+      await this.purgeUser(purge);
+    } catch (error) {
+      await this.recordFailure(purge, error);
+    }
+    return true;
+  }
+
+  async purgeUser(purge) {
+    const userId = purge.user_id;
+    const start = Math.max(0, PURGE_TABLES.findIndex(({ table }) => table === purge.current_table));
+    // Counts from earlier runs of this purge, including tables it will not revisit
+    const deletedByTable = { ...(purge.deleted_by_table || {}) };
+
+    for (const { table, directory: onDirectory } of PURGE_TABLES.slice(start)) {
+      const purgeTable = () => this.purgeTable(onDirectory ? directory() : db, table, userId, purge);
+      const deleted = await (onDirectory ? purgeTable() : runForUser(userId, purgeTable));
+      deletedByTable[table] = Number(deletedByTable[table] || 0) + deleted;
+
+      if (this.stopping) {
+        await this.release(userId);
+        return;
+      }
+    }
+
+    await runForUser(userId, () => this.vacuum(db, deletedByTable, userId));
+    await this.anonymizeUser(userId);
+
+    await directory()('account_purges')
+      .where({ user_id: userId })
+      .update({
+        status: 'done',
+        current_table: null,
+        locked_until: null,
+        last_error: null,
+        completed_at: new Date(),
+        updated_at: new Date()
+      });
+    logger.info(`Purged account ${userId}: ${purge.deleted_rows} rows`);
+  }
+
+  /**
+   * Delete the user's rows from `table` in adaptive batches, recording
+   * progress after each. Returns the number of rows deleted.
+   */
+  async purgeTable(handle, table, userId, purge) {
+    if (!(await handle.schema.hasTable(table)) || !(await handle.schema.hasColumn(table, 'user_id'))) {
+      return 0;
+    }
+
+    let deleted = 0;
+    let backoffMs = this.batchDelayMs;
+    let retries = 0;
+    while (!this.stopping) {
+      const startedAt = Date.now();
+      let count;
+      try {
+        count = await this.deleteBatch(handle, table, userId, this.batchSize);
+      } catch (error) {
+        if (!RETRYABLE_CODES.has(error.code) || ++retries > MAX_BATCH_RETRIES) {
+          throw error;
+        }
+        // Someone holds locks on these rows; back off with a smaller batch
+        this.batchSize = Math.max(this.minBatchSize, Math.floor(this.batchSize / 2));
+        backoffMs = Math.min(backoffMs * 2 || 100, 10000);
+        await sleep(backoffMs);
+        continue;
+      }
+      const elapsedMs = Date.now() - startedAt;
+
+      deleted += count;
+      purge.deleted_rows = Number(purge.deleted_rows) + count;
+      await this.recordProgress(userId, table, count);
+
+      if (count === 0) {
+        return deleted;
+      }
+
+      this.batchSize = AccountPurgeService.nextBatchSize(this.batchSize, elapsedMs, {
+        targetMs: this.targetBatchMs,
+        min: this.minBatchSize,
+        max: this.maxBatchSize
+      });
+      backoffMs = this.batchDelayMs;
+      retries = 0;
+      if (this.batchDelayMs > 0) {
+        await sleep(this.batchDelayMs);
+      }
+    }
+    return deleted;
+  }
+
+  /** Delete up to `limit` of the user's rows in one short transaction. */
+  async deleteBatch(handle, table, userId, limit) {
+    return handle.transaction(async (trx) => {
+      await trx.raw(`SET LOCAL lock_timeout = ${Number(this.lockTimeoutMs)}`);
+      await trx.raw(`SET LOCAL statement_timeout = ${Number(this.lockTimeoutMs) * 20}`);
+      return trx(table)
+        .whereIn('ctid', trx(table).select('ctid').where({ user_id: userId }).limit(limit))
+        .del();
+    });
+  }
+
+  async recordProgress(userId, table, count) {
+    await directory()('account_purges')
+      .where({ user_id: userId })
+      .update({
+        current_table: table,
+        deleted_rows: directory().raw('deleted_rows + ?', [count]),
+        deleted_by_table: directory().raw(
+          "deleted_by_table || jsonb_build_object(?::text, COALESCE((deleted_by_table ->> ?)::bigint, 0) + ?)",
+          [table, table, count]
+        ),
+        locked_until: directory().raw('now() + make_interval(secs => ?)', [this.leaseSecs]),
+        updated_at: new Date()
+      });
+  }
+
+  /** Hold the purge for `secs` more, so no other worker claims it meanwhile. */
+  async renewLease(userId, secs) {
+    await directory()('account_purges')
+      .where({ user_id: userId })
+      .update({
+        locked_until: directory().raw('now() + make_interval(secs => ?)', [secs]),
+        updated_at: new Date()
+      });
+  }
+
+  /**
+   * VACUUM tables this purge emptied a lot of, so the dead rows' heap and
+   * index pages are reused right away instead of waiting on autovacuum.
+   * VACUUM only takes a lock that lets reads and writes continue. Each one
+   * first extends the lease to `vacuumLeaseSecs`.
+   */
+  async vacuum(handle, deletedByTable, userId) {
+    const tables = Object.entries(deletedByTable)
+      .filter(([, count]) => Number(count) >= this.vacuumThreshold)
+      .map(([table]) => table);
+
+    for (const table of tables) {
+      await this.renewLease(userId, this.vacuumLeaseSecs);
+      try {
+        await handle.raw('VACUUM (ANALYZE) ??', [table]);
+      } catch (error) {
+        logger.warn(`VACUUM ${table} after purge failed:`, error.message);
+      }
+    }
+  }
+
+  /**
+   * Strip personal data from the users row. On a sharded setup the copy
+   * replicated to the user's shard is anonymised too.
+   */
+  async anonymizeUser(userId) {
+    const anonymized = {
+      email: `deleted-${userId}@deleted.invalid`,
+      name: null,
+      password_hash: null,
+      phone_number: null,
+      oauth_provider: null,
+      oauth_provider_id: null,
+      mfa_enabled: false,
+      mfa_secret: null,
+      last_login_device_id: null,
+      account_status: 'deleted',
+      updated_at: new Date()
+    };
+
+    await directory()('users').where({ user_id: userId }).update(anonymized);
+
+    const router = getShardRouter();
+    if (router && router.enabled) {
+      await runForUser(userId, async () => {
+        if (router.current() !== router.primary) {
+          await db('users').where({ user_id: userId }).update(anonymized);
+        }
+      });
+    }
+  }
+
+  /** Give the purge back to the queue without counting an attempt. */
+  async release(userId) {
+    await directory()('account_purges')
+      .where({ user_id: userId })
+      .update({
+        status: 'pending',
+        locked_until: null,
+        attempts: directory().raw('GREATEST(attempts - 1, 0)'),
+        updated_at: new Date()
+      });
+  }
+
+  async recordFailure(purge, error) {
+    const failed = purge.attempts >= this.maxAttempts;
+    logger.error(`Purge of account ${purge.user_id} failed (attempt ${purge.attempts}):`, error.message);
+
+    await directory()('account_purges')
+      .where({ user_id: purge.user_id })
+      .update({
+        status: failed ? 'failed' : 'pending',
+        last_error: error.message,
+        locked_until: null,
+        run_after: new Date(Date.now() + Math.min(2 ** purge.attempts, 60) * 60 * 1000),
+        updated_at: new Date()
+      });
+  }
+}
+
+AccountPurgeService.PURGE_TABLES = PURGE_TABLES;
+
+module.exports = AccountPurgeService;
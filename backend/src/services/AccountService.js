@@ -26,6 +26,22 @@ class AccountService {
 
     return Account.remove(accountId, userId);
   }
+
+  /**
+   * Fold pending ledger deltas into current_balance, one batch of accounts
+   * per round. Bounded so a steady stream of new deltas cannot keep it busy.
+   */
+  static async compactBalances(maxRounds = 20) {
+    let total = 0;
+    for (let round = 0; round < maxRounds; round++) {
+      const compacted = await Account.compactBalances();
+      if (compacted === 0) {
+        break;
+      }
+      total += compacted;
+    }
+    return total;
+  }
 }
 
 module.exports = AccountService;
@@ -1,4 +1,5 @@
 const db = require('../config/database');
+const FxRate = require('../models/FxRate');
 
 class AnalyticsService {
   static getStartDate(endDate, period) {
@@ -22,27 +23,35 @@ class AnalyticsService {
     const endDate = new Date();
     const startDate = this.getStartDate(endDate, period);
 
-    const transactions = await db('transactions')
-      .where('user_id', userId)
-      .where('is_deleted', false)
-      .whereBetween('transaction_date', [startDate, endDate]);
-
-    const income = transactions
-      .filter(t => t.transaction_type === 'income')
-      .reduce((sum, t) => sum + Number(t.amount), 0);
-
-    const expenses = transactions
-      .filter(t => t.transaction_type === 'expense')
-      .reduce((sum, t) => sum + Number(t.amount), 0);
-
-    const spendingByCategory = await db('transactions')
-      .where('transactions.user_id', userId)
-      .where('transactions.transaction_type', 'expense')
-      .where('transactions.is_deleted', false)
-      .whereBetween('transactions.transaction_date', [startDate, endDate])
-      .join('categories', 'transactions.category_id', 'categories.category_id')
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+    const amount = FxRate.convertedAmount('transactions', baseCurrency);
+
+    const totals = await FxRate.joinRates(
+      db('transactions')
+        .where('transactions.user_id', userId)
+        .where('transactions.is_deleted', false)
+        .whereBetween('transactions.transaction_date', [startDate, endDate]),
+      'transactions', 'transaction_date', baseCurrency
+    )
+      .first(
+        db.raw("COALESCE(SUM(?) FILTER (WHERE transactions.transaction_type = 'income'), 0) as income", [amount]),
+        db.raw("COALESCE(SUM(?) FILTER (WHERE transactions.transaction_type = 'expense'), 0) as expenses", [amount])
+      );
+
+    const income = Number(totals.income);
+    const expenses = Number(totals.expenses);
+
+    const spendingByCategory = await FxRate.joinRates(
+      db('transactions')
+        .where('transactions.user_id', userId)
+        .where('transactions.transaction_type', 'expense')
+        .where('transactions.is_deleted', false)
+        .whereBetween('transactions.transaction_date', [startDate, endDate])
+        .join('categories', 'transactions.category_id', 'categories.category_id'),
+      'transactions', 'transaction_date', baseCurrency
+    )
       .groupBy('categories.category_id', 'categories.name')
-      .select('categories.name', db.raw('SUM(transactions.amount) as total'))
+      .select('categories.name', db.raw('SUM(?) as total', [amount]))
       .orderBy('total', 'desc');
 
     const savings = income - expenses;
@@ -52,6 +61,7 @@ class AnalyticsService {
       period,
       startDate,
       endDate,
+      currency: baseCurrency,
       income,
       expenses,
       savings,
@@ -63,6 +73,112 @@ class AnalyticsService {
     };
   }
 
+  /**
+   * Dashboard totals for `period` plus the latest `recentLimit` transactions
+   * in one statement. The period's rows are scanned once (a CTE referenced
+   * twice is materialised) and feed both the totals and the category split.
+   */
+  static async getHomeActivity(userId, baseCurrency, period = 'month', recentLimit = 10) {
+    const endDate = new Date();
+    const startDate = this.getStartDate(endDate, period);
+    const amount = FxRate.convertedAmount('transactions', baseCurrency);
+
+    const periodRows = FxRate.joinRates(
+      db('transactions')
+        .where('transactions.user_id', userId)
+        .where('transactions.is_deleted', false)
+        .whereBetween('transactions.transaction_date', [startDate, endDate])
+        .leftJoin('categories', 'transactions.category_id', 'categories.category_id'),
+      'transactions', 'transaction_date', baseCurrency
+    ).select(
+      'transactions.transaction_type',
+      'transactions.category_id',
+      'categories.name as category_name',
+      db.raw('? as amount', [amount])
+    );
+
+    const recentRows = db('transactions')
+      .where({ 'transactions.user_id': userId, 'transactions.is_deleted': false })
+      .leftJoin('categories', 'transactions.category_id', 'categories.category_id')
+      .orderBy('transactions.transaction_date', 'desc')
+      .orderBy('transactions.transaction_id', 'desc')
+      .limit(recentLimit)
+      .select(
+        'transactions.transaction_id',
+        'transactions.account_id',
+        'transactions.transaction_type',
+        'transactions.amount',
+        'transactions.currency',
+        'transactions.description',
+        'transactions.merchant',
+        'transactions.transaction_date',
+        'categories.name as category_name'
+      );
+
+    const row = await db.with('period_rows', periodRows)
+      .with('recent_rows', recentRows)
+      .first(
+        db.raw("(SELECT COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'income'), 0) FROM period_rows) as income"),
+        db.raw("(SELECT COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'expense'), 0) FROM period_rows) as expenses"),
+        db.raw(`(SELECT COALESCE(json_agg(json_build_object('category', c.category_name, 'amount', c.total) ORDER BY c.total DESC), '[]')
+          FROM (
+            SELECT category_id, category_name, SUM(amount) AS total FROM period_rows
+            WHERE transaction_type = 'expense' AND category_name IS NOT NULL
+            GROUP BY category_id, category_name
+          ) c) as spending_by_category`),
+        db.raw(`(SELECT COALESCE(json_agg(r ORDER BY r.transaction_date DESC, r.transaction_id DESC), '[]')
+          FROM recent_rows r) as recent`)
+      );
+
+    const income = Number(row.income);
+    const expenses = Number(row.expenses);
+    const savings = income - expenses;
+
+    return {
+      dashboard: {
+        period,
+        startDate,
+        endDate,
+        currency: baseCurrency,
+        income,
+        expenses,
+        savings,
+        savingsRate: income > 0 ? ((savings / income) * 100).toFixed(2) : '0.00',
+        spendingByCategory: row.spending_by_category.map(entry => ({
+          category: entry.category,
+          amount: Number(entry.amount)
+        }))
+      },
+      recentTransactions: row.recent
+    };
+  }
+
+  /**
+   * Active budget count and how many are over their limit this month, in one
+   * query (getBudgetProgress issues one query per budget).
+   */
+  static async getBudgetSummary(userId) {
+    const row = await db('budgets')
+      .where({ 'budgets.user_id': userId, 'budgets.is_active': true })
+      .joinRaw(`LEFT JOIN LATERAL (
+        SELECT SUM(transactions.amount) AS total FROM transactions
+        WHERE transactions.user_id = budgets.user_id
+          AND transactions.transaction_type = 'expense'
+          AND transactions.category_id = budgets.category_id
+          AND transactions.is_deleted = false
+          AND transactions.transaction_date >= DATE_TRUNC('month', NOW())
+      ) AS spent ON true`)
+      .first(
+        db.raw('count(*) as active'),
+        db.raw('count(*) FILTER (WHERE COALESCE(spent.total, 0) > budgets.amount) as over_budget')
+      );
+
+    return {
+      active: Number(row.active),
+      overBudget: Number(row.over_budget)
+    };
+  }
+
   static async getBudgetProgress(userId) {
     const budgets = await db('budgets')
       .where({ user_id: userId, is_active: true })
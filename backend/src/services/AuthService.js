@@ -4,8 +4,9 @@ const speakeasy = require('speakeasy');
 const QRCode = require('qrcode');
 const { v4: uuidv4 } = require('uuid');
 // const { pwnedPassword } = require('hibp'); // Disabled due to ESM compatibility issue
-const db = require('../config/database');
+const { directory } = require('../config/shards');
 const bcrypt = require('bcryptjs');
+const PhoneOtpService = require('./PhoneOtpService');
 
 class AuthService {
   static generateJWT(payload) {
@@ -158,19 +159,7 @@ class AuthService {
       throw new Error('Account not found');
     }
 
-    // Generate 6-digit OTP
-    const otp = (Math.floor(100000 + Math.random() * 900000)).toString();
-    const codeHash = await bcrypt.hash(otp, 10);
-    const expiresAt = new Date(Date.now() + 10 * 60 * 1000); // 10 minutes
-
-    // Clear previous OTPs for this phone/purpose
-    await db('phone_otps').where({ phone_number: normalized, purpose }).del();
-    await db('phone_otps').insert({
-      phone_number: normalized,
-      code_hash: codeHash,
-      purpose,
-      expires_at: expiresAt
-    });
+    const otp = await PhoneOtpService.issue(normalized, purpose);
 
     return {
       message: 'OTP sent',
@@ -239,31 +228,7 @@ class AuthService {
   }
 
   static async verifyPhoneOtp(phoneNumber, otp, purpose) {
-    const record = await db('phone_otps')
-      .where({ phone_number: phoneNumber.replace(/\D/g, ''), purpose })
-      .andWhere('expires_at', '>', new Date())
-      .orderBy('created_at', 'desc')
-      .first();
-
-    if (!record) {
-      throw new Error('OTP expired or not found');
-    }
-
-    if (record.attempt_count >= 5) {
-      throw new Error('Too many attempts. Request a new OTP.');
-    }
-
-    const isValid = await bcrypt.compare(otp, record.code_hash);
-    if (!isValid) {
-      await db('phone_otps')
-        .where({ otp_id: record.otp_id })
-        .update({ attempt_count: record.attempt_count + 1 });
-      throw new Error('Invalid OTP');
-    }
-
-    // Cleanup after successful verification
-    await db('phone_otps').where({ phone_number: phoneNumber.replace(/\D/g, ''), purpose }).del();
-    return true;
+    return PhoneOtpService.verify(phoneNumber.replace(/\D/g, ''), otp, purpose);
   }
 
   static async verifyToken(token) {
@@ -282,10 +247,10 @@ class AuthService {
         throw new Error('Invalid refresh token format');
       }
 
-      const hasRevokedTokensTable = await db.schema.hasTable('revoked_tokens');
+      const hasRevokedTokensTable = await directory().schema.hasTable('revoked_tokens');
 
       if (decoded.tokenId && hasRevokedTokensTable) {
-        const revoked = await db('revoked_tokens')
+        const revoked = await directory()('revoked_tokens')
           .where({ token_id: decoded.tokenId })
           .first();
         if (revoked) {
@@ -308,12 +273,12 @@ class AuthService {
 
     const expiresAt = decoded.exp ? new Date(decoded.exp * 1000) : new Date(Date.now() + 7 * 24 * 60 * 60 * 1000);
 
-    const hasRevokedTokensTable = await db.schema.hasTable('revoked_tokens');
+    const hasRevokedTokensTable = await directory().schema.hasTable('revoked_tokens');
     if (!hasRevokedTokensTable) {
       return false;
     }
 
-    await db('revoked_tokens')
+    await directory()('revoked_tokens')
       .insert({
         token_id: decoded.tokenId,
         user_id: decoded.userId,
@@ -328,7 +293,7 @@ class AuthService {
 
   static async cleanupRevokedTokens() {
     try {
-      const hasRevokedTokensTable = await db.schema.hasTable('revoked_tokens');
+      const hasRevokedTokensTable = await directory().schema.hasTable('revoked_tokens');
       if (!hasRevokedTokensTable) {
         return {
           deleted: 0,
@@ -340,7 +305,7 @@ class AuthService {
       }
 
       // Get count of expired tokens before deletion
-      const expiredTokens = await db('revoked_tokens')
+      const expiredTokens = await directory()('revoked_tokens')
         .where('expires_at', '<', new Date())
         .count('* as count')
         .first();
@@ -348,18 +313,18 @@ class AuthService {
       const countBeforeDelete = expiredTokens?.count || 0;
 
       // Delete expired tokens
-      const deletedCount = await db('revoked_tokens')
+      const deletedCount = await directory()('revoked_tokens')
         .where('expires_at', '<', new Date())
         .del();
 
       // Verify deletion (as sanity check)
-      const remainingExpired = await db('revoked_tokens')
+      const remainingExpired = await directory()('revoked_tokens')
         .where('expires_at', '<', new Date())
         .count('* as count')
         .first();
 
       // Get total active revoked tokens
-      const activeRevoked = await db('revoked_tokens')
+      const activeRevoked = await directory()('revoked_tokens')
         .where('expires_at', '>=', new Date())
         .count('* as count')
         .first();
@@ -420,7 +385,7 @@ class AuthService {
   }
 
   static async storeDevice(userId, deviceId, deviceName, source) {
-    const db = require('../config/database');
+    const db = directory();
     
     // Check if device already exists
     const existingDevice = await db('devices')
@@ -0,0 +1,148 @@
+const db = require('../config/database');
+const Account = require('../models/Account');
+const AccountBalanceSnapshot = require('../models/AccountBalanceSnapshot');
+const FxRate = require('../models/FxRate');
+
+const DEFAULT_HISTORY_DAYS = 365;
+const MAX_HISTORY_DAYS = 5 * 366;
+const SNAPSHOT_BATCH_SIZE = 1000;
+const BACKFILL_BATCH_SIZE = 100;
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const rangeError = message => {
+  const error = new Error(message);
+  error.statusCode = 400;
+  return error;
+};
+
+const addDays = (dateString, days) => {
+  const [year, month, day] = dateString.split('-').map(Number);
+  return AccountBalanceSnapshot.toDateString(new Date(year, month - 1, day + days));
+};
+
+class BalanceHistoryService {
+  static resolveRange(from, to) {
+    const toDate = to ? to.slice(0, 10) : AccountBalanceSnapshot.toDateString(new Date());
+    const fromDate = from ? from.slice(0, 10) : addDays(toDate, -DEFAULT_HISTORY_DAYS);
+
+    if (fromDate > toDate) {
+      throw rangeError('from must be on or before to');
+    }
+    if ((new Date(toDate) - new Date(fromDate)) / DAY_MS > MAX_HISTORY_DAYS) {
+      throw rangeError(`Range cannot exceed ${MAX_HISTORY_DAYS} days`);
+    }
+
+    return { fromDate, toDate };
+  }
+
+  /**
+   * Rebuild snapshot ranges made stale by back-dated writes, within each
+   * account's existing snapshots (later days are written by the next job run).
+   */
+  static async repairInvalidations(filter = {}) {
+    const accountIds = await AccountBalanceSnapshot.invalidatedAccounts(filter);
+    let rows = 0;
+
+    for (const accountId of accountIds) {
+      rows += await db.transaction(trx => this.repairAccount(trx, accountId));
+    }
+
+    return rows;
+  }
+
+  /**
+   * Rebuild one account under a lock on its invalidations, deleting them only
+   * once the rebuild succeeded in the same transaction. If it fails they stay
+   * for the next read or job run.
+   */
+  static async repairAccount(trx, accountId) {
+    const claimed = await AccountBalanceSnapshot.lockInvalidations(trx, accountId);
+    if (!claimed) {
+      return 0;
+    }
+
+    let rows = 0;
+    const range = await AccountBalanceSnapshot.snapshotRange(accountId, trx);
+    if (range) {
+      const start = claimed.fromDate > range.firstDate ? claimed.fromDate : range.firstDate;
+      rows = await AccountBalanceSnapshot.rebuild([accountId], start, range.lastDate, trx);
+    }
+
+    await AccountBalanceSnapshot.deleteInvalidations(trx, claimed.ids);
+    return rows;
+  }
+
+  static async getBalanceHistory(userId, accountId, { from, to } = {}) {
+    const account = await Account.findById(accountId);
+    if (!account || account.user_id !== userId) {
+      return null;
+    }
+
+    const { fromDate, toDate } = this.resolveRange(from, to);
+    if (await AccountBalanceSnapshot.hasInvalidations({ accountId })) {
+      await this.repairInvalidations({ accountIds: [accountId] });
+    }
+
+    const history = await AccountBalanceSnapshot.history(accountId, fromDate, toDate);
+
+    return {
+      accountId,
+      currency: account.currency,
+      from: fromDate,
+      to: toDate,
+      history: history.map(row => ({ date: row.date, balance: Number(row.balance) }))
+    };
+  }
+
+  static async getNetWorthTimeline(userId, { from, to } = {}) {
+    const { fromDate, toDate } = this.resolveRange(from, to);
+    if (await AccountBalanceSnapshot.hasInvalidations({ userId })) {
+      await this.repairInvalidations({ userId });
+    }
+
+    const baseCurrency = await FxRate.getBaseCurrency(userId);
+    const timeline = await AccountBalanceSnapshot.netWorth(userId, baseCurrency, fromDate, toDate);
+
+    return {
+      currency: baseCurrency,
+      from: fromDate,
+      to: toDate,
+      timeline: timeline.map(row => ({
+        date: row.date,
+        netWorth: Number(row.net_worth),
+        accounts: Number(row.accounts)
+      }))
+    };
+  }
+
+  /**
+   * End-of-day batch: repair stale ranges, backfill accounts that have no
+   * history yet, then snapshot every account for `day` (default yesterday).
+   */
+  static async runEndOfDay(day = addDays(AccountBalanceSnapshot.toDateString(new Date()), -1)) {
+    const stats = { day, repaired: 0, backfilled: 0, snapshots: 0 };
+
+    stats.repaired = await this.repairInvalidations();
+
+    let pending;
+    do {
+      pending = await AccountBalanceSnapshot.listUnsnapshotted(BACKFILL_BATCH_SIZE);
+      for (const { account_id: accountId, first_date: firstDate } of pending) {
+        const fromDate = firstDate && firstDate < day ? firstDate : day;
+        stats.backfilled += await AccountBalanceSnapshot.rebuild([accountId], fromDate, day);
+      }
+    } while (pending.length === BACKFILL_BATCH_SIZE);
+
+    let afterId = null;
+    let accountIds;
+    do {
+      accountIds = await AccountBalanceSnapshot.accountIdsAfter(afterId, SNAPSHOT_BATCH_SIZE);
+      stats.snapshots += await AccountBalanceSnapshot.rebuild(accountIds, day, day);
+      afterId = accountIds[accountIds.length - 1];
+    } while (accountIds.length === SNAPSHOT_BATCH_SIZE);
+
+    return stats;
+  }
+}
+
+module.exports = BalanceHistoryService;
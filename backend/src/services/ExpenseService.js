@@ -1,5 +1,15 @@
 const Expense = require('../models/Expense');
-const { Parser } = require('@json2csv/plainjs');
+
+const EXPORT_FIELDS = [
+  'expense_id',
+  'description',
+  'amount',
+  'currency',
+  'category_name',
+  'merchant',
+  'expense_date',
+  'notes'
+];
 
 class ExpenseService {
   async createExpense(userId, data) {
@@ -81,22 +91,16 @@ class ExpenseService {
     return await Expense.getStatistics(userId, start, end);
   }
 
-  async exportExpenses(userId, format = 'csv', filters) {
-    const { expenses } = await Expense.list(userId, { ...filters, limit: 10000 });
-
-    if (format === 'csv') {
-      const fields = [
-        'expense_id',
-        'description',
-        'amount',
-        'currency',
-        'category_name',
-        'merchant',
-        'expense_date',
-        'notes'
-      ];
-
-      const data = expenses.map(e => ({
+  get exportFields() {
+    return EXPORT_FIELDS;
+  }
+
+  /**
+   * All matching expenses as export rows, streamed page by page.
+   */
+  async *exportExpenses(userId, filters) {
+    for await (const e of Expense.exportRows(userId, filters)) {
+      yield {
         expense_id: e.expense_id,
         description: e.description,
         amount: e.amount,
@@ -105,13 +109,8 @@ class ExpenseService {
         merchant: e.merchant || 'N/A',
         expense_date: new Date(e.expense_date).toISOString().split('T')[0],
         notes: e.notes || ''
-      }));
-
-      const parser = new Parser({ fields });
-      return parser.parse(data);
+      };
     }
-
-    throw new Error('Unsupported export format');
   }
 
   async filterExpenses(userId, filters) {
@@ -0,0 +1,48 @@
+const FxRate = require('../models/FxRate');
+
+class FxRateService {
+  /**
+   * Parse a rates file with `date,currency,rate` lines (rate = units per USD).
+   * A header line and blank/# comment lines are skipped.
+   */
+  static parseRatesCsv(content) {
+    const rates = [];
+    const pivotDates = new Set();
+    const quotedPivotDates = new Set();
+
+    content.split(/\r?\n/).forEach((line, index) => {
+      const trimmed = line.trim();
+      if (!trimmed || trimmed.startsWith('#') || (index === 0 && /^date\s*,/i.test(trimmed))) {
+        return;
+      }
+
+      const [rateDate, currency, rate] = trimmed.split(',').map(value => value.trim());
+      const parsedRate = Number(rate);
+      if (!/^\d{4}-\d{2}-\d{2}$/.test(rateDate || '') || !/^[A-Za-z]{3}$/.test(currency || '') || !(parsedRate > 0)) {
+        throw new Error(`Invalid FX rate on line ${index + 1}: ${trimmed}`);
+      }
+
+      rates.push({ rate_date: rateDate, currency: currency.toUpperCase(), rate: parsedRate });
+      pivotDates.add(rateDate);
+      if (currency.toUpperCase() === FxRate.PIVOT_CURRENCY) {
+        quotedPivotDates.add(rateDate);
+      }
+    });
+
+    // The pivot is always 1; storing it keeps the SQL join uniform
+    pivotDates.forEach(rateDate => {
+      if (!quotedPivotDates.has(rateDate)) {
+        rates.push({ rate_date: rateDate, currency: FxRate.PIVOT_CURRENCY, rate: 1 });
+      }
+    });
+
+    return rates;
+  }
+
+  static async loadRates(content, source = 'file') {
+    const rates = this.parseRatesCsv(content);
+    return FxRate.upsertMany(rates, source);
+  }
+}
+
+module.exports = FxRateService;
@@ -0,0 +1,45 @@
+const Account = require('../models/Account');
+const Category = require('../models/Category');
+const FxRate = require('../models/FxRate');
+const { Notification } = require('../models/Notification');
+const AnalyticsService = require('./AnalyticsService');
+
+const DEFAULT_RECENT_LIMIT = 10;
+
+const compactCategory = category => ({
+  category_id: category.category_id,
+  name: category.name,
+  category_type: category.category_type,
+  icon: category.icon,
+  color: category.color
+});
+
+class HomeService {
+  /**
+   * Everything the home screen needs on launch. The independent reads run
+   * concurrently on separate pool connections; recent transactions and the
+   * dashboard totals share one query.
+   */
+  static async getHome(userId, { period = 'month', recentLimit = DEFAULT_RECENT_LIMIT } = {}) {
+    const [accounts, categories, activity, budgets, unread] = await Promise.all([
+      Account.listByUser(userId),
+      Category.listForUser(userId),
+      FxRate.getBaseCurrency(userId)
+        .then(baseCurrency => AnalyticsService.getHomeActivity(userId, baseCurrency, period, recentLimit)),
+      AnalyticsService.getBudgetSummary(userId),
+      Notification.getUnreadCount(userId)
+    ]);
+
+    return {
+      accounts,
+      recentTransactions: activity.recentTransactions,
+      dashboard: activity.dashboard,
+      categories: categories.filter(category => !category.is_deleted).map(compactCategory),
+      budgets,
+      notifications: { unread: Number(unread) },
+      generatedAt: new Date().toISOString()
+    };
+  }
+}
+
+module.exports = HomeService;
@@ -1,5 +1,17 @@
 const Income = require('../models/Income');
 
+const EXPORT_FIELDS = [
+  'income_id',
+  'description',
+  'amount',
+  'currency',
+  'category_name',
+  'source',
+  'account_name',
+  'income_date',
+  'notes'
+];
+
 class IncomeService {
   async createIncome(userId, data) {
     if (!data.amount || data.amount <= 0) {
@@ -70,6 +82,29 @@ class IncomeService {
 
     return await Income.getStatistics(userId, start, end);
   }
+
+  get exportFields() {
+    return EXPORT_FIELDS;
+  }
+
+  /**
+   * All matching income as export rows, streamed page by page.
+   */
+  async *exportIncome(userId, filters) {
+    for await (const i of Income.exportRows(userId, filters)) {
+      yield {
+        income_id: i.income_id,
+        description: i.description,
+        amount: i.amount,
+        currency: i.currency,
+        category_name: i.category_name || 'Uncategorized',
+        source: i.source || '',
+        account_name: i.account_name || '',
+        income_date: new Date(i.income_date).toISOString().split('T')[0],
+        notes: i.notes || ''
+      };
+    }
+  }
 }
 
 module.exports = new IncomeService();
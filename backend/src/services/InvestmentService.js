@@ -1,4 +1,5 @@
 const Investment = require('../models/Investment');
+const PriceService = require('./PriceService');
 
 class InvestmentService {
   static async createInvestment(userId, data) {
@@ -143,7 +144,7 @@ class InvestmentService {
       throw new Error('User ID is required');
     }
 
-    return await Investment.getPortfolioSummary(userId);
+    return await Investment.getPortfolioSummary(userId, symbols => PriceService.getLatestPrices(symbols));
   }
 }
 
@@ -0,0 +1,181 @@
+/**
+ * Phone OTP issue and verification.
+ *
+ * With Redis, a code is stored as an HMAC under `otp:{phone}:<purpose>` with a
+ * native TTL, so issuing costs one HMAC and one round trip instead of a bcrypt
+ * hash plus a delete and an insert. Verification is a single Lua call that
+ * checks the per-code and per-phone attempt counters, compares the HMAC and
+ * consumes the code atomically, so two concurrent verifications can never
+ * both succeed. Both keys share the `{phone}` hash tag and stay in one slot.
+ *
+ * Without Redis (or if a Redis call fails) the phone_otps table is used as
+ * before.
+ */
+
+const crypto = require('crypto');
+const bcrypt = require('bcryptjs');
+const { directory } = require('../config/shards');
+const { getRedisClient } = require('../config/redis');
+const logger = require('../utils/logger');
+
+const OTP_TTL_MS = 10 * 60 * 1000;
+const MAX_CODE_ATTEMPTS = 5;
+// Failed attempts across re-issued codes, so requesting a new code does not
+// reset a guessing run
+const MAX_PHONE_ATTEMPTS = 15;
+
+// KEYS: code hash, phone attempt counter. ARGV: digest, max code attempts,
+// max phone attempts, attempt window (ms).
+const VERIFY_SCRIPT = `
+local code = redis.call('HGET', KEYS[1], 'code')
+if not code then
+  return 'missing'
+end
+if tonumber(redis.call('GET', KEYS[2]) or '0') >= tonumber(ARGV[3])
+  or tonumber(redis.call('HGET', KEYS[1], 'attempts')) >= tonumber(ARGV[2]) then
+  return 'locked'
+end
+if code == ARGV[1] then
+  redis.call('DEL', KEYS[1], KEYS[2])
+  return 'ok'
+end
+redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if redis.call('INCR', KEYS[2]) == 1 then
+  redis.call('PEXPIRE', KEYS[2], ARGV[4])
+end
+return 'invalid'
+`;
+
+const VERIFY_SHA = crypto.createHash('sha1').update(VERIFY_SCRIPT).digest('hex');
+
+const codeKey = (phoneNumber, purpose) => `otp:{${phoneNumber}}:${purpose}`;
+const attemptsKey = phoneNumber => `otp:{${phoneNumber}}:attempts`;
+
+const verifyErrors = {
+  missing: 'OTP expired or not found',
+  locked: 'Too many attempts. Request a new OTP.',
+  invalid: 'Invalid OTP'
+};
+
+class PhoneOtpService {
+  static generateCode() {
+    return crypto.randomInt(100000, 1000000).toString();
+  }
+
+  static digest(phoneNumber, purpose, otp) {
+    const secret = process.env.OTP_HMAC_SECRET || process.env.JWT_SECRET;
+    return crypto.createHmac('sha256', secret).update(`${purpose}:${phoneNumber}:${otp}`).digest('hex');
+  }
+
+  /**
+   * Store a fresh code for `phoneNumber` (already normalised), replacing any
+   * previous one for the same purpose, and return it.
+   */
+  static async issue(phoneNumber, purpose) {
+    const otp = this.generateCode();
+    const client = getRedisClient();
+
+    if (client) {
+      try {
+        await this.issueInRedis(client, phoneNumber, purpose, otp);
+        return otp;
+      } catch (error) {
+        logger.error('OTP store falling back to database:', error.message);
+      }
+    }
+
+    await this.issueInDb(phoneNumber, purpose, otp);
+    return otp;
+  }
+
+  static async issueInRedis(client, phoneNumber, purpose, otp) {
+    const key = codeKey(phoneNumber, purpose);
+    await client.multi()
+      .hSet(key, { code: this.digest(phoneNumber, purpose, otp), attempts: 0 })
+      .pExpire(key, OTP_TTL_MS)
+      .exec();
+  }
+
+  static async issueInDb(phoneNumber, purpose, otp) {
+    const codeHash = await bcrypt.hash(otp, 10);
+
+    // Clear previous OTPs for this phone/purpose
+    await directory()('phone_otps').where({ phone_number: phoneNumber, purpose }).del();
+    await directory()('phone_otps').insert({
+      phone_number: phoneNumber,
+      code_hash: codeHash,
+      purpose,
+      expires_at: new Date(Date.now() + OTP_TTL_MS)
+    });
+  }
+
+  /**
+   * Check and consume a code. Throws on a missing, locked or wrong code.
+   */
+  static async verify(phoneNumber, otp, purpose) {
+    const client = getRedisClient();
+
+    if (client) {
+      let result;
+      try {
+        result = await this.verifyInRedis(client, phoneNumber, otp, purpose);
+      } catch (error) {
+        logger.error('OTP store falling back to database:', error.message);
+      }
+      if (result === 'ok') {
+        return true;
+      }
+      // A code issued while Redis was unavailable lives in the table
+      if (result && result !== 'missing') {
+        throw new Error(verifyErrors[result]);
+      }
+    }
+
+    return this.verifyInDb(phoneNumber, otp, purpose);
+  }
+
+  static async verifyInRedis(client, phoneNumber, otp, purpose) {
+    const options = {
+      keys: [codeKey(phoneNumber, purpose), attemptsKey(phoneNumber)],
+      arguments: [this.digest(phoneNumber, purpose, otp), MAX_CODE_ATTEMPTS, MAX_PHONE_ATTEMPTS, OTP_TTL_MS].map(String)
+    };
+    try {
+      return await client.evalSha(VERIFY_SHA, options);
+    } catch (error) {
+      if (!String(error.message).includes('NOSCRIPT')) {
+        throw error;
+      }
+      return client.eval(VERIFY_SCRIPT, options);
+    }
+  }
+
+  static async verifyInDb(phoneNumber, otp, purpose) {
+    const record = await directory()('phone_otps')
+      .where({ phone_number: phoneNumber, purpose })
+      .andWhere('expires_at', '>', new Date())
+      .orderBy('created_at', 'desc')
+      .first();
+
+    if (!record) {
+      throw new Error(verifyErrors.missing);
+    }
+
+    if (record.attempt_count >= MAX_CODE_ATTEMPTS) {
+      throw new Error(verifyErrors.locked);
+    }
+
+    const isValid = await bcrypt.compare(otp, record.code_hash);
+    if (!isValid) {
+      await directory()('phone_otps')
+        .where({ otp_id: record.otp_id })
+        .update({ attempt_count: record.attempt_count + 1 });
+      throw new Error(verifyErrors.invalid);
+    }
+
+    // Cleanup after successful verification
+    await directory()('phone_otps').where({ phone_number: phoneNumber, purpose }).del();
+    return true;
+  }
+}
+
+module.exports = PhoneOtpService;
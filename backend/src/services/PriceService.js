@@ -0,0 +1,131 @@
+const SecurityPrice = require('../models/SecurityPrice');
+const Investment = require('../models/Investment');
+const LruCache = require('../utils/lruCache');
+const logger = require('../utils/logger');
+
+const VALUATION_BATCH_SIZE = 50000;
+
+// upper-cased symbol -> { price, price_date }, or null when no price is known
+const priceCache = new LruCache({
+  maxSize: parseInt(process.env.PRICE_CACHE_SIZE, 10) || 10000,
+  ttlMs: parseInt(process.env.PRICE_CACHE_TTL_MS, 10) || 15 * 60 * 1000
+});
+
+// Optional price feed: { name, fetchPrices(symbols) -> [{ symbol, price_date, price }] }
+let priceFeed = null;
+
+class PriceService {
+  static setFeed(feed) {
+    priceFeed = feed;
+  }
+
+  /**
+   * Latest prices for `symbols` as a Map. Cached symbols cost nothing; the
+   * misses are fetched together in one query.
+   */
+  static async getLatestPrices(symbols) {
+    const prices = new Map();
+    const misses = [];
+
+    for (const symbol of symbols) {
+      const cached = priceCache.get(symbol);
+      if (cached === undefined) {
+        misses.push(symbol);
+      } else if (cached) {
+        prices.set(symbol, cached);
+      }
+    }
+
+    if (misses.length) {
+      const rows = await SecurityPrice.latestForSymbols(misses);
+      const found = new Map(rows.map(row => [row.symbol, { price: Number(row.price), price_date: row.price_date }]));
+      for (const symbol of misses) {
+        const quote = found.get(symbol) || null;
+        priceCache.set(symbol, quote);
+        if (quote) prices.set(symbol, quote);
+      }
+    }
+
+    return prices;
+  }
+
+  /**
+   * Parse a prices file with `date,symbol,price` lines.
+   * A header line and blank/# comment lines are skipped.
+   */
+  static parsePricesCsv(content) {
+    const prices = [];
+
+    content.split(/\r?\n/).forEach((line, index) => {
+      const trimmed = line.trim();
+      if (!trimmed || trimmed.startsWith('#') || (index === 0 && /^date\s*,/i.test(trimmed))) {
+        return;
+      }
+
+      const [priceDate, symbol, price] = trimmed.split(',').map(value => value.trim());
+      const parsedPrice = Number(price);
+      if (!/^\d{4}-\d{2}-\d{2}$/.test(priceDate || '') || !/^[A-Za-z0-9.\-^]{1,20}$/.test(symbol || '') || !(parsedPrice > 0)) {
+        throw new Error(`Invalid price on line ${index + 1}: ${trimmed}`);
+      }
+
+      prices.push({ price_date: priceDate, symbol: symbol.toUpperCase(), price: parsedPrice });
+    });
+
+    return prices;
+  }
+
+  static async storePrices(prices, source) {
+    const count = await SecurityPrice.upsertMany(prices, source);
+    new Set(prices.map(price => price.symbol)).forEach(symbol => priceCache.delete(symbol));
+    return count;
+  }
+
+  static async loadPrices(content, source = 'file') {
+    return this.storePrices(this.parsePricesCsv(content), source);
+  }
+
+  /**
+   * Pull the latest prices for `symbols` from the configured feed.
+   */
+  static async refreshFromFeed(symbols) {
+    if (!priceFeed) {
+      throw new Error('No price feed configured');
+    }
+
+    const fetched = await priceFeed.fetchPrices(symbols);
+    const prices = fetched.map(price => ({
+      symbol: String(price.symbol).toUpperCase(),
+      price_date: price.price_date,
+      price: Number(price.price)
+    }));
+    return this.storePrices(prices, priceFeed.name || 'feed');
+  }
+
+  static async valueUserHoldings(userId) {
+    return Investment.markToMarket({ userId });
+  }
+
+  /**
+   * Nightly batch: mark every user's holdings to market, one set-based
+   * UPDATE per investment_id range so no single statement holds locks on
+   * the whole table.
+   */
+  static async valueAllHoldings({ batchSize = VALUATION_BATCH_SIZE } = {}) {
+    const maxId = await Investment.maxId();
+    let updated = 0;
+
+    for (let fromId = 1; fromId <= maxId; fromId += batchSize) {
+      const toId = Math.min(fromId + batchSize - 1, maxId);
+      updated += await Investment.markToMarket({ fromId, toId });
+      logger.debug(`Valued holdings ${fromId}-${toId} (${updated} updated so far)`);
+    }
+
+    return { updated, maxId };
+  }
+
+  static clearCache() {
+    priceCache.clear();
+  }
+}
+
+module.exports = PriceService;
@@ -0,0 +1,304 @@
+/**
+ * Profiling Service
+ *
+ * On-demand CPU profiles and heap snapshots of the running process through
+ * the `inspector` module, written to PROFILE_DIR as .cpuprofile /
+ * .heapsnapshot files (open them in Chrome DevTools). Only one capture runs
+ * per instance at a time, with a cooldown between captures. After each
+ * capture, files beyond `maxCaptures` or older than `maxAgeMs` are deleted,
+ * oldest first, so the directory cannot fill the disk.
+ *
+ * Continuous sampling is opt-in: it profiles in short windows at a coarse
+ * sampling interval, folds each window into collapsed stacks and keeps the
+ * last N minutes in memory for flame graphs.
+ */
+
+const fs = require('fs');
+const path = require('path');
+const inspector = require('inspector');
+const { pipeline } = require('stream/promises');
+const { Readable } = require('stream');
+const logger = require('../utils/logger');
+
+const MAX_CPU_PROFILE_MS = 60 * 1000;
+const SAMPLING_WINDOW_MS = 10 * 1000;
+const CAPTURE_NAME_PATTERN = /^(cpu|heap)-[\w-]+\.(cpuprofile|heapsnapshot)$/;
+
+const post = (session, method, params = {}) => new Promise((resolve, reject) => {
+  session.post(method, params, (error, result) => (error ? reject(error) : resolve(result)));
+});
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+const frameName = ({ functionName, url, lineNumber }) => {
+  const name = functionName || '(anonymous)';
+  return url ? `${name} (${path.basename(url)}:${lineNumber + 1})` : name;
+};
+
+/**
+ * Fold a V8 CPU profile into collapsed stacks ("a;b;c" -> sample count).
+ */
+const foldProfile = (profile, stacks = new Map()) => {
+  const nodes = new Map(profile.nodes.map(node => [node.id, node]));
+  const parents = new Map();
+  profile.nodes.forEach(node => (node.children || []).forEach(childId => parents.set(childId, node.id)));
+
+  const sampleCounts = new Map();
+  profile.samples.forEach(id => sampleCounts.set(id, (sampleCounts.get(id) || 0) + 1));
+
+  sampleCounts.forEach((count, id) => {
+    const frames = [];
+    for (let current = id; current !== undefined; current = parents.get(current)) {
+      const { callFrame } = nodes.get(current);
+      if (callFrame.functionName !== '(root)') {
+        frames.push(frameName(callFrame));
+      }
+    }
+    const stack = frames.reverse().join(';');
+    if (stack && stack !== '(idle)') {
+      stacks.set(stack, (stacks.get(stack) || 0) + count);
+    }
+  });
+
+  return stacks;
+};
+
+class ProfilingService {
+  constructor(options = {}) {
+    this.directory = options.directory || process.env.PROFILE_DIR || path.join(process.cwd(), 'profiles');
+    this.cooldownMs = options.cooldownMs ?? (parseInt(process.env.PROFILE_COOLDOWN_MS) || 60 * 1000);
+    this.maxCaptures = options.maxCaptures ?? (parseInt(process.env.PROFILE_MAX_CAPTURES) || 20);
+    this.maxAgeMs = options.maxAgeMs ?? (parseInt(process.env.PROFILE_MAX_AGE_HOURS) || 7 * 24) * 60 * 60 * 1000;
+    this.activeCapture = null;
+    this.lastCaptureAt = 0;
+    this.sampling = null;
+  }
+
+  /**
+   * Take the per-instance capture slot or throw with a `statusCode` the
+   * routes can return as-is.
+   */
+  acquire(kind) {
+    if (this.activeCapture) {
+      const error = new Error(`A ${this.activeCapture} capture is already running`);
+      error.statusCode = 409;
+      throw error;
+    }
+
+    const waitMs = this.lastCaptureAt + this.cooldownMs - Date.now();
+    if (waitMs > 0) {
+      const error = new Error(`Next capture allowed in ${Math.ceil(waitMs / 1000)}s`);
+      error.statusCode = 429;
+      throw error;
+    }
+
+    this.activeCapture = kind;
+  }
+
+  release() {
+    this.activeCapture = null;
+    this.lastCaptureAt = Date.now();
+  }
+
+  async withSession(kind, capture) {
+    this.acquire(kind);
+    const session = new inspector.Session();
+    session.connect();
+    try {
+      await fs.promises.mkdir(this.directory, { recursive: true });
+      const result = await capture(session);
+      await this.pruneCaptures();
+      return result;
+    } finally {
+      session.disconnect();
+      this.release();
+    }
+  }
+
+  captureFile(kind, extension) {
+    const name = `${kind}-${new Date().toISOString().replace(/[:.]/g, '-')}-${process.pid}.${extension}`;
+    return { name, filePath: path.join(this.directory, name) };
+  }
+
+  async captureCpuProfile({ durationMs = 10 * 1000, samplingIntervalUs = 1000 } = {}) {
+    const duration = Math.min(Math.max(parseInt(durationMs) || 0, 100), MAX_CPU_PROFILE_MS);
+
+    return this.withSession('cpu', async (session) => {
+      await post(session, 'Profiler.enable');
+      await post(session, 'Profiler.setSamplingInterval', { interval: samplingIntervalUs });
+      await post(session, 'Profiler.start');
+      await sleep(duration);
+      const { profile } = await post(session, 'Profiler.stop');
+      await post(session, 'Profiler.disable');
+
+      const { name, filePath } = this.captureFile('cpu', 'cpuprofile');
+      await fs.promises.writeFile(filePath, JSON.stringify(profile));
+      const { size } = await fs.promises.stat(filePath);
+      return { name, durationMs: duration, bytes: size, samples: profile.samples.length };
+    });
+  }
+
+  async captureHeapSnapshot() {
+    return this.withSession('heap', async (session) => {
+      const { name, filePath } = this.captureFile('heap', 'heapsnapshot');
+
+      // Snapshots can be hundreds of MB, so chunks are streamed to disk
+      const chunks = new Readable({ read() {} });
+      const written = pipeline(chunks, fs.createWriteStream(filePath));
+      session.on('HeapProfiler.addHeapSnapshotChunk', ({ params }) => chunks.push(params.chunk));
+
+      try {
+        await post(session, 'HeapProfiler.takeHeapSnapshot', { reportProgress: false });
+      } finally {
+        chunks.push(null);
+        await written;
+      }
+
+      const { size } = await fs.promises.stat(filePath);
+      return { name, bytes: size };
+    });
+  }
+
+  async listCaptures() {
+    let names;
+    try {
+      names = await fs.promises.readdir(this.directory);
+    } catch (error) {
+      if (error.code === 'ENOENT') {
+        return [];
+      }
+      throw error;
+    }
+
+    const captures = await Promise.all(names
+      .filter(name => CAPTURE_NAME_PATTERN.test(name))
+      .map(async (name) => {
+        const { size, mtime } = await fs.promises.stat(path.join(this.directory, name));
+        return { name, bytes: size, createdAt: mtime.toISOString() };
+      }));
+
+    return captures.sort((a, b) => b.createdAt.localeCompare(a.createdAt));
+  }
+
+  /**
+   * Delete captures beyond `maxCaptures` (newest kept) or older than
+   * `maxAgeMs`. Returns the names removed; failures are logged, never thrown.
+   */
+  async pruneCaptures() {
+    try {
+      const cutoff = new Date(Date.now() - this.maxAgeMs).toISOString();
+      const expired = (await this.listCaptures())
+        .filter((capture, index) => index >= this.maxCaptures || capture.createdAt < cutoff);
+
+      await Promise.all(expired.map(({ name }) => fs.promises.rm(path.join(this.directory, name), { force: true })));
+      return expired.map(({ name }) => name);
+    } catch (error) {
+      logger.warn('Profile retention sweep failed:', error.message);
+      return [];
+    }
+  }
+
+  /**
+   * Absolute path of a stored capture, or null for unknown or unsafe names.
+   */
+  resolveCapture(name) {
+    if (!CAPTURE_NAME_PATTERN.test(name)) {
+      return null;
+    }
+    const filePath = path.join(this.directory, name);
+    return fs.existsSync(filePath) ? filePath : null;
+  }
+
+  startSampling({ windowMinutes = 10, samplingIntervalUs = 10 * 1000 } = {}) {
+    if (this.sampling) {
+      return this.getSamplingStatus();
+    }
+
+    const session = new inspector.Session();
+    session.connect();
+
+    const sampling = {
+      session,
+      samplingIntervalUs,
+      retainMs: Math.max(1, windowMinutes) * 60 * 1000,
+      windows: [],
+      startedAt: Date.now(),
+      timer: null
+    };
+    this.sampling = sampling;
+
+    const collectWindow = async () => {
+      try {
+        const { profile } = await post(session, 'Profiler.stop');
+        sampling.windows.push({ endedAt: Date.now(), stacks: foldProfile(profile) });
+        const cutoff = Date.now() - sampling.retainMs;
+        while (sampling.windows.length && sampling.windows[0].endedAt < cutoff) {
+          sampling.windows.shift();
+        }
+        if (this.sampling === sampling) {
+          await post(session, 'Profiler.start');
+        }
+      } catch (error) {
+        // The session was closed by stopSampling()
+      }
+    };
+
+    post(session, 'Profiler.enable')
+      .then(() => post(session, 'Profiler.setSamplingInterval', { interval: samplingIntervalUs }))
+      .then(() => post(session, 'Profiler.start'))
+      .then(() => {
+        sampling.timer = setInterval(collectWindow, SAMPLING_WINDOW_MS);
+        sampling.timer.unref?.();
+      })
+      .catch(() => this.stopSampling());
+
+    return this.getSamplingStatus();
+  }
+
+  stopSampling() {
+    if (!this.sampling) {
+      return this.getSamplingStatus();
+    }
+    clearInterval(this.sampling.timer);
+    this.sampling.session.disconnect();
+    this.sampling = null;
+    return this.getSamplingStatus();
+  }
+
+  getSamplingStatus() {
+    if (!this.sampling) {
+      return { enabled: false };
+    }
+    return {
+      enabled: true,
+      startedAt: new Date(this.sampling.startedAt).toISOString(),
+      windowMinutes: this.sampling.retainMs / 60000,
+      samplingIntervalUs: this.sampling.samplingIntervalUs,
+      windows: this.sampling.windows.length
+    };
+  }
+
+  /**
+   * Collapsed stacks over the retained windows, one "frames count" per line,
+   * ready for flamegraph.pl or speedscope.
+   */
+  getFlameGraph() {
+    if (!this.sampling) {
+      return null;
+    }
+
+    const merged = new Map();
+    this.sampling.windows.forEach(({ stacks }) => {
+      stacks.forEach((count, stack) => merged.set(stack, (merged.get(stack) || 0) + count));
+    });
+
+    return [...merged.entries()]
+      .sort((a, b) => b[1] - a[1])
+      .map(([stack, count]) => `${stack} ${count}`)
+      .join('\n');
+  }
+}
+
+ProfilingService.foldProfile = foldProfile;
+
+module.exports = ProfilingService;
@@ -0,0 +1,154 @@
+/**
+ * Report Job Queue
+ *
+ * Redis-backed queue for heavy reports (annual, long trends, comparisons).
+ * A job id is derived from (user, report, params), so identical concurrent
+ * requests share one job and one computation. Finished results stay in Redis
+ * for a TTL and are served directly to later identical requests. Jobs are
+ * executed by src/workers/reportWorker.js.
+ */
+
+const crypto = require('crypto');
+const { getRedisClient } = require('../config/redis');
+
+const QUEUE_KEY = 'report_jobs:queue';
+const JOB_KEY_PREFIX = 'report_job:';
+
+let sharedQueue = null;
+
+class ReportJobQueue {
+  constructor(redisClient, options = {}) {
+    this.redis = redisClient;
+    this.resultTtlSecs = options.resultTtlSecs || parseInt(process.env.REPORT_RESULT_TTL_SECONDS) || 5 * 60;
+    this.pendingTtlSecs = options.pendingTtlSecs || 10 * 60;
+    this.failedTtlSecs = options.failedTtlSecs || 60;
+  }
+
+  /**
+   * Queue bound to the shared Redis connection, or null while Redis is
+   * unavailable.
+   */
+  static fromSharedClient() {
+    const client = getRedisClient();
+    if (!client) {
+      return null;
+    }
+
+    if (!sharedQueue || sharedQueue.redis !== client) {
+      sharedQueue = new ReportJobQueue(client);
+    }
+    return sharedQueue;
+  }
+
+  static jobId(userId, report, params) {
+    const canonicalParams = Object.keys(params)
+      .sort()
+      .map(key => [key, params[key] === undefined ? null : String(params[key])]);
+
+    return crypto
+      .createHash('sha256')
+      .update(JSON.stringify([userId, report, canonicalParams]))
+      .digest('hex')
+      .slice(0, 32);
+  }
+
+  async getJob(jobId) {
+    const raw = await this.redis.get(`${JOB_KEY_PREFIX}${jobId}`);
+    return raw ? JSON.parse(raw) : null;
+  }
+
+  async getJobForUser(jobId, userId) {
+    const job = await this.getJob(jobId);
+    return job && job.userId === userId ? job : null;
+  }
+
+  async saveJob(job, ttlSecs) {
+    await this.redis.set(`${JOB_KEY_PREFIX}${job.jobId}`, JSON.stringify(job), { EX: ttlSecs });
+  }
+
+  /**
+   * Return the existing job for these params (which may already be completed)
+   * or queue a new one. Only the request that creates the job record pushes
+   * it, so duplicates never reach the workers.
+   */
+  async enqueue(userId, report, params) {
+    const jobId = ReportJobQueue.jobId(userId, report, params);
+    const existing = await this.getJob(jobId);
+    if (existing && existing.status !== 'failed') {
+      return existing;
+    }
+
+    const job = {
+      jobId,
+      userId,
+      report,
+      params,
+      status: 'queued',
+      createdAt: new Date().toISOString()
+    };
+
+    // A failed job is replaced so the report can be retried
+    const created = await this.redis.set(
+      `${JOB_KEY_PREFIX}${jobId}`,
+      JSON.stringify(job),
+      existing ? { XX: true, EX: this.pendingTtlSecs } : { NX: true, EX: this.pendingTtlSecs }
+    );
+
+    if (created === 'OK') {
+      await this.redis.lPush(QUEUE_KEY, jobId);
+      return job;
+    }
+
+    return (await this.getJob(jobId)) || job;
+  }
+
+  /**
+   * Wait up to `timeoutSecs` for a job and run it with the matching handler.
+   * Blocks the connection, so workers must not share it with anything else.
+   * Returns false when no job arrived.
+   */
+  async processNext(handlers, timeoutSecs = 5) {
+    const popped = await this.redis.brPop(QUEUE_KEY, timeoutSecs);
+    if (!popped) {
+      return false;
+    }
+
+    const job = await this.getJob(popped.element);
+    if (!job || job.status !== 'queued') {
+      return true;
+    }
+
+    const started = { ...job, status: 'processing', startedAt: new Date().toISOString() };
+    await this.saveJob(started, this.pendingTtlSecs);
+
+    try {
+      const handler = handlers[job.report];
+      if (!handler) {
+        throw new Error(`Unknown report type: ${job.report}`);
+      }
+
+      const result = await handler(job.userId, job.params);
+      await this.saveJob({
+        ...started,
+        status: 'completed',
+        result,
+        completedAt: new Date().toISOString()
+      }, this.resultTtlSecs);
+    } catch (error) {
+      await this.saveJob({
+        ...started,
+        status: 'failed',
+        error: error.message,
+        completedAt: new Date().toISOString()
+      }, this.failedTtlSecs);
+    }
+
+    return true;
+  }
+
+  async getQueueLength() {
+    return this.redis.lLen(QUEUE_KEY);
+  }
+}
+
+module.exports = ReportJobQueue;
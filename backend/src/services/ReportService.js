@@ -1,6 +1,54 @@
 const Report = require('../models/Report');
 
+const invalidArgument = (message) => {
+  const error = new Error(message);
+  error.statusCode = 400;
+  return error;
+};
+
 class ReportService {
+  /*
+   * Argument checks shared by the inline and queued paths of the heavy
+   * reports, so a bad request is refused before a job is queued for it
+   */
+  static parseMonths(months) {
+    const monthsNumber = parseInt(months) || 12;
+    if (monthsNumber < 1 || monthsNumber > 60) {
+      throw invalidArgument('Months must be between 1 and 60');
+    }
+    return monthsNumber;
+  }
+
+  static parseYear(year) {
+    const yearNumber = parseInt(year);
+    if (isNaN(yearNumber)) {
+      throw invalidArgument('Year must be a number');
+    }
+
+    const currentYear = new Date().getFullYear();
+    if (yearNumber < 2000 || yearNumber > currentYear + 1) {
+      throw invalidArgument('Year must be between 2000 and next year');
+    }
+    return yearNumber;
+  }
+
+  static parseComparisonDates(startDate1, endDate1, startDate2, endDate2) {
+    if (!startDate1 || !endDate1 || !startDate2 || !endDate2) {
+      throw invalidArgument('All four date parameters are required');
+    }
+
+    const dates = [startDate1, endDate1, startDate2, endDate2].map(value => new Date(value));
+    if (dates.some(date => isNaN(date))) {
+      throw invalidArgument('Invalid date format');
+    }
+
+    const [s1, e1, s2, e2] = dates;
+    if (s1 > e1 || s2 > e2) {
+      throw invalidArgument('Start date must be before end date');
+    }
+    return dates;
+  }
+
   static async getDashboard(userId, period) {
     if (!userId) {
       throw new Error('User ID is required');
@@ -19,12 +67,7 @@ class ReportService {
       throw new Error('User ID is required');
     }
 
-    const monthsNumber = parseInt(months) || 12;
-    if (monthsNumber < 1 || monthsNumber > 60) {
-      throw new Error('Months must be between 1 and 60');
-    }
-
-    return await Report.getTrends(userId, monthsNumber);
+    return await Report.getTrends(userId, this.parseMonths(months));
   }
 
   static async getCategorySpending(userId, startDate, endDate) {
@@ -79,18 +122,7 @@ class ReportService {
       throw new Error('User ID is required');
     }
 
-    const yearNumber = parseInt(year);
-
-    if (isNaN(yearNumber)) {
-      throw new Error('Year must be a number');
-    }
-
-    const currentYear = new Date().getFullYear();
-    if (yearNumber < 2000 || yearNumber > currentYear + 1) {
-      throw new Error('Year must be between 2000 and next year');
-    }
-
-    return await Report.getAnnualReport(userId, yearNumber);
+    return await Report.getAnnualReport(userId, this.parseYear(year));
   }
 
   static async getGoalsProgress(userId) {
@@ -106,12 +138,7 @@ class ReportService {
       throw new Error('User ID is required');
     }
 
-    const monthsNumber = parseInt(months) || 12;
-    if (monthsNumber < 1 || monthsNumber > 60) {
-      throw new Error('Months must be between 1 and 60');
-    }
-
-    return await Report.getIncomeVsExpense(userId, monthsNumber);
+    return await Report.getIncomeVsExpense(userId, this.parseMonths(months));
   }
 
   static async getComparison(userId, startDate1, endDate1, startDate2, endDate2) {
@@ -119,23 +146,7 @@ class ReportService {
       throw new Error('User ID is required');
     }
 
-    if (!startDate1 || !endDate1 || !startDate2 || !endDate2) {
-      throw new Error('All four date parameters are required');
-    }
-
-    const s1 = new Date(startDate1);
-    const e1 = new Date(endDate1);
-    const s2 = new Date(startDate2);
-    const e2 = new Date(endDate2);
-
-    if (isNaN(s1) || isNaN(e1) || isNaN(s2) || isNaN(e2)) {
-      throw new Error('Invalid date format');
-    }
-
-    if (s1 > e1 || s2 > e2) {
-      throw new Error('Start date must be before end date');
-    }
-
+    const [s1, e1, s2, e2] = this.parseComparisonDates(startDate1, endDate1, startDate2, endDate2);
     return await Report.getComparison(userId, s1, e1, s2, e2);
   }
 }
@@ -0,0 +1,26 @@
+const Sync = require('../models/Sync');
+
+class SyncService {
+  static parseWatermark(since) {
+    if (since === undefined || since === null || since === '') {
+      return null;
+    }
+
+    const watermark = String(since);
+    if (!/^\d+$/.test(watermark)) {
+      throw new Error('Invalid sync watermark');
+    }
+
+    return watermark;
+  }
+
+  static async getChanges(userId, since) {
+    if (!userId) {
+      throw new Error('User ID is required');
+    }
+
+    return await Sync.getChanges(userId, this.parseWatermark(since));
+  }
+}
+
+module.exports = SyncService;
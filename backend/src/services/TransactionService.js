@@ -1,7 +1,47 @@
 const db = require('../config/database');
 const Account = require('../models/Account');
+const AccountBalanceSnapshot = require('../models/AccountBalanceSnapshot');
 const Transaction = require('../models/Transaction');
 
+const EXPORT_FIELDS = [
+  'transaction_id',
+  'transaction_date',
+  'transaction_type',
+  'amount',
+  'currency',
+  'category_name',
+  'account_name',
+  'description',
+  'merchant',
+  'notes'
+];
+
+// Signed ledger entries a transaction applies to its account(s)
+const balanceDeltas = (type, amount, accountId, toAccountId) => {
+  const value = Number(amount);
+  if (type === 'income') {
+    return [{ accountId, amount: value }];
+  }
+  if (type === 'expense') {
+    return [{ accountId, amount: -value }];
+  }
+  if (type === 'transfer' && toAccountId) {
+    return [{ accountId, amount: -value }, { accountId: toAccountId, amount: value }];
+  }
+  return [];
+};
+
+// Snapshots on or after a back-dated transaction's day no longer hold
+const invalidateSnapshotsIfBackdated = async (trx, userId, transactionDate, deltas) => {
+  if (!transactionDate) {
+    return;
+  }
+  const day = AccountBalanceSnapshot.toDateString(new Date(transactionDate));
+  if (deltas.length && day < AccountBalanceSnapshot.toDateString(new Date())) {
+    await AccountBalanceSnapshot.invalidate(trx, userId, deltas.map(delta => delta.accountId), day);
+  }
+};
+
 class TransactionService {
   static async createTransaction(userId, payload) {
     if (payload.amount <= 0) {
@@ -48,23 +88,11 @@ class TransactionService {
         .insert({ ...txRecord, user_id: userId, created_at: new Date(), updated_at: new Date(), is_deleted: false, transaction_id: trx.raw('gen_random_uuid()') })
         .returning('*');
 
-      const now = new Date();
-      if (payload.type === 'income') {
-        await trx('accounts')
-          .where({ account_id: account.account_id })
-          .update({ current_balance: trx.raw('current_balance + ?', [payload.amount]), updated_at: now });
-      } else if (payload.type === 'expense') {
-        await trx('accounts')
-          .where({ account_id: account.account_id })
-          .update({ current_balance: trx.raw('current_balance - ?', [payload.amount]), updated_at: now });
-      } else if (payload.type === 'transfer' && toAccount) {
-        await trx('accounts')
-          .where({ account_id: account.account_id })
-          .update({ current_balance: trx.raw('current_balance - ?', [payload.amount]), updated_at: now });
-        await trx('accounts')
-          .where({ account_id: toAccount.account_id })
-          .update({ current_balance: trx.raw('current_balance + ?', [payload.amount]), updated_at: now });
+      const deltas = balanceDeltas(payload.type, payload.amount, account.account_id, toAccount && toAccount.account_id);
+      if (deltas.length) {
+        await Account.appendBalanceDeltas(trx, userId, created.transaction_id, deltas);
       }
+      await invalidateSnapshotsIfBackdated(trx, userId, transactionDate, deltas);
 
       return created;
     });
@@ -74,6 +102,39 @@ class TransactionService {
     return Transaction.list(userId, filters);
   }
 
+  static get exportFields() {
+    return EXPORT_FIELDS;
+  }
+
+  /**
+   * All matching transactions as export rows, streamed page by page.
+   */
+  static async *exportTransactions(userId, filters = {}) {
+    for await (const t of Transaction.exportRows(userId, filters)) {
+      yield {
+        transaction_id: t.transaction_id,
+        transaction_date: new Date(t.transaction_date).toISOString().split('T')[0],
+        transaction_type: t.transaction_type,
+        amount: t.amount,
+        currency: t.currency,
+        category_name: t.category_name || 'Uncategorized',
+        account_name: t.account_name || '',
+        description: t.description || '',
+        merchant: t.merchant || '',
+        notes: t.notes || ''
+      };
+    }
+  }
+
+  static async searchTransactions(userId, searchText, filters = {}) {
+    const normalized = (searchText || '').trim().replace(/\s+/g, ' ');
+    if (normalized.length < 2) {
+      throw new Error('Search query must be at least 2 characters');
+    }
+
+    return Transaction.search(userId, normalized, filters);
+  }
+
   static async deleteTransaction(userId, transactionId) {
     const transaction = await Transaction.findById(transactionId, userId);
     if (!transaction || transaction.is_deleted) {
@@ -87,27 +148,25 @@ class TransactionService {
         throw new Error('Account not found for transaction');
       }
 
-      // Revert balance
-      if (transaction.transaction_type === 'income') {
-        await trx('accounts')
-          .where({ account_id: account.account_id })
-          .update({ current_balance: trx.raw('current_balance - ?', [transaction.amount]), updated_at: now });
-      } else if (transaction.transaction_type === 'expense') {
-        await trx('accounts')
-          .where({ account_id: account.account_id })
-          .update({ current_balance: trx.raw('current_balance + ?', [transaction.amount]), updated_at: now });
-      } else if (transaction.transaction_type === 'transfer' && transaction.to_account_id) {
-        await trx('accounts')
-          .where({ account_id: account.account_id })
-          .update({ current_balance: trx.raw('current_balance + ?', [transaction.amount]), updated_at: now });
-        await trx('accounts')
-          .where({ account_id: transaction.to_account_id })
-          .update({ current_balance: trx.raw('current_balance - ?', [transaction.amount]), updated_at: now });
+      // Claim the row first so concurrent deletes cannot revert the balance twice
+      const deleted = await trx('transactions')
+        .where({ transaction_id: transactionId, user_id: userId, is_deleted: false })
+        .update({ is_deleted: true, updated_at: now });
+      if (!deleted) {
+        throw new Error('Transaction not found');
       }
 
-      await trx('transactions')
-        .where({ transaction_id: transactionId, user_id: userId })
-        .update({ is_deleted: true, updated_at: now });
+      // Revert balance
+      const deltas = balanceDeltas(
+        transaction.transaction_type,
+        transaction.amount,
+        account.account_id,
+        transaction.to_account_id
+      ).map(delta => ({ ...delta, amount: -delta.amount }));
+      if (deltas.length) {
+        await Account.appendBalanceDeltas(trx, userId, transactionId, deltas);
+      }
+      await invalidateSnapshotsIfBackdated(trx, userId, transaction.transaction_date, deltas);
 
       return true;
     });
@@ -1,5 +1,6 @@
 const User = require('../models/User');
-const db = require('../config/database');
+const { directory, refreshUserReplica } = require('../config/shards');
+const AccountPurgeService = require('./AccountPurgeService');
 const bcrypt = require('bcryptjs');
 const { v4: uuidv4 } = require('uuid');
 
@@ -27,10 +28,11 @@ class UserService {
       updated_at: new Date()
     };
 
-    const result = await db('users')
+    const result = await directory()('users')
       .where({ user_id: userId })
       .update(updates)
       .returning('*');
+    await refreshUserReplica(userId);
 
     return this.formatUserProfile(result[0]);
   }
@@ -50,7 +52,7 @@ class UserService {
     // Hash new password
     const hashedPassword = await bcrypt.hash(newPassword, 10);
 
-    await db('users')
+    await directory()('users')
       .where({ user_id: userId })
       .update({
         password_hash: hashedPassword,
@@ -66,7 +68,7 @@ class UserService {
     const profilePictureId = uuidv4();
     const fileUrl = `/uploads/profile-pictures/${profilePictureId}`;
 
-    await db('users')
+    await directory()('users')
       .where({ user_id: userId })
       .update({
         profile_picture_url: fileUrl,
@@ -92,23 +94,18 @@ class UserService {
       throw new Error('Password is incorrect');
     }
 
-    // Mark account as deleted instead of hard delete
-    await db('users')
-      .where({ user_id: userId })
-      .update({
-        account_status: 'deleted',
-        deleted_at: new Date(),
-        updated_at: new Date()
-      });
-
-    // Soft delete all related data
-    await db('accounts')
-      .where({ user_id: userId })
-      .update({ deleted_at: new Date() });
-
-    await db('transactions')
-      .where({ user_id: userId })
-      .update({ deleted_at: new Date() });
+    // Mark the account deleted and queue its data for the purge worker.
+    // Deleting a large account's rows here would hold locks for seconds.
+    await directory().transaction(async (trx) => {
+      await trx('users')
+        .where({ user_id: userId })
+        .update({
+          account_status: 'deleted',
+          deleted_at: new Date(),
+          updated_at: new Date()
+        });
+      await AccountPurgeService.enqueue(userId, trx);
+    });
 
     return { success: true, message: 'Account deleted successfully' };
   }
@@ -152,7 +149,7 @@ class UserService {
       updated_at: new Date()
     };
 
-    const result = await db('users')
+    const result = await directory()('users')
       .where({ user_id: userId })
       .update(updates)
       .returning('*');
@@ -0,0 +1,177 @@
+/**
+ * Winston transport that keeps the request path free of log I/O.
+ *
+ * Formatted lines go into a fixed-size ring buffer and are flushed in batches
+ * to a worker thread (utils/logWriter.js), which appends them to the log
+ * files. When the buffer is full the oldest line is overwritten and counted
+ * as dropped. Levels listed in `sampleRates` are kept with that probability;
+ * anything else (errors, warnings) is always kept.
+ *
+ * The worker acknowledges each batch through a shared counter. On exit the
+ * main thread blocks (up to `drainTimeoutMs`) until every posted batch is
+ * acknowledged, then appends the rest synchronously, including any batch the
+ * worker did not confirm in time.
+ */
+
+const fs = require('fs');
+const path = require('path');
+const { Worker } = require('worker_threads');
+const { Transport } = require('winston');
+
+const MESSAGE = Symbol.for('message');
+
+class BatchedFileTransport extends Transport {
+  constructor(options = {}) {
+    super(options);
+    this.files = options.files;
+    this.capacity = options.capacity || 10000;
+    this.batchSize = options.batchSize || 500;
+    this.sampleRates = options.sampleRates || {};
+    this.drainTimeoutMs = options.drainTimeoutMs || 2000;
+    this.buffer = new Array(this.capacity);
+    this.head = 0;
+    this.size = 0;
+    this.flushScheduled = false;
+    this.worker = null;
+    // Sequence number of the last batch the worker has written
+    this.written = new Int32Array(new SharedArrayBuffer(4));
+    this.posted = 0;
+    this.pending = [];
+    this.metrics = {
+      flushed: 0,
+      dropped: 0,
+      sampledOut: 0,
+      flushes: 0,
+      writeErrors: 0
+    };
+
+    this.timer = setInterval(() => this.flush(), options.flushIntervalMs || 1000);
+    this.timer.unref();
+    process.once('exit', () => this.flushSync());
+  }
+
+  startWorker() {
+    if (!this.worker) {
+      this.worker = new Worker(path.join(__dirname, 'logWriter.js'), {
+        workerData: { files: this.files, written: this.written }
+      });
+      this.worker.unref();
+      this.worker.on('message', () => { this.metrics.writeErrors++; });
+      this.worker.on('error', () => {
+        this.metrics.writeErrors++;
+        this.worker = null;
+      });
+      this.worker.on('exit', () => { this.worker = null; });
+    }
+    return this.worker;
+  }
+
+  log(info, callback) {
+    setImmediate(() => this.emit('logged', info));
+
+    const sampleRate = this.sampleRates[info.level];
+    if (sampleRate !== undefined && sampleRate < 1 && Math.random() >= sampleRate) {
+      this.metrics.sampledOut++;
+      return callback();
+    }
+
+    if (this.size === this.capacity) {
+      this.head = (this.head + 1) % this.capacity;
+      this.size--;
+      this.metrics.dropped++;
+    }
+    this.buffer[(this.head + this.size) % this.capacity] = { line: `${info[MESSAGE]}\n`, isError: info.level === 'error' };
+    this.size++;
+
+    if (this.size >= this.batchSize && !this.flushScheduled) {
+      this.flushScheduled = true;
+      setImmediate(() => this.flush());
+    }
+
+    return callback();
+  }
+
+  drain() {
+    let combined = '';
+    let error = '';
+    const count = this.size;
+
+    for (let i = 0; i < count; i++) {
+      const index = (this.head + i) % this.capacity;
+      const entry = this.buffer[index];
+      combined += entry.line;
+      if (entry.isError) {
+        error += entry.line;
+      }
+      this.buffer[index] = undefined;
+    }
+
+    this.head = 0;
+    this.size = 0;
+    return { combined, error, count };
+  }
+
+  flush() {
+    this.flushScheduled = false;
+    if (this.size === 0) {
+      return;
+    }
+
+    const batch = this.drain();
+    try {
+      const seq = this.posted + 1;
+      this.startWorker().postMessage({ seq, combined: batch.combined, error: batch.error });
+      this.posted = seq;
+      // Keep unacknowledged batches so exit can write them if the worker does not
+      const written = Atomics.load(this.written, 0);
+      this.pending = this.pending.filter(pending => pending.seq > written);
+      this.pending.push({ seq, ...batch });
+      this.metrics.flushed += batch.count;
+      this.metrics.flushes++;
+    } catch (err) {
+      this.metrics.writeErrors++;
+    }
+  }
+
+  // Last-chance write on exit: wait for the worker to finish the batches
+  // already posted to it, then append whatever it has not written
+  flushSync() {
+    const deadline = Date.now() + this.drainTimeoutMs;
+    let written = Atomics.load(this.written, 0);
+    while (this.worker && written < this.posted && Date.now() < deadline) {
+      Atomics.wait(this.written, 0, written, deadline - Date.now());
+      written = Atomics.load(this.written, 0);
+    }
+
+    const batches = this.pending.filter(pending => pending.seq > written);
+    this.pending = [];
+    const buffered = this.drain();
+    batches.push(buffered);
+
+    const combined = batches.map(batch => batch.combined).join('');
+    const error = batches.map(batch => batch.error).join('');
+    if (!combined) {
+      return;
+    }
+
+    try {
+      fs.appendFileSync(this.files.combined, combined);
+      if (error) {
+        fs.appendFileSync(this.files.error, error);
+      }
+      this.metrics.flushed += buffered.count;
+    } catch (err) {
+      this.metrics.writeErrors++;
+    }
+  }
+
+  getMetrics() {
+    return {
+      buffered: this.size,
+      capacity: this.capacity,
+      ...this.metrics
+    };
+  }
+}
+
+module.exports = BatchedFileTransport;
@@ -0,0 +1,125 @@
+/**
+ * Streaming CSV / NDJSON exports with no row cap.
+ *
+ * Rows are read in keyset pages (ORDER BY date DESC, id DESC, then
+ * `(date, id) < last seen`), so memory stays at one page however many rows
+ * the export has. The next page is only queried when the response has
+ * drained, which gives backpressure end to end. Each page checks a pool
+ * connection out and back in, so a slow download never pins a connection.
+ */
+
+const zlib = require('zlib');
+const { Readable, Transform } = require('stream');
+const { pipeline } = require('stream/promises');
+const logger = require('./logger');
+
+const EXPORT_BATCH_SIZE = 5000;
+
+const FORMATS = {
+  csv: { contentType: 'text/csv; charset=utf-8', extension: 'csv' },
+  ndjson: { contentType: 'application/x-ndjson; charset=utf-8', extension: 'ndjson' }
+};
+
+/**
+ * Async iterator over every row of `buildQuery()`, newest first.
+ * `buildQuery` returns a fresh, filtered knex query on each call.
+ */
+async function* keysetRows(buildQuery, { dateColumn, idColumn, batchSize = EXPORT_BATCH_SIZE }) {
+  const dateKey = dateColumn.split('.').pop();
+  const idKey = idColumn.split('.').pop();
+  let last = null;
+
+  while (true) {
+    const query = buildQuery()
+      .orderBy(dateColumn, 'desc')
+      .orderBy(idColumn, 'desc')
+      .limit(batchSize);
+    if (last) {
+      query.whereRaw('(??, ??) < (?, ?)', [dateColumn, idColumn, last[dateKey], last[idKey]]);
+    }
+
+    const rows = await query;
+    for (const row of rows) {
+      yield row;
+    }
+    if (rows.length < batchSize) {
+      return;
+    }
+    last = rows[rows.length - 1];
+  }
+}
+
+// Same quoting as the json2csv Parser the exports used before: header and
+// string values quoted, numbers and booleans bare, null/undefined empty.
+const csvValue = value => {
+  if (value === null || value === undefined) return '';
+  if (typeof value === 'number' || typeof value === 'boolean') return String(value);
+  return `"${String(value).replace(/"/g, '""')}"`;
+};
+
+const csvTransform = fields => {
+  let headerWritten = false;
+  return new Transform({
+    writableObjectMode: true,
+    transform(row, encoding, callback) {
+      let chunk = '';
+      if (!headerWritten) {
+        chunk = fields.map(csvValue).join(',');
+        headerWritten = true;
+      }
+      chunk += `\n${fields.map(field => csvValue(row[field])).join(',')}`;
+      callback(null, chunk);
+    },
+    flush(callback) {
+      callback(null, headerWritten ? '' : fields.map(csvValue).join(','));
+    }
+  });
+};
+
+const ndjsonTransform = fields => new Transform({
+  writableObjectMode: true,
+  transform(row, encoding, callback) {
+    const picked = {};
+    fields.forEach(field => { picked[field] = row[field] === undefined ? null : row[field]; });
+    callback(null, `${JSON.stringify(picked)}\n`);
+  }
+});
+
+/**
+ * Pipe `rows` (an iterable of plain objects) to the response as a download.
+ * Errors before the first byte go to the error handler as usual; after that
+ * the status is already sent, so the connection is cut to mark the download
+ * as incomplete.
+ */
+async function sendExport(res, rows, { fields, filename, format = 'csv', gzip = false }) {
+  const { contentType, extension } = FORMATS[format];
+  const serialize = format === 'csv' ? csvTransform(fields) : ndjsonTransform(fields);
+  const stages = [Readable.from(rows), serialize];
+
+  res.setHeader('Content-Type', gzip ? 'application/gzip' : contentType);
+  res.setHeader('Content-Disposition', `attachment; filename="${filename}.${extension}${gzip ? '.gz' : ''}"`);
+  res.setHeader('Cache-Control', 'no-store');
+  if (gzip) {
+    stages.push(zlib.createGzip());
+  }
+
+  try {
+    await pipeline(...stages, res);
+  } catch (error) {
+    if (!res.headersSent) {
+      throw error;
+    }
+    if (error.code === 'ERR_STREAM_PREMATURE_CLOSE') {
+      // Client went away; the generator has already stopped querying
+      return;
+    }
+    logger.error(`Export ${filename} aborted after headers were sent: ${error.message}`);
+    res.destroy(error);
+  }
+}
+
+module.exports = {
+  EXPORT_FORMATS: Object.keys(FORMATS),
+  keysetRows,
+  sendExport
+};
@@ -0,0 +1,24 @@
+// Worker thread for BatchedFileTransport: appends batches of log lines so
+// file I/O never runs on the request thread. Each batch is acknowledged in
+// the shared `written` counter, which the main thread waits on at exit.
+
+const fs = require('fs');
+const { parentPort, workerData } = require('worker_threads');
+
+const combinedFd = fs.openSync(workerData.files.combined, 'a');
+const errorFd = fs.openSync(workerData.files.error, 'a');
+
+parentPort.on('message', ({ seq, combined, error }) => {
+  try {
+    if (combined) {
+      fs.writeSync(combinedFd, combined);
+    }
+    if (error) {
+      fs.writeSync(errorFd, error);
+    }
+  } catch (err) {
+    parentPort.postMessage({ type: 'error', message: err.message });
+  }
+  Atomics.store(workerData.written, 0, seq);
+  Atomics.notify(workerData.written, 0);
+});
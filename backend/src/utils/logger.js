@@ -1,12 +1,26 @@
 const winston = require('winston');
+const BatchedFileTransport = require('./batchedFileTransport');
+
+const parseSampleRate = (value) => {
+  const rate = parseFloat(value);
+  return Number.isFinite(rate) ? Math.min(Math.max(rate, 0), 1) : 1;
+};
+
+const fileTransport = new BatchedFileTransport({
+  files: { combined: 'combined.log', error: 'error.log' },
+  capacity: parseInt(process.env.LOG_BUFFER_SIZE) || 10000,
+  flushIntervalMs: parseInt(process.env.LOG_FLUSH_INTERVAL_MS) || 1000,
+  sampleRates: {
+    info: parseSampleRate(process.env.LOG_INFO_SAMPLE_RATE),
+    http: parseSampleRate(process.env.LOG_INFO_SAMPLE_RATE),
+    debug: parseSampleRate(process.env.LOG_DEBUG_SAMPLE_RATE)
+  }
+});
 
 const logger = winston.createLogger({
   level: process.env.LOG_LEVEL || 'info',
   format: winston.format.json(),
-  transports: [
-    new winston.transports.File({ filename: 'error.log', level: 'error' }),
-    new winston.transports.File({ filename: 'combined.log' })
-  ]
+  transports: [fileTransport]
 });
 
 if (process.env.NODE_ENV !== 'production') {
@@ -15,4 +29,7 @@ if (process.env.NODE_ENV !== 'production') {
   }));
 }
 
+logger.getMetrics = () => fileTransport.getMetrics();
+logger.flush = () => fileTransport.flush();
+
 module.exports = logger;
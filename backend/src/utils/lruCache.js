@@ -0,0 +1,53 @@
+/**
+ * Small in-process LRU cache with an optional per-entry TTL.
+ *
+ * A Map keeps insertion order, so re-inserting on every hit moves the key to
+ * the end and the first key is always the least recently used.
+ */
+
+class LruCache {
+  constructor({ maxSize = 1000, ttlMs = 0 } = {}) {
+    this.maxSize = maxSize;
+    this.ttlMs = ttlMs;
+    this.entries = new Map();
+    this.hits = 0;
+    this.misses = 0;
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry || (this.ttlMs && Date.now() - entry.storedAt > this.ttlMs)) {
+      if (entry) this.entries.delete(key);
+      this.misses += 1;
+      return undefined;
+    }
+
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.hits += 1;
+    return entry.value;
+  }
+
+  set(key, value) {
+    this.entries.delete(key);
+    this.entries.set(key, { value, storedAt: Date.now() });
+    while (this.entries.size > this.maxSize) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+    return this;
+  }
+
+  delete(key) {
+    return this.entries.delete(key);
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+
+  get size() {
+    return this.entries.size;
+  }
+}
+
+module.exports = LruCache;
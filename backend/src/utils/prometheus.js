@@ -0,0 +1,171 @@
+/**
+ * Minimal Prometheus text exposition (format 0.0.4).
+ *
+ * Counters, gauges and histograms with labels, plus collectors that refresh
+ * gauges right before a scrape. Covers what /metrics needs without pulling
+ * in a client library.
+ */
+
+const escapeLabelValue = value => String(value)
+  .replace(/\\/g, '\\\\')
+  .replace(/\n/g, '\\n')
+  .replace(/"/g, '\\"');
+
+class Metric {
+  constructor(type, { name, help, labelNames = [] }) {
+    this.type = type;
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    this.series = new Map();
+  }
+
+  seriesFor(labels, create) {
+    const key = this.labelNames.map(labelName => labels[labelName] ?? '').join('\u0000');
+    if (!this.series.has(key)) {
+      this.series.set(key, { labels, value: create() });
+    }
+    return this.series.get(key);
+  }
+
+  formatLabels(labels, extra = []) {
+    const pairs = this.labelNames
+      .map(labelName => [labelName, labels[labelName] ?? ''])
+      .concat(extra)
+      .map(([labelName, value]) => `${labelName}="${escapeLabelValue(value)}"`);
+    return pairs.length ? `{${pairs.join(',')}}` : '';
+  }
+
+  header() {
+    return `# HELP ${this.name} ${this.help}\n# TYPE ${this.name} ${this.type}\n`;
+  }
+
+  reset() {
+    this.series.clear();
+  }
+}
+
+class Counter extends Metric {
+  constructor(options) {
+    super('counter', options);
+  }
+
+  inc(labels = {}, value = 1) {
+    this.seriesFor(labels, () => ({ count: 0 })).value.count += value;
+  }
+
+  render() {
+    let output = this.header();
+    this.series.forEach(({ labels, value }) => {
+      output += `${this.name}${this.formatLabels(labels)} ${value.count}\n`;
+    });
+    return output;
+  }
+}
+
+class Gauge extends Metric {
+  constructor(options) {
+    super('gauge', options);
+  }
+
+  set(labels = {}, value) {
+    this.seriesFor(labels, () => ({ current: 0 })).value.current = value;
+  }
+
+  inc(labels = {}, value = 1) {
+    this.seriesFor(labels, () => ({ current: 0 })).value.current += value;
+  }
+
+  dec(labels = {}, value = 1) {
+    this.inc(labels, -value);
+  }
+
+  render() {
+    let output = this.header();
+    this.series.forEach(({ labels, value }) => {
+      output += `${this.name}${this.formatLabels(labels)} ${value.current}\n`;
+    });
+    return output;
+  }
+}
+
+class Histogram extends Metric {
+  constructor({ buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10], ...options }) {
+    super('histogram', options);
+    this.buckets = [...buckets].sort((a, b) => a - b);
+  }
+
+  observe(labels = {}, seconds) {
+    const { value } = this.seriesFor(labels, () => ({
+      counts: new Array(this.buckets.length).fill(0),
+      sum: 0,
+      count: 0
+    }));
+
+    const index = this.buckets.findIndex(bound => seconds <= bound);
+    if (index !== -1) {
+      value.counts[index]++;
+    }
+    value.sum += seconds;
+    value.count++;
+  }
+
+  render() {
+    let output = this.header();
+    this.series.forEach(({ labels, value }) => {
+      let cumulative = 0;
+      this.buckets.forEach((bound, index) => {
+        cumulative += value.counts[index];
+        output += `${this.name}_bucket${this.formatLabels(labels, [['le', bound]])} ${cumulative}\n`;
+      });
+      output += `${this.name}_bucket${this.formatLabels(labels, [['le', '+Inf']])} ${value.count}\n`;
+      output += `${this.name}_sum${this.formatLabels(labels)} ${value.sum}\n`;
+      output += `${this.name}_count${this.formatLabels(labels)} ${value.count}\n`;
+    });
+    return output;
+  }
+}
+
+class Registry {
+  constructor() {
+    this.metrics = [];
+    this.collectors = [];
+  }
+
+  register(metric) {
+    this.metrics.push(metric);
+    return metric;
+  }
+
+  counter(options) {
+    return this.register(new Counter(options));
+  }
+
+  gauge(options) {
+    return this.register(new Gauge(options));
+  }
+
+  histogram(options) {
+    return this.register(new Histogram(options));
+  }
+
+  addCollector(collect) {
+    this.collectors.push(collect);
+  }
+
+  async render() {
+    for (const collect of this.collectors) {
+      await collect();
+    }
+    return this.metrics.map(metric => metric.render()).join('');
+  }
+}
+
+Registry.CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8';
+
+module.exports = {
+  Registry,
+  Counter,
+  Gauge,
+  Histogram
+};
@@ -0,0 +1,58 @@
+/**
+ * Purge Worker
+ *
+ * Deletes the data of accounts queued by UserService.deleteAccount, using
+ * AccountPurgeService: small keyed batches with a pause between them, so a
+ * purge of even the largest account never holds locks long enough to be
+ * noticed by API traffic. One purge runs at a time per loop; scale with
+ * PURGE_WORKER_CONCURRENCY or more processes. On SIGTERM the in-flight purge
+ * stops after its current batch and is resumed by the next worker.
+ *
+ * Usage: npm run worker:purge
+ */
+
+require('dotenv').config();
+const db = require('../config/database');
+const logger = require('../utils/logger');
+const AccountPurgeService = require('../services/AccountPurgeService');
+
+const concurrency = parseInt(process.env.PURGE_WORKER_CONCURRENCY) || 1;
+const pollIntervalMs = parseInt(process.env.PURGE_POLL_INTERVAL_MS) || 30000;
+const services = [];
+let running = true;
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+const runLoop = async (index) => {
+  const service = new AccountPurgeService();
+  services.push(service);
+
+  logger.info(`Purge worker loop ${index} started`);
+  while (running) {
+    try {
+      const worked = await service.processNext();
+      if (!worked && running) {
+        await sleep(pollIntervalMs);
+      }
+    } catch (error) {
+      logger.error(`Purge worker loop ${index} error:`, error.message);
+      await sleep(1000);
+    }
+  }
+};
+
+const shutdown = () => {
+  logger.info('Purge worker shutting down after the current batch');
+  running = false;
+  services.forEach(service => service.stop());
+};
+
+process.on('SIGTERM', shutdown);
+process.on('SIGINT', shutdown);
+
+Promise.all(Array.from({ length: concurrency }, (_, index) => runLoop(index)))
+  .catch(error => {
+    logger.error('Purge worker failed:', error.message);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
@@ -0,0 +1,72 @@
+/**
+ * Report Worker
+ *
+ * Runs jobs queued by ReportJobQueue. Each of REPORT_WORKER_CONCURRENCY loops
+ * holds one blocking Redis connection and at most one database connection,
+ * so the load heavy reports put on Postgres stays fixed however many users
+ * request them at once. Scale by running more worker processes.
+ *
+ * Usage: npm run worker:reports
+ */
+
+require('dotenv').config();
+const db = require('../config/database');
+const { runForUser } = require('../config/shards');
+const { createRedisClient } = require('../config/redis');
+const logger = require('../utils/logger');
+const ReportService = require('../services/ReportService');
+const ReportJobQueue = require('../services/ReportJobQueue');
+
+const REPORT_HANDLERS = {
+  annual: (userId, params) => ReportService.getAnnualReport(userId, params.year),
+  trends: (userId, params) => ReportService.getTrends(userId, params.months),
+  comparison: (userId, params) => ReportService.getComparison(
+    userId,
+    params.startDate1,
+    params.endDate1,
+    params.startDate2,
+    params.endDate2
+  )
+};
+
+// Queries a handler makes go to the shard holding the job's user
+const SHARDED_HANDLERS = Object.fromEntries(Object.entries(REPORT_HANDLERS).map(([type, handler]) => [
+  type,
+  (userId, params) => runForUser(userId, () => handler(userId, params))
+]));
+
+const concurrency = parseInt(process.env.REPORT_WORKER_CONCURRENCY) || 2;
+let running = true;
+
+const runLoop = async (index) => {
+  const client = createRedisClient();
+  await client.connect();
+  const queue = new ReportJobQueue(client);
+
+  logger.info(`Report worker loop ${index} started`);
+  while (running) {
+    try {
+      await queue.processNext(SHARDED_HANDLERS);
+    } catch (error) {
+      logger.error(`Report worker loop ${index} error:`, error.message);
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+  }
+
+  await client.close();
+};
+
+const shutdown = () => {
+  logger.info('Report worker shutting down after in-flight jobs');
+  running = false;
+};
+
+process.on('SIGTERM', shutdown);
+process.on('SIGINT', shutdown);
+
+Promise.all(Array.from({ length: concurrency }, (_, index) => runLoop(index)))
+  .catch(error => {
+    logger.error('Report worker failed:', error.message);
+    process.exitCode = 1;
+  })
+  .finally(() => db.destroy());
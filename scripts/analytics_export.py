@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""Incremental Parquet export of RUPAYA data plus offline analytics queries.
+
+`export` copies transactions, accounts, categories and budgets into a local
+dataset of month-partitioned Parquet files (Hive layout, `month=YYYY-MM`).
+Transactions are partitioned by transaction_date; the other tables by
+updated_at. Each run reads only rows written since the previous run, inside
+one REPEATABLE READ snapshot.
+
+The watermark is the same change_seq / snapshot-xmin pair that /api/v1/sync
+uses, not max(updated_at). updated_at is assigned by the application before
+commit, so a slow transaction can commit an older updated_at after the
+watermark has moved past it. change_seq cannot be skipped that way.
+
+Rows that change again are written again. Readers keep the copy with the
+highest change_seq per primary key. Soft deletes arrive as updates; hard
+deleted accounts stay in the export. fx_rates and users' base currencies are
+small, so every run rewrites them in full.
+
+With sharding (SHARD_DATABASE_URLS), run `export` once per database, one
+after another, into the same dataset: `--shard primary` with the primary's
+DSN, then `--shard <name> --dsn <url>` for each shard. change_seq is per
+database, so each shard keeps its own watermark. users and fx_rates are
+exported from the primary only, because the primary holds the authoritative
+users rows.
+
+Deleted accounts are dropped. The primary run also records every user_id
+in account_purges (queued by UserService.deleteAccount) in
+purged_users/purged_users.parquet. Every run leaves those users' rows out of
+the parts it writes. The first run that sees a newly purged user rewrites the
+existing parts without that user's rows. Users already dropped are kept in
+the state file so the rewrite happens only once per user.
+
+`dashboard` and `trends` answer the same questions as
+AnalyticsService.getDashboardStats and the monthly report series. They
+convert currencies with the same rule as FxRate.joinRates: use the latest
+rate on or before the date, and leave the amount unconverted when no rate is
+known. They run entirely over the Parquet files.
+
+Usage:
+  DATABASE_URL=postgres://... python3 analytics_export.py export --out ./analytics
+  python3 analytics_export.py export --out ./analytics --shard shard1 --dsn postgres://shard1/...
+  python3 analytics_export.py dashboard --out ./analytics --user <userId> --period month
+  python3 analytics_export.py trends --out ./analytics --user <userId> --months 24
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import psycopg2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 100_000
+DEFAULT_BASE_CURRENCY = 'INR'
+STATE_FILE = '_state.json'
+PRIMARY_SHARD = 'primary'
+PURGED_USERS = os.path.join('purged_users', 'purged_users.parquet')
+
+TABLES = {
+    'transactions': {'key': 'transaction_id', 'partition_by': 'transaction_date'},
+    'accounts': {'key': 'account_id', 'partition_by': 'updated_at'},
+    'categories': {'key': 'category_id', 'partition_by': 'updated_at'},
+    'budgets': {'key': 'budget_id', 'partition_by': 'updated_at'},
+}
+
+# Same shape as Account.findById: pending ledger deltas folded into the balance
+ACCOUNTS_SELECT = """
+    SELECT a.*, a.current_balance + COALESCE((
+        SELECT SUM(d.amount) FROM account_balance_deltas d WHERE d.account_id = a.account_id
+    ), 0) AS current_balance
+    FROM accounts a
+"""
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def load_state(out_dir):
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(f'{path}.tmp', 'w') as handle:
+        json.dump(state, handle, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+def normalize_frame(frame):
+    """Make psycopg2 values Arrow-friendly (Decimal -> float, json -> text)."""
+    for column in frame.columns:
+        sample = frame[column].dropna()
+        if sample.empty:
+            continue
+        value = sample.iloc[0]
+        if type(value).__name__ == 'Decimal':
+            frame[column] = pd.to_numeric(frame[column])
+        elif isinstance(value, dict):
+            frame[column] = frame[column].map(lambda item: None if item is None else json.dumps(item))
+    return frame
+
+
+def export_query(table, since):
+    if table == 'accounts':
+        if since is None:
+            return ACCOUNTS_SELECT, ()
+        # Ledger deltas change a balance without touching the account row
+        return (
+            ACCOUNTS_SELECT + """
+            WHERE a.change_seq >= %s
+               OR a.account_id IN (SELECT account_id FROM account_balance_deltas WHERE change_seq >= %s)
+            """,
+            (since, since),
+        )
+    if since is None:
+        return f'SELECT * FROM {table}', ()
+    return f'SELECT * FROM {table} WHERE change_seq >= %s', (since,)
+
+
+def write_partitions(frame, table_dir, partition_by, run_id, chunk_index):
+    months = pd.to_datetime(frame[partition_by], utc=True).dt.strftime('%Y-%m').fillna('unknown')
+    for month, part in frame.groupby(months):
+        month_dir = os.path.join(table_dir, f'month={month}')
+        os.makedirs(month_dir, exist_ok=True)
+        pq.write_table(
+            pa.Table.from_pandas(part, preserve_index=False),
+            os.path.join(month_dir, f'part-{run_id}-{chunk_index:05d}.parquet'),
+            compression='zstd',
+        )
+
+
+def export_table(conn, table, since, out_dir, run_id, purged=frozenset()):
+    config = TABLES[table]
+    sql, params = export_query(table, since)
+    table_dir = os.path.join(out_dir, table)
+    rows = 0
+
+    with conn.cursor(name=f'export_{table}') as cursor:
+        cursor.itersize = CHUNK_ROWS
+        cursor.execute(sql, params)
+        chunk_index = 0
+        while True:
+            chunk = cursor.fetchmany(CHUNK_ROWS)
+            if not chunk:
+                break
+            columns = [column.name for column in cursor.description]
+            frame = normalize_frame(pd.DataFrame(chunk, columns=columns))
+            # A.* plus the folded balance yields current_balance twice; keep the last
+            frame = frame.loc[:, ~frame.columns.duplicated(keep='last')]
+            if purged and 'user_id' in frame.columns:
+                frame = frame[~frame['user_id'].astype(str).isin(purged)]
+            write_partitions(frame, table_dir, config['partition_by'], run_id, chunk_index)
+            rows += len(frame)
+            chunk_index += 1
+
+    return rows
+
+
+def export_full(conn, sql, path):
+    frame = pd.read_sql_query(sql, conn)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(normalize_frame(frame), preserve_index=False), path)
+    return len(frame)
+
+
+def load_purged_users(out_dir):
+    path = os.path.join(out_dir, PURGED_USERS)
+    if not os.path.exists(path):
+        return set()
+    return set(pd.read_parquet(path)['user_id'].astype(str))
+
+
+def drop_users(out_dir, user_ids):
+    """Rewrite every part holding rows of `user_ids` without them. Returns rows removed."""
+    value_set = pa.array(sorted(user_ids), pa.string())
+    removed = 0
+    for table in TABLES:
+        for root, _, files in os.walk(os.path.join(out_dir, table)):
+            for name in files:
+                if not name.endswith('.parquet'):
+                    continue
+                path = os.path.join(root, name)
+                if 'user_id' not in pq.read_schema(path).names:
+                    continue
+                owners = pq.read_table(path, columns=['user_id'])['user_id'].cast(pa.string())
+                drop = pc.fill_null(pc.is_in(owners, value_set=value_set), False)
+                count = pc.sum(drop).as_py() or 0
+                if count == 0:
+                    continue
+                part = pq.read_table(path)
+                if count == len(part):
+                    os.remove(path)
+                else:
+                    pq.write_table(part.filter(pc.invert(drop)), f'{path}.tmp', compression='zstd')
+                    os.replace(f'{path}.tmp', path)
+                removed += count
+    return removed
+
+
+def run_export(args):
+    os.makedirs(args.out, exist_ok=True)
+    state = load_state(args.out)
+    # Datasets written before per-shard watermarks hold the primary's as `watermark`
+    watermarks = state.get('watermarks', {PRIMARY_SHARD: state['watermark']} if 'watermark' in state else {})
+    since = None if args.full else watermarks.get(args.shard)
+    dropped = set(state.get('dropped_users', []))
+    purged = load_purged_users(args.out)
+    run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    print('=' * 60)
+    print('RUPAYA Analytics Export')
+    print('=' * 60)
+    print(f"\n   Shard: {args.shard}, mode: {'incremental since ' + since if since else 'full'}")
+
+    start = time.perf_counter()
+    conn = psycopg2.connect(args.dsn)
+    try:
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text')
+            watermark = cursor.fetchone()[0]
+            if args.shard == PRIMARY_SHARD:
+                cursor.execute('SELECT user_id::text FROM account_purges')
+                purged = {row[0] for row in cursor.fetchall()}
+
+        for table in TABLES:
+            rows = export_table(conn, table, since, args.out, run_id, purged)
+            print(f'   {table:14s} {rows:>10,} rows')
+
+        if args.shard == PRIMARY_SHARD:
+            rates = export_full(conn, 'SELECT currency, rate_date, rate FROM fx_rates',
+                                os.path.join(args.out, 'fx_rates', 'fx_rates.parquet'))
+            users = export_full(conn, 'SELECT user_id::text, currency_preference FROM users '
+                                'WHERE user_id NOT IN (SELECT user_id FROM account_purges)',
+                                os.path.join(args.out, 'users', 'users.parquet'))
+            os.makedirs(os.path.dirname(os.path.join(args.out, PURGED_USERS)), exist_ok=True)
+            pq.write_table(pa.table({'user_id': pa.array(sorted(purged), pa.string())}),
+                           os.path.join(args.out, PURGED_USERS))
+            print(f'   {"fx_rates":14s} {rates:>10,} rows (full)')
+            print(f'   {"users":14s} {users:>10,} rows (full, base currency only)')
+        conn.commit()
+    finally:
+        conn.close()
+
+    newly_purged = purged - dropped
+    if newly_purged:
+        removed = drop_users(args.out, newly_purged)
+        print(f'   Dropped {removed:,} rows of {len(newly_purged):,} deleted account(s)')
+
+    save_state(args.out, {
+        'watermarks': {**watermarks, args.shard: watermark},
+        'last_run': run_id,
+        'dropped_users': sorted(dropped | purged),
+    })
+    print(f'\n   Watermark {watermark}, {time.perf_counter() - start:.1f}s')
+    print('=' * 60)
+
+
+# ---------------------------------------------------------------------------
+# Query layer
+# ---------------------------------------------------------------------------
+
+def read_table(out_dir, table, filters=None, columns=None, partition_filter=None):
+    """Latest copy of each row, soft-deleted rows removed.
+
+    `filters` must only use columns that never change for a row (user_id).
+    `partition_filter` prunes by `month`. An edit that moves a row to another
+    month leaves its old copy behind, so the latest change_seq per key is
+    found across all partitions first. Copies in the pruned months that are
+    not the latest are dropped, instead of winning because the newer copy
+    was filtered out.
+    """
+    path = os.path.join(out_dir, table)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns or [])
+
+    # Parts written by different runs can disagree (e.g. an all-null column
+    # typed `null`), so scan with the unified schema of every file
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    schema = pa.unify_schemas(
+        [fragment.physical_schema for fragment in dataset.get_fragments()] + [pa.schema([('month', pa.string())])]
+    )
+    dataset = ds.dataset(path, format='parquet', partitioning='hive', schema=schema)
+    wanted = None
+    if columns:
+        key = TABLES[table]['key']
+        wanted = sorted(set(columns) | {key, 'change_seq'} | ({'is_deleted'} & set(dataset.schema.names)))
+    key = TABLES[table]['key']
+    scan = filters
+    if partition_filter is not None:
+        scan = partition_filter if filters is None else filters & partition_filter
+    frame = dataset.to_table(filter=scan, columns=wanted).to_pandas()
+
+    if partition_filter is not None:
+        latest = dataset.to_table(filter=filters, columns=[key, 'change_seq']).to_pandas()
+        latest = latest.groupby(key)['change_seq'].max()
+        frame = frame[frame['change_seq'].values == frame[key].map(latest).values]
+    frame = frame.sort_values('change_seq', kind='stable').drop_duplicates(key, keep='last')
+    if 'is_deleted' in frame.columns:
+        frame = frame[~frame['is_deleted'].fillna(False).astype(bool)]
+    return frame
+
+
+def base_currency(out_dir, user_id):
+    users = pd.read_parquet(os.path.join(out_dir, 'users', 'users.parquet'))
+    match = users.loc[users['user_id'] == user_id, 'currency_preference']
+    return match.iloc[0] if len(match) and match.iloc[0] else DEFAULT_BASE_CURRENCY
+
+
+def convert_amounts(frame, out_dir, base):
+    """Add `converted` using the latest rate on or before transaction_date."""
+    frame = frame.copy()
+    frame['amount'] = frame['amount'].astype(float)
+    frame['currency'] = frame['currency'].fillna(base)
+    frame['rate_date'] = pd.to_datetime(frame['transaction_date'], utc=True).dt.tz_localize(None).dt.normalize()
+    frame['converted'] = frame['amount']
+
+    foreign = frame['currency'] != base
+    rates_path = os.path.join(out_dir, 'fx_rates', 'fx_rates.parquet')
+    if not foreign.any() or not os.path.exists(rates_path):
+        return frame
+
+    rates = pd.read_parquet(rates_path)
+    rates['rate_date'] = pd.to_datetime(rates['rate_date'])
+    rates['rate'] = rates['rate'].astype(float)
+    rates = rates.sort_values('rate_date')
+
+    rows = frame[foreign].reset_index().sort_values('rate_date')
+    rows = pd.merge_asof(rows, rates.rename(columns={'rate': 'from_rate'}),
+                         on='rate_date', by='currency', direction='backward')
+    to_rates = rates[rates['currency'] == base][['rate_date', 'rate']].rename(columns={'rate': 'to_rate'})
+    rows = pd.merge_asof(rows, to_rates, on='rate_date', direction='backward')
+
+    converted = (rows['amount'] * rows['to_rate'] / rows['from_rate']).fillna(rows['amount'])
+    frame.loc[rows['index'].values, 'converted'] = converted.values
+    return frame
+
+
+def period_start(end, period):
+    """AnalyticsService.getStartDate, including JS Date month/year overflow (Mar 31 -> Mar 3)."""
+    if period == 'week':
+        return end - timedelta(days=7)
+    if period == 'year':
+        year, month = end.year - 1, end.month
+    else:
+        year, month = (end.year - 1, 12) if end.month == 1 else (end.year, end.month - 1)
+    return end.replace(year=year, month=month, day=1) + timedelta(days=end.day - 1)
+
+
+def user_transactions(out_dir, user_id, start=None, end=None):
+    months = None
+    if start is not None:
+        months = ds.field('month') >= start.strftime('%Y-%m')
+    if end is not None:
+        before_end = ds.field('month') <= end.strftime('%Y-%m')
+        months = before_end if months is None else months & before_end
+
+    frame = read_table(out_dir, 'transactions', filters=ds.field('user_id') == user_id, partition_filter=months,
+                       columns=['user_id', 'transaction_type', 'amount', 'currency', 'category_id',
+                                'transaction_date'])
+    dates = pd.to_datetime(frame['transaction_date'], utc=True)
+    if start is not None:
+        frame = frame[dates >= pd.Timestamp(start, tz='UTC')]
+        dates = dates[frame.index]
+    if end is not None:
+        frame = frame[dates <= pd.Timestamp(end, tz='UTC')]
+    return frame
+
+
+def dashboard(out_dir, user_id, period='month', end=None):
+    """Same fields as AnalyticsService.getDashboardStats."""
+    end = end or datetime.utcnow()
+    start = period_start(end, period)
+    base = base_currency(out_dir, user_id)
+    frame = convert_amounts(user_transactions(out_dir, user_id, start, end), out_dir, base)
+
+    totals = frame.groupby('transaction_type')['converted'].sum()
+    income = float(totals.get('income', 0.0))
+    expenses = float(totals.get('expense', 0.0))
+    savings = income - expenses
+
+    categories = read_table(out_dir, 'categories', columns=['category_id', 'name'])
+    spend = (frame[frame['transaction_type'] == 'expense']
+             .merge(categories[['category_id', 'name']], on='category_id', how='inner')
+             .groupby(['category_id', 'name'], as_index=False)['converted'].sum()
+             .sort_values('converted', ascending=False))
+
+    return {
+        'period': period,
+        'startDate': start.isoformat(),
+        'endDate': end.isoformat(),
+        'currency': base,
+        'income': income,
+        'expenses': expenses,
+        'savings': savings,
+        'savingsRate': f'{savings / income * 100:.2f}' if income > 0 else '0.00',
+        'spendingByCategory': [
+            {'category': row.name, 'amount': float(row.converted)} for row in spend.itertuples(index=False)
+        ],
+    }
+
+
+def trends(out_dir, user_id, months=12, today=None):
+    """Income, expenses and net per calendar month, oldest first."""
+    today = today or date.today()
+    first = (pd.Timestamp(today).to_period('M') - (months - 1)).to_timestamp()
+    base = base_currency(out_dir, user_id)
+    frame = convert_amounts(user_transactions(out_dir, user_id, first.to_pydatetime()), out_dir, base)
+
+    frame['month'] = frame['rate_date'].dt.to_period('M')
+    monthly = (frame[frame['transaction_type'].isin(['income', 'expense'])]
+               .pivot_table(index='month', columns='transaction_type', values='converted',
+                            aggfunc='sum', fill_value=0.0)
+               .reindex(pd.period_range(first, periods=months, freq='M'), fill_value=0.0))
+
+    return [
+        {
+            'month': str(month),
+            'income': float(row.get('income', 0.0)),
+            'expenses': float(row.get('expense', 0.0)),
+            'net': float(row.get('income', 0.0) - row.get('expense', 0.0)),
+            'currency': base,
+        }
+        for month, row in monthly.iterrows()
+    ]
+
+
+def print_dashboard(args):
+    stats = dashboard(args.out, args.user, args.period)
+    print('=' * 60)
+    print(f"Dashboard ({stats['period']}, {stats['currency']})")
+    print('=' * 60)
+    print(f"   • Income:        {stats['income']:12,.2f}")
+    print(f"   • Expenses:      {stats['expenses']:12,.2f}")
+    print(f"   • Savings:       {stats['savings']:12,.2f}")
+    print(f"   • Savings Rate:  {stats['savingsRate']}%")
+    for i, cat in enumerate(stats['spendingByCategory'][:10], 1):
+        print(f"      {i:2d}. {cat['category']:25s} {cat['amount']:12,.2f}")
+
+
+def print_trends(args):
+    rows = trends(args.out, args.user, args.months)
+    print('=' * 60)
+    print(f'Monthly trends ({args.months} months)')
+    print('=' * 60)
+    for row in rows:
+        print(f"   {row['month']}  income {row['income']:12,.2f}  "
+              f"expenses {row['expenses']:12,.2f}  net {row['net']:12,.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parquet export and offline analytics')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    export = subcommands.add_parser('export', help='Export changes since the last run')
+    export.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help='Postgres DSN (default: $DATABASE_URL)')
+    export.add_argument('--out', default='analytics', help='Dataset directory')
+    export.add_argument('--full', action='store_true', help='Ignore the stored watermark')
+    export.add_argument('--shard', default=PRIMARY_SHARD,
+                        help='Shard name the DSN points at; keys the watermark (default: primary)')
+
+    dash = subcommands.add_parser('dashboard', help='Dashboard totals for one user')
+    dash.add_argument('--out', default='analytics')
+    dash.add_argument('--user', required=True)
+    dash.add_argument('--period', choices=['week', 'month', 'year'], default='month')
+
+    trend = subcommands.add_parser('trends', help='Monthly income / expenses for one user')
+    trend.add_argument('--out', default='analytics')
+    trend.add_argument('--user', required=True)
+    trend.add_argument('--months', type=int, default=12)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        if not args.dsn:
+            parser.error('--dsn or DATABASE_URL is required')
+        run_export(args)
+    elif args.command == 'dashboard':
+        print_dashboard(args)
+    else:
+        print_trends(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Check that account balances match their transaction history.
+
+Reads Postgres directly (not the API) so it covers every account. Accounts
+are split into hash partitions, one worker process per partition. Each worker
+streams its transactions through a server-side cursor, and sums signed
+amounts per account with pandas group-bys over each chunk. It then compares
+the result with the account's balance, which is current_balance plus
+uncompacted ledger deltas.
+
+An account's opening balance is not recorded anywhere, so the check is:
+
+    implied_opening = balance - sum(transaction effects)
+
+Without --baseline every opening balance is taken to be 0. With --baseline
+(a CSV written earlier by --write-baseline) an account drifts when its
+implied opening balance has changed since that run: something moved the
+balance without a transaction, or a transaction without moving the balance.
+
+Drifted accounts go to --report as CSV. --repair-plan writes SQL that appends
+compensating ledger deltas. The SQL is never applied automatically. It
+requires --baseline, because without one any account opened with a non-zero
+balance looks drifted, and the plan would zero out that opening balance.
+
+Usage:
+  DATABASE_URL=postgres://... python3 check_balance_integrity.py --workers 8 \
+      --baseline baseline.csv --report drift.csv --repair-plan repair.sql
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+CHUNK_ROWS = 200_000
+
+# Signed effect of every live transaction on each account it touches.
+# Transfers debit account_id and credit to_account_id.
+EFFECTS_SQL = """
+    SELECT account_id::text AS account_id,
+           CASE WHEN transaction_type = 'income' THEN amount ELSE -amount END AS amount
+    FROM transactions
+    WHERE is_deleted = false
+      AND transaction_type IN ('income', 'expense', 'transfer')
+      AND abs(hashtext(account_id::text)) %% %(partitions)s = %(partition)s
+    UNION ALL
+    SELECT to_account_id::text, amount
+    FROM transactions
+    WHERE is_deleted = false
+      AND transaction_type = 'transfer'
+      AND to_account_id IS NOT NULL
+      AND abs(hashtext(to_account_id::text)) %% %(partitions)s = %(partition)s
+"""
+
+BALANCES_SQL = """
+    SELECT a.account_id::text AS account_id,
+           a.user_id::text AS user_id,
+           a.current_balance + COALESCE(d.pending, 0) AS balance
+    FROM accounts a
+    LEFT JOIN (
+        SELECT account_id, SUM(amount) AS pending
+        FROM account_balance_deltas
+        GROUP BY account_id
+    ) d ON d.account_id = a.account_id
+    WHERE abs(hashtext(a.account_id::text)) %% %(partitions)s = %(partition)s
+"""
+
+
+def to_cents(values):
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def check_partition(dsn, partition, partitions):
+    """Return one DataFrame row per account in the partition."""
+    params = {'partition': partition, 'partitions': partitions}
+    conn = psycopg2.connect(dsn)
+    try:
+        # One snapshot for both reads, so a transaction and its ledger delta
+        # are either both visible or both not
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+
+        with conn.cursor(name=f'balance_effects_{partition}') as cursor:
+            cursor.itersize = CHUNK_ROWS
+            cursor.execute(EFFECTS_SQL, params)
+            totals = pd.Series(dtype=np.int64)
+            rows = 0
+            while True:
+                chunk = cursor.fetchmany(CHUNK_ROWS)
+                if not chunk:
+                    break
+                rows += len(chunk)
+                frame = pd.DataFrame(chunk, columns=['account_id', 'amount'])
+                frame['cents'] = to_cents(frame['amount'])
+                totals = totals.add(frame.groupby('account_id')['cents'].sum(), fill_value=0)
+
+        with conn.cursor() as cursor:
+            cursor.execute(BALANCES_SQL, params)
+            accounts = pd.DataFrame(cursor.fetchall(), columns=['account_id', 'user_id', 'balance'])
+    finally:
+        conn.close()
+
+    accounts['balance_cents'] = to_cents(accounts['balance'])
+    accounts['effects_cents'] = accounts['account_id'].map(totals).fillna(0).astype(np.int64)
+    accounts['implied_opening_cents'] = accounts['balance_cents'] - accounts['effects_cents']
+    accounts.attrs['rows'] = rows
+    return accounts.drop(columns=['balance'])
+
+
+def load_baseline(path):
+    baseline = pd.read_csv(path, dtype={'account_id': str})
+    return baseline.set_index('account_id')['implied_opening_cents']
+
+
+def find_drift(accounts, baseline, tolerance_cents):
+    if baseline is None:
+        expected_opening = pd.Series(0, index=accounts.index, dtype=np.int64)
+    else:
+        # Accounts created after the baseline have nothing to compare against
+        expected_opening = accounts['account_id'].map(baseline)
+        accounts = accounts[expected_opening.notna()]
+        expected_opening = expected_opening[expected_opening.notna()].astype(np.int64)
+
+    drift = accounts.assign(
+        expected_cents=expected_opening + accounts['effects_cents'],
+        drift_cents=accounts['implied_opening_cents'] - expected_opening
+    )
+    return drift[drift['drift_cents'].abs() > tolerance_cents]
+
+
+def write_report(drift, path):
+    report = pd.DataFrame({
+        'account_id': drift['account_id'],
+        'user_id': drift['user_id'],
+        'balance': drift['balance_cents'] / 100,
+        'expected_balance': drift['expected_cents'] / 100,
+        'drift': drift['drift_cents'] / 100,
+    }).sort_values('drift', key=np.abs, ascending=False)
+    report.to_csv(path, index=False)
+
+
+def write_repair_plan(drift, path):
+    """Compensating ledger deltas; compaction folds them in like any other."""
+    with open(path, 'w') as plan:
+        plan.write('-- Balance repair plan generated by check_balance_integrity.py\n')
+        plan.write('-- Review before running: psql "$DATABASE_URL" -f <this file>\n')
+        plan.write('BEGIN;\n')
+        for row in drift.itertuples(index=False):
+            plan.write(
+                'INSERT INTO account_balance_deltas (account_id, user_id, amount) '
+                f"VALUES ('{row.account_id}', '{row.user_id}', {-row.drift_cents / 100:.2f});\n"
+            )
+        plan.write('COMMIT;\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check account balances against transaction history')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help='Postgres DSN (default: $DATABASE_URL)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Worker processes / hash partitions')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='Ignore drift up to this amount')
+    parser.add_argument('--baseline', help='CSV from an earlier --write-baseline run')
+    parser.add_argument('--write-baseline', help='Write implied opening balances for the next run')
+    parser.add_argument('--report', default='balance_drift.csv', help='Drifted accounts (CSV)')
+    parser.add_argument('--repair-plan', help='Write compensating ledger deltas as SQL (needs --baseline)')
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+    if args.repair_plan and not args.baseline:
+        parser.error('--repair-plan requires --baseline; zero opening balances are not a safe reference')
+
+    print('=' * 60)
+    print('RUPAYA Balance Integrity Check')
+    print('=' * 60)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(check_partition, args.dsn, partition, args.workers)
+                   for partition in range(args.workers)]
+        partitions = [future.result() for future in futures]
+
+    rows = sum(frame.attrs['rows'] for frame in partitions)
+    accounts = pd.concat(partitions, ignore_index=True)
+    elapsed = time.perf_counter() - start
+    print(f'\nScanned {rows:,} transaction effects for {len(accounts):,} accounts '
+          f'in {elapsed:.1f}s ({args.workers} workers)')
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    drift = find_drift(accounts, baseline, round(args.tolerance * 100))
+
+    print(f"   Mode:            {'against baseline ' + args.baseline if baseline is not None else 'zero opening balances'}")
+    print(f'   Drifted:         {len(drift):,}')
+    print(f"   Total drift:     {drift['drift_cents'].sum() / 100:,.2f}")
+
+    if len(drift):
+        write_report(drift, args.report)
+        print(f'\n   Report written to {args.report}')
+        worst = drift.reindex(drift['drift_cents'].abs().sort_values(ascending=False).index).head(5)
+        for row in worst.itertuples(index=False):
+            print(f'      {row.account_id}  drift {row.drift_cents / 100:12,.2f}')
+
+    if args.repair_plan and len(drift):
+        write_repair_plan(drift, args.repair_plan)
+        print(f'   Repair plan written to {args.repair_plan}')
+
+    if args.write_baseline:
+        accounts[['account_id', 'implied_opening_cents']].to_csv(args.write_baseline, index=False)
+        print(f'   Baseline written to {args.write_baseline}')
+
+    print('\n' + '=' * 60)
+    print('✓ Balances consistent' if drift.empty else '✗ Balance drift found')
+    print('=' * 60)
+    return 0 if drift.empty else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -127,8 +127,13 @@ for txn_data in transactions_data:
         "date": f"{txn_data['date']}T12:00:00Z"
     }
     
-    resp = requests.post('http://localhost:3000/api/v1/transactions', json=txn_request, headers=headers)
-    if resp.status_code == 201:
+    # Stable key per seed row, so re-running the script replays instead of double-posting
+    idempotency_key = f"seed-{txn_data['date']}-{txn_data['description']}"
+    resp = requests.post('http://localhost:3000/api/v1/transactions', json=txn_request,
+                         headers={**headers, 'Idempotency-Key': idempotency_key})
+    if resp.status_code == 201 and resp.headers.get('Idempotent-Replayed'):
+        failed_count += 1
+    elif resp.status_code == 201:
         created_count += 1
         print(f"   ✓ {txn_data['date']}: {txn_data['description']} (${txn_data['amount']})")
     else:
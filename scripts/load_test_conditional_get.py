@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Load-test scenario for ETag / If-None-Match on polled endpoints.
+
+Simulates app clients polling /categories, /accounts, /settings and
+notification preferences. Each endpoint is hit twice with the same load:
+once as a plain poll and once replaying the last ETag the client saw. The
+report compares latency and bytes transferred, then prints the server-side
+hit-rate counters from /health.
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = 'http://localhost:3000'
+ENDPOINTS = [
+    '/api/v1/categories',
+    '/api/v1/accounts',
+    '/api/v1/settings',
+    '/api/v1/notifications/preferences',
+]
+
+
+def signin(email, password):
+    resp = requests.post(f'{BASE_URL}/api/v1/auth/signin', json={
+        'email': email,
+        'password': password,
+        'deviceId': 'etag-load-test'
+    })
+    resp.raise_for_status()
+    return {'Authorization': f"Bearer {resp.json()['accessToken']}"}
+
+
+def poll(session, url, headers, etag):
+    request_headers = dict(headers)
+    if etag:
+        request_headers['If-None-Match'] = etag
+    start = time.perf_counter()
+    resp = session.get(url, headers=request_headers)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return resp.status_code, len(resp.content), elapsed_ms
+
+
+def run_scenario(url, headers, requests_per_client, clients, conditional):
+    etag = None
+    if conditional:
+        etag = requests.get(url, headers=headers).headers.get('ETag')
+
+    def client(_):
+        session = requests.Session()
+        return [poll(session, url, headers, etag) for _ in range(requests_per_client)]
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = [r for batch in pool.map(client, range(clients)) for r in batch]
+
+    latencies = sorted(r[2] for r in results)
+    return {
+        'requests': len(results),
+        'not_modified': sum(1 for r in results if r[0] == 304),
+        'bytes': sum(r[1] for r in results),
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--email', default='iostest@example.com')
+    parser.add_argument('--password', default='TestPass123!@#')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=50, help='requests per client per scenario')
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("RUPAYA Conditional GET Load Test")
+    print("=" * 78)
+
+    headers = signin(args.email, args.password)
+
+    for path in ENDPOINTS:
+        url = f'{BASE_URL}{path}'
+        plain = run_scenario(url, headers, args.requests, args.clients, conditional=False)
+        cached = run_scenario(url, headers, args.requests, args.clients, conditional=True)
+        saved = 100 * (1 - cached['bytes'] / plain['bytes']) if plain['bytes'] else 0
+
+        print(f"\n{path}")
+        print(f"   plain poll:   {plain['requests']:6d} req  {plain['bytes']:10d} B  "
+              f"p50 {plain['p50_ms']:7.2f} ms  p95 {plain['p95_ms']:7.2f} ms")
+        print(f"   If-None-Match:{cached['requests']:6d} req  {cached['bytes']:10d} B  "
+              f"p50 {cached['p50_ms']:7.2f} ms  p95 {cached['p95_ms']:7.2f} ms  "
+              f"304s {cached['not_modified']}")
+        print(f"   bandwidth saved: {saved:5.1f}%")
+
+    health = requests.get(f'{BASE_URL}/health').json()
+    print("\nServer-side hit rates:")
+    for route, stats in sorted(health.get('conditionalRequests', {}).items()):
+        print(f"   {route:40s} hits {stats['hits']:6d}  misses {stats['misses']:6d}  "
+              f"hit rate {stats['hitRate'] * 100:5.1f}%  ~{stats['estimatedBytesSaved']} B saved")
+
+    print("\n" + "=" * 78)
+
+
+if __name__ == '__main__':
+    main()
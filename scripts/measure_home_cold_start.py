@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Measure home-screen cold start: sequential calls vs GET /api/v1/home.
+
+The legacy launch path fetches accounts, transactions, categories, the
+dashboard, budget progress and notification stats one after another, each
+on a fresh connection. The composite endpoint returns the same screen in one
+request.
+
+A slow mobile network is simulated by adding --rtt milliseconds per request
+(one round trip each for connection setup and the request itself), so the
+report shows how the saving grows with latency. Server time is measured
+without the added delay.
+
+Usage:
+  python3 measure_home_cold_start.py --email you@example.com --password ... \
+      --iterations 20 --rtt 0 150 400
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+BASE_URL = 'http://localhost:3000/api/v1'
+LEGACY_CALLS = [
+    '/accounts',
+    '/transactions?limit=10',
+    '/categories',
+    '/analytics/dashboard?period=month',
+    '/analytics/budget-progress',
+    '/notifications?is_read=false&limit=1',
+]
+HOME_CALLS = ['/home?period=month&recentLimit=10']
+
+
+def signin(email, password):
+    resp = requests.post(f'{BASE_URL}/auth/signin', json={
+        'email': email,
+        'password': password,
+        'deviceId': 'home-cold-start'
+    })
+    resp.raise_for_status()
+    return {'Authorization': f"Bearer {resp.json()['accessToken']}"}
+
+
+def cold_start(paths, headers):
+    """One launch: every call on a new connection, as on a cold app start."""
+    server_ms = 0.0
+    size = 0
+    for path in paths:
+        start = time.perf_counter()
+        resp = requests.get(f'{BASE_URL}{path}', headers={**headers, 'Connection': 'close'})
+        server_ms += (time.perf_counter() - start) * 1000
+        resp.raise_for_status()
+        size += len(resp.content)
+    return server_ms, size
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[max(0, int(len(ordered) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare home-screen cold start before and after /home')
+    parser.add_argument('--email', default='iostest@example.com')
+    parser.add_argument('--password', default='TestPass123!@#')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--rtt', type=int, nargs='+', default=[0, 150, 400],
+                        help='Simulated network round-trip times (ms)')
+    args = parser.parse_args()
+
+    print('=' * 60)
+    print('RUPAYA Home Cold Start')
+    print('=' * 60)
+
+    headers = signin(args.email, args.password)
+    results = {}
+    for label, paths in (('sequential', LEGACY_CALLS), ('/home', HOME_CALLS)):
+        runs = [cold_start(paths, headers) for _ in range(args.iterations)]
+        results[label] = {
+            'server': [run[0] for run in runs],
+            'bytes': runs[-1][1],
+            'requests': len(paths),
+        }
+
+    for label, result in results.items():
+        p50, p95 = summarize(result['server'])
+        print(f"\n{label:<11} {result['requests']} request(s), {result['bytes']:,} bytes")
+        print(f"   server+local p50 {p50:7.1f} ms   p95 {p95:7.1f} ms")
+
+    print(f"\n{'RTT (ms)':>9} {'sequential':>12} {'/home':>10} {'saved':>8}")
+    for rtt in args.rtt:
+        # connection setup + request/response = 2 round trips per request
+        totals = {
+            label: summarize(result['server'])[0] + result['requests'] * 2 * rtt
+            for label, result in results.items()
+        }
+        saved = totals['sequential'] - totals['/home']
+        print(f"{rtt:>9} {totals['sequential']:>10.0f}ms {totals['/home']:>8.0f}ms {saved:>6.0f}ms")
+
+    print('\n' + '=' * 60)
+
+
+if __name__ == '__main__':
+    main()
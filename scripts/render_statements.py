@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""Batch-render monthly statements (HTML, optional PNG charts) for every user.
+
+All users' monthly aggregates come from one bulk SQL pull: daily income and
+expense totals per category, converted to each user's base currency with
+the same rule as FxRate.joinRates. Rows stream through a server-side cursor
+ordered by user_id, so memory holds only the users currently being rendered.
+
+Users are grouped into batches and rendered across a ProcessPoolExecutor.
+The figure layouts and page template are built once per worker process.
+Per user only the data is filled in, and figures are rendered as plain dicts
+with validation off, which skips most of Plotly's per-figure cost. PNG export
+(--png) goes through kaleido and is much slower than HTML. Enable it only
+when the time budget allows.
+
+Output goes to a local directory or to S3-compatible storage
+(--out s3://bucket/prefix, with --s3-endpoint for MinIO and similar):
+  <out>/<YYYY-MM>/<user_id>/statement.html
+  <out>/<YYYY-MM>/<user_id>/spending.png, daily.png   (with --png)
+
+--time-budget stops reading new users once the window is used up and lets
+in-flight batches finish. It then prints the --resume-after value for the
+next run. Batches are taken in user_id order, so a resumed run never skips
+or repeats a user.
+
+With sharding (SHARD_DATABASE_URLS), a user's transactions live on one
+database only, so run the renderer once per database: the primary, then
+each shard with --dsn set to its URL. Each run renders the users whose
+transactions are on that database, against their replicated users row.
+
+Usage:
+  DATABASE_URL=postgres://... python3 render_statements.py --out ./statements
+  python3 render_statements.py --dsn postgres://shard1/... --out ./statements
+  python3 render_statements.py --month 2026-09 --out s3://rupaya-statements --workers 16
+  python3 render_statements.py --time-budget 240 --resume-after <userId> --png
+"""
+
+import argparse
+import html
+import itertools
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from string import Template
+
+import plotly.io as pio
+import psycopg2
+
+DEFAULT_BASE_CURRENCY = 'INR'
+FETCH_ROWS = 20_000
+ZERO_UUID = '00000000-0000-0000-0000-000000000000'
+
+# One row per user, day, type and category. The fx lookups mirror
+# FxRate.joinRates / convertedAmount.
+AGGREGATES_SQL = """
+    SELECT t.user_id::text AS user_id,
+           u.base_currency,
+           t.transaction_type,
+           COALESCE(c.name, 'Uncategorized') AS category,
+           t.transaction_date::date AS day,
+           SUM(CASE WHEN COALESCE(t.currency, u.base_currency) = u.base_currency THEN t.amount
+                    ELSE COALESCE(t.amount * fx_to.rate / fx_from.rate, t.amount) END)::float8 AS amount,
+           COUNT(*) AS transactions
+    FROM transactions t
+    JOIN (
+        SELECT user_id, COALESCE(currency_preference, %(default_currency)s) AS base_currency FROM users
+    ) u ON u.user_id = t.user_id
+    LEFT JOIN categories c ON c.category_id = t.category_id
+    LEFT JOIN LATERAL (
+        SELECT fx_rates.rate FROM fx_rates
+        WHERE t.currency <> u.base_currency AND fx_rates.currency = t.currency
+          AND fx_rates.rate_date <= t.transaction_date
+        ORDER BY fx_rates.rate_date DESC LIMIT 1
+    ) AS fx_from ON true
+    LEFT JOIN LATERAL (
+        SELECT fx_rates.rate FROM fx_rates
+        WHERE t.currency <> u.base_currency AND fx_rates.currency = u.base_currency
+          AND fx_rates.rate_date <= t.transaction_date
+        ORDER BY fx_rates.rate_date DESC LIMIT 1
+    ) AS fx_to ON true
+    WHERE t.is_deleted = false
+      AND t.transaction_type IN ('income', 'expense')
+      AND t.transaction_date >= %(start)s AND t.transaction_date < %(end)s
+      AND t.user_id > %(after)s::uuid
+    GROUP BY t.user_id, u.base_currency, t.transaction_type, c.name, t.transaction_date::date
+    ORDER BY t.user_id
+"""
+
+PAGE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>RUPAYA statement $month</title>
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
+<style>
+  body { font-family: -apple-system, 'Segoe UI', Roboto, sans-serif; margin: 2rem auto; max-width: 960px; color: #1f2933; }
+  table { border-collapse: collapse; width: 100%; margin: 1rem 0; }
+  th, td { padding: 0.4rem 0.6rem; border-bottom: 1px solid #e4e7eb; text-align: left; }
+  td.amount { text-align: right; font-variant-numeric: tabular-nums; }
+  .totals td { font-weight: 600; }
+</style>
+</head>
+<body>
+<h1>Monthly statement &middot; $month</h1>
+<table class="totals">
+  <tr><th>Income</th><th>Expenses</th><th>Net</th><th>Savings rate</th></tr>
+  <tr><td class="amount">$income</td><td class="amount">$expenses</td><td class="amount">$net</td><td class="amount">$savings_rate%</td></tr>
+</table>
+$spending_chart
+$daily_chart
+<h2>Spending by category</h2>
+<table>
+  <tr><th>Category</th><th>Transactions</th><th>Amount ($currency)</th></tr>
+$category_rows
+</table>
+<p>Generated $generated_at</p>
+</body>
+</html>
+""")
+
+SPENDING_LAYOUT = {
+    'title': {'text': 'Spending by category'},
+    'height': 380,
+    'margin': {'l': 20, 'r': 20, 't': 50, 'b': 20},
+    'showlegend': True,
+    'template': 'plotly_white',
+}
+
+DAILY_LAYOUT = {
+    'title': {'text': 'Cumulative income and spending'},
+    'height': 320,
+    'margin': {'l': 50, 'r': 20, 't': 50, 'b': 40},
+    'xaxis': {'type': 'date'},
+    'legend': {'orientation': 'h', 'y': -0.2},
+    'template': 'plotly_white',
+}
+
+# Set once per worker process by init_worker
+_worker = {}
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+class LocalStore:
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, key, body, content_type):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(body)
+
+
+class S3Store:
+    def __init__(self, url, endpoint=None):
+        import boto3  # only needed for s3:// output
+
+        bucket, _, prefix = url[len('s3://'):].partition('/')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client('s3', endpoint_url=endpoint)
+
+    def put(self, key, body, content_type):
+        full_key = f'{self.prefix}/{key}' if self.prefix else key
+        self.client.put_object(Bucket=self.bucket, Key=full_key, Body=body, ContentType=content_type)
+
+
+def open_store(out, endpoint):
+    return S3Store(out, endpoint) if out.startswith('s3://') else LocalStore(out)
+
+
+# ---------------------------------------------------------------------------
+# Rendering (worker processes)
+# ---------------------------------------------------------------------------
+
+def init_worker(out, endpoint, month_label, png):
+    _worker['store'] = open_store(out, endpoint)
+    _worker['month'] = month_label
+    _worker['png'] = png
+    _worker['generated_at'] = datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
+
+
+def summarize(rows):
+    """Totals, category split and cumulative daily series for one user."""
+    totals = {'income': 0.0, 'expense': 0.0}
+    categories = defaultdict(lambda: [0.0, 0])
+    daily = defaultdict(lambda: {'income': 0.0, 'expense': 0.0})
+
+    for row in rows:
+        totals[row['transaction_type']] += row['amount']
+        daily[row['day']][row['transaction_type']] += row['amount']
+        if row['transaction_type'] == 'expense':
+            categories[row['category']][0] += row['amount']
+            categories[row['category']][1] += row['transactions']
+
+    days = sorted(daily)
+    income_series = list(itertools.accumulate(daily[day]['income'] for day in days))
+    expense_series = list(itertools.accumulate(daily[day]['expense'] for day in days))
+    return {
+        'income': totals['income'],
+        'expenses': totals['expense'],
+        'categories': sorted(categories.items(), key=lambda item: item[1][0], reverse=True),
+        'days': [day.isoformat() for day in days],
+        'cumulative_income': income_series,
+        'cumulative_expenses': expense_series,
+    }
+
+
+def figures(summary):
+    spending = {
+        'data': [{
+            'type': 'pie',
+            'hole': 0.5,
+            'labels': [name for name, _ in summary['categories']],
+            'values': [round(amount, 2) for _, (amount, _) in summary['categories']],
+            'sort': False,
+        }],
+        'layout': SPENDING_LAYOUT,
+    }
+    daily = {
+        'data': [
+            {'type': 'scatter', 'mode': 'lines', 'name': 'Income',
+             'x': summary['days'], 'y': summary['cumulative_income'], 'line': {'color': '#2e7d32'}},
+            {'type': 'scatter', 'mode': 'lines', 'name': 'Spending',
+             'x': summary['days'], 'y': summary['cumulative_expenses'], 'line': {'color': '#c62828'}},
+        ],
+        'layout': DAILY_LAYOUT,
+    }
+    return spending, daily
+
+
+def render_user(user_id, currency, rows):
+    summary = summarize(rows)
+    spending, daily = figures(summary)
+    store = _worker['store']
+    prefix = f"{_worker['month']}/{user_id}"
+
+    chart_html = {
+        name: pio.to_html(fig, include_plotlyjs=False, full_html=False, validate=False,
+                          config={'displayModeBar': False})
+        for name, fig in (('spending', spending), ('daily', daily))
+    }
+
+    income, expenses = summary['income'], summary['expenses']
+    net = income - expenses
+    page = PAGE.substitute(
+        month=_worker['month'],
+        currency=html.escape(currency),
+        income=f'{income:,.2f}',
+        expenses=f'{expenses:,.2f}',
+        net=f'{net:,.2f}',
+        savings_rate=f'{net / income * 100:.2f}' if income > 0 else '0.00',
+        spending_chart=chart_html['spending'] if summary['categories'] else '',
+        daily_chart=chart_html['daily'],
+        category_rows='\n'.join(
+            f'  <tr><td>{html.escape(name)}</td><td>{count}</td><td class="amount">{amount:,.2f}</td></tr>'
+            for name, (amount, count) in summary['categories']
+        ),
+        generated_at=_worker['generated_at'],
+    )
+    store.put(f'{prefix}/statement.html', page.encode('utf-8'), 'text/html; charset=utf-8')
+    written = len(page)
+
+    if _worker['png']:
+        for name, fig in (('spending', spending), ('daily', daily)):
+            image = pio.to_image(fig, format='png', width=900, validate=False)
+            store.put(f'{prefix}/{name}.png', image, 'image/png')
+            written += len(image)
+
+    return written
+
+
+def render_batch(batch):
+    """Render one batch of (user_id, currency, rows); returns (users, bytes)."""
+    written = 0
+    for user_id, currency, rows in batch:
+        written += render_user(user_id, currency, rows)
+    return len(batch), written
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def month_bounds(label):
+    start = datetime.strptime(label, '%Y-%m').date()
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, end
+
+
+def previous_month():
+    first = date.today().replace(day=1)
+    return (first - timedelta(days=1)).strftime('%Y-%m')
+
+
+def user_batches(conn, start, end, after, batch_size, limit):
+    """Yield lists of (user_id, currency, rows) in user_id order."""
+    with conn.cursor(name='statement_aggregates') as cursor:
+        cursor.itersize = FETCH_ROWS
+        cursor.execute(AGGREGATES_SQL, {
+            'default_currency': DEFAULT_BASE_CURRENCY,
+            'start': start,
+            'end': end,
+            'after': after,
+        })
+        columns = [column.name for column in cursor.description]
+        rows = (dict(zip(columns, row)) for row in cursor)
+
+        batch = []
+        users = 0
+        for user_id, user_rows in itertools.groupby(rows, key=lambda row: row['user_id']):
+            user_rows = list(user_rows)
+            batch.append((user_id, user_rows[0]['base_currency'], user_rows))
+            users += 1
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+            if limit and users >= limit:
+                break
+        if batch:
+            yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render monthly statements for every user')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help='Postgres DSN (default: $DATABASE_URL)')
+    parser.add_argument('--month', default=previous_month(), help='Statement month, YYYY-MM (default: last month)')
+    parser.add_argument('--out', default='statements', help='Directory or s3://bucket/prefix')
+    parser.add_argument('--s3-endpoint', default=os.environ.get('S3_ENDPOINT_URL'),
+                        help='Endpoint for S3-compatible storage (default: $S3_ENDPOINT_URL)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=200, help='Users per worker task')
+    parser.add_argument('--png', action='store_true', help='Also export chart PNGs (needs kaleido)')
+    parser.add_argument('--time-budget', type=float, help='Minutes before no new users are started')
+    parser.add_argument('--resume-after', default=ZERO_UUID, help='Start after this user_id')
+    parser.add_argument('--limit', type=int, help='Render at most this many users')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+
+    start, end = month_bounds(args.month)
+    deadline = time.monotonic() + args.time_budget * 60 if args.time_budget else None
+
+    print('=' * 60)
+    print(f'RUPAYA Statements {args.month}')
+    print('=' * 60)
+    print(f"\n   Workers: {args.workers}, batch {args.batch_size} users, PNG {'on' if args.png else 'off'}")
+
+    started = time.perf_counter()
+    users = 0
+    written = 0
+    # Batches are submitted in user_id order and all finish before exit
+    resume_after = args.resume_after
+    stopped_early = False
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        conn.set_session(readonly=True)
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                 initargs=(args.out, args.s3_endpoint, args.month, args.png)) as pool:
+            in_flight = set()
+            for batch in user_batches(conn, start, end, args.resume_after, args.batch_size, args.limit):
+                if deadline and time.monotonic() > deadline:
+                    stopped_early = True
+                    break
+                # Keep a bounded number of batches queued so memory stays flat
+                while len(in_flight) >= args.workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        count, size = future.result()
+                        users += count
+                        written += size
+                future = pool.submit(render_batch, batch)
+                in_flight.add(future)
+                resume_after = batch[-1][0]
+
+            for future in in_flight:
+                count, size = future.result()
+                users += count
+                written += size
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = users / elapsed if elapsed else 0.0
+    print(f'\n   Rendered {users:,} statements, {written / 1e6:,.1f} MB in {elapsed:,.1f}s')
+    if rate:
+        print(f'   {rate:,.1f} users/s; 100,000 users would take {100_000 / rate / 60:,.1f} min')
+    if stopped_early:
+        print(f'\n   ⚠ Time budget reached. Continue with --resume-after {resume_after}')
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
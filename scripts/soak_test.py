@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Soak test: hours of steady mixed load, failing on memory or latency drift.
+
+Several parts of the backend keep state for the life of the process: the
+deployment-metrics buffers, feature-flag check counters, the in-memory cache
+client (one timer per key), the rate-limiter store and the idempotency
+store. A slow leak in any of them only shows after hours. This harness drives
+a backend at a fixed request rate and samples it periodically:
+
+  - RSS and V8 heap used          (nodejs_memory_bytes on /metrics)
+  - event-loop lag p99            (nodejs_eventloop_lag_seconds on /metrics)
+  - client-side p99 latency       (per sample window)
+
+After a warm-up period it fits a least-squares line to each series and
+fails (exit code 1) if any slope per hour exceeds its threshold.
+
+The workload is a weighted mix of reads (/home, /accounts, /transactions,
+/categories, /analytics/dashboard) and writes. Each write posts a small
+transaction to a scratch account with an Idempotency-Key, sometimes retries
+it, and deletes it again later so the database stays flat. Requests rotate
+through a pool of X-Forwarded-For addresses so per-IP limiter keys churn the
+way they do in production.
+
+--start launches `node src/server.js` from ../backend with raised
+RATE_LIMIT_IP_MAX / RATE_LIMIT_USER_MAX, so the limiters still run but do
+not throttle the soak user, and stops it at the end.
+
+Usage:
+  python3 soak_test.py --start --duration 180 --rps 30
+  python3 soak_test.py --base-url http://localhost:3000 --duration 60 --csv soak.csv
+"""
+
+import argparse
+import csv
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import requests
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+READS = [
+    (4, '/api/v1/home'),
+    (3, '/api/v1/transactions?limit=20'),
+    (2, '/api/v1/accounts'),
+    (2, '/api/v1/categories'),
+    (2, '/api/v1/analytics/dashboard?period=month'),
+    (1, '/health'),
+]
+WRITE_WEIGHT = 2
+RETRY_RATE = 0.1
+MAX_LIVE_TRANSACTIONS = 200
+IP_POOL_SIZE = 5000
+
+METRIC_PATTERN = re.compile(r'^(\w+)(?:\{([^}]*)\})? ([-+\deE.]+|NaN)$')
+
+
+def parse_metrics(text):
+    """{(name, labels): value} from the Prometheus text format."""
+    values = {}
+    for line in text.splitlines():
+        match = METRIC_PATTERN.match(line)
+        if match:
+            values[(match.group(1), match.group(2) or '')] = float(match.group(3))
+    return values
+
+
+def slope_per_hour(points):
+    """Least-squares slope of [(seconds, value)], in units per hour."""
+    if len(points) < 3:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return cov / var_x * 3600
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class Client:
+    """Signed-in API client shared by the load threads; re-signs in on 401."""
+
+    def __init__(self, base_url, email, password):
+        self.base_url = base_url
+        self.email = email
+        self.password = password
+        self.lock = threading.Lock()
+        self.headers = {}
+        self.local = threading.local()
+        self.signin()
+
+    def signin(self):
+        payload = {'email': self.email, 'password': self.password, 'deviceId': 'soak-test'}
+        resp = requests.post(f'{self.base_url}/api/v1/auth/signin', json=payload)
+        if resp.status_code in (400, 401, 404):
+            requests.post(f'{self.base_url}/api/v1/auth/signup', json={**payload, 'deviceName': 'soak'}).raise_for_status()
+            resp = requests.post(f'{self.base_url}/api/v1/auth/signin', json=payload)
+        resp.raise_for_status()
+        self.headers = {'Authorization': f"Bearer {resp.json()['accessToken']}"}
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def request(self, method, path, headers=None, retry=True, **kwargs):
+        address = random.randrange(IP_POOL_SIZE)
+        request_headers = {
+            **self.headers,
+            'X-Forwarded-For': f'10.0.{address // 250}.{address % 250 + 1}',
+            **(headers or {}),
+        }
+        resp = self.session().request(method, f'{self.base_url}{path}', headers=request_headers, timeout=30, **kwargs)
+        if resp.status_code == 401 and retry:
+            # Access tokens last 15 minutes
+            with self.lock:
+                self.signin()
+            return self.request(method, path, headers=headers, retry=False, **kwargs)
+        return resp
+
+
+class Soak:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.counts = {'requests': 0, 'errors': 0, 'throttled': 0}
+        self.live_transactions = []
+        self.account_id = None
+        self.samples = []
+
+    def setup(self):
+        resp = self.client.request('POST', '/api/v1/accounts', json={'name': 'Soak test', 'account_type': 'cash'})
+        resp.raise_for_status()
+        self.account_id = resp.json()['account_id']
+
+    def teardown(self):
+        for transaction_id in self.live_transactions:
+            self.client.request('DELETE', f'/api/v1/transactions/{transaction_id}')
+        if self.account_id:
+            self.client.request('DELETE', f'/api/v1/accounts/{self.account_id}')
+
+    def write(self):
+        payload = {'accountId': self.account_id, 'amount': 1.0, 'type': 'income', 'description': 'soak'}
+        key = str(uuid.uuid4())
+        resp = self.client.request('POST', '/api/v1/transactions', json=payload, headers={'Idempotency-Key': key})
+        if resp.status_code == 201 and random.random() < RETRY_RATE:
+            self.client.request('POST', '/api/v1/transactions', json=payload, headers={'Idempotency-Key': key})
+        if resp.status_code == 201:
+            stale = None
+            with self.lock:
+                self.live_transactions.append(resp.json()['transaction_id'])
+                if len(self.live_transactions) > MAX_LIVE_TRANSACTIONS:
+                    stale = self.live_transactions.pop(0)
+            if stale:
+                self.client.request('DELETE', f'/api/v1/transactions/{stale}')
+        return resp
+
+    def one_request(self):
+        weights = [weight for weight, _ in READS] + [WRITE_WEIGHT]
+        choice = random.choices(range(len(weights)), weights=weights)[0]
+        start = time.perf_counter()
+        try:
+            if choice == len(READS):
+                resp = self.write()
+            else:
+                resp = self.client.request('GET', READS[choice][1])
+            status = resp.status_code
+        except requests.RequestException:
+            status = 599
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self.lock:
+            self.latencies.append(elapsed_ms)
+            self.counts['requests'] += 1
+            if status == 429:
+                self.counts['throttled'] += 1
+            elif status >= 500:
+                self.counts['errors'] += 1
+
+    def worker(self, index):
+        # Each worker owns every Nth slot of a fixed schedule, so the overall
+        # rate stays steady even when individual requests are slow
+        interval = self.args.concurrency / self.args.rps
+        next_at = time.monotonic() + index * interval / self.args.concurrency
+        while not self.stop.is_set():
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                self.stop.wait(delay)
+            next_at = max(next_at + interval, time.monotonic() - interval)
+            self.one_request()
+
+    def sample(self, started):
+        with self.lock:
+            window, self.latencies = self.latencies, []
+            counts = dict(self.counts)
+
+        headers = {'Authorization': f'Bearer {self.args.metrics_token}'} if self.args.metrics_token else {}
+        metrics = parse_metrics(requests.get(f'{self.args.base_url}/metrics', headers=headers, timeout=10).text)
+        sample = {
+            'elapsed_s': round(time.monotonic() - started, 1),
+            'rss_mb': metrics.get(('nodejs_memory_bytes', 'kind="rss"'), 0.0) / 1e6,
+            'heap_used_mb': metrics.get(('nodejs_memory_bytes', 'kind="heap_used"'), 0.0) / 1e6,
+            'loop_lag_p99_ms': metrics.get(('nodejs_eventloop_lag_seconds', 'stat="p99"'), 0.0) * 1000,
+            'p99_ms': percentile(window, 0.99),
+            'p50_ms': percentile(window, 0.5),
+            'requests': counts['requests'],
+            'errors': counts['errors'],
+            'throttled': counts['throttled'],
+        }
+        self.samples.append(sample)
+        print(f"   {sample['elapsed_s'] / 60:7.1f} min  rss {sample['rss_mb']:7.1f} MB  "
+              f"heap {sample['heap_used_mb']:7.1f} MB  lag p99 {sample['loop_lag_p99_ms']:6.1f} ms  "
+              f"p50 {sample['p50_ms']:6.1f} ms  p99 {sample['p99_ms']:7.1f} ms  "
+              f"req {sample['requests']:,}  5xx {sample['errors']}  429 {sample['throttled']}", flush=True)
+
+    def run(self):
+        self.setup()
+        started = time.monotonic()
+        threads = [threading.Thread(target=self.worker, args=(i,), daemon=True) for i in range(self.args.concurrency)]
+        for thread in threads:
+            thread.start()
+
+        deadline = started + self.args.duration * 60
+        try:
+            while time.monotonic() < deadline:
+                self.stop.wait(min(self.args.sample_interval, max(0, deadline - time.monotonic())))
+                try:
+                    self.sample(started)
+                except requests.RequestException as error:
+                    print(f'   ⚠ Sample failed: {error}')
+        except KeyboardInterrupt:
+            print('\n   Interrupted, evaluating what was collected')
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join(timeout=30)
+            self.teardown()
+
+
+def evaluate(samples, args):
+    """Fit a trend per series after warm-up; return a list of failures."""
+    steady = [s for s in samples if s['elapsed_s'] >= args.warmup * 60]
+    checks = [
+        ('rss_mb', 'RSS', 'MB/h', args.max_rss_growth),
+        ('heap_used_mb', 'Heap used', 'MB/h', args.max_heap_growth),
+        ('p99_ms', 'p99 latency', 'ms/h', args.max_p99_growth),
+        ('loop_lag_p99_ms', 'Loop lag p99', 'ms/h', args.max_lag_growth),
+    ]
+
+    print(f'\nTrend over {len(steady)} samples after {args.warmup} min warm-up:')
+    failures = []
+    for key, label, unit, limit in checks:
+        slope = slope_per_hour([(s['elapsed_s'], s[key]) for s in steady])
+        ok = slope <= limit
+        print(f"   {'✓' if ok else '✗'} {label:14s} {slope:+9.2f} {unit}  (limit {limit:g})")
+        if not ok:
+            failures.append(label)
+
+    if samples and samples[-1]['requests']:
+        error_rate = samples[-1]['errors'] / samples[-1]['requests']
+        ok = error_rate <= args.max_error_rate
+        print(f"   {'✓' if ok else '✗'} {'5xx rate':14s} {error_rate * 100:9.3f} %     (limit {args.max_error_rate * 100:g})")
+        if not ok:
+            failures.append('5xx rate')
+    return failures
+
+
+def start_backend(args):
+    env = {
+        **os.environ,
+        'PORT': str(args.port),
+        'RATE_LIMIT_IP_MAX': os.environ.get('RATE_LIMIT_IP_MAX', '1000000'),
+        'RATE_LIMIT_USER_MAX': os.environ.get('RATE_LIMIT_USER_MAX', '1000000'),
+    }
+    process = subprocess.Popen(['node', 'src/server.js'], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(60):
+        try:
+            if requests.get(f'{args.base_url}/health', timeout=2).ok:
+                return process
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            sys.exit(f'❌ Backend exited with code {process.returncode}')
+        time.sleep(1)
+    process.terminate()
+    sys.exit('❌ Backend did not become healthy within 60s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test for memory and latency drift')
+    parser.add_argument('--base-url', default=None, help='Backend URL (default: http://localhost:<port>)')
+    parser.add_argument('--start', action='store_true', help='Start the backend from ../backend and stop it afterwards')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--email', default='soak@example.com')
+    parser.add_argument('--password', default='SoakTest123!@#')
+    parser.add_argument('--metrics-token', default=os.environ.get('METRICS_TOKEN'))
+    parser.add_argument('--duration', type=float, default=120, help='Minutes to run')
+    parser.add_argument('--warmup', type=float, default=10, help='Minutes excluded from the trend fit')
+    parser.add_argument('--rps', type=float, default=20, help='Target requests per second')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--sample-interval', type=float, default=30, help='Seconds between samples')
+    parser.add_argument('--max-rss-growth', type=float, default=20, help='MB per hour')
+    parser.add_argument('--max-heap-growth', type=float, default=10, help='MB per hour')
+    parser.add_argument('--max-p99-growth', type=float, default=20, help='ms per hour')
+    parser.add_argument('--max-lag-growth', type=float, default=5, help='ms per hour')
+    parser.add_argument('--max-error-rate', type=float, default=0.001, help='Fraction of requests')
+    parser.add_argument('--csv', help='Write every sample to this file')
+    args = parser.parse_args()
+    args.base_url = args.base_url or f'http://localhost:{args.port}'
+
+    print('=' * 78)
+    print('RUPAYA Soak Test')
+    print('=' * 78)
+    print(f'\n   {args.rps:g} req/s for {args.duration:g} min against {args.base_url}\n')
+
+    process = start_backend(args) if args.start else None
+    soak = None
+    try:
+        soak = Soak(Client(args.base_url, args.email, args.password), args)
+        soak.run()
+    finally:
+        if process:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+
+    if soak is None:
+        sys.exit(1)
+    if args.csv and soak.samples:
+        with open(args.csv, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(soak.samples[0]))
+            writer.writeheader()
+            writer.writerows(soak.samples)
+
+    failures = evaluate(soak.samples, args)
+    print('\n' + '=' * 78)
+    if failures:
+        print(f"❌ Drift detected: {', '.join(failures)}")
+        sys.exit(1)
+    print('✅ No drift beyond thresholds')
+
+
+if __name__ == '__main__':
+    main()
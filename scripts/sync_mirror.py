@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Local mirror of a user's data built from the /sync delta endpoint.
+
+Each run pulls only the changes since the stored watermark and applies them to
+a SQLite file. With --verify it also takes a full snapshot from the server and
+checks that the incremental mirror holds exactly the same rows.
+"""
+
+import argparse
+import json
+import sqlite3
+
+import requests
+
+BASE_URL = 'http://localhost:3000/api/v1'
+ENTITY_KEYS = {
+    'accounts': 'account_id',
+    'transactions': 'transaction_id',
+    'categories': 'category_id',
+    'budgets': 'budget_id',
+}
+
+
+def signin(email, password):
+    resp = requests.post(f'{BASE_URL}/auth/signin', json={
+        'email': email,
+        'password': password,
+        'deviceId': 'sync-mirror'
+    })
+    resp.raise_for_status()
+    return {'Authorization': f"Bearer {resp.json()['accessToken']}"}
+
+
+def open_mirror(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE IF NOT EXISTS entities ('
+                 'entity_type TEXT NOT NULL, entity_id TEXT NOT NULL, payload TEXT NOT NULL, '
+                 'PRIMARY KEY (entity_type, entity_id))')
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    return conn
+
+
+def get_watermark(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+    return row[0] if row else None
+
+
+def fetch_changes(headers, since=None):
+    params = {'since': since} if since else {}
+    resp = requests.get(f'{BASE_URL}/sync', headers=headers, params=params)
+    resp.raise_for_status()
+    return resp.json()['data']
+
+
+def apply_changes(conn, changes):
+    with conn:
+        if changes['full']:
+            conn.execute('DELETE FROM entities')
+
+        for entity_type, id_key in ENTITY_KEYS.items():
+            section = changes[entity_type]
+            for row in section['updated']:
+                conn.execute('INSERT OR REPLACE INTO entities VALUES (?, ?, ?)',
+                             (entity_type, str(row[id_key]), json.dumps(row, sort_keys=True)))
+            for entity_id in section['deleted']:
+                conn.execute('DELETE FROM entities WHERE entity_type = ? AND entity_id = ?',
+                             (entity_type, str(entity_id)))
+
+        if changes['settings']:
+            conn.execute('INSERT OR REPLACE INTO entities VALUES (?, ?, ?)',
+                         ('settings', 'settings', json.dumps(changes['settings'], sort_keys=True)))
+
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (changes['watermark'],))
+
+
+def mirrored_ids(conn, entity_type):
+    rows = conn.execute('SELECT entity_id FROM entities WHERE entity_type = ?', (entity_type,))
+    return {row[0] for row in rows}
+
+
+def verify(conn, headers):
+    snapshot = fetch_changes(headers)
+    ok = True
+
+    for entity_type, id_key in ENTITY_KEYS.items():
+        expected = {str(row[id_key]) for row in snapshot[entity_type]['updated']}
+        actual = mirrored_ids(conn, entity_type)
+        missing = expected - actual
+        extra = actual - expected
+        status = '✓' if not missing and not extra else '❌'
+        print(f"   {status} {entity_type:13s} server={len(expected):6d}  mirror={len(actual):6d}"
+              f"  missing={len(missing)}  extra={len(extra)}")
+        ok = ok and not missing and not extra
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', default='rupaya_mirror.sqlite3')
+    parser.add_argument('--email', default='iostest@example.com')
+    parser.add_argument('--password', default='TestPass123!@#')
+    parser.add_argument('--verify', action='store_true', help='compare the mirror with a full server snapshot')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("RUPAYA Sync Mirror")
+    print("=" * 60)
+
+    headers = signin(args.email, args.password)
+    conn = open_mirror(args.db)
+
+    since = get_watermark(conn)
+    changes = fetch_changes(headers, since)
+    apply_changes(conn, changes)
+
+    print(f"\nSynced from watermark {since or '(none)'} to {changes['watermark']}"
+          f"{' (full snapshot)' if changes['full'] else ''}")
+    for entity_type in ENTITY_KEYS:
+        section = changes[entity_type]
+        print(f"   {entity_type:13s} +{len(section['updated']):5d} updated  -{len(section['deleted']):5d} deleted")
+
+    if args.verify:
+        print("\nVerifying mirror against a full snapshot...")
+        if not verify(conn, headers):
+            raise SystemExit(1)
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == '__main__':
+    main()